@@ -0,0 +1,262 @@
+# ============================================
+#      AUDITORIA DOS ATENDIMENTOS (EM LOTE)
+# ============================================
+
+import os
+import csv
+import glob
+import gzip
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime
+
+from metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("jsonl", "csv", "sqlite")
+
+tempo_gravacao = metricas.histograma(
+    "chatbot_auditoria_segundos", "Gravações da auditoria (lotes da fila e CSV por atendimento)", ("operacao",))
+
+
+# =======================================================
+#   REGISTRO DE UM ATENDIMENTO
+# =======================================================
+def registro_do_atendimento(atendimento) -> dict:
+    """Fotografia do atendimento no momento em que ele foi encerrado."""
+    return {
+        "user_id": atendimento.user_id,
+        "id_atendimento": atendimento.id_atendimento,
+        "inicio": atendimento.inicio.isoformat(sep=" "),
+        "fim": datetime.now().isoformat(sep=" "),
+        "registros": dict(atendimento.registros),
+    }
+
+
+@tempo_gravacao.cronometrado("csv_atendimento")
+def escrever_csv_atendimento(caminho: str, registro: dict):
+    """Mesmo layout do antigo Atendimento.gerar_csv (CHAVE, VALOR)."""
+    with open(caminho, "w", newline="", encoding="utf-8") as arq:
+        writer = csv.writer(arq)
+        writer.writerow(["CHAVE", "VALOR"])
+        writer.writerow(["user_id", registro["user_id"]])
+        writer.writerow(["id_atendimento", registro["id_atendimento"]])
+        writer.writerow(["inicio", registro["inicio"]])
+        writer.writerow(["fim", registro["fim"]])
+        for chave, valor in registro["registros"].items():
+            writer.writerow([chave, valor])
+
+
+# =======================================================
+#   GRAVADOR ASSÍNCRONO
+# =======================================================
+class AuditoriaAtendimentos:
+    """
+    Fila -> tarefa de fundo -> arquivo diário (só acrescenta).
+
+    Os handlers só colocam o registro na fila; a gravação acontece em lotes
+    numa thread, fora do event loop. Com a fila cheia, registrar() espera
+    (backpressure) e, passado o limite, grava direto para não perder nada.
+    encerrar() esvazia a fila antes de o bot desligar.
+    """
+
+    def __init__(self, pasta="atendimentos", formato="jsonl", compactar=False,
+                 tamanho_fila=10000, tamanho_lote=200, intervalo=1.0, espera_max=5.0, sufixo=""):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de auditoria inválido: {formato} (use {', '.join(FORMATOS)})")
+        self.pasta = pasta
+        self.formato = formato
+        self.compactar = compactar and formato != "sqlite"
+        self.sufixo = sufixo  # um arquivo por processo quando há vários workers
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self._tamanho_fila = tamanho_fila
+        self._fila = None
+        self._tarefa = None
+        self.gravados = 0
+        self.lotes = 0
+        self.esperas_fila_cheia = 0
+
+    # ===================================================
+    #     CICLO DE VIDA
+    # ===================================================
+    async def iniciar(self):
+        if self._tarefa is None:
+            self._fila = asyncio.Queue(maxsize=self._tamanho_fila)
+            self._tarefa = asyncio.create_task(self._gravar_continuamente())
+            logger.info(f"Auditoria iniciada: {self.formato}{' (gzip)' if self.compactar else ''} em {self.pasta}/")
+
+    async def encerrar(self):
+        """Grava tudo o que ainda está na fila e para a tarefa."""
+        if self._tarefa is None:
+            return
+        await self._fila.put(None)
+        await self._tarefa
+        self._tarefa = None
+        logger.info(f"Auditoria encerrada: {self.estatisticas()}")
+
+    async def registrar(self, atendimento):
+        """Enfileira o registro do atendimento encerrado."""
+        await self.iniciar()
+        registro = registro_do_atendimento(atendimento)
+        if self._fila.full():
+            self.esperas_fila_cheia += 1
+        try:
+            await asyncio.wait_for(self._fila.put(registro), timeout=self.espera_max)
+        except asyncio.TimeoutError:
+            logger.error("Fila de auditoria cheia: gravando o registro diretamente")
+            await asyncio.to_thread(self._gravar_lote, [registro])
+
+    async def _gravar_continuamente(self):
+        encerrando = False
+        while not encerrando:
+            primeiro = await self._fila.get()
+            if primeiro is None:
+                break
+            lote = [primeiro]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._fila.get(), timeout=restante)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    encerrando = True
+                    break
+                lote.append(item)
+            try:
+                await asyncio.to_thread(self._gravar_lote, lote)
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de auditoria ({len(lote)} registros): {e}")
+
+    def estatisticas(self) -> dict:
+        return {
+            "na_fila": self._fila.qsize() if self._fila else 0,
+            "gravados": self.gravados,
+            "lotes": self.lotes,
+            "esperas_fila_cheia": self.esperas_fila_cheia,
+        }
+
+    # ===================================================
+    #     GRAVAÇÃO (RODA NUMA THREAD)
+    # ===================================================
+    def _arquivo_do_dia(self, dia: str) -> str:
+        extensao = "db" if self.formato == "sqlite" else self.formato
+        caminho = os.path.join(self.pasta, f"auditoria_{dia}{self.sufixo}.{extensao}")
+        return caminho + ".gz" if self.compactar else caminho
+
+    def _abrir(self, caminho: str):
+        if self.compactar:
+            # cada lote vira um novo membro gzip; leitores tratam o arquivo como um só
+            return gzip.open(caminho, "at", newline="", encoding="utf-8")
+        return open(caminho, "a", newline="", encoding="utf-8")
+
+    @tempo_gravacao.cronometrado("lote")
+    def _gravar_lote(self, lote: list):
+        os.makedirs(self.pasta, exist_ok=True)
+        por_dia = {}
+        for registro in lote:
+            por_dia.setdefault(registro["fim"][:10], []).append(registro)
+
+        for dia, registros in por_dia.items():
+            caminho = self._arquivo_do_dia(dia)
+            if self.formato == "sqlite":
+                self._gravar_sqlite(caminho, registros)
+            elif self.formato == "csv":
+                novo = not os.path.exists(caminho)
+                with self._abrir(caminho) as arq:
+                    writer = csv.writer(arq)
+                    if novo:
+                        writer.writerow(["user_id", "id_atendimento", "inicio", "fim", "registros"])
+                    for r in registros:
+                        writer.writerow([r["user_id"], r["id_atendimento"], r["inicio"], r["fim"],
+                                         json.dumps(r["registros"], ensure_ascii=False)])
+            else:
+                with self._abrir(caminho) as arq:
+                    arq.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in registros)
+
+        self.gravados += len(lote)
+        self.lotes += 1
+
+    @staticmethod
+    def _gravar_sqlite(caminho: str, registros: list):
+        with sqlite3.connect(caminho) as conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS auditoria ("
+                " id_atendimento TEXT, user_id INTEGER, inicio TEXT, fim TEXT, registros TEXT)"
+            )
+            conexao.executemany(
+                "INSERT INTO auditoria VALUES (?, ?, ?, ?, ?)",
+                [(r["id_atendimento"], r["user_id"], r["inicio"], r["fim"],
+                  json.dumps(r["registros"], ensure_ascii=False)) for r in registros],
+            )
+
+    # ===================================================
+    #     LEITURA E EXPORTAÇÃO
+    # ===================================================
+    def ler_registros(self):
+        """Percorre todos os registros gravados, do dia mais antigo ao mais recente."""
+        for caminho in sorted(glob.glob(os.path.join(self.pasta, "auditoria_*"))):
+            if caminho.endswith(".db"):
+                with sqlite3.connect(caminho) as conexao:
+                    for id_atd, user_id, inicio, fim, registros in conexao.execute(
+                            "SELECT id_atendimento, user_id, inicio, fim, registros FROM auditoria"):
+                        yield {"user_id": user_id, "id_atendimento": id_atd, "inicio": inicio,
+                               "fim": fim, "registros": json.loads(registros)}
+                continue
+            abrir = gzip.open if caminho.endswith(".gz") else open
+            with abrir(caminho, "rt", newline="", encoding="utf-8") as arq:
+                if ".csv" in caminho:
+                    for linha in csv.DictReader(arq):
+                        linha["user_id"] = int(linha["user_id"])
+                        linha["registros"] = json.loads(linha["registros"])
+                        yield linha
+                else:
+                    for linha in arq:
+                        if linha.strip():
+                            yield json.loads(linha)
+
+    def exportar_csv(self, id_atendimento: str, pasta_destino: str = None):
+        """
+        Gera, sob demanda, o CSV individual de um atendimento (mesmo formato
+        de antes). Retorna o caminho ou None se o atendimento não existir.
+        """
+        for registro in self.ler_registros():
+            if registro["id_atendimento"] != id_atendimento:
+                continue
+            pasta_destino = pasta_destino or self.pasta
+            os.makedirs(pasta_destino, exist_ok=True)
+            data = registro["fim"][:16].replace(" ", "_").replace(":", "h")
+            caminho = os.path.join(pasta_destino, f"atendimento_{registro['user_id']}_{id_atendimento}_{data}.csv")
+            escrever_csv_atendimento(caminho, registro)
+            return caminho
+        return None
+
+
+def criar_auditoria() -> AuditoriaAtendimentos:
+    """Configuração via .env: AUDITORIA_PASTA, AUDITORIA_FORMATO, AUDITORIA_GZIP, AUDITORIA_SUFIXO."""
+    return AuditoriaAtendimentos(
+        pasta=os.getenv("AUDITORIA_PASTA", "atendimentos"),
+        formato=os.getenv("AUDITORIA_FORMATO", "jsonl").lower(),
+        compactar=os.getenv("AUDITORIA_GZIP", "0") == "1",
+        tamanho_fila=int(os.getenv("AUDITORIA_FILA_MAX", "10000")),
+        sufixo=os.getenv("AUDITORIA_SUFIXO", ""),
+    )
+
+
+if __name__ == "__main__":
+    # exportar o CSV de um atendimento: python auditoria.py <id_atendimento>
+    import sys
+    if len(sys.argv) != 2:
+        print("Uso: python auditoria.py <id_atendimento>")
+        sys.exit(1)
+    caminho = criar_auditoria().exportar_csv(sys.argv[1])
+    print(caminho or f"Atendimento {sys.argv[1]} não encontrado")
@@ -0,0 +1,5 @@
+# ============================================
+#      BENCHMARKS DO BOT UNIFECAF
+# ============================================
+# Executar a partir da raiz do projeto, por exemplo:
+#   python -m benchmarks.bench_disciplinas
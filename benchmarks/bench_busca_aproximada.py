@@ -0,0 +1,160 @@
+# ============================================
+#   BENCHMARK: BUSCA DE CURSOS E DISCIPLINAS COM ERRO DE DIGITAÇÃO
+# ============================================
+# Para cada curso e disciplina do catálogo, uma pergunta com um erro de
+# digitação sorteado (letra trocada, faltando, sobrando ou duas vizinhas
+# invertidas) e sem acentos. Mede:
+#  - quantas a busca exata (Aho-Corasick: cursos_citados/disciplinas_citadas)
+#    resolve sem a IA, e quantas a busca aproximada (sugestoes) resolve,
+#    e se a primeira sugestão é o nome certo;
+#  - falsos positivos em perguntas que não citam nenhum curso nem disciplina;
+#  - o tempo por pergunta com o catálogo 1x, 10x e 100x maior (cada cópia com
+#    palavras novas, então o vocabulário cresce junto), com as correções
+#    ainda não guardadas (fria) e já guardadas (quente).
+#
+#   python -m benchmarks.bench_busca_aproximada
+
+import time
+import random
+import statistics
+
+from catalogo import CatalogIndex, carregar_cursos_csv, _tokens_relevantes
+from normalizacao import normalizar_texto
+
+SEMENTE = 23
+_LETRAS = "abcdefghijklmnopqrstuvwxyz"
+
+# nada aqui cita curso ou disciplina: sugestão é falso positivo
+SEM_CATALOGO = [
+    "quero falar com a secretaria sobre o boleto",
+    "onde vejo minhas notas?",
+    "como faço a rematrícula do próximo semestre",
+    "preciso da segunda via do boleto",
+    "qual o horário de atendimento da secretaria",
+    "não consigo acessar o portal do aluno",
+    "quero trancar a matrícula",
+    "tem desconto para pagamento antecipado?",
+    "quando saem as notas das provas",
+    "como funciona o estágio obrigatório",
+    "quero cancelar meu curso",
+    "obrigado pela ajuda",
+    "qual o valor da mensalidade",
+    "vocês têm bolsa de estudos?",
+    "meu login não funciona",
+]
+
+
+def etiqueta(copia: int) -> str:
+    return _LETRAS[copia // 26 % 26] + _LETRAS[copia % 26]
+
+
+def ampliar(cursos: dict, fator: int) -> dict:
+    """Catálogo 'fator' vezes maior; cada cópia ganha palavras próprias ('logica' -> 'logicaab')."""
+    ampliado = {}
+    for copia in range(fator):
+        def renomear(nome: str) -> str:
+            if not copia:
+                return nome
+            return " ".join(p + etiqueta(copia) if len(p) >= 4 else p for p in nome.split())
+        for curso, semestres in cursos.items():
+            ampliado[renomear(curso)] = {
+                sem: [renomear(d) for d in disciplinas] for sem, disciplinas in semestres.items()
+            }
+    return ampliado
+
+
+def com_erro(palavra: str, sorteio: random.Random) -> str:
+    """Um erro de digitação numa palavra de 4+ letras."""
+    i = sorteio.randrange(1, len(palavra) - 1)
+    tipo = sorteio.choice(("troca", "falta", "sobra", "inverte"))
+    if tipo == "troca":
+        return palavra[:i] + sorteio.choice(_LETRAS.replace(palavra[i], "")) + palavra[i + 1:]
+    if tipo == "falta":
+        return palavra[:i] + palavra[i + 1:]
+    if tipo == "sobra":
+        return palavra[:i] + sorteio.choice(_LETRAS) + palavra[i:]
+    if palavra[i] == palavra[i + 1]:
+        return palavra[:i] + palavra[i + 1:]
+    return palavra[:i] + palavra[i + 1] + palavra[i] + palavra[i + 2:]
+
+
+def perguntas_com_erro(cursos: dict, indice: CatalogIndex) -> list:
+    """[(pergunta, tipo, nome esperado)] com um erro na palavra mais longa de cada nome."""
+    sorteio = random.Random(SEMENTE)
+    nomes = [("curso", curso) for curso in cursos]
+    nomes += [("disciplina", d) for d in dict.fromkeys(
+        d for semestres in cursos.values() for disciplinas in semestres.values() for d in disciplinas)]
+    perguntas = []
+    for tipo, nome in nomes:
+        normalizado = normalizar_texto(nome)
+        longa = max(_tokens_relevantes(normalizado), key=len)
+        errada = com_erro(longa, sorteio)
+        while errada in indice.vocabulario:
+            errada = com_erro(longa, sorteio)
+        perguntas.append((f"quero saber sobre {normalizado.replace(longa, errada, 1)}", tipo, nome))
+    return perguntas
+
+
+def nome_da_sugestao(sugestao) -> str:
+    tipo, valor, _ = sugestao
+    return valor if tipo == "curso" else valor[0]
+
+
+def precisao(cursos: dict):
+    indice = CatalogIndex(cursos)
+    perguntas = perguntas_com_erro(cursos, indice)
+    exata = aproximada = certa = 0
+    for pergunta, _, nome in perguntas:
+        if indice.cursos_citados(pergunta) or indice.disciplinas_citadas(pergunta):
+            exata += 1
+        sugestoes = indice.sugestoes(pergunta)
+        if sugestoes:
+            aproximada += 1
+            certa += nome_da_sugestao(sugestoes[0]) == nome
+    falsos = [p for p in SEM_CATALOGO if indice.sugestoes(p)]
+    total = len(perguntas)
+    print(f"{total} perguntas com um erro de digitação (cursos e disciplinas do catálogo)")
+    print(f"  resolvidas pela busca exata     : {exata:>4}/{total}")
+    print(f"  resolvidas pela busca aproximada: {aproximada:>4}/{total}  (primeira sugestão certa: {certa}/{total})")
+    print(f"  falsos positivos sem curso/disciplina na pergunta: {len(falsos)}/{len(SEM_CATALOGO)} {falsos or ''}")
+    return perguntas
+
+
+def percentis(tempos: list) -> tuple:
+    ordenados = sorted(tempos)
+    return statistics.median(ordenados), ordenados[int(len(ordenados) * 0.95)], ordenados[-1]
+
+
+def tempos_por_tamanho(base: dict, perguntas: list):
+    print(f"\n{'catálogo':>8} {'nomes':>7} {'vocabulário':>12} {'montagem ms':>12} "
+          f"{'fria p50/p95/máx µs':>22} {'quente p50/p95 µs':>19} {'certas':>8}")
+    for fator in (1, 10, 100):
+        cursos = ampliar(base, fator)
+        inicio = time.perf_counter()
+        indice = CatalogIndex(cursos)
+        montagem = (time.perf_counter() - inicio) * 1000
+        nomes = len(indice._nomes)
+        frias, quentes, certas = [], [], 0
+        for pergunta, _, nome in perguntas:
+            indice.vocabulario._correcoes.clear()
+            inicio = time.perf_counter()
+            sugestoes = indice.sugestoes(pergunta)
+            frias.append((time.perf_counter() - inicio) * 1e6)
+            inicio = time.perf_counter()
+            indice.sugestoes(pergunta)
+            quentes.append((time.perf_counter() - inicio) * 1e6)
+            certas += bool(sugestoes) and nome_da_sugestao(sugestoes[0]) == nome
+        fria, quente = percentis(frias), percentis(quentes)
+        print(f"{str(fator) + 'x':>8} {nomes:>7} {len(indice.vocabulario):>12} {montagem:>12.0f} "
+              f"{fria[0]:>8.0f}/{fria[1]:.0f}/{fria[2]:.0f} {quente[0]:>12.0f}/{quente[1]:.0f} "
+              f"{certas:>4}/{len(perguntas)}")
+
+
+def main():
+    base = carregar_cursos_csv()
+    perguntas = precisao(base)
+    tempos_por_tamanho(base, perguntas)
+
+
+if __name__ == "__main__":
+    main()
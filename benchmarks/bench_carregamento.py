@@ -0,0 +1,85 @@
+# ============================================
+#   BENCHMARK: CARREGAMENTO DO CATÁLOGO
+# ============================================
+# Compara o carregador antigo (pandas.read_csv + iterrows) com o carregador
+# em streaming do módulo csv, em processos novos (importação incluída) e
+# dentro do mesmo processo (só a leitura), com pico de memória via tracemalloc.
+#
+#   python -m benchmarks.bench_carregamento
+
+import sys
+import time
+import subprocess
+import tracemalloc
+
+from catalogo import ARQUIVO_CURSOS, carregar_cursos_csv
+
+REPETICOES = 5
+
+# carregador antigo, executado isolado em um processo novo
+_CODIGO_PANDAS = f"""
+import pandas as pd
+df = pd.read_csv({ARQUIVO_CURSOS!r})
+cursos = {{}}
+curso_atual = semestre_atual = None
+for _, row in df.iterrows():
+    if pd.notna(row['Curso']) and row['Curso'] != '---':
+        curso_atual = row['Curso']
+        cursos[curso_atual] = {{}}
+    if pd.notna(row['Semestre']) and row['Semestre'] != '---':
+        semestre_atual = row['Semestre']
+        if curso_atual:
+            cursos[curso_atual][semestre_atual] = []
+    if pd.notna(row['Disciplina']) and curso_atual and semestre_atual:
+        cursos[curso_atual][semestre_atual].append(row['Disciplina'])
+"""
+
+_CODIGO_CSV = "from catalogo import carregar_cursos_csv; carregar_cursos_csv()"
+
+
+def tempo_processo(codigo: str) -> float:
+    """Melhor tempo (ms) de um processo Python novo executando o código."""
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], check=True)
+        melhor = min(melhor, (time.perf_counter() - inicio) * 1000)
+    return melhor
+
+
+def medir_em_processo(funcao):
+    """(tempo médio em ms, pico de memória em KiB) de uma chamada."""
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        funcao()
+    tempo = (time.perf_counter() - inicio) / REPETICOES * 1000
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tempo, pico / 1024
+
+
+def main():
+    print("Processo novo (importação + leitura), melhor de", REPETICOES)
+    print(f"  python vazio : {tempo_processo('pass'):8.1f} ms")
+    print(f"  csv streaming: {tempo_processo(_CODIGO_CSV):8.1f} ms")
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("  pandas       : (não instalado — comparação ignorada)")
+        pandas_ok = False
+    else:
+        print(f"  pandas       : {tempo_processo(_CODIGO_PANDAS):8.1f} ms")
+        pandas_ok = True
+
+    print("\nMesmo processo (só a leitura)")
+    tempo, pico = medir_em_processo(carregar_cursos_csv)
+    print(f"  csv streaming: {tempo:8.2f} ms  pico {pico:8.1f} KiB")
+    if pandas_ok:
+        tempo, pico = medir_em_processo(lambda: exec(_CODIGO_PANDAS, {}))
+        print(f"  pandas       : {tempo:8.2f} ms  pico {pico:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# ============================================
+#   BENCHMARK: CLIENTE RESILIENTE DA OPENAI
+# ============================================
+# Roda consultas concorrentes contra o servidor OpenAI falso (rede local,
+# sem chave real) e compara a chamada direta do SDK com o ClienteIAResiliente:
+#  1) API instável (erros 429/5xx e cauda de latência): taxa de respostas da
+#     IA e p50/p90/p99, com repetição (prazo por tentativa acima e abaixo da
+#     cauda) e com repetição + hedge. A cauda pega 5% das chamadas, então o
+#     p95 cai bem na fronteira e varia de uma rodada para outra; o p90 mede
+#     as chamadas normais, e o p99 e as esperas acima de 1 s medem a cauda;
+#  2) API fora do ar: quanto tempo o aluno espera pelo fallback e quantas
+#     requisições ainda vão para a API, sem e com o disjuntor.
+#
+#   python -m benchmarks.bench_cliente_ia [consultas, padrão 300]
+
+import sys
+import time
+import asyncio
+import logging
+
+from openai import AsyncOpenAI
+
+from cliente_ia import ClienteIAResiliente, Disjuntor, IAIndisponivel
+from benchmarks.fake_openai import ServidorOpenAIFalso
+
+CONCORRENCIA = 30
+MENSAGENS = [{"role": "user", "content": "Quais disciplinas tem no 1º semestre?"}]
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def rodar(servidor: ServidorOpenAIFalso, consultas: int, resiliente: ClienteIAResiliente = None) -> dict:
+    """Dispara as consultas; erro ou recusa contam como fallback."""
+    cliente = AsyncOpenAI(api_key="teste-offline", base_url=servidor.url, max_retries=0, timeout=30)
+    semaforo = asyncio.Semaphore(CONCORRENCIA)
+    tempos, respostas_ia = [], 0
+    requisicoes_antes = servidor.requisicoes
+
+    async def consulta():
+        nonlocal respostas_ia
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                if resiliente:
+                    await resiliente.criar(cliente, model="gpt-4o-mini", messages=MENSAGENS)
+                else:
+                    await cliente.chat.completions.create(model="gpt-4o-mini", messages=MENSAGENS)
+                respostas_ia += 1
+            except (IAIndisponivel, Exception):
+                pass  # aqui o bot usaria _resposta_fallback
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+    await asyncio.gather(*(consulta() for _ in range(consultas)))
+    await cliente.close()
+    return {
+        "ia": respostas_ia / consultas,
+        "p50": percentil(tempos, 0.50), "p90": percentil(tempos, 0.90), "p99": percentil(tempos, 0.99),
+        "acima_1s": sum(t > 1000 for t in tempos),
+        "requisicoes": servidor.requisicoes - requisicoes_antes,
+    }
+
+
+def imprimir(nome: str, r: dict):
+    print(f"{nome:<36} {r['ia'] * 100:>6.1f}% {r['p50']:>8.0f} {r['p90']:>8.0f} {r['p99']:>8.0f} {r['acima_1s']:>6} {r['requisicoes']:>12}")
+
+
+def cliente(**opcoes) -> ClienteIAResiliente:
+    padrao = dict(prazo=4.0, prazo_tentativa=2.0, tentativas=3, espera_base=0.05, espera_max=0.5,
+                  hedge_apos=0, disjuntor=Disjuntor(falhas=10 ** 9))
+    return ClienteIAResiliente(**{**padrao, **opcoes})
+
+
+async def principal(consultas: int):
+    cabecalho = f"{'cliente':<36} {'IA ok':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'> 1 s':>6} {'req. à API':>12}"
+
+    print("1) API instável: 50 ms + 5% de cauda de 1,5 s, 10% de respostas 429/500/503\n")
+    print(cabecalho)
+    cenarios = [
+        ("SDK direto (sem repetição)", None),
+        ("repetição, prazo 2 s por tentativa", cliente()),
+        ("repetição, prazo 0,5 s por tentativa", cliente(prazo_tentativa=0.5)),
+        ("repetição + hedge após 400 ms", cliente(hedge_apos=0.4, hedge_max_fracao=0.1)),
+    ]
+    for nome, resiliente in cenarios:
+        servidor = await ServidorOpenAIFalso(latencia=0.05, cauda=1.5, prob_cauda=0.05, prob_erro=0.10).iniciar()
+        imprimir(nome, await rodar(servidor, consultas, resiliente))
+        await servidor.parar()
+
+    print("\n2) API fora do ar: toda resposta é 503 depois de 300 ms\n")
+    print(cabecalho)
+    cenarios = [
+        ("SDK direto", None),
+        ("repetição, sem disjuntor", cliente()),
+        ("repetição + disjuntor (5 falhas)", cliente(disjuntor=Disjuntor(falhas=5, pausa=30))),
+    ]
+    for nome, resiliente in cenarios:
+        servidor = await ServidorOpenAIFalso(latencia=0.3, fora_do_ar=True).iniciar()
+        imprimir(nome, await rodar(servidor, consultas, resiliente))
+        await servidor.parar()
+
+
+def main():
+    logging.getLogger().setLevel(logging.ERROR)
+    consultas = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{consultas} consultas, {CONCORRENCIA} simultâneas\n")
+    asyncio.run(principal(consultas))
+
+
+if __name__ == "__main__":
+    main()
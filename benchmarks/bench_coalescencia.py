@@ -0,0 +1,192 @@
+# ============================================
+#   BENCHMARK: CONSULTAS IGUAIS AO MESMO TEMPO (SINGLE-FLIGHT)
+# ============================================
+# Um aviso vai para o campus e dezenas de visitantes apertam "Como se
+# inscrever" em poucos segundos: a mesma consulta à IA, com o cache vazio.
+# Contra a OpenAI falsa (latência fixa), sem e com a coalescência (ver
+# coalescencia.py), em consultar_ia_async e em streaming:
+#  - requisições que chegaram à API, p50/p95 da espera de cada visitante e
+#    se todos receberam a mesma resposta completa;
+#  - desistências: o primeiro visitante (o que fez a chamada) e outros
+#    cancelam no meio; quem ficou precisa receber a resposta inteira, com uma
+#    chamada só. Se todos desistem, a chamada é cancelada;
+#  - API fora do ar: todos caem no fallback, sem multiplicar as tentativas.
+#
+#   python -m benchmarks.bench_coalescencia [--visitantes 50] [--janela 200] [--latencia 300]
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_coalescencia_"))
+os.environ.setdefault("CACHE_IA_ARQUIVO", "")
+
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def consulta_inscricao() -> dict:
+    """O 'ia' da opção "Como se inscrever" do menus.json (prompt e categoria)."""
+    with open(os.path.join(RAIZ, "menus.json"), encoding="utf-8") as arquivo:
+        pendentes = [json.load(arquivo)]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, dict):
+            if "como se inscrever" in item.get("textos", []) and "ia" in item:
+                return item["ia"]
+            pendentes.extend(item.values())
+        elif isinstance(item, list):
+            pendentes.extend(item)
+    raise LookupError("opção 'como se inscrever' não encontrada no menus.json")
+
+
+async def consultar(bot, ia: dict, streaming: bool) -> str:
+    if not streaming:
+        return await bot.consultar_ia_async(ia["prompt"], categoria=ia["categoria"])
+    resposta = bot.consultar_ia_stream(ia["prompt"], categoria=ia["categoria"])
+    async for _ in resposta:
+        pass
+    return resposta.texto
+
+
+async def visitante(bot, ia: dict, streaming: bool, atraso: float) -> tuple:
+    """(resposta, espera em ms desde o clique)."""
+    await asyncio.sleep(atraso)
+    inicio = time.perf_counter()
+    texto = await consultar(bot, ia, streaming)
+    return texto, (time.perf_counter() - inicio) * 1000
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def recomecar(bot, servidor, coalescer: bool):
+    """Cache vazio, cliente novo (disjuntor fechado) e contadores zerados."""
+    from cliente_ia import ClienteIAResiliente
+    from coalescencia import Coalescedor
+    bot.cache_respostas.limpar()
+    bot.cliente_ia = ClienteIAResiliente()
+    bot.coalescencia = Coalescedor(ativo=coalescer)
+    return servidor.requisicoes
+
+
+async def pico(bot, servidor, ia: dict, visitantes: int, janela: float, streaming: bool, coalescer: bool) -> dict:
+    antes = recomecar(bot, servidor, coalescer)
+    sorteio = random.Random(24)
+    atrasos = sorted(sorteio.uniform(0, janela) for _ in range(visitantes))
+    resultados = await asyncio.gather(*(visitante(bot, ia, streaming, a) for a in atrasos))
+    respostas = [texto for texto, _ in resultados]
+    esperas = [ms for _, ms in resultados]
+    return {
+        "requisicoes": servidor.requisicoes - antes,
+        "p50": statistics.median(esperas), "p95": percentil(esperas, 0.95),
+        "iguais": sum(texto == respostas[0] and texto.startswith("[IA local]") for texto in respostas),
+        "coalescencia": bot.coalescencia.estatisticas(),
+    }
+
+
+async def desistencias(bot, servidor, ia: dict, streaming: bool, visitantes: int = 10, desistem=(0, 3, 6)) -> dict:
+    """O primeiro (quem fez a chamada) e mais alguns cancelam no meio da espera."""
+    antes = recomecar(bot, servidor, True)
+    tarefas = [asyncio.ensure_future(visitante(bot, ia, streaming, i * 0.005)) for i in range(visitantes)]
+    await asyncio.sleep(0.1)
+    for i in desistem:
+        tarefas[i].cancel()
+    resultados = await asyncio.gather(*tarefas, return_exceptions=True)
+    completas = sum(not isinstance(r, BaseException) and r[0].startswith("[IA local]") for r in resultados)
+    parcial = {"requisicoes": servidor.requisicoes - antes, "completas": completas,
+               "esperadas": visitantes - len(desistem), "coalescencia": bot.coalescencia.estatisticas()}
+
+    # todos desistem: a chamada é cancelada e a vaga no semáforo volta
+    recomecar(bot, servidor, True)
+    tarefas = [asyncio.ensure_future(visitante(bot, ia, streaming, 0)) for _ in range(visitantes)]
+    await asyncio.sleep(0.1)
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    semaforo, limite = bot._obter_semaforo_ia(), time.monotonic() + 1
+    while semaforo._value < bot.IA_MAX_CONCORRENCIA and time.monotonic() < limite:
+        await asyncio.sleep(0.01)  # a chamada cancelada fecha a conexão e devolve a vaga
+    parcial["todos_desistem"] = bot.coalescencia.estatisticas()
+    parcial["semaforo_livre"] = semaforo._value == bot.IA_MAX_CONCORRENCIA
+    return parcial
+
+
+async def principal(visitantes: int, janela: float, latencia: float) -> int:
+    servidor = await ServidorOpenAIFalso(latencia=latencia / 1000).iniciar()
+    os.environ["OPENAI_BASE_URL"] = servidor.url
+    import bot_faculdade as bot  # noqa: E402 (lê a URL acima)
+    logging.getLogger().setLevel(logging.CRITICAL)
+    ia = consulta_inscricao()
+    falhas = []
+
+    print(f"{visitantes} visitantes pedem \"Como se inscrever\" em {janela:.0f} ms | OpenAI falsa: {latencia:.0f} ms\n")
+    print(f"{'modo':<10} {'coalescência':<13} {'requisições':>12} {'p50 ms':>8} {'p95 ms':>8} {'iguais':>8} "
+          f"{'caronas':>8} {'maior voo':>10}")
+    for streaming in (False, True):
+        for coalescer in (False, True):
+            r = await pico(bot, servidor, ia, visitantes, janela / 1000, streaming, coalescer)
+            c = r["coalescencia"]
+            print(f"{'stream' if streaming else 'async':<10} {'sim' if coalescer else 'não':<13} "
+                  f"{r['requisicoes']:>12} {r['p50']:>8.0f} {r['p95']:>8.0f} {r['iguais']:>4}/{visitantes} "
+                  f"{c['coalescidas']:>8} {c['maior_voo']:>10}")
+            if r["iguais"] != visitantes:
+                falhas.append(f"pico {'stream' if streaming else 'async'}: {r['iguais']}/{visitantes} respostas completas")
+
+    print("\ndesistências (10 visitantes; o 1º, o 4º e o 7º cancelam depois de 100 ms)")
+    for streaming in (False, True):
+        r = await desistencias(bot, servidor, ia, streaming)
+        c, todos = r["coalescencia"], r["todos_desistem"]
+        print(f"  {'stream' if streaming else 'async':<7} requisições: {r['requisicoes']}  completas: "
+              f"{r['completas']}/{r['esperadas']}  desistências: {c['desistencias']}  | todos desistem: "
+              f"abandonadas {todos['abandonadas']}, em andamento {todos['em_andamento']}, "
+              f"semáforo livre: {'sim' if r['semaforo_livre'] else 'NÃO'}")
+        if r["requisicoes"] != 1 or r["completas"] != r["esperadas"] or todos["abandonadas"] != 1 \
+                or todos["em_andamento"] or not r["semaforo_livre"]:
+            falhas.append(f"desistências {'stream' if streaming else 'async'}: {r} {todos}")
+
+    print("\nAPI fora do ar (todos recebem o fallback)")
+    servidor.fora_do_ar = True
+    for coalescer in (False, True):
+        antes = recomecar(bot, servidor, coalescer)
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*(consultar(bot, ia, False) for _ in range(visitantes)))
+        duracao = (time.perf_counter() - inicio) * 1000
+        fallback = sum(not texto.startswith("[IA local]") for texto in respostas)
+        print(f"  coalescência {'sim' if coalescer else 'não'}: requisições {servidor.requisicoes - antes:>4}  "
+              f"fallback {fallback}/{visitantes}  em {duracao:.0f} ms  "
+              f"falhas compartilhadas: {bot.coalescencia.contadores['falhas']}")
+        if fallback != visitantes:
+            falhas.append(f"fora do ar: {fallback}/{visitantes} no fallback")
+    servidor.fora_do_ar = False
+
+    await servidor.parar()
+    if falhas:
+        print("\nFALHOU: " + "; ".join(falhas))
+        return 1
+    print("\nok: uma chamada por consulta em andamento, e quem desiste não derruba os outros")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas iguais à IA ao mesmo tempo (single-flight).")
+    parser.add_argument("--visitantes", type=int, default=50)
+    parser.add_argument("--janela", type=float, default=200, help="em quanto tempo chegam os cliques (ms)")
+    parser.add_argument("--latencia", type=float, default=300, help="latência da OpenAI falsa (ms)")
+    argumentos = parser.parse_args()
+    return asyncio.run(principal(argumentos.visitantes, argumentos.janela, argumentos.latencia))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# ============================================
+#   BENCHMARK: CONTEXTO DOS CURSOS NO PROMPT DA IA
+# ============================================
+# Compara o enriquecimento antigo (a lista inteira de consultar_info_curso
+# colada no prompt) com o trecho montado por contexto_ia dentro do
+# orçamento de tokens: tokens enviados por pergunta e tempo para montar,
+# com o catálogo atual multiplicado por 1x, 10x e 100x.
+#
+#   python -m benchmarks.bench_contexto
+
+import os
+import time
+import logging
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+
+import catalogo as modulo_catalogo  # noqa: E402
+from bot_faculdade import consultar_info_curso  # noqa: E402
+from catalogo import Catalogo, carregar_cursos_csv  # noqa: E402
+from contexto_ia import CONTEXTO_MAX_TOKENS, contar_tokens, montar_contexto_cursos, tiktoken  # noqa: E402
+from benchmarks.bench_disciplinas import ampliar  # noqa: E402
+
+# (descrição, prompt + contexto adicional como chegam em _montar_mensagens)
+PERGUNTAS = [
+    ("recuperação de métodos ágeis",
+     "Processar solicitação de recuperação/reposição: métodos ágeis\nAluno: RA 123456"),
+    ("semestre de um curso (apelido)",
+     "Pergunta do usuário: quais as disciplinas do 3º semestre de ADS?"),
+    ("curso inteiro",
+     "Pergunta do usuário: o que se estuda em Ciência de Dados EAD?"),
+    ("genérica sobre cursos",
+     "Pergunta do usuário: quais cursos vocês oferecem?"),
+]
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Tempo médio por chamada, em microssegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    cursos = carregar_cursos_csv()
+    contagem = "tiktoken" if tiktoken is not None else "aproximada"
+    print(f"Orçamento: {CONTEXTO_MAX_TOKENS} tokens | contagem {contagem}\n")
+    print(f"{'fator':>5} {'pergunta':<32} {'tokens antes':>13} {'tokens depois':>14} "
+          f"{'µs antes':>10} {'µs depois':>10}")
+
+    for fator in (1, 10, 100):
+        catalogo = Catalogo(ampliar(cursos, fator))
+        # consultar_info_curso lê o catálogo global; troca pelo ampliado
+        modulo_catalogo._catalogo = catalogo
+        repeticoes = max(20, 2000 // fator)
+        for descricao, pergunta in PERGUNTAS:
+            antes = consultar_info_curso()
+            depois = montar_contexto_cursos(pergunta, catalogo=catalogo)
+            assert contar_tokens(depois) <= CONTEXTO_MAX_TOKENS, (descricao, fator)
+            t_antes = cronometrar(consultar_info_curso, repeticoes)
+            t_depois = cronometrar(lambda: montar_contexto_cursos(pergunta, catalogo=catalogo), repeticoes)
+            print(f"{fator:>4}x {descricao:<32} {contar_tokens(antes):>13} {contar_tokens(depois):>14} "
+                  f"{t_antes:>10.1f} {t_depois:>10.1f}")
+    modulo_catalogo._catalogo = None
+
+
+if __name__ == "__main__":
+    main()
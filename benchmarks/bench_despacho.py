@@ -0,0 +1,160 @@
+# ============================================
+#   BENCHMARK: DESPACHO DOS UPDATES (ORDEM POR USUÁRIO x PARALELISMO)
+# ============================================
+# Cada usuário manda a conversa inteira de uma vez, sem esperar resposta
+# (toques duplos, mensagens em rajada), e o bot de verdade responde pela Bot
+# API falsa. A conversa passa duas vezes pela IA (OpenAI falsa, sem cache nem
+# coalescência): o handler espera a resposta e, sem a vez de cada usuário, a
+# mensagem seguinte do mesmo aluno muda a etapa enquanto isso. Compara:
+#  - concorrente simples (concurrent_updates=N do python-telegram-bot);
+#  - sequencial (um update por vez no bot inteiro);
+#  - DespachoPorUsuario (em ordem por usuário, paralelo entre usuários).
+# "corretas" conta as conversas cujas respostas são as mesmas de quando o
+# usuário espera cada resposta antes de mandar a próxima mensagem.
+#
+#   python -m benchmarks.bench_despacho [usuários, padrão 100]
+
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_despacho_"))
+os.environ.setdefault("IA_STREAMING", "0")
+# a Bot API falsa não limita envios (os limites do Telegram estão em bench_envio)
+os.environ.setdefault("ENVIO_POR_SEGUNDO", "0")
+os.environ.setdefault("ENVIO_CHAT_POR_SEGUNDO", "0")
+# toda consulta à IA vai mesmo à OpenAI falsa (o handler espera por ela)
+os.environ.setdefault("CACHE_IA_TTLS", "")
+os.environ.setdefault("CACHE_IA_ARQUIVO", "")
+os.environ.setdefault("CACHE_SEMANTICO_ATIVO", "0")
+os.environ.setdefault("IA_COALESCER", "0")
+
+from telegram.ext import ApplicationBuilder, SimpleUpdateProcessor  # noqa: E402
+
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+from benchmarks.fake_telegram import BotAPIFalsa, update_de_texto  # noqa: E402
+from envio import SEPARADOR  # noqa: E402
+
+# texto livre no menu do aluno (etapa 20) vai para a IA, duas vezes
+FLUXO = ["/start", "Sou aluno", "123456", "o portal está fora do ar", "Financeiro", "Voltar",
+         "meu professor não respondeu", "Cancelar"]
+
+LATENCIA_TELEGRAM = 0.02
+LATENCIA_IA = 0.2
+LIMITE = 100
+_VARIAVEIS = re.compile(r"Protocolo: \S+|\d+")
+
+
+def respostas(telegram: BotAPIFalsa, user_id: int) -> str:
+    """
+    Texto que o bot mandou ao usuário, sem o que muda de um para outro
+    (protocolo, números). Juntado como na fila de envio, para não depender
+    de quais respostas saíram agrupadas.
+    """
+    enviadas = [_VARIAVEIS.sub("#", texto) for _, chat, texto, _ in telegram.enviadas if chat == user_id]
+    return SEPARADOR.join(enviadas)
+
+
+async def rodar(chatbot, telegram: BotAPIFalsa, processador, faixa: range, referencia: list) -> dict:
+    app = (
+        ApplicationBuilder()
+        .token(chatbot.TELEGRAM_TOKEN)
+        .base_url(chatbot.TELEGRAM_API_URL)
+        .concurrent_updates(processador)
+        .post_init(chatbot.ao_iniciar)
+        .post_stop(chatbot.ao_parar)
+        .post_shutdown(chatbot.ao_encerrar)
+        .build()
+    )
+    for handler in chatbot.criar_aplicacao().handlers[0]:
+        app.add_handler(handler)
+    await app.initialize()
+    await app.post_init(app)
+    await app.updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+
+    inicio = time.perf_counter()
+    update_id = faixa[0] * 10
+    for texto in FLUXO:  # todas as mensagens de todos, sem esperar
+        for user_id in faixa:
+            update_id += 1
+            telegram.enfileirar(update_de_texto(update_id, user_id, texto))
+    # terminou quando o bot fica 1 s sem mandar nada (o número de mensagens
+    # depende de quantas respostas a fila de envio agrupou)
+    limite = time.monotonic() + 120
+    vistas, ultima = len(telegram.enviadas), time.perf_counter()
+    while time.perf_counter() - ultima < 1.0 and time.monotonic() < limite:
+        await asyncio.sleep(0.01)
+        if len(telegram.enviadas) != vistas:
+            vistas, ultima = len(telegram.enviadas), telegram.enviadas[-1][3]
+    duracao = ultima - inicio
+
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    estatisticas = processador.estatisticas() if hasattr(processador, "estatisticas") else {}
+    await app.shutdown()
+    await app.post_shutdown(app)
+    corretas = sum(respostas(telegram, u) == referencia for u in faixa)
+    return {"duracao": duracao, "corretas": corretas, "despacho": estatisticas}
+
+
+async def principal(usuarios: int):
+    telegram = await BotAPIFalsa(latencia=LATENCIA_TELEGRAM).iniciar()
+    openai_falsa = await ServidorOpenAIFalso(latencia=LATENCIA_IA).iniciar()
+    os.environ["TELEGRAM_API_URL"] = telegram.url
+    os.environ["OPENAI_BASE_URL"] = openai_falsa.url
+    import chatbot  # noqa: E402 (lê as URLs acima)
+    from despacho import DespachoPorUsuario  # noqa: E402
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # referência: um usuário que espera cada resposta antes de mandar a próxima
+    app = chatbot.criar_aplicacao()
+    await app.initialize()
+    await app.post_init(app)
+    await app.updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+    for indice, texto in enumerate(FLUXO):
+        resposta = telegram.aguardar_resposta(1)
+        telegram.enfileirar(update_de_texto(10 + indice, 1, texto))
+        await asyncio.wait_for(resposta, 30)
+    await asyncio.sleep(0.5)
+    referencia = respostas(telegram, 1)
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    await app.shutdown()
+    await app.post_shutdown(app)
+
+    print(f"{usuarios} usuários mandando {len(FLUXO)} mensagens de uma vez ({referencia.count(SEPARADOR) + 1} respostas cada), "
+          f"sendMessage com {LATENCIA_TELEGRAM * 1000:.0f} ms, IA com {LATENCIA_IA * 1000:.0f} ms\n")
+    print(f"{'despacho':<34} {'tempo s':>8} {'corretas':>10} {'espera p95 ms':>14} {'fila máx':>9}")
+    cenarios = [
+        (f"concorrente simples ({LIMITE})", lambda: SimpleUpdateProcessor(LIMITE)),
+        ("sequencial (1)", lambda: SimpleUpdateProcessor(1)),
+        (f"por usuário ({LIMITE})", lambda: DespachoPorUsuario(LIMITE)),
+    ]
+    for numero, (nome, criar) in enumerate(cenarios, start=1):
+        faixa = range(numero * 100_000, numero * 100_000 + usuarios)
+        r = await rodar(chatbot, telegram, criar(), faixa, referencia)
+        despacho = r["despacho"]
+        print(f"{nome:<34} {r['duracao']:>8.2f} {r['corretas']:>6}/{usuarios} "
+              f"{despacho.get('espera_p95_ms', '-'):>14} {despacho.get('profundidade_max_usuario', '-'):>9}")
+
+    await openai_falsa.parar()
+    await telegram.parar()
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    asyncio.run(principal(usuarios))
+
+
+if __name__ == "__main__":
+    main()
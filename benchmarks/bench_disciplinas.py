@@ -0,0 +1,71 @@
+# ============================================
+#   BENCHMARK: BUSCA DE DISCIPLINAS NA PERGUNTA
+# ============================================
+# Compara o laço triplo antigo (curso -> semestre -> disciplina, com .lower()
+# a cada mensagem) com o autômato Aho-Corasick do CatalogIndex, com o
+# catálogo atual multiplicado por 1x, 10x e 100x.
+#
+#   python -m benchmarks.bench_disciplinas
+
+import time
+
+from catalogo import CatalogIndex, carregar_cursos_csv
+
+PERGUNTAS = [
+    "tenho dúvida na disciplina de métodos ágeis",
+    "quando começa engenharia de software e rede de computadores?",
+    "qual o conteúdo de deep learning e redes neurais",
+    "quero saber sobre o estágio",
+    "onde vejo minhas notas?",
+]
+
+
+def ampliar(cursos: dict, fator: int) -> dict:
+    """Catálogo 'fator' vezes maior; a cópia 0 mantém os nomes originais."""
+    ampliado = {}
+    for copia in range(fator):
+        sufixo = f" {copia}" if copia else ""
+        for curso, semestres in cursos.items():
+            ampliado[curso + sufixo] = {
+                sem: [d + sufixo for d in disciplinas] for sem, disciplinas in semestres.items()
+            }
+    return ampliado
+
+
+def busca_laco_triplo(cursos: dict, pergunta_usuario: str):
+    """Implementação anterior de consultar_curso_especifico (só a parte das disciplinas)."""
+    pergunta = pergunta_usuario.lower()
+    for curso in cursos.keys():
+        for semestre in cursos[curso]:
+            for disciplina in cursos[curso][semestre]:
+                if disciplina.lower() in pergunta:
+                    return disciplina, curso, semestre
+    return None
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Tempo médio por pergunta, em microssegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for pergunta in PERGUNTAS:
+            funcao(pergunta)
+    return (time.perf_counter() - inicio) / (repeticoes * len(PERGUNTAS)) * 1e6
+
+
+def main():
+    base = carregar_cursos_csv()
+    print(f"{'catálogo':>10} {'disciplinas':>12} {'laço triplo (µs)':>18} {'Aho-Corasick (µs)':>18} {'montagem (ms)':>14}")
+    for fator in (1, 10, 100):
+        cursos = ampliar(base, fator)
+        total = sum(len(d) for s in cursos.values() for d in s.values())
+        inicio = time.perf_counter()
+        indice = CatalogIndex(cursos)
+        montagem_ms = (time.perf_counter() - inicio) * 1000
+        repeticoes = max(1, 200 // fator)
+        antigo = cronometrar(lambda p: busca_laco_triplo(cursos, p), repeticoes)
+        novo = cronometrar(indice.disciplinas_citadas, repeticoes)
+        print(f"{str(fator) + 'x':>10} {total:>12} {antigo:>18.1f} {novo:>18.1f} {montagem_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
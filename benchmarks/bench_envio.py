@@ -0,0 +1,177 @@
+# ============================================
+#   BENCHMARK: ENVIO DAS RESPOSTAS NO PICO (LIMITES DO TELEGRAM)
+# ============================================
+# O bot de verdade contra a Bot API falsa com os limites do Telegram (30
+# mensagens/s no total, poucas por segundo em cada chat; passou disso, 429
+# com retry_after) e latência de rede em cada chamada. Todos os usuários
+# mandam a conversa inteira de uma vez, como no horário de pico. Compara:
+#  - direto: reply_text dentro do handler (como era antes da fila de envio);
+#  - fila sem agrupar: FIFO por chat + balde global e por chat;
+#  - fila + agrupamento: respostas seguidas do mesmo chat numa mensagem só.
+# "completas" conta as conversas que chegaram ao "Atendimento finalizado";
+# "corretas", as que o usuário leu exatamente como um usuário sozinho leria.
+#
+#   python -m benchmarks.bench_envio [--usuarios 100] [--latencia 100]
+
+import os
+import re
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_envio_"))
+os.environ.setdefault("IA_STREAMING", "0")
+
+# antes de bench_webhook, que zera os limites de envio dos outros benchmarks
+from envio import (  # noqa: E402
+    SEPARADOR, EnvioTelegram, ENVIO_CONEXOES, ENVIO_POR_SEGUNDO, ENVIO_RAJADA, ambiente_dos_workers, workers_no_limite,
+)
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+from benchmarks.fake_telegram import BotAPIFalsa, update_de_texto  # noqa: E402
+from benchmarks.bench_webhook import FLUXO  # noqa: E402
+
+LIMITE_GLOBAL = 30
+LIMITE_CHAT = 4
+_VARIAVEIS = re.compile(r"Protocolo: \S+|\d+")
+
+
+def leitura(telegram: BotAPIFalsa, user_id: int) -> str:
+    """O que o usuário leu, sem protocolo e números, independente de como foi agrupado."""
+    return SEPARADOR.join(_VARIAVEIS.sub("#", texto) for _, chat, texto, _ in telegram.enviadas if chat == user_id)
+
+
+class _MensagemDoUsuario:
+    """Só chat_id e reply_text, guardando o teclado de cada mensagem entregue."""
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.teclados = []
+
+    async def reply_text(self, texto, reply_markup=None, **opcoes):
+        self.teclados.append(reply_markup)
+
+
+async def conferir_teclados() -> bool:
+    """Teclado, texto simples e outro teclado seguidos no chat: o agrupamento não pode perder teclado."""
+    envio = EnvioTelegram(por_segundo=0, chat_por_segundo=0)
+    mensagem = _MensagemDoUsuario(1)
+    for texto, teclado in (("menu A", "teclado A"), ("aviso", None), ("menu B", "teclado B")):
+        await envio.enviar(mensagem, texto, reply_markup=teclado)
+    await envio.aguardar(mensagem.chat_id)
+    await envio.encerrar()
+    return [t for t in mensagem.teclados if t is not None] == ["teclado A", "teclado B"]
+
+
+def conferir_divisao(ate: int = 64) -> list:
+    """Pedidos de 1..ate workers cujo envio somado passaria do limite do bot num processo só."""
+    limite = ENVIO_POR_SEGUNDO + ENVIO_RAJADA
+    acima = []
+    for pedidos in range(1, ate + 1):
+        workers = workers_no_limite(pedidos)
+        ambiente = ambiente_dos_workers(workers)
+        taxa = float(ambiente.get("ENVIO_POR_SEGUNDO", ENVIO_POR_SEGUNDO))
+        rajada = int(ambiente.get("ENVIO_RAJADA", ENVIO_RAJADA))
+        if taxa <= 0 or workers * (taxa + rajada) > limite:  # taxa 0 seria sem limite
+            acima.append(pedidos)
+    return acima
+
+
+async def rodar(chatbot, telegram: BotAPIFalsa, faixa: range, referencia: str = None) -> dict:
+    app = chatbot.criar_aplicacao()
+    await app.initialize()
+    await app.post_init(app)
+    await app.updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+
+    recusadas, enviadas = telegram.recusadas_429, len(telegram.enviadas)
+    inicio = time.perf_counter()
+    update_id = faixa[0] * 10
+    for texto in FLUXO:
+        for user_id in faixa:
+            update_id += 1
+            telegram.enfileirar(update_de_texto(update_id, user_id, texto))
+            if len(faixa) == 1:  # referência: espera cada resposta
+                await asyncio.wait_for(telegram.aguardar_resposta(user_id), 30)
+                await asyncio.sleep(0.2)
+    # terminou quando o bot fica 2 s sem mandar nada
+    limite = time.monotonic() + 300
+    vistas, ultima = len(telegram.enviadas), time.perf_counter()
+    while time.perf_counter() - ultima < 2.0 and time.monotonic() < limite:
+        await asyncio.sleep(0.02)
+        if len(telegram.enviadas) != vistas:
+            vistas, ultima = len(telegram.enviadas), telegram.enviadas[-1][3]
+
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    estatisticas = chatbot.envio.estatisticas()
+    await app.shutdown()
+    await app.post_shutdown(app)
+    leituras = [leitura(telegram, u) for u in faixa]
+    return {
+        "duracao": ultima - inicio,
+        "mensagens": len(telegram.enviadas) - enviadas,
+        "recusadas_429": telegram.recusadas_429 - recusadas,
+        "completas": sum("finalizado" in texto for texto in leituras),
+        "corretas": sum(texto == referencia for texto in leituras) if referencia else None,
+        "envio": estatisticas,
+        "leitura": leituras[0],
+    }
+
+
+async def principal(usuarios: int, latencia: float):
+    resultado = "OK, os dois entregues" if await conferir_teclados() else "ERRO, um teclado se perdeu"
+    print(f"agrupamento: teclado, texto, outro teclado -> {resultado}")
+    acima = conferir_divisao()
+    resultado = f"ERRO, passam do limite com {acima}" if acima else "OK, a soma fica no limite"
+    print(f"divisão do envio entre 1..64 workers (no máximo {workers_no_limite(64)} sobem) -> {resultado} "
+          f"de {ENVIO_POR_SEGUNDO + ENVIO_RAJADA:g} msg/s")
+    telegram = await BotAPIFalsa(latencia=latencia / 1000).iniciar()
+    openai_falsa = await ServidorOpenAIFalso(latencia=0.05).iniciar()
+    os.environ["TELEGRAM_API_URL"] = telegram.url
+    os.environ["OPENAI_BASE_URL"] = openai_falsa.url
+    import chatbot  # noqa: E402 (lê as URLs acima)
+    logging.getLogger().setLevel(logging.CRITICAL)  # no modo direto cada 429 vira um erro no log
+
+    # referência: um usuário sozinho, sem limites, esperando cada resposta
+    chatbot.envio = EnvioTelegram(ativo=False)
+    referencia = (await rodar(chatbot, telegram, range(1, 2)))["leitura"]
+
+    telegram.limite_global, telegram.limite_chat = LIMITE_GLOBAL, LIMITE_CHAT
+    print(f"{usuarios} usuários mandando {len(FLUXO)} mensagens de uma vez | Bot API falsa: {latencia:.0f} ms, "
+          f"{LIMITE_GLOBAL} msg/s no total e {LIMITE_CHAT} msg/s por chat (429 com retry_after=1)")
+    print(f"fila: {ENVIO_POR_SEGUNDO:.0f} msg/s + rajada de {ENVIO_RAJADA}, {ENVIO_CONEXOES} conexões HTTP\n")
+    print(f"{'envio':<22} {'tempo s':>8} {'mensagens':>10} {'429':>6} {'completas':>10} {'corretas':>9} "
+          f"{'espera p95 ms':>14} {'agrupadas':>10}")
+    cenarios = [
+        ("direto", dict(ativo=False)),
+        ("fila sem agrupar", dict(agrupar=False)),
+        ("fila + agrupamento", dict()),
+    ]
+    for numero, (nome, opcoes) in enumerate(cenarios, start=1):
+        chatbot.envio = EnvioTelegram(**opcoes)
+        faixa = range(numero * 100_000, numero * 100_000 + usuarios)
+        r = await rodar(chatbot, telegram, faixa, referencia)
+        fila = r["envio"]
+        print(f"{nome:<22} {r['duracao']:>8.1f} {r['mensagens']:>10} {r['recusadas_429']:>6} "
+              f"{r['completas']:>6}/{usuarios} {r['corretas']:>5}/{usuarios} "
+              f"{fila['espera_p95_ms'] if fila['espera_p95_ms'] is not None else '-':>14} {fila['agrupadas']:>10}")
+
+    await openai_falsa.parar()
+    await telegram.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envio das respostas com os limites do Telegram.")
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--latencia", type=float, default=100, help="latência da Bot API falsa (ms)")
+    argumentos = parser.parse_args()
+    asyncio.run(principal(argumentos.usuarios, argumentos.latencia))
+
+
+if __name__ == "__main__":
+    main()
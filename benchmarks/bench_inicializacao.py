@@ -0,0 +1,127 @@
+# ============================================
+#   BENCHMARK: SUBIDA DO BOT (IMPORT E INICIALIZAÇÃO)
+# ============================================
+# Importa o chatbot em processos novos (os .pyc já gerados, como num
+# reinício em produção) e mede:
+#  - o tempo do `import chatbot` e do processo inteiro (mediana), contra um
+#    orçamento: passou dele, o benchmark sai com código 1;
+#  - de onde vem o tempo, como no `python -X importtime` (módulos importados
+#    direto pelo chatbot e pelo bot_faculdade, com os filhos);
+#  - que o import não carrega o que ficou para depois (SDK da OpenAI, pandas,
+#    numpy, aiohttp) e funciona sem OPENAI_API_KEY;
+#  - o que a inicialização faz depois do import (catálogo, clientes da
+#    OpenAI, modelo de intenções), que é o que ao_iniciar roda antes do
+#    primeiro update.
+#
+#   python -m benchmarks.bench_inicializacao [--repeticoes 7] [--orcamento 600]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# módulos pesados que não podem vir no import do bot
+ADIADOS = ("openai", "pandas", "numpy", "aiohttp")
+
+_CODIGO = f"""
+import sys, json, time
+inicio = time.perf_counter()
+import chatbot
+importacao = (time.perf_counter() - inicio) * 1000
+carregados = [m for m in {ADIADOS!r} if m in sys.modules]
+inicio = time.perf_counter()
+partes = chatbot.inicializar()
+if chatbot.motor.intencoes:
+    chatbot.motor.intencoes.preparar()
+inicializacao = (time.perf_counter() - inicio) * 1000
+print(json.dumps({{"importacao": importacao, "inicializacao": inicializacao, "partes": partes,
+                  "carregados": carregados}}))
+"""
+
+
+def rodar(ambiente: dict, importtime: bool = False):
+    """(resultado do processo, tempo total em ms, linhas do -X importtime)."""
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _CODIGO]
+    inicio = time.perf_counter()
+    saida = subprocess.run(comando, cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True)
+    total = (time.perf_counter() - inicio) * 1000
+    linhas = [linha for linha in saida.stderr.splitlines() if linha.startswith("import time:")]
+    return json.loads(saida.stdout.splitlines()[-1]), total, linhas
+
+
+def arvore_importtime(linhas: list) -> list:
+    """[(profundidade, módulo, acumulado ms)] na ordem do -X importtime (filhos antes do pai)."""
+    arvore = []
+    for linha in linhas[1:]:  # a primeira é o cabeçalho
+        _, acumulado, nome = linha.split("|")
+        profundidade = (len(nome) - len(nome.lstrip()) - 1) // 2
+        arvore.append((profundidade, nome.strip(), int(acumulado) / 1000))
+    return arvore
+
+
+def filhos(arvore: list, modulo: str) -> list:
+    """Módulos importados direto por `modulo` (a primeira vez que cada um apareceu), do mais caro ao mais barato."""
+    for posicao, (profundidade, nome, _) in enumerate(arvore):
+        if nome == modulo:
+            break
+    else:
+        return []
+    encontrados = []
+    for nivel, nome, acumulado in reversed(arvore[:posicao]):
+        if nivel <= profundidade:
+            break
+        if nivel == profundidade + 1:
+            encontrados.append((nome, acumulado))
+    return sorted(encontrados, key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de subida do bot (import e inicialização).")
+    parser.add_argument("--repeticoes", type=int, default=7)
+    parser.add_argument("--orcamento", type=float, default=600, help="orçamento do `import chatbot` (ms)")
+    parser.add_argument("--mostrar", type=int, default=8, help="módulos mostrados por nível")
+    argumentos = parser.parse_args()
+
+    ambiente = dict(os.environ, OPENAI_API_KEY="teste-offline",
+                    AUDITORIA_PASTA=tempfile.mkdtemp(prefix="auditoria_inicializacao_"))
+    sem_chave = {k: v for k, v in ambiente.items() if k != "OPENAI_API_KEY"}
+
+    rodar(ambiente)  # gera os .pyc
+    rodadas = [rodar(ambiente) for _ in range(argumentos.repeticoes)]
+    importacao = statistics.median(r["importacao"] for r, _, _ in rodadas)
+    processo = statistics.median(total for _, total, _ in rodadas)
+    inicializacao = statistics.median(r["inicializacao"] for r, _, _ in rodadas)
+    resultado, _, _ = rodadas[0]
+
+    print(f"processo novo, mediana de {argumentos.repeticoes}")
+    print(f"  import chatbot           : {importacao:8.1f} ms  (orçamento {argumentos.orcamento:.0f} ms)")
+    print(f"  processo (import + init) : {processo:8.1f} ms")
+    print(f"  inicializar + intenções  : {inicializacao:8.1f} ms  {resultado['partes']}")
+    print(f"  adiados carregados no import: {resultado['carregados'] or 'nenhum'} (de {', '.join(ADIADOS)})")
+
+    sem_chave_resultado, _, _ = rodar(sem_chave)
+    print(f"  import sem OPENAI_API_KEY: ok ({sem_chave_resultado['importacao']:.1f} ms)")
+
+    _, _, linhas = rodar(ambiente, importtime=True)
+    arvore = arvore_importtime(linhas)
+    for modulo in ("chatbot", "bot_faculdade"):
+        total = next((acumulado for _, nome, acumulado in arvore if nome == modulo), 0.0)
+        print(f"\n-X importtime: {modulo} ({total:.1f} ms com os filhos)")
+        for nome, acumulado in filhos(arvore, modulo)[:argumentos.mostrar]:
+            print(f"  {nome:<28} {acumulado:8.1f} ms")
+
+    if resultado["carregados"] or importacao > argumentos.orcamento:
+        print(f"\nFORA DO ORÇAMENTO: import em {importacao:.1f} ms; adiados carregados: {resultado['carregados']}")
+        return 1
+    print(f"\nimport dentro do orçamento ({importacao:.1f} <= {argumentos.orcamento:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
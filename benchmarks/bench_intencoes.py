@@ -0,0 +1,253 @@
+# ============================================
+#   BENCHMARK: ROTEADOR DE INTENÇÕES
+# ============================================
+# Grava uma auditoria sintética (texto livre digitado numa etapa + a opção
+# que o usuário escolheu em seguida) e faz validação cruzada em 5 partes:
+# treina com 4/5 dos atendimentos e mede na parte separada a taxa de desvio
+# da IA, a acurácia e a latência evitada. Compara só o menu (palavras-chave
+# + modelo semente) com o modelo treinado na auditoria. Parte dos textos são
+# sinônimos e erros de digitação que se repetem entre alunos ("carnê",
+# "boelto", "istorico") e que nenhuma palavra-chave pega: esses só saem da
+# IA se o modelo aprender com a auditoria (coluna "pelo modelo").
+#
+#   python -m benchmarks.bench_intencoes [latência da IA em ms, padrão 1500]
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+
+from auditoria import AuditoriaAtendimentos  # noqa: E402
+from bot_faculdade import Atendimento  # noqa: E402
+from dialogo import MotorDialogo  # noqa: E402
+from intencoes import LIVRE, RoteadorIntencoes, separar_validacao  # noqa: E402
+
+DOBRAS = 5
+
+# etapa -> [(texto digitado, registro que o usuário fez depois ou None)]
+CONVERSAS = {
+    20: [
+        ("quero ver meu boleto", ("setor", "financeiro")),
+        ("como pago a mensalidade atrasada", ("setor", "financeiro")),
+        ("to devendo duas parcelas", ("setor", "financeiro")),
+        ("minha fatura veio errada", ("setor", "financeiro")),
+        ("preciso negociar uma divida", ("setor", "financeiro")),
+        ("quando é a prova de recuperação", ("setor", "secretaria")),
+        ("quero trancar a matricula", ("setor", "secretaria")),
+        ("qual o horario da aula de sexta", ("setor", "secretaria")),
+        ("como faço rematrícula", ("setor", "secretaria")),
+        ("perdi a prova preciso repor", ("setor", "secretaria")),
+        ("preciso de uma declaração para o estágio", ("setor", "documentos")),
+        ("quero meu historico escolar", ("setor", "documentos")),
+        ("como pego meu diploma", ("setor", "documentos")),
+        ("preciso de atestado pro trabalho", ("setor", "documentos")),
+        ("quais disciplinas tem no curso", ("setor", "info_curso")),
+        ("ciencia de dados tem estatistica?", ("setor", "info_curso")),
+        ("o que estuda em ads", ("setor", "info_curso")),
+        ("grade do terceiro semestre", ("setor", "info_curso")),
+        ("oi tudo bem", None),
+        ("tenho uma duvida", None),
+        ("cadê meu carnê", ("setor", "financeiro")),
+        ("carnê do mês", ("setor", "financeiro")),
+        ("meu carnê não chegou", ("setor", "financeiro")),
+        ("onde pego o carnê", ("setor", "financeiro")),
+        ("carnê atrasado", ("setor", "financeiro")),
+        ("tenho dependência em cálculo", ("setor", "secretaria")),
+        ("quando abre a dependência", ("setor", "secretaria")),
+        ("fazer dependência de física", ("setor", "secretaria")),
+        ("pedido de dependência", ("setor", "secretaria")),
+        ("preciso da declarasao", ("setor", "documentos")),
+        ("declarasao pro estagio", ("setor", "documentos")),
+        ("uma declarasao por favor", ("setor", "documentos")),
+        ("declarasao pra empresa", ("setor", "documentos")),
+        ("o portal está fora do ar", None),
+        ("esqueci minha senha do ava", None),
+        ("bom dia", None),
+        ("meu professor não respondeu", None),
+        ("não estou de acordo com a minha nota", None),
+    ],
+    30: [
+        ("boleto", ("financeiro_acao", "ver_boletos")),
+        ("quero ver os boletos do semestre", ("financeiro_acao", "ver_boletos")),
+        ("minhas faturas", ("financeiro_acao", "ver_boletos")),
+        ("preciso da segunda via", ("financeiro_acao", "segunda_via")),
+        ("2a via de março", ("financeiro_acao", "segunda_via")),
+        ("boleto vencido", ("financeiro_acao", "segunda_via")),
+        ("perdi o boleto e venceu", ("financeiro_acao", "segunda_via")),
+        ("quero parcelar a dívida", ("financeiro_acao", "acordo")),
+        ("dá pra renegociar?", ("financeiro_acao", "acordo")),
+        ("fazer um acordo", ("financeiro_acao", "acordo")),
+        ("estou devendo, posso negociar", ("financeiro_acao", "acordo")),
+        ("já paguei e consta em aberto", ("financeiro_acao", "consultar_pagamentos")),
+        ("meus pagamentos", ("financeiro_acao", "consultar_pagamentos")),
+        ("comprovante do mês passado", ("financeiro_acao", "consultar_pagamentos")),
+        ("meu carnê", ("financeiro_acao", "ver_boletos")),
+        ("ver o carnê", ("financeiro_acao", "ver_boletos")),
+        ("carnê do mês", ("financeiro_acao", "ver_boletos")),
+        ("cadê o carnê", ("financeiro_acao", "ver_boletos")),
+        ("quero ver o boelto", ("financeiro_acao", "ver_boletos")),
+        ("boelto do mes", ("financeiro_acao", "ver_boletos")),
+        ("meus boeltos", ("financeiro_acao", "ver_boletos")),
+        ("cade o boelto", ("financeiro_acao", "ver_boletos")),
+        ("quero negosiar", ("financeiro_acao", "acordo")),
+        ("da pra negosiar", ("financeiro_acao", "acordo")),
+        ("posso negosiar as parcelas", ("financeiro_acao", "acordo")),
+        ("negosiar o atraso", ("financeiro_acao", "acordo")),
+        ("quanto ainda devo", None),
+        ("tem desconto para pagamento antecipado?", None),
+        ("oi", None),
+        ("não entendi", None),
+        ("meu fies atrasou", None),
+        ("posso pagar via pix?", None),
+        ("o estacionamento é pago?", None),
+    ],
+    40: [
+        ("perdi a prova", ("secretaria_acao", "recuperacao")),
+        ("quero fazer recuperação", ("secretaria_acao", "recuperacao")),
+        ("prova substitutiva de calculo", ("secretaria_acao", "recuperacao")),
+        ("exame final", ("secretaria_acao", "recuperacao")),
+        ("quando começam as aulas", ("secretaria_acao", "calendario")),
+        ("tem feriado semana que vem", ("secretaria_acao", "calendario")),
+        ("calendario do semestre", ("secretaria_acao", "calendario")),
+        ("qual o horario das aulas da noite", ("secretaria_acao", "horario")),
+        ("que horas começa a aula", ("secretaria_acao", "horario")),
+        ("quero mudar de curso", ("secretaria_acao", "troca_curso")),
+        ("transferencia para ciencia de dados", ("secretaria_acao", "troca_curso")),
+        ("trocar de curso", ("secretaria_acao", "troca_curso")),
+        ("segunda chamada da prova", ("secretaria_acao", "recuperacao")),
+        ("pedir segunda chamada", ("secretaria_acao", "recuperacao")),
+        ("tem segunda chamada?", ("secretaria_acao", "recuperacao")),
+        ("segunda chamada de calculo", ("secretaria_acao", "recuperacao")),
+        ("orario da aula", ("secretaria_acao", "horario")),
+        ("qual o orario", ("secretaria_acao", "horario")),
+        ("orario de segunda", ("secretaria_acao", "horario")),
+        ("orario noturno", ("secretaria_acao", "horario")),
+        ("minha nota não saiu", None),
+        ("preciso falar com o coordenador", None),
+        ("oi", None),
+        ("tenho uma dúvida", None),
+    ],
+    50: [
+        ("declaração de matrícula para o banco", ("documento_solicitado", "declaracao_matricula")),
+        ("comprovante de matricula", ("documento_solicitado", "declaracao_matricula")),
+        ("preciso de uma declaração", ("documento_solicitado", "declaracao_matricula")),
+        ("atestado para o trabalho", ("documento_solicitado", "atestado_frequencia")),
+        ("comprovar frequencia", ("documento_solicitado", "atestado_frequencia")),
+        ("meu historico", ("documento_solicitado", "historico_parcial")),
+        ("boletim de notas", ("documento_solicitado", "historico_parcial")),
+        ("quando sai meu diploma", ("documento_solicitado", "diploma")),
+        ("colação de grau", ("documento_solicitado", "diploma")),
+        ("certificado de conclusão", ("documento_solicitado", "diploma")),
+        ("certificado de conclusão do curso", ("documento_solicitado", "diploma")),
+        ("meu certificado de conclusão", ("documento_solicitado", "diploma")),
+        ("pegar o certificado de conclusão", ("documento_solicitado", "diploma")),
+        ("meu istorico", ("documento_solicitado", "historico_parcial")),
+        ("istorico escolar", ("documento_solicitado", "historico_parcial")),
+        ("preciso do istorico", ("documento_solicitado", "historico_parcial")),
+        ("istorico parcial", ("documento_solicitado", "historico_parcial")),
+        ("quanto tempo demora", None),
+        ("é pago?", None),
+        ("bom dia", None),
+    ],
+    70: [
+        ("quais cursos vocês têm", ("visitante_acao", "ver_cursos")),
+        ("tem curso de inteligencia artificial?", ("visitante_acao", "ver_cursos")),
+        ("quero fazer graduação em ti", ("visitante_acao", "ver_cursos")),
+        ("quanto custa a mensalidade", ("visitante_acao", "ver_valores")),
+        ("tem bolsa?", ("visitante_acao", "ver_valores")),
+        ("aceita fies", ("visitante_acao", "ver_valores")),
+        ("qual o preço", ("visitante_acao", "ver_valores")),
+        ("que documentos preciso levar", ("visitante_acao", "documentos_matricula")),
+        ("documentação para matricula", ("visitante_acao", "documentos_matricula")),
+        ("como faço a inscrição", ("visitante_acao", "como_inscrever")),
+        ("posso usar a nota do enem?", ("visitante_acao", "como_inscrever")),
+        ("tem vestibular?", ("visitante_acao", "como_inscrever")),
+        ("quero falar com um consultor", ("visitante_acao", "falar_consultor")),
+        ("qual o telefone de vocês", ("visitante_acao", "falar_consultor")),
+        ("quanto sai por mes", ("visitante_acao", "ver_valores")),
+        ("quanto sai a parcela", ("visitante_acao", "ver_valores")),
+        ("quanto sai pra estudar ai", ("visitante_acao", "ver_valores")),
+        ("quanto sai", ("visitante_acao", "ver_valores")),
+        ("como faço a inscrisao", ("visitante_acao", "como_inscrever")),
+        ("inscrisao aberta?", ("visitante_acao", "como_inscrever")),
+        ("quero fazer inscrisao", ("visitante_acao", "como_inscrever")),
+        ("prazo da inscrisao", ("visitante_acao", "como_inscrever")),
+        ("onde fica a faculdade", None),
+        ("o curso é reconhecido pelo mec?", None),
+        ("oi", None),
+        ("as aulas são ao vivo?", None),
+    ],
+}
+
+
+async def gravar_auditoria_sintetica(pasta: str) -> int:
+    """Cada conversa vira um atendimento na auditoria (textos não se repetem entre treino e validação)."""
+    auditoria = AuditoriaAtendimentos(pasta=pasta)
+    total = 0
+    for etapa, conversas in CONVERSAS.items():
+        for texto, escolha in conversas:
+            atendimento = Atendimento(1000 + total)
+            atendimento.registrar(f"texto_livre_{etapa}", texto)
+            if escolha:
+                atendimento.registrar(*escolha)
+            await auditoria.registrar(atendimento)
+            total += 1
+    await auditoria.encerrar()
+    return total
+
+
+def medir(roteador: RoteadorIntencoes, validacao: dict) -> float:
+    """Tempo médio de classificação, em microssegundos."""
+    textos = [(n, t) for n, lista in validacao.items() for t, _, _ in lista]
+    inicio = time.perf_counter()
+    for _ in range(20):
+        for numero, texto in textos:
+            roteador.prever(numero, texto)
+    return (time.perf_counter() - inicio) / (20 * len(textos)) * 1e6
+
+
+def main():
+    latencia_ia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 1500.0
+    logging.getLogger().setLevel(logging.WARNING)
+    pasta = tempfile.mkdtemp(prefix="auditoria_intencoes_")
+    total = asyncio.run(gravar_auditoria_sintetica(pasta))
+
+    etapas = MotorDialogo(responder=None, encerrar=None).etapas
+    roteador = RoteadorIntencoes(etapas)
+    exemplos = roteador.exemplos_da_auditoria(AuditoriaAtendimentos(pasta=pasta).ler_registros())
+    livres = sum(1 for v in exemplos.values() for _, r, _ in v if r == LIVRE)
+    print(f"Atendimentos na auditoria: {total} ({livres} sem opção do menu) | validação cruzada em {DOBRAS} partes\n")
+
+    print(f"{'roteador':<32} {'limiar':>6} {'acurácia':>9} {'desvio':>8} {'acerto desvios':>15} "
+          f"{'pelo modelo':>12} {'µs/texto':>9} {'IA evitada (s)':>15}")
+    cenarios = [("só menu (regras + sementes)", False, 0.8)]
+    cenarios += [("menu + auditoria", True, limiar) for limiar in (0.6, 0.7, 0.8, 0.9)]
+    for nome, usar_auditoria, limiar in cenarios:
+        roteador.limiar = limiar
+        acertos = desvios = desvios_certos = avaliados = pelo_modelo = pelo_modelo_certos = 0
+        tempos = []
+        for dobra in range(DOBRAS):
+            treino, validacao = separar_validacao(exemplos, DOBRAS, dobra)
+            roteador.treinar(treino if usar_auditoria else None)
+            r = roteador.avaliar(validacao)
+            acertos += r["acuracia"] * r["exemplos"]
+            desvios += r["taxa_desvio"] * r["exemplos"]
+            desvios_certos += r["acuracia_desvios"] * r["taxa_desvio"] * r["exemplos"]
+            avaliados += r["exemplos"]
+            pelo_modelo += r["desvios_modelo"]
+            pelo_modelo_certos += r["desvios_modelo_certos"]
+            tempos.append(medir(roteador, validacao))
+        evitada = desvios * latencia_ia_ms / 1000
+        print(f"{nome:<32} {limiar:>6.1f} {acertos / avaliados:>9.3f} {desvios / avaliados:>8.3f} "
+              f"{desvios_certos / desvios:>15.3f} {f'{pelo_modelo_certos}/{pelo_modelo}':>12} "
+              f"{sum(tempos) / len(tempos):>9.1f} {evitada:>15.1f}")
+    print(f"\n(pelo modelo: desvios certos/desvios que nenhuma regra pegou; "
+          f"latência da IA considerada: {latencia_ia_ms:.0f} ms por chamada evitada)")
+
+
+if __name__ == "__main__":
+    main()
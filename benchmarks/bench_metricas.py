@@ -0,0 +1,121 @@
+# ============================================
+#   BENCHMARK: CUSTO DAS MÉTRICAS (LIGADAS x DESLIGADAS)
+# ============================================
+# 1. Custo por chamada de cada instrumento (inc, observar, cronometrar e função
+#    decorada) com as métricas ligadas e desligadas (objetos nulos).
+# 2. Vazão do benchmark de carga (bench_pipeline, em processos separados) com
+#    METRICAS_ATIVAS=0 e =1, alternando as execuções.
+# 3. Os fluxos do harness com as métricas ligadas: confere que o texto
+#    exportado é válido no formato do Prometheus e mostra as séries geradas.
+#
+#   python -m benchmarks.bench_metricas [--conversas 600] [--repeticoes 3]
+
+import io
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import contextlib
+import tempfile
+import subprocess
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ["METRICAS_ATIVAS"] = "1"  # parte 3; as partes 1 e 2 escolhem por conta própria
+
+from metricas import Metricas, metricas  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_AMOSTRA = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? \S+$')
+
+
+def ns_por_chamada(funcao, vezes: int = 200_000) -> float:
+    inicio = time.perf_counter_ns()
+    for _ in range(vezes):
+        funcao()
+    return (time.perf_counter_ns() - inicio) / vezes
+
+
+def custo_dos_instrumentos():
+    print(f"{'operação':<28} {'desligadas ns':>14} {'ligadas ns':>11}")
+    medidas = {}
+    for ativo in (False, True):
+        registro = Metricas(ativo=ativo)
+        contador = registro.contador("bench_total", "bench", ("origem",))
+        histograma = registro.histograma("bench_segundos", "bench", ("etapa",))
+
+        def bloco():
+            with histograma.cronometrar(10):
+                pass
+
+        @histograma.cronometrado("decorada")
+        def decorada():
+            pass
+
+        medidas[ativo] = {
+            "contador.inc": ns_por_chamada(lambda: contador.inc("ia")),
+            "histograma.observar": ns_por_chamada(lambda: histograma.observar(0.03, 10)),
+            "with cronometrar": ns_por_chamada(bloco),
+            "função decorada": ns_por_chamada(decorada),
+        }
+    for operacao in medidas[False]:
+        print(f"{operacao:<28} {medidas[False][operacao]:>14.0f} {medidas[True][operacao]:>11.0f}")
+
+
+def vazao_pipeline(ativas: bool, conversas: int) -> float:
+    ambiente = dict(os.environ, METRICAS_ATIVAS="1" if ativas else "0")
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipeline", "--conversas", str(conversas), "--sessoes", "0",
+         "--base", os.path.join(tempfile.gettempdir(), "sem_linha_base.json")],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(re.search(r"vazão: ([\d.]+) msg/s", saida).group(1))
+
+
+def custo_na_carga(conversas: int, repeticoes: int):
+    vazoes = {False: [], True: []}
+    for _ in range(repeticoes):
+        for ativas in (False, True):
+            vazoes[ativas].append(vazao_pipeline(ativas, conversas))
+    desligadas = sorted(vazoes[False])[repeticoes // 2]
+    ligadas = sorted(vazoes[True])[repeticoes // 2]
+    print(f"\nbench_pipeline ({conversas} conversas, mediana de {repeticoes} execuções alternadas)")
+    print(f"  METRICAS_ATIVAS=0: {desligadas:.0f} msg/s  {vazoes[False]}")
+    print(f"  METRICAS_ATIVAS=1: {ligadas:.0f} msg/s  {vazoes[True]}")
+    print(f"  custo das métricas: {(desligadas - ligadas) / desligadas:+.1%} da vazão")
+
+
+async def exportacao_dos_fluxos():
+    from benchmarks.harness import FLUXOS, Simulador, chatbot, rodar_fluxos
+    logging.getLogger().setLevel(logging.WARNING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        falhas = await rodar_fluxos(Simulador())
+    await chatbot.auditoria.encerrar()
+
+    texto = metricas.texto()
+    amostras = [linha for linha in texto.splitlines() if not linha.startswith("#")]
+    invalidas = [linha for linha in amostras if not _AMOSTRA.match(linha)]
+    nomes = sorted({linha.split("{")[0].split(" ")[0] for linha in amostras})
+    print(f"\n{len(FLUXOS) - falhas}/{len(FLUXOS)} fluxos do harness; exportação: {len(texto)} bytes, {len(amostras)} amostras, "
+          f"{len(invalidas)} inválidas")
+    for nome in nomes:
+        print(f"  {nome}")
+    for linha in invalidas[:5]:
+        print(f"  INVÁLIDA: {linha}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo das métricas ligadas x desligadas.")
+    parser.add_argument("--conversas", type=int, default=600)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    argumentos = parser.parse_args()
+
+    custo_dos_instrumentos()
+    custo_na_carga(argumentos.conversas, argumentos.repeticoes)
+    asyncio.run(exportacao_dos_fluxos())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# ============================================
+#   BENCHMARK DE CARGA: CONVERSA INTEIRA (HANDLERS + IA FALSA POR HTTP)
+# ============================================
+# Reproduz conversas roteirizadas (aluno no financeiro, visitante, consultas
+# de curso, /cursos) com os handlers reais e os Update/Message falsos do
+# harness, com a OpenAI falsa atendendo por HTTP com latência sorteada de uma
+# distribuição (fixa, lognormal ou exponencial). Com concorrência controlada
+# (usuários virtuais, cada um conversando em sequência), mostra:
+#  - vazão (mensagens e conversas por segundo), mediana de --rodadas repetições
+#    depois de um aquecimento;
+#  - p50/p95/p99 de cada etapa de cada roteiro (ex.: consulta_curso:consulta);
+#  - memória por 10 mil sessões abertas (tracemalloc);
+#  - regressões contra a linha de base guardada (vazão, memória, chamadas à
+#    IA e p95 por etapa piores que a tolerância; sai com código 1).
+# A linha de base é da máquina onde foi gravada: regrave com --salvar-base
+# ao trocar de máquina.
+#
+#   python -m benchmarks.bench_pipeline [--conversas 600] [--concorrencia 50] [--distribuicao lognormal]
+#   python -m benchmarks.bench_pipeline --salvar-base
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+# mede os handlers: a entrega ao Telegram (fila de envio) tem o próprio benchmark, bench_envio
+os.environ.setdefault("ENVIO_ATIVO", "0")
+
+from openai import AsyncOpenAI  # noqa: E402
+
+from benchmarks.harness import Simulador  # noqa: E402 (define AUDITORIA_PASTA e IA_STREAM_INTERVALO)
+from benchmarks.fake_openai import DISTRIBUICOES, ServidorOpenAIFalso  # noqa: E402
+import chatbot  # noqa: E402
+
+LINHA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linha_base_pipeline.json")
+
+# roteiro -> [(etapa, mensagem)]; {campos} são sorteados por conversa
+ROTEIROS = {
+    "aluno_financeiro": [("inicio", "/start"), ("perfil", "Sou aluno"), ("ra", "{ra}"), ("curso", "ADS"),
+                         ("menu", "Financeiro"), ("acao", "Segunda via"), ("detalhe_ia", "{mes}")],
+    "aluno_financeiro_livre": [("inicio", "/start"), ("perfil", "Sou aluno"), ("ra", "{ra}"), ("curso", "ADS"),
+                               ("menu", "Financeiro"), ("texto_livre_ia", "{pergunta_financeiro}")],
+    "visitante": [("inicio", "/start"), ("perfil", "Não sou aluno"), ("texto_livre_ia", "{pergunta_visitante}")],
+    "visitante_cursos": [("inicio", "/start"), ("perfil", "Não sou aluno"), ("ver_cursos", "Ver cursos")],
+    "consulta_curso": [("inicio", "/start"), ("perfil", "Sou aluno"), ("ra", "{ra}"), ("curso", "ADS"),
+                       ("menu", "Informações do curso"), ("consulta", "{consulta}")],
+    "comando_cursos": [("cursos", "/cursos"), ("listar", "Listar todos os cursos")],
+}
+CAMPOS = {
+    "mes": ["março", "abril", "maio", "junho"],
+    "pergunta_financeiro": ["quero pagar a mensalidade", "tem desconto para pagamento antecipado?",
+                            "quanto ainda devo?", "posso parcelar a rematrícula?"],
+    "pergunta_visitante": ["vocês têm aula presencial?", "o diploma é reconhecido pelo mec?",
+                           "qual o horário das aulas?", "tem bolsa para quem está desempregado?"],
+    "consulta": ["engenharia de software", "machine learning", "banco de dados", "primeiro semestre de ads",
+                 "qual curso tem segurança da informação?"],
+}
+# mensagens de cada sessão aberta no teste de memória (para no menu do aluno)
+ABRIR_SESSAO = ["/start", "Sou aluno", "{ra}", "ADS"]
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def preencher(texto: str, aleatorio: random.Random) -> str:
+    campos = {nome: aleatorio.choice(opcoes) for nome, opcoes in CAMPOS.items()}
+    return texto.format(ra=aleatorio.randint(100000, 999999), **campos)
+
+
+# =======================================================
+#   CARGA
+# =======================================================
+async def rodar_carga(simulador: Simulador, conversas: int, concorrencia: int, semente: int,
+                      primeiro_usuario: int = 1_000_000) -> dict:
+    aleatorio = random.Random(semente)
+    roteiros = list(ROTEIROS)
+    plano = [(primeiro_usuario + i, aleatorio.choice(roteiros)) for i in range(conversas)]
+    textos = {user_id: [preencher(m, aleatorio) for _, m in ROTEIROS[r]] for user_id, r in plano}
+    tempos = {}
+    pendentes = iter(plano)
+
+    async def usuario_virtual():
+        for user_id, roteiro in pendentes:
+            for (etapa, _), texto in zip(ROTEIROS[roteiro], textos[user_id]):
+                inicio = time.perf_counter()
+                await simulador.enviar(user_id, texto)
+                tempos.setdefault(f"{roteiro}:{etapa}", []).append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario_virtual() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    mensagens = sum(len(t) for t in tempos.values())
+    return {
+        "vazao_msg_s": round(mensagens / duracao, 1),
+        "vazao_conversas_s": round(conversas / duracao, 1),
+        "mensagens": mensagens,
+        "etapas": {
+            etapa: {"n": len(t), "p50": round(percentil(t, 0.5), 2), "p95": round(percentil(t, 0.95), 2),
+                    "p99": round(percentil(t, 0.99), 2)}
+            for etapa, t in sorted(tempos.items())
+        },
+    }
+
+
+def mediana_das_rodadas(rodadas: list) -> dict:
+    """Cada número é a mediana entre as rodadas: uma rodada ruim (GC, vizinho barulhento) não vira regressão."""
+    def mediana(valores):
+        return sorted(valores)[len(valores) // 2]
+
+    resultado = {chave: mediana([r[chave] for r in rodadas]) for chave in ("vazao_msg_s", "vazao_conversas_s", "mensagens")}
+    resultado["etapas"] = {
+        etapa: {medida: mediana([r["etapas"][etapa][medida] for r in rodadas if etapa in r["etapas"]])
+                for medida in ("n", "p50", "p95", "p99")}
+        for etapa in rodadas[0]["etapas"]
+    }
+    return resultado
+
+
+async def medir_memoria(simulador: Simulador, sessoes: int, concorrencia: int, semente: int) -> float:
+    """MiB retidos por 10 mil sessões abertas (paradas no menu do aluno)."""
+    aleatorio = random.Random(semente)
+    usuarios = iter(range(5_000_000, 5_000_000 + sessoes))
+    textos = [[preencher(m, aleatorio) for m in ABRIR_SESSAO] for _ in range(sessoes)]
+
+    async def usuario_virtual():
+        for user_id in usuarios:
+            for texto in textos[user_id - 5_000_000]:
+                await simulador.enviar(user_id, texto)
+
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    await asyncio.gather(*(usuario_virtual() for _ in range(concorrencia)))
+    gc.collect()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round((depois - antes) / sessoes * 10_000 / 2 ** 20, 2)
+
+
+# =======================================================
+#   LINHA DE BASE
+# =======================================================
+def comparar(atual: dict, base: dict, tolerancia: float, piso_ms: float = 2.0) -> list:
+    """
+    Regressões: vazão menor, memória ou chamadas à IA maiores que a tolerância; p95 de etapa
+    maior que a tolerância e também mais que piso_ms (etapas de 1 ms oscilam).
+    """
+    regressoes = []
+    if atual["vazao_msg_s"] < base["vazao_msg_s"] * (1 - tolerancia):
+        regressoes.append(("vazão (msg/s)", base["vazao_msg_s"], atual["vazao_msg_s"]))
+    if atual.get("memoria_mib_10k") and base.get("memoria_mib_10k") and \
+            atual["memoria_mib_10k"] > base["memoria_mib_10k"] * (1 + tolerancia):
+        regressoes.append(("memória (MiB/10 mil sessões)", base["memoria_mib_10k"], atual["memoria_mib_10k"]))
+    if base.get("chamadas_ia") and atual["chamadas_ia"] > base["chamadas_ia"] * (1 + tolerancia):
+        regressoes.append(("chamadas à IA (cache, intenções)", base["chamadas_ia"], atual["chamadas_ia"]))
+    for etapa, medidas in atual["etapas"].items():
+        anterior = base["etapas"].get(etapa)
+        if anterior and medidas["p95"] > anterior["p95"] * (1 + tolerancia) and \
+                medidas["p95"] - anterior["p95"] > piso_ms:
+            regressoes.append((f"p95 {etapa} (ms)", anterior["p95"], medidas["p95"]))
+    return regressoes
+
+
+def imprimir(resultado: dict, base: dict):
+    print(f"\n{'etapa':<38} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'p95 base':>9}")
+    for etapa, m in resultado["etapas"].items():
+        anterior = base.get("etapas", {}).get(etapa, {}).get("p95", "-") if base else "-"
+        print(f"{etapa:<38} {m['n']:>5} {m['p50']:>8.1f} {m['p95']:>8.1f} {m['p99']:>8.1f} {anterior:>9}")
+    print(f"\nvazão: {resultado['vazao_msg_s']} msg/s, {resultado['vazao_conversas_s']} conversas/s "
+          f"({resultado['mensagens']} mensagens)")
+    if "memoria_mib_10k" in resultado:
+        print(f"memória: {resultado['memoria_mib_10k']} MiB por 10 mil sessões abertas")
+
+
+async def principal(argumentos) -> int:
+    servidor = await ServidorOpenAIFalso(
+        latencia=argumentos.latencia / 1000, distribuicao=argumentos.distribuicao,
+        dispersao=argumentos.dispersao, semente=argumentos.semente,
+    ).iniciar()
+    cliente = AsyncOpenAI(api_key="teste-offline", base_url=servidor.url, max_retries=0)
+    simulador = Simulador(cliente_ia=cliente)
+    print(f"{argumentos.conversas} conversas, {argumentos.concorrencia} usuários simultâneos | IA falsa: "
+          f"{argumentos.distribuicao}, {argumentos.latencia:g} ms")
+    try:
+        # aquecimento (catálogo, caches, conexões HTTP), descartado
+        await rodar_carga(simulador, argumentos.concorrencia, argumentos.concorrencia, argumentos.semente - 1, 900_000)
+        # cada rodada sorteia outros RAs e perguntas: a anterior não deixa a resposta no cache
+        rodadas = [
+            await rodar_carga(simulador, argumentos.conversas, argumentos.concorrencia, argumentos.semente + rodada,
+                              1_000_000 * (rodada + 1))
+            for rodada in range(argumentos.rodadas)
+        ]
+        resultado = mediana_das_rodadas(rodadas)
+        resultado["chamadas_ia"] = servidor.requisicoes
+        if argumentos.sessoes:
+            resultado["memoria_mib_10k"] = await medir_memoria(
+                simulador, argumentos.sessoes, argumentos.concorrencia, argumentos.semente)
+    finally:
+        await cliente.close()
+        await servidor.parar()
+        await chatbot.auditoria.encerrar()
+
+    base = None
+    if os.path.exists(argumentos.base):
+        with open(argumentos.base, encoding="utf-8") as arq:
+            base = json.load(arq)
+    imprimir(resultado, base)
+    print(f"chamadas à IA falsa: {resultado['chamadas_ia']}")
+
+    if argumentos.salvar_base:
+        resultado["parametros"] = {k: v for k, v in vars(argumentos).items() if k not in ("base", "salvar_base")}
+        with open(argumentos.base, "w", encoding="utf-8") as arq:
+            json.dump(resultado, arq, ensure_ascii=False, indent=2)
+        print(f"\nlinha de base gravada em {argumentos.base}")
+        return 0
+    if base is None:
+        print("\nsem linha de base para comparar (use --salvar-base)")
+        return 0
+    regressoes = comparar(resultado, base, argumentos.tolerancia)
+    if not regressoes:
+        print(f"\nsem regressões contra a linha de base (tolerância {argumentos.tolerancia:.0%})")
+        return 0
+    print(f"\nREGRESSÕES (tolerância {argumentos.tolerancia:.0%}):")
+    for medida, antes, agora in regressoes:
+        print(f"  {medida:<46} base {antes:>9} -> {agora}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga e latência do pipeline de conversa")
+    parser.add_argument("--conversas", type=int, default=600)
+    parser.add_argument("--concorrencia", type=int, default=50, help="usuários virtuais simultâneos")
+    parser.add_argument("--latencia", type=float, default=100, help="latência da IA falsa (ms)")
+    parser.add_argument("--distribuicao", choices=DISTRIBUICOES, default="lognormal")
+    parser.add_argument("--dispersao", type=float, default=0.5, help="sigma da lognormal")
+    parser.add_argument("--sessoes", type=int, default=10000, help="sessões abertas no teste de memória (0 = pula)")
+    parser.add_argument("--rodadas", type=int, default=3, help="repetições da carga (vale a mediana)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--base", default=LINHA_BASE)
+    parser.add_argument("--salvar-base", action="store_true")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    argumentos = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(asyncio.run(principal(argumentos)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# ============================================
+#   BENCHMARK: MODELOS DE PROMPT E CACHE DE PREFIXO
+# ============================================
+# Manda o mesmo tráfego sintético (alunos diferentes, todas as categorias)
+# para o servidor OpenAI falso, que imita o cache de prefixo da OpenAI, com:
+#  - o layout antigo (prompt de sistema único + uma mensagem com pedido,
+#    dados do aluno e trecho do catálogo na ordem de cada ramo);
+#  - os modelos de prompts.py, com cursos@v1 (trecho) e cursos@v2 (catálogo
+#    inteiro no prefixo).
+# Mostra, por versão de modelo, tokens de entrada, fração em cache, custo
+# relativo (token em cache vale metade) e latência. Com as versões padrão
+# nenhum prefixo chega aos 1024 tokens do cache: a diferença para o layout
+# antigo vem dos prompts de sistema menores, não do cache.
+#
+#   python -m benchmarks.bench_prompts [chamadas, padrão 300]
+
+import os
+import sys
+import random
+import asyncio
+import logging
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+
+from openai import AsyncOpenAI  # noqa: E402
+
+import prompts  # noqa: E402
+from contexto_ia import contar_tokens, montar_contexto_cursos  # noqa: E402
+from prompts import PALAVRAS_CHAVE_CURSOS, PROMPT_SISTEMA, UsoPrompts, modelo_prompt  # noqa: E402
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+
+# (categoria, prompt como era no menus.json, contexto, textos digitados)
+CHAMADAS = [
+    ("aluno", "O usuário (aluno) escreveu: '{texto}'. {contexto}. Resuma em uma frase e responda de forma cortês, sugerindo as opções do menu.",
+     "Aluno: RA {ra}, Curso: {curso}", ["o portal está fora do ar", "esqueci minha senha do ava", "meu professor não respondeu"]),
+    ("financeiro", "Usuário pediu algo no Financeiro: '{texto}'. {contexto}. Resuma a solicitação e explique os próximos passos possíveis em linguagem natural.",
+     "Aluno: RA {ra}, Curso: {curso}, Setor: Financeiro", ["quanto ainda devo", "tem desconto para pagamento antecipado?"]),
+    ("financeiro", "Processar solicitação financeira: '{texto}'. Forneça confirmação e próximos passos.",
+     "\nDADOS DO ALUNO:\n• RA: {ra}\n• Curso: {curso}\n• Ação Financeira: segunda_via\n• Detalhes: {texto}\n", ["boleto de março", "mensalidade de abril"]),
+    ("secretaria", "Processar solicitação da secretaria: '{texto}'. Forneça confirmação e próximos passos.",
+     "\nDADOS DO ALUNO:\n• RA: {ra}\n• Curso: {curso}\n• Ação Secretaria: recuperacao\n• Detalhes: {texto}\n",
+     ["recuperação de métodos ágeis", "reposição da prova de lógica matemática"]),
+    ("documentos", "Solicitação de documento: '{texto}'. {contexto}. Resuma e indique opções (email/retirar/voltar).",
+     "Aluno: RA {ra}, Curso: {curso}, Setor: Documentos", ["quanto tempo demora", "é pago?"]),
+    ("cursos", "Pergunta do usuário: {texto}\n\nResponda de forma precisa usando as informações reais dos cursos.",
+     "", ["qual curso tem machine learning?", "quais cursos têm disciplina de python?", "qual curso é melhor para segurança?"]),
+    ("visitante_livre", "Visitante escreveu: '{texto}'. Resuma a intenção e sugira as opções do menu de visitante.",
+     "", ["onde fica a faculdade", "o curso é reconhecido pelo mec?"]),
+]
+CURSOS_ALUNOS = ["Análise e Desenvolvimento de Sistemas EAD", "Ciência de Dados EAD", "Defesa Cibernética EAD"]
+
+
+def trafego(quantidade: int, semente: int = 0) -> list:
+    """(categoria, prompt antigo, prompt novo, contexto) para cada chamada."""
+    aleatorio = random.Random(semente)
+    chamadas = []
+    for _ in range(quantidade):
+        categoria, modelo, contexto, textos = aleatorio.choice(CHAMADAS)
+        campos = {"texto": aleatorio.choice(textos), "ra": aleatorio.randint(100000, 999999),
+                  "curso": aleatorio.choice(CURSOS_ALUNOS)}
+        contexto = contexto.format(**campos)
+        antigo = modelo.format(contexto=contexto, **campos)
+        novo = modelo.replace(" {contexto}.", "").format(**campos)
+        chamadas.append((categoria, antigo, novo, contexto))
+    return chamadas
+
+
+def layout_antigo(prompt: str, contexto_adicional: str) -> list:
+    """_montar_mensagens antes dos modelos de prompt."""
+    if any(palavra in prompt.lower() for palavra in PALAVRAS_CHAVE_CURSOS):
+        info_cursos = montar_contexto_cursos(f"{prompt}\n{contexto_adicional}")
+        usuario = (f"{prompt}\n\n{contexto_adicional}\n\nInformações dos cursos (trecho do catálogo):\n{info_cursos}"
+                   "\n\nBaseie sua resposta nessas informações reais dos cursos.")
+    else:
+        usuario = f"{prompt}\n\n{contexto_adicional}"
+    return [{"role": "system", "content": PROMPT_SISTEMA}, {"role": "user", "content": usuario}]
+
+
+async def rodar(chamadas: list, montar, rotulo) -> UsoPrompts:
+    servidor = await ServidorOpenAIFalso(latencia=0.02, custo_token=0.00005).iniciar()
+    cliente = AsyncOpenAI(api_key="teste-offline", base_url=servidor.url, max_retries=0)
+    uso = UsoPrompts()
+    for categoria, antigo, novo, contexto in chamadas:
+        mensagens = montar(categoria, antigo, novo, contexto)
+        inicio = time.perf_counter()
+        resposta = await cliente.chat.completions.create(model="gpt-4o-mini", messages=mensagens)
+        uso.registrar(rotulo(categoria), resposta.usage, (time.perf_counter() - inicio) * 1000)
+    await cliente.close()
+    await servidor.parar()
+    return uso
+
+
+def imprimir(titulo: str, uso: UsoPrompts):
+    print(f"\n{titulo}")
+    print(f"{'modelo':<28} {'chamadas':>8} {'tokens':>8} {'em cache':>9} {'custo rel.':>11} {'ms':>7}")
+    chamadas = custo = 0
+    for id_modelo, e in uso.estatisticas().items():
+        custo_medio = e["tokens_entrada_media"] * (1 - e["taxa_cache"] / 2)
+        chamadas += e["chamadas"]
+        custo += custo_medio * e["chamadas"]
+        print(f"{id_modelo:<28} {e['chamadas']:>8} {e['tokens_entrada_media']:>8.0f} {e['taxa_cache']:>9.1%} "
+              f"{custo_medio:>11.0f} {e['latencia_media_ms']:>7.1f}")
+    print(f"{'total (custo médio/chamada)':<28} {chamadas:>8} {'':>8} {'':>9} {custo / chamadas:>11.0f}")
+
+
+async def principal(quantidade: int):
+    chamadas = trafego(quantidade)
+    antes = await rodar(chamadas, lambda c, antigo, novo, ctx: layout_antigo(antigo, ctx), lambda c: f"antigo:{c}")
+    imprimir("Layout antigo (sistema único + mensagem montada por ramo)", antes)
+    for versao in (1, 2):
+        prompts._VERSOES_ATIVAS["cursos"] = versao
+        depois = await rodar(chamadas, lambda c, antigo, novo, ctx: modelo_prompt(c).montar(novo, ctx),
+                             lambda c: modelo_prompt(c).id)
+        padrao = " (padrão)" if versao == prompts._VERSOES_PADRAO["cursos"] else " (só com IA_PROMPT_VERSOES)"
+        imprimir(f"Modelos de prompt, cursos@v{versao}{padrao}", depois)
+        if versao == prompts._VERSOES_PADRAO["cursos"]:
+            prefixos = [contar_tokens(modelo_prompt(categoria).sistema) for categoria in prompts.MODELOS]
+            print(f"sem cache de prefixo: o prefixo fixo dos modelos padrão tem {min(prefixos)}-{max(prefixos)} "
+                  f"tokens, abaixo do mínimo de 1024; a economia vem dos prompts de sistema menores")
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{quantidade} chamadas | cache de prefixo: >= 1024 tokens, blocos de 128 | token em cache = 1/2 do custo")
+    asyncio.run(principal(quantidade))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# ============================================
+#   BENCHMARK: ROTAS DA IA (MODELO E ORÇAMENTO POR CATEGORIA E ETAPA)
+# ============================================
+# Contra a OpenAI falsa imitando modelos de verdade: latência base por
+# modelo mais um custo por token gerado, e a resposta cortada no max_tokens.
+#  1) cada pedido à IA do menus.json (categoria e etapa), com a política
+#     fixa de antes (gpt-4o-mini, 500 tokens para tudo) e com rotas_ia.json:
+#     modelo, p50/p95, tokens de saída por chamada e se a rota cumpre o SLO;
+#  2) rebaixamento: a rota de confirmação financeira (etapa 31) com um SLO
+#     apertado; o modelo completo fica lento, a rota desce para o rápido,
+#     tenta voltar depois da pausa e volta de vez quando ele se recupera.
+#
+#   python -m benchmarks.bench_rotas_ia [--consultas 20]
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_rotas_"))
+# cada chamada precisa chegar à API: sem cache e sem juntar consultas iguais
+os.environ.setdefault("CACHE_IA_TTLS", "")
+os.environ.setdefault("CACHE_IA_TTL_PADRAO", "0")
+os.environ.setdefault("CACHE_IA_ARQUIVO", "")
+os.environ.setdefault("IA_COALESCER", "0")
+os.environ.setdefault("IA_MAX_CONCORRENCIA", "1000")
+
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+
+# "modelos" da OpenAI falsa: latência base (s) e custo por token gerado (s)
+LATENCIA_MODELOS = {"gpt-4o-mini": 0.30, "gpt-4.1-nano": 0.15}
+TOKENS_DESEJADOS = 400
+CUSTO_TOKEN_SAIDA = 0.005
+
+# política do cenário 2: só a rota financeiro@31, com SLO apertado e pausa curta
+POLITICA_REBAIXAMENTO = {
+    "niveis": [{"nome": "completo", "modelo": "gpt-4o-mini"}, {"nome": "rapido", "modelo": "gpt-4.1-nano"}],
+    "rebaixamento": {"janela": 20, "min_amostras": 10, "pausa_s": 2},
+    "padrao": {"nivel": "completo", "max_tokens": 100, "temperatura": 0.4, "prazo": 20, "slo_p95_ms": 1500},
+}
+
+
+def pedidos_do_menu() -> list:
+    """[(etapa, opção, ia)] de cada opção do menus.json que vai para a IA."""
+    from dialogo import MotorDialogo
+    motor = MotorDialogo(None, None)
+    pedidos = []
+    for etapa, (mapa, livre) in motor.etapas.items():
+        opcoes = {id(o): o for o in mapa.values()}
+        for opcao in list(opcoes.values()) + ([livre] if livre else []):
+            if "ia" in opcao:
+                nome = opcao["textos"][0] if opcao.get("textos") else "texto livre"
+                pedidos.append((etapa, nome, opcao["ia"]))
+    return pedidos
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def consultas(bot, etapa: int, ia: dict, quantidade: int, rodada: str) -> list:
+    """Tempos (ms) de 'quantidade' consultas simultâneas, cada uma com um texto diferente."""
+    from dialogo import _Campos
+
+    async def uma(numero: int) -> float:
+        campos = _Campos(texto=f"pedido {rodada}-{numero}", ra="123456", curso="Análise e Desenvolvimento de Sistemas")
+        campos["contexto"] = ia.get("contexto", "").format_map(campos)
+        prompt = ia["prompt"].format_map(campos) + f" ({rodada}-{numero})"  # sem cache entre rodadas
+        inicio = time.perf_counter()
+        await bot.consultar_ia_async(prompt, campos["contexto"], categoria=ia.get("categoria", "geral"), etapa=etapa)
+        return (time.perf_counter() - inicio) * 1000
+
+    return await asyncio.gather(*(uma(n) for n in range(quantidade)))
+
+
+async def por_rota(bot, quantidade: int) -> list:
+    from rotas_ia import carregar_politica
+    pedidos = pedidos_do_menu()
+    politicas = [("fixa", carregar_politica(caminho=None)), ("rotas", carregar_politica())]
+    etapa, _, ia = pedidos[0]
+    await consultas(bot, etapa, ia, quantidade, "aquecimento")  # conexões abertas antes de medir
+    tempos = {}
+    for nome, politica in politicas:
+        bot.rotas_ia = politica
+        resultados = []
+        for i, (etapa, _, ia) in enumerate(pedidos):
+            resultados.append(await consultas(bot, etapa, ia, quantidade, f"{nome}{i}"))
+        tempos[nome] = (politica, resultados)
+
+    print(f"{quantidade} consultas simultâneas por pedido, um pedido de cada vez | OpenAI falsa: "
+          f"{', '.join(f'{m} {s * 1000:.0f} ms' for m, s in LATENCIA_MODELOS.items())} "
+          f"+ {CUSTO_TOKEN_SAIDA * 1000:.0f} ms/token gerado (até {TOKENS_DESEJADOS})\n")
+    print(f"{'pedido (etapa)':<36} {'fixa p50/p95 ms':>16} {'tok':>5} | {'rota':<20} {'modelo':<13} "
+          f"{'p50/p95 ms':>11} {'tok':>5} {'SLO ms':>7} {'ok':>3}")
+    fora_do_slo, totais = [], {"fixa": [0, 0.0], "rotas": [0, 0.0]}
+    for i, (etapa, opcao, ia) in enumerate(pedidos):
+        linha = f"{(ia.get('categoria', 'geral') + ': ' + opcao)[:31] + f' ({etapa})':<36}"
+        for nome in ("fixa", "rotas"):
+            politica, resultados = tempos[nome]
+            rota = politica.rota(ia.get("categoria", "geral"), etapa)
+            estatisticas = rota.estatisticas()
+            p50, p95 = percentil(resultados[i], 0.5), percentil(resultados[i], 0.95)
+            tokens = estatisticas["tokens_saida_media"]
+            totais[nome][0] += estatisticas["tokens_saida"]
+            totais[nome][1] += sum(resultados[i])
+            if nome == "fixa":
+                linha += f" {p50:>7.0f}/{p95:<8.0f} {tokens:>5.0f} |"
+            else:
+                ok = p95 <= rota.slo_p95_ms
+                linha += (f" {rota.nome:<20} {estatisticas['modelo']:<13} {p50:>5.0f}/{p95:<5.0f} {tokens:>5.0f} "
+                          f"{rota.slo_p95_ms:>7.0f} {'sim' if ok else 'NÃO':>3}")
+                if not ok:
+                    fora_do_slo.append(rota.nome)
+        print(linha)
+    chamadas = len(pedidos) * quantidade
+    print(f"\n{'total':<36} tokens de saída fixa {totais['fixa'][0]} -> rotas {totais['rotas'][0]} "
+          f"({1 - totais['rotas'][0] / totais['fixa'][0]:.0%} menos); espera média "
+          f"{totais['fixa'][1] / chamadas:.0f} -> {totais['rotas'][1] / chamadas:.0f} ms")
+    return fora_do_slo
+
+
+async def rebaixamento(bot, servidor) -> list:
+    from rotas_ia import PoliticaRotas
+    bot.rotas_ia = politica = PoliticaRotas(POLITICA_REBAIXAMENTO)
+    ia = {"prompt": "Processar solicitação financeira: '{texto}'. Forneça confirmação e próximos passos.",
+          "categoria": "financeiro"}
+    rota = politica.rota("financeiro", 31)
+    fases = [
+        ("normal", 0.30, 0), ("normal", 0.30, 0),
+        ("completo lento", 2.00, 0), ("completo lento", 2.00, 0),
+        ("completo lento", 2.00, politica.pausa),  # passou a pausa: tenta o completo de novo
+        ("completo lento", 2.00, 0),
+        ("recuperado", 0.30, politica.pausa), ("recuperado", 0.30, 0),
+    ]
+    print(f"\nrebaixamento: rota {rota.nome}, SLO p95 {rota.slo_p95_ms:.0f} ms "
+          f"(mín. {politica.min_amostras} amostras), pausa {politica.pausa:.0f}s, lotes de 10 consultas")
+    print(f"{'lote':>4} {'gpt-4o-mini':<15} {'modelo usado':<13} {'p95 ms':>7} {'rebaixamentos':>14} {'depois':<9}")
+    usados = []
+    for numero, (nome, latencia, espera) in enumerate(fases, start=1):
+        await asyncio.sleep(espera)
+        servidor.latencia_modelos["gpt-4o-mini"] = latencia
+        modelo = rota.escolher().modelo
+        tempos = await consultas(bot, 31, ia, 10, f"lote{numero}")
+        usados.append(modelo)
+        print(f"{numero:>4} {nome:<15} {modelo:<13} {percentil(tempos, 0.95):>7.0f} "
+              f"{rota.contadores['rebaixamentos']:>14} {politica.niveis[rota.nivel][0]:<9}")
+    servidor.latencia_modelos.update(LATENCIA_MODELOS)
+    esperado = ["gpt-4o-mini"] * 3 + ["gpt-4.1-nano", "gpt-4o-mini", "gpt-4.1-nano", "gpt-4o-mini", "gpt-4o-mini"]
+    return [] if usados == esperado else [f"modelos por lote {usados}, esperado {esperado}"]
+
+
+async def principal(quantidade: int) -> int:
+    servidor = await ServidorOpenAIFalso(latencia_modelos=LATENCIA_MODELOS, tokens_saida=TOKENS_DESEJADOS,
+                                         custo_token_saida=CUSTO_TOKEN_SAIDA).iniciar()
+    os.environ["OPENAI_BASE_URL"] = servidor.url
+    import bot_faculdade as bot  # noqa: E402 (lê a URL acima)
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    fora_do_slo = await por_rota(bot, quantidade)
+    falhas = await rebaixamento(bot, servidor)
+    await servidor.parar()
+
+    if fora_do_slo:
+        falhas.append(f"rotas acima do SLO: {fora_do_slo}")
+    if falhas:
+        print("\nFALHOU: " + "; ".join(falhas))
+        return 1
+    print("\nok: todas as rotas dentro do SLO; rebaixamento e volta como esperado")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotas da IA por categoria e etapa.")
+    parser.add_argument("--consultas", type=int, default=20, help="consultas simultâneas por pedido do menu")
+    argumentos = parser.parse_args()
+    return asyncio.run(principal(argumentos.consultas))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
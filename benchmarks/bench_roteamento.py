@@ -0,0 +1,82 @@
+# ============================================
+#   BENCHMARK: ROTEAMENTO DAS MENSAGENS
+# ============================================
+# Compara a cadeia de ifs antiga (testa etapa a etapa e opção a opção, na
+# ordem em que estavam no código) com a tabela do MotorDialogo
+# (etapa -> dicionário de textos normalizados). Mede só a escolha da
+# opção, sem IA e sem Telegram.
+#
+#   python -m benchmarks.bench_roteamento
+
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+
+from dialogo import MotorDialogo  # noqa: E402
+from normalizacao import normalizar_texto  # noqa: E402
+
+# (etapa, mensagem) como chegam do Telegram
+MENSAGENS = [
+    (10, "Sou aluno"), (10, "Não sou aluno"), (20, "Financeiro"), (20, "Cancelar"),
+    (30, "Consultar pagamentos"), (30, "quero pagar a mensalidade"), (40, "Troca de curso"),
+    (50, "Solicitar diploma"), (60, "Voltar"), (61, "Voltar ao menu"),
+    (70, "Falar com consultor"), (70, "quanto custa?"),
+]
+
+
+def cadeia_de_ifs(motor: MotorDialogo):
+    """
+    Reconstrói o roteamento antigo a partir dos mesmos menus: lista de
+    etapas percorrida em ordem e, dentro da etapa, comparação texto a texto
+    com a mensagem em minúsculas (como era o if/elif do chatbot).
+    """
+    etapas = []
+    for etapa, (mapa, livre) in motor.etapas.items():
+        opcoes = []
+        for opcao in {id(o): o for o in mapa.values()}.values():
+            opcoes.append(([t.lower() for t in opcao["textos"]], opcao))
+        etapas.append((etapa, opcoes, livre))
+
+    def rotear(etapa, texto_raw):
+        texto = texto_raw.lower()
+        for numero, opcoes, livre in etapas:
+            if etapa == numero:
+                for textos, opcao in opcoes:
+                    for t in textos:
+                        if texto == t:
+                            return opcao
+                return livre or motor.nao_mapeado
+        return motor.nao_mapeado
+
+    return rotear
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Tempo médio por mensagem, em microssegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for etapa, texto in MENSAGENS:
+            funcao(etapa, texto)
+    return (time.perf_counter() - inicio) / (repeticoes * len(MENSAGENS)) * 1e6
+
+
+def main():
+    motor = MotorDialogo(responder=None, encerrar=None)
+    antigo = cadeia_de_ifs(motor)
+    tabela = lambda etapa, texto: motor.rota(etapa, normalizar_texto(texto))  # noqa: E731
+    tabela_sem_normalizar = lambda etapa, texto: motor.rota(etapa, texto)  # noqa: E731
+
+    # as duas formas precisam escolher a mesma opção
+    for etapa, texto in MENSAGENS:
+        assert antigo(etapa, texto) is tabela(etapa, texto), (etapa, texto)
+
+    repeticoes = 20000
+    print(f"{'roteamento':<36} {'µs/mensagem':>12}")
+    print(f"{'cadeia de ifs (antigo)':<36} {cronometrar(antigo, repeticoes):>12.2f}")
+    print(f"{'tabela + normalizar_texto':<36} {cronometrar(tabela, repeticoes):>12.2f}")
+    print(f"{'tabela (só o lookup)':<36} {cronometrar(tabela_sem_normalizar, repeticoes):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# ============================================
+#   BENCHMARK: SUPERVISOR COM 1..N WORKERS (GERADOR DE CARGA)
+# ============================================
+# Sobe `python chatbot.py` em BOT_MODO=supervisor contra a Bot API falsa e a
+# OpenAI falsa (neste processo) e injeta conversas completas de muitos
+# usuários ao mesmo tempo pelo getUpdates. Para cada quantidade de workers:
+#  - vazão (mensagens respondidas/s) e latência update -> resposta;
+#  - fluxos completos: com sessões em memória, um usuário que mudasse de
+#    worker no meio da conversa perderia o atendimento;
+#  - distribuição dos usuários entre os workers (arquivos de auditoria .wN);
+#  - quantos workers leram o catálogo da fotografia em vez do CSV.
+# O ganho de vazão acompanha o número de núcleos livres: com 1 núcleo os
+# workers só dividem o mesmo processador.
+#
+#   python -m benchmarks.bench_supervisor [usuários, padrão 200] [workers, padrão 1,2,4]
+
+import os
+import sys
+import glob
+import time
+import signal
+import asyncio
+import tempfile
+import subprocess
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+from benchmarks.fake_telegram import BotAPIFalsa, update_de_texto  # noqa: E402
+from benchmarks.bench_webhook import FLUXO, percentil  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def esperar(condicao, prazo: float = 60.0):
+    limite = time.monotonic() + prazo
+    while not condicao():
+        if time.monotonic() > limite:
+            raise TimeoutError("o bot não respondeu a tempo")
+        await asyncio.sleep(0.05)
+
+
+async def rodar(workers: int, usuarios: int, telegram: BotAPIFalsa, url_openai: str) -> dict:
+    pasta = tempfile.mkdtemp(prefix=f"supervisor_{workers}w_")
+    ambiente = dict(
+        os.environ,
+        BOT_MODO="supervisor",
+        SUPERVISOR_WORKERS=str(workers),
+        SUPERVISOR_POLLING_ESPERA="1",
+        TELEGRAM_TOKEN="123456:teste-offline",
+        TELEGRAM_API_URL=telegram.url,
+        OPENAI_BASE_URL=url_openai,
+        AUDITORIA_PASTA=pasta,
+        IA_STREAMING="0",
+        ENVIO_POR_SEGUNDO="0",  # a Bot API falsa não limita envios
+        ENVIO_CHAT_POR_SEGUNDO="0",
+    )
+    log = open(os.path.join(pasta, "bot.log"), "w")
+    prontos = telegram.chamadas.get("getMe", 0) + workers  # cada worker chama getMe no initialize
+    bot = subprocess.Popen([sys.executable, "chatbot.py"], cwd=RAIZ, env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+    await esperar(lambda: telegram.chamadas.get("getMe", 0) >= prontos)
+
+    proximo_id = [0]
+    tempos = []
+
+    async def usuario(user_id: int):
+        for texto in FLUXO:
+            resposta = telegram.aguardar_resposta(user_id)
+            proximo_id[0] += 1
+            inicio = time.perf_counter()
+            telegram.enfileirar(update_de_texto(proximo_id[0], user_id, texto))
+            tempos.append((await asyncio.wait_for(resposta, 60) - inicio) * 1000)
+
+    faixa = range(workers * 1_000_000, workers * 1_000_000 + usuarios)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario(u) for u in faixa))
+    duracao = time.perf_counter() - inicio
+
+    def finalizados() -> set:
+        # o "Cancelar" manda duas mensagens; a segunda ("Atendimento finalizado") fecha o fluxo
+        return {chat for _, chat, texto, _ in telegram.enviadas if chat in faixa and "finalizado" in texto}
+    try:
+        await esperar(lambda: len(finalizados()) == usuarios, prazo=5)
+    except TimeoutError:
+        pass
+    completos = len(finalizados())
+
+    bot.send_signal(signal.SIGINT)
+    await asyncio.to_thread(bot.wait, 60)
+    log.close()
+
+    por_worker = []
+    for arquivo in sorted(glob.glob(os.path.join(pasta, "auditoria_*.w*.jsonl"))):
+        with open(arquivo, encoding="utf-8") as arq:
+            por_worker.append(sum(1 for _ in arq))
+    with open(os.path.join(pasta, "bot.log"), encoding="utf-8") as arq:
+        fotografias = sum("lido da fotografia" in linha for linha in arq)
+    return {"tempos": tempos, "duracao": duracao, "completos": completos,
+            "por_worker": por_worker, "fotografias": fotografias}
+
+
+async def principal(usuarios: int, quantidades: list):
+    telegram = await BotAPIFalsa().iniciar()
+    openai_falsa = await ServidorOpenAIFalso(latencia=0.05).iniciar()
+    print(f"{usuarios} usuários simultâneos x {len(FLUXO)} mensagens | núcleos: {os.cpu_count()}\n")
+    print(f"{'workers':>7} {'msg/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fluxos':>9} "
+          f"{'fotografia':>10}  usuários por worker")
+    referencia = None
+    for workers in quantidades:
+        r = await rodar(workers, usuarios, telegram, openai_falsa.url)
+        vazao = len(r["tempos"]) / r["duracao"]
+        referencia = referencia or vazao
+        print(f"{workers:>7} {vazao:>7.0f} {percentil(r['tempos'], 0.5):>8.1f} {percentil(r['tempos'], 0.95):>8.1f} "
+              f"{percentil(r['tempos'], 0.99):>8.1f} {r['completos']:>5}/{usuarios} {r['fotografias']:>5}/{workers:<4}"
+              f"  {r['por_worker']} (x{vazao / referencia:.2f})")
+    await openai_falsa.parar()
+    await telegram.parar()
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    quantidades = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4]
+    asyncio.run(principal(usuarios, quantidades))
+
+
+if __name__ == "__main__":
+    main()
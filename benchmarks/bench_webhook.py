@@ -0,0 +1,155 @@
+# ============================================
+#   BENCHMARK: WEBHOOK x POLLING (UPDATE -> RESPOSTA)
+# ============================================
+# Sobe o bot de verdade (Application, handlers, sessões, auditoria) contra a
+# Bot API falsa e a OpenAI falsa, sem rede externa, e mede o tempo entre o
+# update chegar e o bot mandar a resposta (sendMessage):
+#  - polling: o update entra na fila do getUpdates (long polling);
+#  - webhook: o update é postado no ServidorWebhook, com o segredo.
+# Depois confere o segredo (401), o JSON inválido (400) e a drenagem: uma
+# rajada de updates seguida de desligamento imediato precisa ser respondida
+# inteira antes de o servidor encerrar.
+#
+#   python -m benchmarks.bench_webhook [usuários simultâneos, padrão 50]
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_webhook_"))
+os.environ.setdefault("IA_STREAMING", "0")  # uma mensagem por resposta: mede só o sendMessage
+# a Bot API falsa não limita envios (os limites do Telegram estão em bench_envio)
+os.environ.setdefault("ENVIO_POR_SEGUNDO", "0")
+os.environ.setdefault("ENVIO_CHAT_POR_SEGUNDO", "0")
+
+import aiohttp  # noqa: E402
+
+from benchmarks.fake_openai import ServidorOpenAIFalso  # noqa: E402
+from benchmarks.fake_telegram import BotAPIFalsa, update_de_texto  # noqa: E402
+
+SEGREDO = "segredo-de-teste"
+
+# cada passo gera uma única mensagem do bot; o penúltimo vai para a IA
+FLUXO = ["/start", "Sou aluno", "123456", "Financeiro", "Voltar", "o portal está fora do ar", "Cancelar"]
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Entrega:
+    """Como o update chega ao bot: fila do getUpdates ou POST no webhook."""
+
+    def __init__(self, telegram: BotAPIFalsa, url_webhook: str = None, sessao=None):
+        self.telegram = telegram
+        self.url_webhook = url_webhook
+        self.sessao = sessao
+        self.proximo_id = int(time.time() * 1000) % 10 ** 9
+
+    async def enviar(self, user_id: int, texto: str, segredo: str = SEGREDO) -> int:
+        self.proximo_id += 1
+        update = update_de_texto(self.proximo_id, user_id, texto)
+        if self.url_webhook is None:
+            self.telegram.enfileirar(update)
+            return 200
+        async with self.sessao.post(self.url_webhook, json=update,
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": segredo}) as resposta:
+            return resposta.status
+
+
+async def conversar(entrega: Entrega, usuarios: range, tempos: list):
+    async def usuario(user_id: int):
+        for texto in FLUXO:
+            resposta = entrega.telegram.aguardar_resposta(user_id)
+            inicio = time.perf_counter()
+            await entrega.enviar(user_id, texto)
+            tempos.append((await asyncio.wait_for(resposta, 30) - inicio) * 1000)
+
+    await asyncio.gather(*(usuario(u) for u in usuarios))
+
+
+def imprimir(nome: str, tempos: list, duracao: float, completos: int, usuarios: int):
+    print(f"{nome:<10} {len(tempos):>9} {percentil(tempos, 0.5):>8.1f} {percentil(tempos, 0.95):>8.1f} "
+          f"{percentil(tempos, 0.99):>8.1f} {len(tempos) / duracao:>8.0f} {completos:>6}/{usuarios}")
+
+
+async def principal(usuarios: int):
+    telegram = await BotAPIFalsa().iniciar()
+    openai_falsa = await ServidorOpenAIFalso(latencia=0.05).iniciar()
+    os.environ["TELEGRAM_API_URL"] = telegram.url
+    os.environ["OPENAI_BASE_URL"] = openai_falsa.url
+    import chatbot  # noqa: E402 (lê as URLs acima)
+    from webhook import ServidorWebhook  # noqa: E402
+
+    async def encerrados(faixa: range) -> int:
+        # o "Cancelar" responde antes de apagar a sessão: dá um instante aos últimos handlers
+        for _ in range(50):
+            abertos = sum(1 for u in faixa if chatbot.atendimentos.obter(u) is not None)
+            if not abertos:
+                break
+            await asyncio.sleep(0.02)
+        return len(faixa) - abertos
+
+    print(f"{usuarios} usuários simultâneos, {len(FLUXO)} mensagens cada (IA falsa: 50 ms)\n")
+    print(f"{'modo':<10} {'mensagens':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'msg/s':>8} {'fluxos':>9}")
+
+    # ---------- polling ----------
+    app = chatbot.criar_aplicacao()
+    await app.initialize()
+    await app.post_init(app)
+    await app.updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+    faixa, tempos = range(1000, 1000 + usuarios), []
+    inicio = time.perf_counter()
+    await conversar(Entrega(telegram), faixa, tempos)
+    imprimir("polling", tempos, time.perf_counter() - inicio, await encerrados(faixa), usuarios)
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    await app.shutdown()
+    await app.post_shutdown(app)
+
+    # ---------- webhook ----------
+    servidor = ServidorWebhook(chatbot.criar_aplicacao(), SEGREDO, host="127.0.0.1", porta=0)
+    await servidor.iniciar()
+    url = f"http://127.0.0.1:{servidor.porta}{servidor.caminho}"
+    async with aiohttp.ClientSession() as sessao:
+        entrega = Entrega(telegram, url, sessao)
+        faixa, tempos = range(2000, 2000 + usuarios), []
+        inicio = time.perf_counter()
+        await conversar(entrega, faixa, tempos)
+        imprimir("webhook", tempos, time.perf_counter() - inicio, await encerrados(faixa), usuarios)
+
+        sem_segredo = await entrega.enviar(1, "/start", segredo="errado")
+        async with sessao.post(url, data=b"{nao e json", headers={"X-Telegram-Bot-Api-Secret-Token": SEGREDO}) as r:
+            invalido = r.status
+        print(f"\nsegredo errado -> HTTP {sem_segredo} | JSON inválido -> HTTP {invalido}")
+
+        # ---------- drenagem: rajada e desligamento imediato ----------
+        telegram.latencia = 0.05  # cada sendMessage demora: os handlers ainda estão rodando no SIGTERM
+        rajada = range(3000, 3000 + usuarios * 4)
+        await asyncio.gather(*(entrega.enviar(u, "/start") for u in rajada))
+    inicio = time.perf_counter()
+    await servidor.encerrar()
+    respondidos = len({chat_id for _, chat_id, _, _ in telegram.enviadas if chat_id in rajada})
+    print(f"drenagem: {respondidos}/{len(rajada)} updates da rajada respondidos antes de encerrar "
+          f"({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+
+    await openai_falsa.parar()
+    await telegram.parar()
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    asyncio.run(principal(usuarios))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# ============================================
+#   SERVIDOR OPENAI FALSO (LATÊNCIA E ERROS SIMULADOS)
+# ============================================
+# Servidor HTTP local, só com a biblioteca padrão, que responde a
+# POST /v1/chat/completions como a OpenAI (JSON ou SSE com stream=true).
+# Serve para exercitar o cliente resiliente sem rede: cada requisição tem
+# latência base + cauda ocasional, e uma fração vira 429/500/503. Com
+# fora_do_ar=True todas falham (simula a API degradada).
+# A latência base segue uma distribuição: fixa, lognormal (mediana = latencia,
+# espalhada por dispersao) ou exponencial (média = latencia).
+# O campo usage imita o cache de prefixo da OpenAI: prompt_tokens ~ 4
+# caracteres por token, e cached_tokens é o maior prefixo já visto, a partir
+# de 1024 tokens e em blocos de 128; tokens fora do cache custam custo_token
+# segundos de latência cada.
+# Como um modelo de verdade, a resposta "gera" tokens_saida tokens (cortados
+# no max_tokens do pedido), a custo_token_saida segundos cada; latencia_modelos
+# dá uma latência base própria a alguns modelos ({"gpt-4.1-nano": 0.15}).
+#
+#   python -m benchmarks.fake_openai [--porta 8089] [--latencia 300] [--distribuicao lognormal] [--erros 0.1]
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python chatbot.py
+
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from benchmarks.servidor_falso import ServidorHTTPFalso
+
+DISTRIBUICOES = ("fixa", "lognormal", "exponencial")
+
+
+class ServidorOpenAIFalso(ServidorHTTPFalso):
+    """
+    latencia/cauda em segundos; prob_cauda e prob_erro entre 0 e 1;
+    distribuicao: fixa, lognormal ou exponencial (ver _latencia_base).
+    Os atributos podem ser mudados com o servidor no ar (janela de queda).
+    """
+
+    def __init__(self, latencia: float = 0.05, cauda: float = 1.0, prob_cauda: float = 0.0,
+                 prob_erro: float = 0.0, status_erros=(429, 500, 503), fora_do_ar: bool = False,
+                 custo_token: float = 0.0, semente: int = 0, distribuicao: str = "fixa",
+                 dispersao: float = 0.5, latencia_modelos: dict = None, tokens_saida: int = 20,
+                 custo_token_saida: float = 0.0):
+        super().__init__()
+        if distribuicao not in DISTRIBUICOES:
+            raise ValueError(f"distribuição desconhecida: {distribuicao} (use {', '.join(DISTRIBUICOES)})")
+        self.latencia = latencia
+        self.distribuicao = distribuicao
+        self.dispersao = dispersao
+        self.cauda = cauda
+        self.prob_cauda = prob_cauda
+        self.prob_erro = prob_erro
+        self.status_erros = status_erros
+        self.fora_do_ar = fora_do_ar
+        self.custo_token = custo_token
+        self.latencia_modelos = dict(latencia_modelos or {})
+        self.tokens_saida = tokens_saida
+        self.custo_token_saida = custo_token_saida
+        self._prefixos = set()
+        self._aleatorio = random.Random(semente)
+        self.erros = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.porta}/v1"
+
+    def _latencia_base(self, modelo: str = None) -> float:
+        latencia = self.latencia_modelos.get(modelo, self.latencia)
+        if self.distribuicao == "lognormal":
+            return latencia * self._aleatorio.lognormvariate(0.0, self.dispersao)
+        if self.distribuicao == "exponencial":
+            return self._aleatorio.expovariate(1 / latencia) if latencia else 0.0
+        return latencia
+
+    def _uso(self, pedido: dict) -> dict:
+        texto = "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in pedido.get("messages", []))
+        tokens = max(1, len(texto) // 4)
+        em_cache = 0
+        if len(self._prefixos) > 100000:
+            self._prefixos.clear()
+        for limite in range(1024, tokens + 1, 128):
+            prefixo = hash(texto[:limite * 4])
+            if prefixo in self._prefixos:
+                em_cache = limite
+            else:
+                self._prefixos.add(prefixo)
+        saida = min(self.tokens_saida, pedido.get("max_tokens") or self.tokens_saida)
+        return {"prompt_tokens": tokens, "completion_tokens": saida, "total_tokens": tokens + saida,
+                "prompt_tokens_details": {"cached_tokens": em_cache}}
+
+    async def _responder(self, metodo: str, caminho: str, cabecalhos: dict, corpo: bytes, escritor):
+        pedido = json.loads(corpo or b"{}")
+        uso = self._uso(pedido)
+        atraso = self._latencia_base(pedido.get("model")) + self.custo_token * (uso["prompt_tokens"] - uso["prompt_tokens_details"]["cached_tokens"])
+        atraso += self.custo_token_saida * uso["completion_tokens"]
+        if self._aleatorio.random() < self.prob_cauda:
+            atraso += self.cauda
+        await asyncio.sleep(atraso)
+
+        if not caminho.endswith("/chat/completions"):
+            return self._json(escritor, 404, {"error": {"message": "não encontrado", "type": "invalid_request_error"}})
+        if self.fora_do_ar or self._aleatorio.random() < self.prob_erro:
+            self.erros += 1
+            status = self._aleatorio.choice(self.status_erros)
+            extra = {"retry-after-ms": "100"} if status == 429 else {}
+            return self._json(escritor, status, {"error": {"message": f"erro simulado {status}", "type": "server_error"}}, extra)
+
+        texto = "[IA local] " + pedido.get("messages", [{}])[-1].get("content", "")[:80]
+        if pedido.get("stream"):
+            incluir_uso = (pedido.get("stream_options") or {}).get("include_usage")
+            await self._sse(escritor, pedido.get("model", "fake"), texto, uso if incluir_uso else None)
+        else:
+            self._json(escritor, 200, {
+                "id": f"chatcmpl-{self.requisicoes}", "object": "chat.completion", "created": int(time.time()),
+                "model": pedido.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+                "usage": uso,
+            })
+
+    async def _sse(self, escritor, modelo: str, texto: str, uso: dict = None):
+        escritor.write(self._inicio(200, {"content-type": "text/event-stream", "transfer-encoding": "chunked"}))
+        for i in range(0, len(texto), 8):
+            evento = {"id": f"chatcmpl-{self.requisicoes}", "object": "chat.completion.chunk", "created": int(time.time()),
+                      "model": modelo, "choices": [{"index": 0, "delta": {"content": texto[i:i + 8]}, "finish_reason": None}]}
+            self._pedaco(escritor, f"data: {json.dumps(evento)}\n\n".encode())
+            await escritor.drain()
+        if uso:
+            evento = {"id": f"chatcmpl-{self.requisicoes}", "object": "chat.completion.chunk", "created": int(time.time()),
+                      "model": modelo, "choices": [], "usage": uso}
+            self._pedaco(escritor, f"data: {json.dumps(evento)}\n\n".encode())
+        self._pedaco(escritor, b"data: [DONE]\n\n")
+        escritor.write(b"0\r\n\r\n")
+        await escritor.drain()
+
+
+async def _principal(argumentos):
+    servidor = await ServidorOpenAIFalso(
+        latencia=argumentos.latencia / 1000, cauda=argumentos.cauda / 1000,
+        prob_cauda=argumentos.prob_cauda, prob_erro=argumentos.erros,
+        distribuicao=argumentos.distribuicao, dispersao=argumentos.dispersao
+    ).iniciar(argumentos.porta)
+    print(f"OpenAI falsa em {servidor.url} (Ctrl+C para sair)")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor OpenAI falso para testes offline")
+    parser.add_argument("--porta", type=int, default=8089)
+    parser.add_argument("--latencia", type=float, default=300, help="latência base (ms)")
+    parser.add_argument("--cauda", type=float, default=3000, help="latência extra da cauda (ms)")
+    parser.add_argument("--prob-cauda", type=float, default=0.05)
+    parser.add_argument("--distribuicao", choices=DISTRIBUICOES, default="fixa")
+    parser.add_argument("--dispersao", type=float, default=0.5, help="sigma da lognormal")
+    parser.add_argument("--erros", type=float, default=0.05, help="fração de respostas 429/5xx")
+    try:
+        asyncio.run(_principal(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
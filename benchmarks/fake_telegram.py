@@ -0,0 +1,142 @@
+# ============================================
+#   BOT API DO TELEGRAM FALSA
+# ============================================
+# Responde aos métodos que o bot usa (getMe, getUpdates, sendMessage,
+# editMessageText, setWebhook/deleteWebhook...) em /bot<token>/<método>,
+# aceitando corpo form-urlencoded (como o python-telegram-bot manda) ou JSON.
+# Guarda tudo o que o bot enviou e avisa quem espera a resposta de um chat.
+# getUpdates faz long polling sobre a fila de enfileirar().
+# Com limite_global/limite_chat (mensagens por segundo) responde 429 com
+# retry_after, como o Telegram, a quem passar do limite (ver bench_envio).
+#
+#   TELEGRAM_API_URL=http://127.0.0.1:<porta>/bot (ver bench_webhook)
+
+import json
+import time
+import asyncio
+from collections import deque
+from urllib.parse import parse_qsl
+
+from benchmarks.servidor_falso import ServidorHTTPFalso
+
+BOT = {"id": 1, "is_bot": True, "first_name": "UniFECAF (teste)", "username": "unifecaf_teste_bot"}
+
+
+def update_de_texto(update_id: int, user_id: int, texto: str) -> dict:
+    """Update de mensagem privada, como o Telegram manda (comandos com a entidade bot_command)."""
+    mensagem = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": f"Aluno {user_id}"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"Aluno {user_id}"},
+        "text": texto,
+    }
+    if texto.startswith("/"):
+        mensagem["entities"] = [{"type": "bot_command", "offset": 0, "length": len(texto.split()[0])}]
+    return {"update_id": update_id, "message": mensagem}
+
+
+class BotAPIFalsa(ServidorHTTPFalso):
+    def __init__(self, latencia: float = 0.0, limite_global: int = 0, limite_chat: int = 0, retry_after: int = 1):
+        super().__init__()
+        self.latencia = latencia
+        self.limite_global = limite_global
+        self.limite_chat = limite_chat
+        self.retry_after = retry_after
+        self.recusadas_429 = 0
+        self._envios = deque()     # instantes dos envios aceitos no último segundo
+        self._envios_chat = {}     # chat_id -> deque de instantes
+        self.enviadas = []         # (método, chat_id, texto, instante)
+        self.chamadas = {}         # método -> quantidade
+        self._updates = []
+        self._chegou_update = asyncio.Event()
+        self._esperas = {}         # chat_id -> [futures]
+        self._proxima_mensagem = 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.porta}/bot"
+
+    def enfileirar(self, update: dict):
+        """Update que o próximo getUpdates vai entregar (modo polling)."""
+        self._updates.append(update)
+        self._chegou_update.set()
+
+    def aguardar_resposta(self, chat_id: int) -> asyncio.Future:
+        """Resolve no próximo sendMessage/editMessageText para o chat, com o instante."""
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperas.setdefault(int(chat_id), []).append(futuro)
+        return futuro
+
+    async def parar(self):
+        self._chegou_update.set()  # libera o long polling pendente antes de fechar as conexões
+        await asyncio.sleep(0)
+        await super().parar()
+
+    async def _responder(self, metodo_http: str, caminho: str, cabecalhos: dict, corpo: bytes, escritor):
+        metodo = caminho.rsplit("/", 1)[-1]
+        if "json" in cabecalhos.get("content-type", ""):
+            parametros = json.loads(corpo or b"{}")
+        else:
+            parametros = dict(parse_qsl(corpo.decode()))
+        self.chamadas[metodo] = self.chamadas.get(metodo, 0) + 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        if metodo == "getUpdates":
+            resultado = await self._get_updates(parametros)
+        elif metodo == "getMe":
+            resultado = BOT
+        elif metodo in ("sendMessage", "editMessageText"):
+            if self._passou_do_limite(int(parametros["chat_id"])):
+                self.recusadas_429 += 1
+                return self._json(escritor, 429, {
+                    "ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after}})
+            resultado = self._mensagem(metodo, parametros)
+        elif metodo in ("setWebhook", "deleteWebhook", "sendChatAction", "answerCallbackQuery", "setMyCommands"):
+            resultado = True
+        else:
+            return self._json(escritor, 404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        self._json(escritor, 200, {"ok": True, "result": resultado})
+
+    async def _get_updates(self, parametros: dict) -> list:
+        offset = int(parametros.get("offset", 0) or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates:
+            self._chegou_update.clear()
+            try:
+                await asyncio.wait_for(self._chegou_update.wait(), float(parametros.get("timeout", 0) or 0))
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates)
+
+    def _passou_do_limite(self, chat_id: int) -> bool:
+        """Janela deslizante de 1 s, no total e por chat; só os envios aceitos contam."""
+        if not (self.limite_global or self.limite_chat):
+            return False
+        agora = time.monotonic()
+        chat = self._envios_chat.setdefault(chat_id, deque())
+        for janela in (self._envios, chat):
+            while janela and agora - janela[0] > 1.0:
+                janela.popleft()
+        if (self.limite_global and len(self._envios) >= self.limite_global) or \
+                (self.limite_chat and len(chat) >= self.limite_chat):
+            return True
+        self._envios.append(agora)
+        chat.append(agora)
+        return False
+
+    def _mensagem(self, metodo: str, parametros: dict) -> dict:
+        chat_id = int(parametros["chat_id"])
+        agora = time.perf_counter()
+        self.enviadas.append((metodo, chat_id, parametros.get("text", ""), agora))
+        for futuro in self._esperas.pop(chat_id, []):
+            if not futuro.done():
+                futuro.set_result(agora)
+        if metodo == "editMessageText":
+            message_id = int(parametros["message_id"])
+        else:
+            message_id, self._proxima_mensagem = self._proxima_mensagem, self._proxima_mensagem + 1
+        return {"message_id": message_id, "date": int(time.time()), "from": BOT,
+                "chat": {"id": chat_id, "type": "private"}, "text": parametros.get("text", "")}
@@ -0,0 +1,226 @@
+# ============================================
+#   SIMULADOR DE CONVERSAS (SEM TELEGRAM E SEM IA)
+# ============================================
+# Roda os handlers reais do chatbot com Update/Message falsos e um cliente
+# OpenAI falso (só a chamada à API é trocada: caches, streaming e fallbacks
+# continuam os reais), para percorrer os fluxos dos menus sem rede. Cada fluxo roteirizado
+# confere em que etapa o atendimento termina (ou se foi encerrado).
+# Também confere que erros ao editar (429, mensagem apagada) não fazem a
+# resposta progressiva perder texto.
+#
+#   python -m benchmarks.harness
+
+import os
+import sys
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+# nada de chave real nem de arquivos de auditoria na pasta do projeto
+os.environ.setdefault("OPENAI_API_KEY", "teste-offline")
+os.environ.setdefault("AUDITORIA_PASTA", tempfile.mkdtemp(prefix="auditoria_harness_"))
+os.environ.setdefault("IA_STREAM_INTERVALO", "0")
+# sem Telegram de verdade, sem limites de envio (a fila e o agrupamento continuam)
+os.environ.setdefault("ENVIO_POR_SEGUNDO", "0")
+os.environ.setdefault("ENVIO_CHAT_POR_SEGUNDO", "0")
+
+from telegram.error import BadRequest, RetryAfter  # noqa: E402
+
+import chatbot  # noqa: E402
+import bot_faculdade  # noqa: E402
+from resposta_progressiva import MensagemProgressiva  # noqa: E402
+
+
+class UsuarioFalso:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class MensagemEnviadaFalsa:
+    """Mensagem do bot; edit_text troca o texto registrado nas respostas."""
+
+    def __init__(self, respostas: list):
+        self._respostas = respostas
+        self._posicao = len(respostas) - 1
+        self.edicoes = 0
+
+    async def edit_text(self, texto, **kwargs):
+        self._respostas[self._posicao] = texto
+        self.edicoes += 1
+        return self
+
+
+class MensagemFalsa:
+    """Só o que os handlers usam de telegram.Message: text, from_user, chat_id e reply_text."""
+
+    def __init__(self, user_id: int, texto: str, respostas: list):
+        self.text = texto
+        self.from_user = UsuarioFalso(user_id)
+        self.chat_id = user_id
+        self._respostas = respostas
+
+    async def reply_text(self, texto, reply_markup=None, parse_mode=None, **kwargs):
+        self._respostas.append(texto)
+        return MensagemEnviadaFalsa(self._respostas)
+
+
+class EnviadaComFalhas(MensagemEnviadaFalsa):
+    """Mensagem do bot cujas próximas edições falham com os erros da lista."""
+
+    def __init__(self, respostas: list, erros: list):
+        super().__init__(respostas)
+        self._erros = erros
+
+    async def edit_text(self, texto, **kwargs):
+        if self._erros:
+            raise self._erros.pop(0)
+        return await super().edit_text(texto, **kwargs)
+
+
+class OrigemComFalhas:
+    """Mensagem do usuário cujas respostas (e as continuações) recebem os erros em ordem."""
+
+    def __init__(self, respostas: list, erros: list):
+        self._respostas = respostas
+        self._erros = erros
+
+    async def reply_text(self, texto, **kwargs):
+        self._respostas.append(texto)
+        return EnviadaComFalhas(self._respostas, self._erros)
+
+
+class UpdateFalso:
+    def __init__(self, user_id: int, texto: str, respostas: list):
+        self.message = MensagemFalsa(user_id, texto, respostas)
+
+
+class ContextoFalso:
+    def __init__(self, args=None):
+        self.args = args or []
+
+
+def ia_falsa(mensagens: list) -> str:
+    return "[IA] resposta simulada para: " + mensagens[-1]["content"][:60]
+
+
+class ClienteIAFalso:
+    """Imita async_client.chat.completions.create, com e sem stream=True."""
+
+    def __init__(self, gerar=ia_falsa, tamanho_pedaco: int = 8):
+        self.gerar = gerar
+        self.tamanho_pedaco = tamanho_pedaco
+        self.chamadas = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        self.chamadas += 1
+        texto = self.gerar(messages)
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=texto))])
+        return self._em_pedacos(texto)
+
+    async def _em_pedacos(self, texto: str):
+        for i in range(0, len(texto), self.tamanho_pedaco):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=texto[i:i + self.tamanho_pedaco]))])
+
+
+class Simulador:
+    """Conversa com o bot como um usuário do Telegram faria."""
+
+    def __init__(self, cliente_ia=None):
+        self.cliente_ia = cliente_ia or ClienteIAFalso()
+        bot_faculdade.async_client = self.cliente_ia
+
+    async def enviar(self, user_id: int, texto: str) -> list:
+        """Manda uma mensagem (ou comando) e devolve as respostas do bot."""
+        respostas = []
+        comando, *args = texto.split() if texto.startswith("/") else ("",)
+        update = UpdateFalso(user_id, texto, respostas)
+        if comando == "/start":
+            await chatbot.start(update, ContextoFalso())
+        elif comando == "/cursos":
+            await chatbot.cursos_command(update, ContextoFalso(args))
+        else:
+            await chatbot.mensagem(update, ContextoFalso())
+        await chatbot.envio.aguardar(user_id)  # respostas saem pela fila de envio
+        return respostas
+
+    def etapa(self, user_id: int):
+        """Etapa atual do usuário, ou None se o atendimento foi encerrado."""
+        atendimento = chatbot.atendimentos.obter(user_id)
+        return atendimento.etapa if atendimento else None
+
+
+# (nome, mensagens, etapa final esperada — None = atendimento encerrado)
+FLUXOS = [
+    ("aluno: segunda via", ["/start", "Sou aluno", "12345", "ADS", "Financeiro", "Segunda via", "março"], None),
+    ("aluno: RA inválido", ["/start", "sou ALUNO", "abc"], 12),
+    ("aluno: voltar ao menu", ["/start", "Sou aluno", "12345", "ADS", "Secretaria", "Voltar"], 20),
+    ("aluno: texto livre no financeiro", ["/start", "Sou aluno", "12345", "ADS", "Financeiro", "quero pagar a mensalidade"], 30),
+    ("aluno: declaração", ["/start", "Sou aluno", "12345", "ADS", "Documentos", "Declaração", "email"], None),
+    ("aluno: consulta de curso", ["/start", "Sou aluno", "12345", "ADS", "Informações do curso", "engenharia de software"], 61),
+    ("aluno: nova consulta", ["/start", "Sou aluno", "12345", "ADS", "Informações do curso", "ads", "Nova consulta"], 60),
+    ("aluno: atendente", ["/start", "Sou aluno", "12345", "ADS", "Falar com atendente"], None),
+    ("visitante: ver cursos", ["/start", "Nao sou aluno", "Ver cursos"], None),
+    ("visitante: texto livre", ["/start", "Não sou aluno", "vocês têm aula presencial?"], 70),
+    ("intenção: boleto no financeiro", ["/start", "Sou aluno", "12345", "ADS", "Financeiro", "boletos"], 31),
+    ("intenção: curso no menu do aluno", ["/start", "Sou aluno", "12345", "ADS", "engenharia de software"], 61),
+    ("intenção: segunda via no menu do aluno", ["/start", "Sou aluno", "12345", "ADS", "preciso da 2a via do boleto"], 31),
+    ("intenção: 'via pix' não é segunda via", ["/start", "Sou aluno", "12345", "ADS", "Financeiro", "posso pagar via pix?"], 30),
+    ("intenção: valores do visitante", ["/start", "Não sou aluno", "quanto custa?"], None),
+    ("visitante: valores", ["/start", "Não sou aluno", "ver valores"], None),
+    ("/cursos direto", ["/cursos", "Listar todos os cursos"], None),
+]
+
+
+async def rodar_fluxos(simulador: Simulador) -> int:
+    falhas = 0
+    for user_id, (nome, mensagens, esperado) in enumerate(FLUXOS, start=1):
+        for texto in mensagens:
+            await simulador.enviar(user_id, texto)
+        obtido = simulador.etapa(user_id)
+        ok = obtido == esperado
+        falhas += not ok
+        print(f"{'OK ' if ok else 'ERRO'} {nome:<36} etapa final: {obtido} (esperada: {esperado})")
+    return falhas
+
+
+# (nome, erros das edições em ordem) — a resposta chega em três pedaços
+EDICOES = [
+    ("edição forçada com 429 seguidos", lambda: [RetryAfter(0)] * 4),
+    ("edição recusada (mensagem apagada)", lambda: [BadRequest("Message to edit not found")] * 3),
+    ("edição recusada no fim", lambda: [RetryAfter(0), BadRequest("Message can't be edited")]),
+]
+
+
+async def conferir_edicoes() -> int:
+    """Nenhum erro de edição pode fazer o usuário ler menos que a resposta inteira."""
+    falhas = 0
+    pedacos = ["Resposta progressiva, ", "continuando a frase ", "e chegando ao fim."]
+    for nome, erros in EDICOES:
+        respostas = []
+        mensagem = MensagemProgressiva(OrigemComFalhas(respostas, erros()), intervalo=0)
+        for pedaco in pedacos:
+            await mensagem.acrescentar(pedaco)
+        texto = await mensagem.concluir()
+        ok = "".join(respostas) == texto
+        falhas += not ok
+        print(f"{'OK ' if ok else 'ERRO'} {nome:<36} mensagens: {len(respostas)}")
+    return falhas
+
+
+async def main() -> int:
+    simulador = Simulador()
+    try:
+        falhas = await rodar_fluxos(simulador)
+    finally:
+        await chatbot.auditoria.encerrar()
+    falhas_edicao = await conferir_edicoes()
+    print(f"{len(FLUXOS) - falhas}/{len(FLUXOS)} fluxos corretos "
+          f"({simulador.cliente_ia.chamadas} chamadas à IA falsa), "
+          f"{len(EDICOES) - falhas_edicao}/{len(EDICOES)} edições sem perder texto")
+    return 1 if falhas or falhas_edicao else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,68 @@
+# ============================================
+#   BASE DOS SERVIDORES FALSOS (HTTP/1.1 SOBRE ASYNCIO)
+# ============================================
+# Só a biblioteca padrão: lê requisições com keep-alive e Content-Length e
+# deixa a resposta para a subclasse (fake_openai, fake_telegram).
+
+import json
+import asyncio
+
+
+class ServidorHTTPFalso:
+    def __init__(self):
+        self._servidor = None
+        self._conexoes = set()
+        self.porta = None
+        self.requisicoes = 0
+
+    async def iniciar(self, porta: int = 0):
+        self._servidor = await asyncio.start_server(self._conexao, "127.0.0.1", porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def parar(self):
+        if self._servidor:
+            self._servidor.close()
+            for escritor in list(self._conexoes):  # keep-alive abertas: encerra as leituras
+                escritor.transport.abort()
+            await self._servidor.wait_closed()
+            await asyncio.sleep(0)
+
+    async def _conexao(self, leitor, escritor):
+        self._conexoes.add(escritor)
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                cabecalhos = {}
+                while (cabecalho := await leitor.readline()) not in (b"\r\n", b"\n", b""):
+                    nome, _, valor = cabecalho.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                corpo = await leitor.readexactly(int(cabecalhos.get("content-length", 0)))
+                metodo, caminho = linha.decode("latin-1").split(" ")[:2]
+                self.requisicoes += 1
+                await self._responder(metodo, caminho, cabecalhos, corpo, escritor)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._conexoes.discard(escritor)
+            escritor.close()
+
+    async def _responder(self, metodo: str, caminho: str, cabecalhos: dict, corpo: bytes, escritor):
+        raise NotImplementedError
+
+    def _json(self, escritor, status: int, dados, extra: dict = None):
+        corpo = json.dumps(dados).encode()
+        cabecalhos = {"content-type": "application/json", "content-length": str(len(corpo)), **(extra or {})}
+        escritor.write(self._inicio(status, cabecalhos) + corpo)
+
+    @staticmethod
+    def _pedaco(escritor, dados: bytes):
+        escritor.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n")
+
+    @staticmethod
+    def _inicio(status: int, cabecalhos: dict) -> bytes:
+        linhas = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Erro'}"]
+        linhas += [f"{nome}: {valor}" for nome, valor in cabecalhos.items()]
+        return ("\r\n".join(linhas) + "\r\n\r\n").encode()
@@ -3,119 +3,252 @@
 # ============================================
 
 import os
-import csv
+import json
+import time
+import asyncio
 import uuid
 import logging
-import pandas as pd
+import threading
+from collections import deque
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 
+from cache_ia import CacheRespostas, gerar_chave, ler_ttls
+from cache_semantico import CacheSemantico
+from catalogo import obter_catalogo
+from contexto_ia import contar_tokens_mensagens, tokens_prompt
+from prompts import PROMPT_SISTEMA, modelo_prompt, uso_prompts  # noqa: F401 (PROMPT_SISTEMA: compatibilidade)
+from cliente_ia import ClienteIAResiliente, IAIndisponivel, IA_PRAZO_TENTATIVA, IA_TENTATIVAS
+from coalescencia import Coalescedor
+from rotas_ia import carregar_politica
+from auditoria import registro_do_atendimento, escrever_csv_atendimento
+from metricas import metricas
+
 load_dotenv()
 
-# carregar chave da API
+# carregar chave da API (sem ela as consultas caem no fallback; chatbot.main recusa iniciar)
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_KEY:
-    raise Exception("❌ ERRO: Variável OPENAI_API_KEY não encontrada no .env")
+# endereço da API (padrão: OpenAI); aponte para benchmarks/fake_openai nos testes offline
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Modelo usado nas consultas quando não há política de rotas (ver rotas_ia.json)
+MODELO_IA = "gpt-4o-mini"
+
+# Limite de chamadas simultâneas à OpenAI (pico de alunos vira fila curta, não fila única)
+IA_MAX_CONCORRENCIA = int(os.getenv("IA_MAX_CONCORRENCIA", "100"))
+
+# Clientes da OpenAI: criados no primeiro uso ou em inicializar() (ver abaixo).
+# Os testes podem trocar async_client por um falso antes da primeira consulta.
+client = None
+async_client = None
+
+# Prazo, repetições com jitter, disjuntor e hedge das chamadas (ver cliente_ia)
+cliente_ia = ClienteIAResiliente()
+
+# Consultas iguais em andamento compartilham uma chamada à OpenAI (ver coalescencia)
+coalescencia = Coalescedor()
 
-client = OpenAI(api_key=OPENAI_KEY)
+# Modelo, max_tokens, temperatura, prazo e SLO por categoria e etapa (ver rotas_ia)
+rotas_ia = carregar_politica(modelo=MODELO_IA, prazo=cliente_ia.prazo)
+
+# Cache de respostas da IA (TTL em segundos por categoria; 0 = não guarda)
+cache_respostas = CacheRespostas(
+    ttls=ler_ttls(os.getenv("CACHE_IA_TTLS", "visitante=21600,cursos=3600")),
+    ttl_padrao=int(os.getenv("CACHE_IA_TTL_PADRAO", "0")),
+    max_bytes=int(os.getenv("CACHE_IA_MAX_BYTES", "5000000")),
+    arquivo=os.getenv("CACHE_IA_ARQUIVO") or None
+)
+
+# Cache semântico das perguntas livres (respostas reaproveitadas por etapa do menu)
+cache_semantico = CacheSemantico(
+    limiar=float(os.getenv("CACHE_SEMANTICO_LIMIAR", "0.85")),
+    ttl=int(os.getenv("CACHE_SEMANTICO_TTL", "3600")),
+    capacidade_por_escopo=int(os.getenv("CACHE_SEMANTICO_CAPACIDADE", "500")),
+    ativo=os.getenv("CACHE_SEMANTICO_ATIVO", "1") == "1"
+)
+
+# Métricas (sem efeito com METRICAS_ATIVAS=0; ver metricas.py)
+tempo_ia = metricas.histograma(
+    "chatbot_ia_segundos", "Duração das chamadas à OpenAI, com repetições e hedge", ("categoria", "modo"))
+respostas_ia = metricas.contador(
+    "chatbot_ia_respostas_total", "Respostas da IA por origem (ia, coalescida, cache, fallback, incompleta)", ("categoria", "origem"))
+tempo_rota = metricas.histograma(
+    "chatbot_ia_rota_segundos", "Duração das chamadas à OpenAI por rota e modelo", ("rota", "modelo"))
+tempo_catalogo = metricas.histograma(
+    "chatbot_catalogo_segundos", "Consultas ao catálogo de cursos", ("consulta",))
+metricas.medidor(
+    "chatbot_ia_eventos_total", "Chamadas, repetições, hedges, prazos estourados e recusas do disjuntor",
+    lambda: {(nome,): valor for nome, valor in cliente_ia.estatisticas().items() if isinstance(valor, int)},
+    ("evento",), tipo="counter")
+metricas.medidor(
+    "chatbot_ia_coalescencia_total", "Chamadas feitas, pedidos que pegaram carona, desistências e chamadas abandonadas",
+    lambda: {(nome,): valor for nome, valor in coalescencia.contadores.items()}, ("evento",), tipo="counter")
+metricas.medidor(
+    "chatbot_ia_rota_tokens_total", "Tokens de entrada e de saída informados pela OpenAI, por rota",
+    lambda: {(nome, tipo): rota.contadores[f"tokens_{tipo}"]
+             for nome, rota in rotas_ia.rotas.items() for tipo in ("entrada", "saida")},
+    ("rota", "tipo"), tipo="counter")
+metricas.medidor(
+    "chatbot_ia_rota_rebaixada", "Rota usando um modelo mais rápido por ter estourado o SLO de latência (1/0)",
+    lambda: {(nome,): int(rota.nivel != rota.nivel_base) for nome, rota in rotas_ia.rotas.items()}, ("rota",))
+metricas.medidor(
+    "chatbot_cache_consultas_total", "Consultas aos caches de respostas e semântico",
+    lambda: {("respostas", "hit"): cache_respostas.hits, ("respostas", "miss"): cache_respostas.misses,
+             ("semantico", "hit"): cache_semantico.hits, ("semantico", "miss"): cache_semantico.misses},
+    ("cache", "resultado"), tipo="counter")
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # =======================================================
-#   FUNÇÃO PARA CARREGAR DADOS DOS CURSOS
+#   CLIENTES DA OPENAI E INICIALIZAÇÃO (SOB DEMANDA)
 # =======================================================
-def carregar_cursos_csv():
+_lock_clientes = threading.Lock()
+
+
+def obter_client():
+    """Cliente síncrono; o SDK da OpenAI (~1 s de import) só é carregado aqui."""
+    global client
+    if client is None:
+        with _lock_clientes:
+            if client is None:
+                from openai import OpenAI
+                # o cliente síncrono repete pelo próprio SDK; o assíncrono repete em cliente_ia
+                client = OpenAI(
+                    api_key=OPENAI_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    timeout=IA_PRAZO_TENTATIVA,
+                    max_retries=IA_TENTATIVAS - 1
+                )
+    return client
+
+
+def obter_async_client():
+    """Cliente assíncrono com pool de conexões compartilhado por todos os handlers."""
+    global async_client
+    if async_client is None:
+        with _lock_clientes:
+            if async_client is None:
+                import httpx
+                from openai import AsyncOpenAI
+                async_client = AsyncOpenAI(
+                    api_key=OPENAI_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=IA_MAX_CONCORRENCIA,
+                            max_keepalive_connections=IA_MAX_CONCORRENCIA
+                        ),
+                        timeout=httpx.Timeout(60.0, connect=5.0)
+                    )
+                )
+    return async_client
+
+
+def inicializar() -> dict:
     """
-    Carrega os dados dos cursos do arquivo CSV
+    Prepara antes do primeiro aluno o que as consultas usam: catálogo
+    indexado e clientes da OpenAI. Pode ser chamada várias vezes; sem ela
+    tudo é criado no primeiro uso. Devolve o tempo de cada parte (ms).
     """
-    try:
-        df = pd.read_csv('Cursos Tech UniFECAF EAD.csv')
-        
-        # Processar os dados para estrutura mais limpa
-        cursos = {}
-        curso_atual = None
-        semestre_atual = None
-        
-        for _, row in df.iterrows():
-            # Verificar se é um novo curso
-            if pd.notna(row['Curso']) and row['Curso'] != '---':
-                curso_atual = row['Curso']
-                cursos[curso_atual] = {}
-            
-            # Verificar se é um novo semestre
-            if pd.notna(row['Semestre']) and row['Semestre'] != '---':
-                semestre_atual = row['Semestre']
-                if curso_atual:
-                    cursos[curso_atual][semestre_atual] = []
-            
-            # Adicionar disciplina
-            if pd.notna(row['Disciplina']) and curso_atual and semestre_atual:
-                cursos[curso_atual][semestre_atual].append(row['Disciplina'])
-        
-        return cursos
-    except Exception as e:
-        logger.error(f"Erro ao carregar cursos do CSV: {e}")
-        return {}
+    tempos = {}
+    inicio = time.perf_counter()
+    obter_catalogo()
+    tempos["catalogo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    if OPENAI_KEY:
+        inicio = time.perf_counter()
+        obter_async_client()
+        tempos["openai_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return tempos
+
 
-# Carregar dados dos cursos uma vez ao iniciar
-CURSOS_DATA = carregar_cursos_csv()
+async def aquecer_openai(conexoes: int) -> int:
+    """
+    Abre `conexoes` conexões com a OpenAI (TLS incluso) antes do primeiro
+    aluno, com consultas baratas em paralelo que ficam no pool. Devolve
+    quantas responderam; falha aqui só vira aviso no log.
+    """
+    if not OPENAI_KEY or conexoes <= 0:
+        return 0
+    cliente = obter_async_client()
+
+    async def abrir():
+        try:
+            await cliente.models.list()
+            return True
+        except Exception as e:
+            # qualquer resposta HTTP (até 404) deixa a conexão aberta no pool
+            return getattr(e, "status_code", None) is not None
+
+    abertas = sum(await asyncio.gather(*(abrir() for _ in range(conexoes))))
+    if abertas < conexoes:
+        logger.warning(f"Aquecimento da OpenAI: {abertas}/{conexoes} conexões abertas")
+    return abertas
+
+
+# =======================================================
+#   DADOS DOS CURSOS (CARREGADOS SOB DEMANDA)
+# =======================================================
+def __getattr__(nome):
+    """
+    CURSOS_DATA e INDICE_CURSOS continuam acessíveis como atributos do
+    módulo, mas o CSV só é lido no primeiro acesso (ver catalogo.obter_catalogo).
+    """
+    if nome == "CURSOS_DATA":
+        return obter_catalogo().cursos
+    if nome == "INDICE_CURSOS":
+        return obter_catalogo().indice
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 # =======================================================
 #   FUNÇÃO PARA CONSULTAR INFORMAÇÕES DOS CURSOS
 # =======================================================
+@tempo_catalogo.cronometrado("info")
 def consultar_info_curso(curso_nome=None, semestre=None, disciplina=None):
     """
     Consulta informações específicas sobre cursos, semestres ou disciplinas
     """
     try:
-        if not CURSOS_DATA:
+        catalogo = obter_catalogo()
+        cursos = catalogo.cursos
+        indice = catalogo.indice
+
+        if not cursos:
             return "Não foi possível carregar as informações dos cursos no momento."
         
         # Se não especificar curso, lista todos disponíveis
         if not curso_nome:
-            cursos_disponiveis = list(CURSOS_DATA.keys())
+            cursos_disponiveis = list(cursos.keys())
             return f"🎓 **Cursos Disponíveis na UniFECAF**\n\n" + "\n".join(f"• {curso}" for curso in cursos_disponiveis)
         
-        # Buscar curso específico (com busca flexível)
-        curso_encontrado = None
-        for curso in CURSOS_DATA.keys():
-            if curso_nome.lower() in curso.lower():
-                curso_encontrado = curso
-                break
+        # Buscar curso específico (nome, apelido ou parte do nome; sem diferenciar acento)
+        curso_encontrado = indice.melhor_curso(curso_nome)
         
         if not curso_encontrado:
-            return f"❌ Curso '{curso_nome}' não encontrado.\n\n🎓 Cursos disponíveis:\n" + "\n".join(f"• {curso}" for curso in CURSOS_DATA.keys())
+            return f"❌ Curso '{curso_nome}' não encontrado.\n\n🎓 Cursos disponíveis:\n" + "\n".join(f"• {curso}" for curso in cursos.keys())
         
         # Se não especificar semestre, lista todos os semestres do curso
         if not semestre:
-            semestres = list(CURSOS_DATA[curso_encontrado].keys())
+            semestres = list(cursos[curso_encontrado].keys())
             info = f"📚 **Curso: {curso_encontrado}**\n\n**Semestres disponíveis:**\n"
             for sem in semestres:
-                disciplinas_count = len(CURSOS_DATA[curso_encontrado][sem])
+                disciplinas_count = len(cursos[curso_encontrado][sem])
                 info += f"• {sem}: {disciplinas_count} disciplinas\n"
             return info
         
-        # Buscar semestre específico
-        semestre_encontrado = None
-        for sem in CURSOS_DATA[curso_encontrado].keys():
-            if semestre.lower() in sem.lower():
-                semestre_encontrado = sem
-                break
+        # Buscar semestre específico ("1", "1º", "primeiro"...)
+        semestre_encontrado = indice.buscar_semestre(curso_encontrado, semestre)
         
         if not semestre_encontrado:
-            semestres = list(CURSOS_DATA[curso_encontrado].keys())
+            semestres = list(cursos[curso_encontrado].keys())
             return f"❌ Semestre '{semestre}' não encontrado no curso {curso_encontrado}.\n\n**Semestres disponíveis:**\n" + "\n".join(f"• {sem}" for sem in semestres)
         
         # Se busca por disciplina específica
         if disciplina:
-            disciplinas_encontradas = []
-            for disc in CURSOS_DATA[curso_encontrado][semestre_encontrado]:
-                if disciplina.lower() in disc.lower():
-                    disciplinas_encontradas.append(disc)
+            disciplinas_encontradas = indice.buscar_disciplinas(curso_encontrado, semestre_encontrado, disciplina)
             
             if disciplinas_encontradas:
                 return f"🔍 **Disciplinas encontradas em {curso_encontrado} - {semestre_encontrado}:**\n" + "\n".join(f"• {d}" for d in disciplinas_encontradas)
@@ -123,7 +256,7 @@ def consultar_info_curso(curso_nome=None, semestre=None, disciplina=None):
                 return f"❌ Nenhuma disciplina contendo '{disciplina}' encontrada em {curso_encontrado} - {semestre_encontrado}"
         
         # Listar todas as disciplinas do semestre
-        disciplinas = CURSOS_DATA[curso_encontrado][semestre_encontrado]
+        disciplinas = cursos[curso_encontrado][semestre_encontrado]
         info = f"📚 **Curso: {curso_encontrado}**\n🎯 **Semestre: {semestre_encontrado}**\n\n**Disciplinas:**\n"
         info += "\n".join(f"• {disc}" for disc in disciplinas)
         return info
@@ -132,176 +265,551 @@ def consultar_info_curso(curso_nome=None, semestre=None, disciplina=None):
         logger.error(f"Erro ao consultar informações do curso: {e}")
         return "❌ Erro ao consultar informações do curso."
 
+# =======================================================
+#   MONTAGEM DAS MENSAGENS (MODELOS EM prompts.py)
+# =======================================================
+def _montar_mensagens(prompt: str, contexto_adicional: str = "", categoria: str = "geral") -> list:
+    """
+    Mensagens enviadas à OpenAI, pelo modelo de prompt da categoria: prefixo
+    fixo (sistema e, se o modelo usar, o catálogo) e, no fim, o pedido, o
+    trecho do catálogo que a pergunta cita e os dados do aluno.
+    """
+    return modelo_prompt(categoria).montar(prompt, contexto_adicional)
+
+
+def _registrar_tokens(mensagens: list, categoria: str):
+    """Conta os tokens de entrada de cada chamada à OpenAI, por categoria."""
+    tokens = contar_tokens_mensagens(mensagens)
+    tokens_prompt.registrar(categoria, tokens)
+    logger.info(f"Prompt IA [{categoria}]: {tokens} tokens")
+
+
+def _registrar_uso(categoria: str, uso, inicio: float):
+    """Tokens de entrada e em cache informados pela OpenAI, por versão do modelo de prompt."""
+    uso_prompts.registrar(modelo_prompt(categoria).id, uso, (time.perf_counter() - inicio) * 1000)
+
+
+def _chave_mensagens(mensagens: list, modelo: str = MODELO_IA) -> str:
+    """Mesmo modelo, contexto e prompt (normalizado) = mesma chave."""
+    sistema = "\x00".join(m["content"] for m in mensagens[:-1])
+    return gerar_chave(modelo, sistema, mensagens[-1]["content"])
+
+
+def _chave_cache(mensagens: list, categoria: str, modelo: str = MODELO_IA):
+    """Chave do cache para as mensagens, ou None se a categoria não usa cache."""
+    if cache_respostas.ttl_da_categoria(categoria) <= 0:
+        return None
+    return _chave_mensagens(mensagens, modelo)
+
+
+def _registrar_rota(escolha, inicio: float, uso=None, sucesso: bool = True):
+    """Duração e tokens da chamada na rota (decide o rebaixamento) e nas métricas."""
+    segundos = time.perf_counter() - inicio
+    escolha.rota.registrar(escolha, segundos, uso, sucesso)
+    tempo_rota.observar(segundos, escolha.rota.nome, escolha.modelo)
+
+
+def _extrair_resposta(resposta, chave=None, categoria: str = "geral") -> str:
+    """Extrai o texto da resposta da OpenAI e guarda no cache quando couber."""
+    # ACESSO CORRETO - usando .content em vez de ["content"]
+    if resposta.choices and resposta.choices[0].message:
+        texto = resposta.choices[0].message.content
+        if chave:
+            cache_respostas.guardar(chave, texto, categoria)
+        return texto
+    return "❌ Não foi possível processar sua solicitação no momento."
+
+
+# =======================================================
+#   FALLBACK POR CATEGORIA (QUANDO A IA FALHA)
+# =======================================================
+def _resposta_fallback(prompt: str, contexto_adicional: str = "") -> str:
+    """
+    Resposta específica por categoria usada quando a consulta à IA falha.
+    """
+    # FALLBACK ESPECÍFICO E MELHORADO PARA TODOS OS CASOS
+    prompt_lower = prompt.lower()
+    contexto_lower = contexto_adicional.lower()
+    
+    # RECUPERAÇÃO/REPOSIÇÃO
+    if "recuperação" in prompt_lower or "reposição" in prompt_lower:
+        if "métodos ágeis" in prompt_lower:
+            return "✅ **SOLICITAÇÃO DE RECUPERAÇÃO/REPOSIÇÃO REGISTRADA**\n\n📚 **Disciplina:** MÉTODOS ÁGEIS\n🎯 **Semestre:** 1º Semestre\n👤 **Curso:** Análise e Desenvolvimento de Sistemas\n\n📋 **Próximos passos:**\n• Secretaria entrará em contato em até 48h úteis\n• Serão informadas datas disponíveis para prova\n• Documentação necessária será solicitada\n\n📞 **Contato:** secretaria@unifecaf.edu.br"
+        else:
+            return "✅ **SOLICITAÇÃO DE RECUPERAÇÃO/REPOSIÇÃO REGISTRADA**\n\nSua solicitação foi encaminhada para a secretaria acadêmica. A equipe entrará em contato em até 48h úteis com todas as orientações.\n\n📞 **Contato:** secretaria@unifecaf.edu.br"
+    
+    # FINANCEIRO
+    elif "financeiro" in prompt_lower or "boleto" in prompt_lower or "pagamento" in prompt_lower or "acordo" in prompt_lower:
+        acao = "solicitação financeira"
+        if "boleto" in prompt_lower:
+            acao = "consulta de boletos"
+        elif "segunda via" in prompt_lower:
+            acao = "emissão de segunda via"
+        elif "acordo" in prompt_lower:
+            acao = "proposta de acordo"
+        elif "pagamento" in prompt_lower:
+            acao = "consulta de pagamentos"
+            
+        return f"✅ **SOLICITAÇÃO FINANCEIRA REGISTRADA**\n\n💼 **Tipo:** {acao}\n📅 **Prazo:** Até 24h úteis para retorno\n\n📋 **Próximos passos:**\n• Equipe financeira analisará sua solicitação\n• Retornaremos por email com informações\n• Mantenha seus dados atualizados\n\n📞 **Contato:** financeiro@unifecaf.edu.br"
+    
+    # DOCUMENTOS
+    elif "documento" in prompt_lower or "declaração" in prompt_lower or "atestado" in prompt_lower or "histórico" in prompt_lower or "diploma" in prompt_lower:
+        doc_type = "documento"
+        if "declaração" in prompt_lower:
+            doc_type = "declaração de matrícula"
+        elif "atestado" in prompt_lower:
+            doc_type = "atestado de frequência"
+        elif "histórico" in prompt_lower:
+            doc_type = "histórico parcial"
+        elif "diploma" in prompt_lower:
+            doc_type = "diploma"
+            
+        return f"✅ **SOLICITAÇÃO DE DOCUMENTO REGISTRADA**\n\n📄 **Documento:** {doc_type.upper()}\n📅 **Prazo de emissão:** 2-3 dias úteis\n\n📋 **Próximos passos:**\n• Documento será processado conforme sua escolha\n• Receberá confirmação por email\n• Retirada disponível na secretaria\n\n📞 **Contato:** documentos@unifecaf.edu.br"
+    
+    # CURSOS
+    elif "curso" in prompt_lower or "disciplina" in prompt_lower:
+        return consultar_info_curso() + "\n\n💡 **Dica:** Para informações detalhadas, entre em contato com a coordenação do curso."
+    
+    # INFORMAÇÕES GERAIS
+    else:
+        return "✅ **SOLICITAÇÃO REGISTRADA COM SUCESSO**\n\nSua mensagem foi recebida e será processada pela nossa equipe.\n\n📞 **Atendimento humano:** atendimento@unifecaf.edu.br\n⏰ **Horário:** Segunda a sexta, 8h às 18h"
+
+
 # =======================================================
 #   FUNÇÃO DE IA — CONSULTA A OPENAI (CORRIGIDA E MELHORADA)
 # =======================================================
-def consultar_ia(prompt: str, contexto_adicional: str = "") -> str:
+def consultar_ia(prompt: str, contexto_adicional: str = "", categoria: str = "geral", etapa=None) -> str:
     """
     Função central de IA utilizada pelo bot inteiro.
     Recebe um prompt e retorna a resposta otimizada.
+
+    Versão síncrona: bloqueia quem chama. Dentro dos handlers do Telegram
+    use consultar_ia_async.
+
+    A categoria define o TTL do cache de respostas (ver CACHE_IA_TTLS); com
+    a etapa de onde veio o pedido, define também a rota: modelo, max_tokens,
+    temperatura e prazo (ver rotas_ia.json).
     """
     try:
         # Verifica se a chave da API está disponível
         if not OPENAI_KEY:
+            respostas_ia.inc(categoria, "fallback")
             return "🔧 Sistema temporariamente indisponível. Por favor, tente novamente mais tarde."
 
-        # Verificar se é uma pergunta sobre cursos para enriquecer com dados do CSV
-        prompt_enriquecido = prompt
-        palavras_chave_cursos = ['curso', 'disciplina', 'semestre', 'grade', 'matéria', 'matriz', 'métodos ágeis', 'recuperação', 'reposição']
-        
-        if any(palavra in prompt.lower() for palavra in palavras_chave_cursos):
-            info_cursos = consultar_info_curso()
-            prompt_enriquecido = f"{prompt}\n\n{contexto_adicional}\n\nInformações dos cursos disponíveis:\n{info_cursos}\n\nBaseie sua resposta nessas informações reais dos cursos."
-        else:
-            prompt_enriquecido = f"{prompt}\n\n{contexto_adicional}"
-
-        resposta = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """Você é um assistente especializado da UniFECAF. Siga estas diretrizes:
-
-🎯 **PARA RECUPERAÇÃO/REPOSIÇÃO:**
-- Confirme disciplina e semestre
-- Informe prazos (48h úteis)
-- Explique procedimentos
-- Fornece contato da secretaria
-
-💰 **PARA FINANCEIRO:**
-- Confirme tipo de solicitação
-- Informe prazos (24h úteis) 
-- Oriente sobre documentação
-- Fornece contato do financeiro
-
-📄 **PARA DOCUMENTOS:**
-- Confirme documento solicitado
-- Explique opções (email/retirar)
-- Informe prazos de emissão
-- Fornece contato de documentos
-
-🎓 **PARA CURSOS:**
-- Use dados reais do CSV
-- Seja preciso nas informações
-- Sugira contato com coordenação
-
-📋 **PARA TODOS:**
-- Seja educado e profissional
-- Use emojis moderadamente
-- Confirme dados do aluno quando disponíveis
-- Fornece contatos específicos"""
-                },
-                {"role": "user", "content": prompt_enriquecido}
-            ],
-            max_tokens=500,
-            temperature=0.4
-        )
-        
-        # ACESSO CORRETO - usando .content em vez de ["content"]
-        if resposta.choices and resposta.choices[0].message:
-            return resposta.choices[0].message.content
-        else:
-            return "❌ Não foi possível processar sua solicitação no momento."
-            
+        mensagens = _montar_mensagens(prompt, contexto_adicional, categoria)
+        escolha = rotas_ia.escolher(categoria, etapa)
+        chave = _chave_cache(mensagens, categoria, escolha.modelo)
+        if chave:
+            em_cache = cache_respostas.obter(chave)
+            if em_cache is not None:
+                respostas_ia.inc(categoria, "cache")
+                return em_cache
+
+        _registrar_tokens(mensagens, categoria)
+        inicio = time.perf_counter()
+        try:
+            with tempo_ia.cronometrar(categoria, "sincrono"):
+                resposta = cliente_ia.criar_sincrono(
+                    obter_client(),
+                    messages=mensagens,
+                    timeout=min(IA_PRAZO_TENTATIVA, escolha.prazo),
+                    **escolha.parametros()
+                )
+        except Exception:
+            _registrar_rota(escolha, inicio, sucesso=False)
+            raise
+        _registrar_rota(escolha, inicio, getattr(resposta, "usage", None))
+        _registrar_uso(categoria, getattr(resposta, "usage", None), inicio)
+        respostas_ia.inc(categoria, "ia")
+        return _extrair_resposta(resposta, chave, categoria)
+
+    except IAIndisponivel as e:
+        logger.warning(f"IA indisponível, usando fallback: {e}")
+        respostas_ia.inc(categoria, "fallback")
+        return _resposta_fallback(prompt, contexto_adicional)
     except Exception as e:
         logger.error(f"Erro na consulta à IA: {str(e)}")
-        
-        # FALLBACK ESPECÍFICO E MELHORADO PARA TODOS OS CASOS
-        prompt_lower = prompt.lower()
-        contexto_lower = contexto_adicional.lower()
-        
-        # RECUPERAÇÃO/REPOSIÇÃO
-        if "recuperação" in prompt_lower or "reposição" in prompt_lower:
-            if "métodos ágeis" in prompt_lower:
-                return "✅ **SOLICITAÇÃO DE RECUPERAÇÃO/REPOSIÇÃO REGISTRADA**\n\n📚 **Disciplina:** MÉTODOS ÁGEIS\n🎯 **Semestre:** 1º Semestre\n👤 **Curso:** Análise e Desenvolvimento de Sistemas\n\n📋 **Próximos passos:**\n• Secretaria entrará em contato em até 48h úteis\n• Serão informadas datas disponíveis para prova\n• Documentação necessária será solicitada\n\n📞 **Contato:** secretaria@unifecaf.edu.br"
-            else:
-                return "✅ **SOLICITAÇÃO DE RECUPERAÇÃO/REPOSIÇÃO REGISTRADA**\n\nSua solicitação foi encaminhada para a secretaria acadêmica. A equipe entrará em contato em até 48h úteis com todas as orientações.\n\n📞 **Contato:** secretaria@unifecaf.edu.br"
-        
-        # FINANCEIRO
-        elif "financeiro" in prompt_lower or "boleto" in prompt_lower or "pagamento" in prompt_lower or "acordo" in prompt_lower:
-            acao = "solicitação financeira"
-            if "boleto" in prompt_lower:
-                acao = "consulta de boletos"
-            elif "segunda via" in prompt_lower:
-                acao = "emissão de segunda via"
-            elif "acordo" in prompt_lower:
-                acao = "proposta de acordo"
-            elif "pagamento" in prompt_lower:
-                acao = "consulta de pagamentos"
-                
-            return f"✅ **SOLICITAÇÃO FINANCEIRA REGISTRADA**\n\n💼 **Tipo:** {acao}\n📅 **Prazo:** Até 24h úteis para retorno\n\n📋 **Próximos passos:**\n• Equipe financeira analisará sua solicitação\n• Retornaremos por email com informações\n• Mantenha seus dados atualizados\n\n📞 **Contato:** financeiro@unifecaf.edu.br"
-        
-        # DOCUMENTOS
-        elif "documento" in prompt_lower or "declaração" in prompt_lower or "atestado" in prompt_lower or "histórico" in prompt_lower or "diploma" in prompt_lower:
-            doc_type = "documento"
-            if "declaração" in prompt_lower:
-                doc_type = "declaração de matrícula"
-            elif "atestado" in prompt_lower:
-                doc_type = "atestado de frequência"
-            elif "histórico" in prompt_lower:
-                doc_type = "histórico parcial"
-            elif "diploma" in prompt_lower:
-                doc_type = "diploma"
-                
-            return f"✅ **SOLICITAÇÃO DE DOCUMENTO REGISTRADA**\n\n📄 **Documento:** {doc_type.upper()}\n📅 **Prazo de emissão:** 2-3 dias úteis\n\n📋 **Próximos passos:**\n• Documento será processado conforme sua escolha\n• Receberá confirmação por email\n• Retirada disponível na secretaria\n\n📞 **Contato:** documentos@unifecaf.edu.br"
-        
-        # CURSOS
-        elif "curso" in prompt_lower or "disciplina" in prompt_lower:
-            return consultar_info_curso() + "\n\n💡 **Dica:** Para informações detalhadas, entre em contato com a coordenação do curso."
-        
-        # INFORMAÇÕES GERAIS
-        else:
-            return "✅ **SOLICITAÇÃO REGISTRADA COM SUCESSO**\n\nSua mensagem foi recebida e será processada pela nossa equipe.\n\n📞 **Atendimento humano:** atendimento@unifecaf.edu.br\n⏰ **Horário:** Segunda a sexta, 8h às 18h"
+        respostas_ia.inc(categoria, "fallback")
+        return _resposta_fallback(prompt, contexto_adicional)
+
+
+# =======================================================
+#   FUNÇÃO DE IA ASSÍNCRONA — NÃO BLOQUEIA O EVENT LOOP
+# =======================================================
+_semaforo_ia = None
+
+
+def _obter_semaforo_ia() -> asyncio.Semaphore:
+    """Cria o semáforo sob demanda, já dentro do event loop do bot."""
+    global _semaforo_ia
+    if _semaforo_ia is None:
+        _semaforo_ia = asyncio.Semaphore(IA_MAX_CONCORRENCIA)
+    return _semaforo_ia
+
+
+async def _pedir_ia(mensagens: list, chave, categoria: str, escolha) -> str:
+    """Uma chamada à OpenAI, feita uma vez para todos que pediram as mesmas mensagens juntos."""
+    _registrar_tokens(mensagens, categoria)
+    async with _obter_semaforo_ia():
+        inicio = time.perf_counter()
+        try:
+            with tempo_ia.cronometrar(categoria, "async"):
+                resposta = await cliente_ia.criar(
+                    obter_async_client(),
+                    prazo=escolha.prazo,
+                    messages=mensagens,
+                    **escolha.parametros()
+                )
+        except Exception:
+            _registrar_rota(escolha, inicio, sucesso=False)
+            raise
+    _registrar_rota(escolha, inicio, getattr(resposta, "usage", None))
+    _registrar_uso(categoria, getattr(resposta, "usage", None), inicio)
+    return _extrair_resposta(resposta, chave, categoria)
+
+
+async def _consultar_ia_async(prompt: str, contexto_adicional: str = "", categoria: str = "geral", etapa=None):
+    """
+    Consulta assíncrona que também informa a origem da resposta:
+    'ia', 'coalescida' (a mesma consulta já estava em andamento e a chamada
+    foi compartilhada), 'cache' ou 'fallback' (quando a OpenAI falhou).
+    """
+    try:
+        if not OPENAI_KEY:
+            respostas_ia.inc(categoria, "fallback")
+            return "🔧 Sistema temporariamente indisponível. Por favor, tente novamente mais tarde.", "fallback"
+
+        mensagens = _montar_mensagens(prompt, contexto_adicional, categoria)
+        escolha = rotas_ia.escolher(categoria, etapa)
+        chave = _chave_cache(mensagens, categoria, escolha.modelo)
+        if chave:
+            em_cache = cache_respostas.obter(chave)
+            if em_cache is not None:
+                respostas_ia.inc(categoria, "cache")
+                return em_cache, "cache"
+
+        texto, coalescida = await coalescencia.executar(
+            ("resposta", _chave_mensagens(mensagens, escolha.modelo), escolha.max_tokens),
+            lambda: _pedir_ia(mensagens, chave, categoria, escolha))
+        origem = "coalescida" if coalescida else "ia"
+        respostas_ia.inc(categoria, origem)
+        return texto, origem
+
+    except IAIndisponivel as e:
+        logger.warning(f"IA indisponível, usando fallback: {e}")
+        respostas_ia.inc(categoria, "fallback")
+        return _resposta_fallback(prompt, contexto_adicional), "fallback"
+    except Exception as e:
+        logger.error(f"Erro na consulta à IA: {str(e)}")
+        respostas_ia.inc(categoria, "fallback")
+        return _resposta_fallback(prompt, contexto_adicional), "fallback"
+
+
+async def consultar_ia_async(prompt: str, contexto_adicional: str = "", categoria: str = "geral", etapa=None) -> str:
+    """
+    Mesma lógica de consultar_ia, mas usando o AsyncOpenAI compartilhado.
+    Enquanto um aluno espera a resposta, o bot continua atendendo os demais;
+    o semáforo limita quantas chamadas ficam abertas ao mesmo tempo.
+    """
+    texto, _ = await _consultar_ia_async(prompt, contexto_adicional, categoria, etapa)
+    return texto
+
+
+async def interpretar_texto_livre_async(etapa, texto_usuario: str, prompt: str, contexto_adicional: str = "",
+                                        categoria: str = "geral", dados_aluno: dict = None) -> str:
+    """
+    Texto livre digitado num menu: antes de chamar a IA, procura no cache
+    semântico da etapa uma pergunta parecida já respondida.
+    'dados_aluno' ({'ra': ..., 'curso': ...}) é retirado da resposta guardada
+    e recolocado com os dados de quem perguntou.
+    """
+    em_cache = cache_semantico.buscar(etapa, texto_usuario, dados_aluno)
+    if em_cache is not None:
+        return em_cache
+
+    texto, origem = await _consultar_ia_async(prompt, contexto_adicional, categoria, etapa)
+    if origem == "ia":
+        cache_semantico.guardar(etapa, texto_usuario, texto, dados_aluno)
+    return texto
+
+# =======================================================
+#   RESPOSTA EM STREAMING (PRIMEIRO TOKEN O QUANTO ANTES)
+# =======================================================
+class LatenciasIA:
+    """
+    Tempos das respostas em streaming por categoria: até o primeiro token
+    (TTFT, o que o usuário sente) e até o fim da geração.
+    """
+
+    def __init__(self, amostras: int = 1000):
+        self._amostras = amostras
+        self._tempos = {}
+
+    def registrar(self, categoria: str, medida: str, ms: float):
+        chave = (categoria, medida)
+        if chave not in self._tempos:
+            self._tempos[chave] = deque(maxlen=self._amostras)
+        self._tempos[chave].append(ms)
+
+    def mediana(self, medida: str = "total"):
+        """Mediana de uma medida somando todas as categorias (None sem amostras)."""
+        tempos = sorted(t for (_, m), lista in self._tempos.items() if m == medida for t in lista)
+        return tempos[len(tempos) // 2] if tempos else None
+
+    def estatisticas(self) -> dict:
+        resumo = {}
+        for (categoria, medida), tempos in sorted(self._tempos.items()):
+            ordenados = sorted(tempos)
+            resumo.setdefault(categoria, {"respostas": len(ordenados)})
+            resumo[categoria][f"{medida}_p50_ms"] = round(ordenados[len(ordenados) // 2], 1)
+            resumo[categoria][f"{medida}_p95_ms"] = round(ordenados[int(len(ordenados) * 0.95)], 1)
+        return resumo
+
+
+latencias_ia = LatenciasIA()
+
+
+async def _partes_da_ia(mensagens: list, chave, categoria: str, escolha):
+    """
+    Uma chamada em streaming à OpenAI, só os pedaços de texto; compartilhada
+    por quem pediu as mesmas mensagens juntos. Completa, vai para o cache.
+    """
+    _registrar_tokens(mensagens, categoria)
+    partes, uso = [], None
+    async with _obter_semaforo_ia():
+        inicio = time.perf_counter()
+        try:
+            stream = await cliente_ia.criar(
+                obter_async_client(),
+                prazo=escolha.prazo,
+                messages=mensagens,
+                stream=True,
+                stream_options={"include_usage": True},
+                **escolha.parametros()
+            )
+            async for evento in stream:
+                if getattr(evento, "usage", None):  # último evento, sem choices
+                    uso = evento.usage
+                    _registrar_uso(categoria, uso, inicio)
+                parte = evento.choices[0].delta.content if evento.choices else None
+                if parte:
+                    partes.append(parte)
+                    yield parte
+        except Exception:
+            _registrar_rota(escolha, inicio, uso, sucesso=False)
+            raise
+        _registrar_rota(escolha, inicio, uso)
+    if chave and partes:
+        cache_respostas.guardar(chave, "".join(partes), categoria)
+
+
+class RespostaIAStream:
+    """
+    Resposta da IA entregue em pedaços: `async for parte in resposta`.
+
+    Cache e fallback chegam num pedaço só. Depois de consumida, .texto tem a
+    resposta completa e .origem diz de onde veio ('ia', 'coalescida', 'cache',
+    'fallback' ou 'incompleta' se a conexão caiu no meio). Só respostas
+    completas vão para o cache.
+    """
+
+    def __init__(self, prompt: str, contexto_adicional: str = "", categoria: str = "geral", etapa=None):
+        self.prompt = prompt
+        self.contexto_adicional = contexto_adicional
+        self.categoria = categoria
+        self.etapa = etapa
+        self.texto = ""
+        self.origem = None
+        self._duracao = 0.0
+
+    async def __aiter__(self):
+        try:
+            async for parte in self._partes():
+                yield parte
+        finally:
+            if self.origem:  # None: quem lia desistiu no meio
+                respostas_ia.inc(self.categoria, self.origem)
+            if self.origem in ("ia", "incompleta"):
+                tempo_ia.observar(self._duracao, self.categoria, "stream")
+
+    async def _partes(self):
+        partes = []
+        inicio = time.perf_counter()
+        try:
+            if not OPENAI_KEY:
+                raise RuntimeError("OPENAI_API_KEY ausente")
+
+            mensagens = _montar_mensagens(self.prompt, self.contexto_adicional, self.categoria)
+            escolha = rotas_ia.escolher(self.categoria, self.etapa)
+            chave = _chave_cache(mensagens, self.categoria, escolha.modelo)
+            if chave:
+                em_cache = cache_respostas.obter(chave)
+                if em_cache is not None:
+                    self.texto, self.origem = em_cache, "cache"
+                    yield em_cache
+                    return
+
+            # quem chega com a chamada em andamento recebe o que já veio e segue junto
+            voo = ("stream", _chave_mensagens(mensagens, escolha.modelo), escolha.max_tokens)
+            leitura = coalescencia.transmitir(voo, lambda: _partes_da_ia(mensagens, chave, self.categoria, escolha))
+            try:
+                async for parte in leitura:
+                    if not partes:
+                        latencias_ia.registrar(self.categoria, "ttft", (time.perf_counter() - inicio) * 1000)
+                    partes.append(parte)
+                    yield parte
+            finally:
+                leitura.fechar()  # desistiu no meio: a chamada segue para os outros leitores
+
+        except Exception as e:
+            logger.error(f"Erro na consulta à IA (streaming): {str(e)}")
+            self.texto = "".join(partes)
+            if partes:
+                self._duracao = time.perf_counter() - inicio
+                self.origem = "incompleta"
+                return
+            self.texto, self.origem = _resposta_fallback(self.prompt, self.contexto_adicional), "fallback"
+            yield self.texto
+            return
+
+        if not partes:
+            self.texto, self.origem = "❌ Não foi possível processar sua solicitação no momento.", "fallback"
+            yield self.texto
+            return
+
+        self._duracao = time.perf_counter() - inicio
+        latencias_ia.registrar(self.categoria, "total", self._duracao * 1000)
+        self.texto, self.origem = "".join(partes), "coalescida" if leitura.coalescida else "ia"
+
+
+def consultar_ia_stream(prompt: str, contexto_adicional: str = "", categoria: str = "geral",
+                        etapa=None) -> RespostaIAStream:
+    """Igual a consultar_ia_async, mas o texto vai chegando enquanto a IA gera."""
+    return RespostaIAStream(prompt, contexto_adicional, categoria, etapa)
+
+
+async def interpretar_texto_livre_stream(etapa, texto_usuario: str, prompt: str, contexto_adicional: str = "",
+                                         categoria: str = "geral", dados_aluno: dict = None):
+    """interpretar_texto_livre_async em streaming (cache semântico antes da IA)."""
+    em_cache = cache_semantico.buscar(etapa, texto_usuario, dados_aluno)
+    if em_cache is not None:
+        yield em_cache
+        return
+
+    resposta = consultar_ia_stream(prompt, contexto_adicional, categoria, etapa)
+    async for parte in resposta:
+        yield parte
+    if resposta.origem == "ia":
+        cache_semantico.guardar(etapa, texto_usuario, resposta.texto, dados_aluno)
 
 # =======================================================
 #   FUNÇÃO ESPECÍFICA PARA CONSULTA DE CURSOS
 # =======================================================
+@tempo_catalogo.cronometrado("pergunta")
+def _consulta_local_curso(pergunta_usuario: str):
+    """
+    Tenta responder a pergunta apenas com os dados do CSV.
+    Retorna None quando for preciso recorrer à IA.
+    """
+    # Extrair informações da pergunta
+    pergunta = pergunta_usuario.lower()
+    
+    # Consulta geral de cursos
+    if 'quais cursos' in pergunta or 'cursos disponíveis' in pergunta or 'quais são os cursos' in pergunta or 'listar cursos' in pergunta:
+        return consultar_info_curso()
+    
+    indice = obter_catalogo().indice
+
+    # Buscar por curso específico (nome completo citado na pergunta)
+    cursos_citados = indice.cursos_citados(pergunta_usuario)
+    disciplinas = [] if cursos_citados else indice.disciplinas_citadas(pergunta_usuario)
+    if not cursos_citados and not disciplinas:
+        # nomes com erro de digitação ou sem as preposições ("analise desenvolvimento sistmas")
+        sugestoes = indice.sugestoes(pergunta_usuario)
+        cursos_citados = [valor for tipo, valor, _ in sugestoes if tipo == "curso"]
+        disciplinas = [valor for tipo, valor, _ in sugestoes if tipo == "disciplina"]
+        if sugestoes:
+            pergunta = indice.corrigir(pergunta_usuario)
+    if cursos_citados:
+        curso = cursos_citados[0]
+        if 'semestre' in pergunta or 'disciplina' in pergunta:
+            # Tentar extrair semestre da pergunta
+            semestre_encontrado = indice.semestre_citado(curso, pergunta_usuario)
+            if semestre_encontrado:
+                return consultar_info_curso(curso, semestre_encontrado)
+        return consultar_info_curso(curso)
+    
+    # Disciplinas citadas (todas, numa única passada pelo texto)
+    if disciplinas:
+        disciplina, curso, semestre = disciplinas[0]
+        resposta = f"🔍 **Disciplina encontrada:** {disciplina}\n\n📚 **Curso:** {curso}\n🎯 **Semestre:** {semestre}\n\n{consultar_info_curso(curso, semestre)}"
+        if len(disciplinas) > 1:
+            resposta += "\n\n🔎 **Também encontrei:**\n" + "\n".join(f"• {d} — {c} ({sem})" for d, c, sem in disciplinas[1:])
+        return resposta
+    
+    return None
+
+
+def _prompt_curso_ia(pergunta_usuario: str) -> str:
+    """
+    Prompt usado quando a pergunta sobre cursos precisa da IA. O trecho do
+    catálogo entra em _montar_mensagens (antes ia a lista inteira duas vezes).
+    """
+    return f"Pergunta do usuário: {pergunta_usuario}\n\nResponda de forma precisa usando as informações reais dos cursos."
+
+
 def consultar_curso_especifico(pergunta_usuario: str) -> str:
     """
     Função especializada para consultas sobre cursos e disciplinas
     """
     try:
-        # Extrair informações da pergunta
-        pergunta = pergunta_usuario.lower()
+        resposta = _consulta_local_curso(pergunta_usuario)
+        if resposta is not None:
+            return resposta
         
-        # Consulta geral de cursos
-        if 'quais cursos' in pergunta or 'cursos disponíveis' in pergunta or 'quais são os cursos' in pergunta or 'listar cursos' in pergunta:
-            return consultar_info_curso()
-        
-        # Buscar por curso específico
-        for curso in CURSOS_DATA.keys():
-            if curso.lower() in pergunta:
-                if 'semestre' in pergunta or 'disciplina' in pergunta:
-                    # Tentar extrair semestre da pergunta
-                    semestre_encontrado = None
-                    for sem in ['1º', '2º', '3º', '4º', '5º', '6º']:
-                        if sem in pergunta_usuario:
-                            semestre_encontrado = f"{sem} Semestre"
-                            break
-                    
-                    if semestre_encontrado:
-                        return consultar_info_curso(curso, semestre_encontrado)
-                    else:
-                        return consultar_info_curso(curso)
-                else:
-                    return consultar_info_curso(curso)
+        # Se não encontrou curso específico, usar IA geral
+        return consultar_ia(_prompt_curso_ia(pergunta_usuario), categoria="cursos")
         
-        # Buscar por disciplina específica
-        for curso in CURSOS_DATA.keys():
-            for semestre in CURSOS_DATA[curso]:
-                for disciplina in CURSOS_DATA[curso][semestre]:
-                    if disciplina.lower() in pergunta:
-                        return f"🔍 **Disciplina encontrada:** {disciplina}\n\n📚 **Curso:** {curso}\n🎯 **Semestre:** {semestre}\n\n{consultar_info_curso(curso, semestre)}"
+    except Exception as e:
+        logger.error(f"Erro na consulta específica de curso: {e}")
+        return consultar_info_curso()
+
+
+async def consultar_curso_especifico_async(pergunta_usuario: str) -> str:
+    """
+    Versão assíncrona de consultar_curso_especifico, para os handlers do bot.
+    """
+    try:
+        resposta = _consulta_local_curso(pergunta_usuario)
+        if resposta is not None:
+            return resposta
         
         # Se não encontrou curso específico, usar IA geral
-        info_cursos = consultar_info_curso()
-        prompt = f"Pergunta do usuário: {pergunta_usuario}\n\nInformações reais dos cursos:\n{info_cursos}\n\nResponda de forma precisa usando essas informações."
-        return consultar_ia(prompt)
+        return await consultar_ia_async(_prompt_curso_ia(pergunta_usuario), categoria="cursos")
         
     except Exception as e:
         logger.error(f"Erro na consulta específica de curso: {e}")
         return consultar_info_curso()
 
+
+
+async def consultar_curso_especifico_stream(pergunta_usuario: str):
+    """
+    consultar_curso_especifico_async em streaming: a resposta local (CSV)
+    vem inteira; se precisar da IA, o texto chega em pedaços.
+    """
+    try:
+        resposta = _consulta_local_curso(pergunta_usuario)
+    except Exception as e:
+        logger.error(f"Erro na consulta específica de curso: {e}")
+        resposta = consultar_info_curso()
+    if resposta is not None:
+        yield resposta
+        return
+
+    async for parte in consultar_ia_stream(_prompt_curso_ia(pergunta_usuario), categoria="cursos"):
+        yield parte
+
 # =======================================================
 #   CLASSE PARA ARMAZENAR DADOS DO ATENDIMENTO
 # =======================================================
@@ -313,12 +821,41 @@ class Atendimento:
         self.registros = {}
         self.id_atendimento = str(uuid.uuid4())[:8]  # ID curto
         self.inicio = datetime.now()
+        self.ultima_atividade = time.time()
 
     def registrar(self, chave, valor):
         """Salva um dado no registro do atendimento."""
         self.registros[chave] = valor
         logger.info(f"Registro: {chave} = {valor}")
 
+    # ===================================================
+    #     SERIALIZAÇÃO (PARA GUARDAR A SESSÃO FORA DA MEMÓRIA)
+    # ===================================================
+    def serializar(self) -> str:
+        """JSON compacto, com chaves de uma letra."""
+        return json.dumps({
+            "u": self.user_id,
+            "e": self.etapa,
+            "x": self.encerrado,
+            "r": self.registros,
+            "i": self.id_atendimento,
+            "t": self.inicio.timestamp(),
+            "a": self.ultima_atividade,
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def desserializar(cls, texto: str) -> "Atendimento":
+        dados = json.loads(texto)
+        atendimento = cls.__new__(cls)
+        atendimento.user_id = dados["u"]
+        atendimento.etapa = dados["e"]
+        atendimento.encerrado = dados["x"]
+        atendimento.registros = dados["r"]
+        atendimento.id_atendimento = dados["i"]
+        atendimento.inicio = datetime.fromtimestamp(dados["t"])
+        atendimento.ultima_atividade = dados["a"]
+        return atendimento
+
     # ===================================================
     #     GERAR CSV DO ATENDIMENTO
     # ===================================================
@@ -326,6 +863,9 @@ class Atendimento:
         """
         Gera um CSV com todos os dados registrados no atendimento.
         O arquivo ficará disponível na pasta /atendimentos/.
+
+        Escrita síncrona, para uso sob demanda. O bot registra os atendimentos
+        pela auditoria em lote (ver auditoria.AuditoriaAtendimentos).
         """
         try:
             # Criar pasta se não existir
@@ -338,16 +878,7 @@ class Atendimento:
             caminho_completo = os.path.join(pasta, nome_arquivo)
 
             # Escrever CSV
-            with open(caminho_completo, "w", newline="", encoding="utf-8") as arq:
-                writer = csv.writer(arq)
-                writer.writerow(["CHAVE", "VALOR"])
-                writer.writerow(["user_id", self.user_id])
-                writer.writerow(["id_atendimento", self.id_atendimento])
-                writer.writerow(["inicio", self.inicio])
-                writer.writerow(["fim", datetime.now()])
-
-                for chave, valor in self.registros.items():
-                    writer.writerow([chave, valor])
+            escrever_csv_atendimento(caminho_completo, registro_do_atendimento(self))
 
             logger.info(f"CSV gerado: {caminho_completo}")
             return caminho_completo
@@ -0,0 +1,175 @@
+# ============================================
+#      CACHE DE RESPOSTAS DA IA
+# ============================================
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# custo fixo aproximado de cada entrada (chave, tupla, metadados)
+_OVERHEAD_ENTRADA = 200
+
+
+# =======================================================
+#   NORMALIZAÇÃO E CHAVE
+# =======================================================
+def normalizar_prompt(texto: str) -> str:
+    """Minúsculas e espaços colapsados: variações triviais caem na mesma chave."""
+    return " ".join(texto.lower().split())
+
+
+def gerar_chave(modelo: str, prompt_sistema: str, prompt_usuario: str) -> str:
+    """Chave do cache: modelo + prompt de sistema + prompt do usuário normalizado."""
+    bruto = "\x00".join([modelo, prompt_sistema, normalizar_prompt(prompt_usuario)])
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def ler_ttls(texto: str) -> dict:
+    """
+    Converte 'visitante=21600,cursos=3600' em {'visitante': 21600, 'cursos': 3600}.
+    Entradas inválidas são ignoradas com aviso no log.
+    """
+    ttls = {}
+    for item in (texto or "").split(","):
+        if not item.strip():
+            continue
+        try:
+            categoria, valor = item.split("=", 1)
+            ttls[categoria.strip()] = int(valor)
+        except ValueError:
+            logger.warning(f"TTL de cache inválido ignorado: {item}")
+    return ttls
+
+
+# =======================================================
+#   CACHE LRU COM TTL POR CATEGORIA
+# =======================================================
+class CacheRespostas:
+    """
+    Cache LRU de respostas da IA com TTL por categoria e limite de memória.
+
+    Categorias com TTL 0 (padrão) não são guardadas — assim respostas com
+    dados pessoais do aluno (RA, curso) só entram no cache se alguém configurar.
+    """
+
+    def __init__(self, ttls=None, ttl_padrao=0, max_bytes=5_000_000, arquivo=None):
+        self.ttls = dict(ttls or {})
+        self.ttl_padrao = ttl_padrao
+        self.max_bytes = max_bytes
+        self.arquivo = arquivo
+        self._entradas = OrderedDict()  # chave -> (resposta, expira_em, categoria, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicoes = 0
+
+        if self.arquivo:
+            self.carregar()
+
+    def ttl_da_categoria(self, categoria: str) -> int:
+        return self.ttls.get(categoria, self.ttl_padrao)
+
+    def obter(self, chave: str):
+        """Retorna a resposta guardada ou None (contando hit/miss)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            if entrada[1] < time.time():
+                self._remover(chave)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return entrada[0]
+
+    def guardar(self, chave: str, resposta: str, categoria: str = "geral"):
+        """Guarda a resposta se a categoria tiver TTL e ela couber no limite."""
+        ttl = self.ttl_da_categoria(categoria)
+        if ttl <= 0 or not resposta:
+            return
+        tamanho = len(chave) + len(resposta.encode("utf-8")) + _OVERHEAD_ENTRADA
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (resposta, time.time() + ttl, categoria, tamanho)
+            self._bytes += tamanho
+            # LRU: descarta as menos usadas até caber no limite
+            while self._bytes > self.max_bytes:
+                antiga = next(iter(self._entradas))
+                self._remover(antiga)
+                self.evicoes += 1
+
+    def _remover(self, chave: str):
+        entrada = self._entradas.pop(chave)
+        self._bytes -= entrada[3]
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicoes": self.evicoes,
+            "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # ===================================================
+    #     PERSISTÊNCIA EM DISCO (OPCIONAL)
+    # ===================================================
+    def salvar(self):
+        """Grava as entradas válidas em JSON (escrita atômica)."""
+        if not self.arquivo:
+            return
+        try:
+            agora = time.time()
+            with self._lock:
+                dados = [
+                    [chave, resposta, expira_em, categoria]
+                    for chave, (resposta, expira_em, categoria, _) in self._entradas.items()
+                    if expira_em > agora
+                ]
+            temporario = f"{self.arquivo}.tmp"
+            with open(temporario, "w", encoding="utf-8") as arq:
+                json.dump(dados, arq, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+            logger.info(f"Cache de respostas salvo: {len(dados)} entradas em {self.arquivo}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de respostas: {e}")
+
+    def carregar(self):
+        """Recarrega as entradas ainda válidas gravadas por salvar()."""
+        if not self.arquivo or not os.path.exists(self.arquivo):
+            return
+        try:
+            with open(self.arquivo, encoding="utf-8") as arq:
+                dados = json.load(arq)
+            agora = time.time()
+            with self._lock:
+                for chave, resposta, expira_em, categoria in dados:
+                    if expira_em <= agora:
+                        continue
+                    tamanho = len(chave) + len(resposta.encode("utf-8")) + _OVERHEAD_ENTRADA
+                    self._entradas[chave] = (resposta, expira_em, categoria, tamanho)
+                    self._bytes += tamanho
+                while self._bytes > self.max_bytes:
+                    self._remover(next(iter(self._entradas)))
+            logger.info(f"Cache de respostas carregado: {len(self._entradas)} entradas de {self.arquivo}")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de respostas: {e}")
@@ -0,0 +1,228 @@
+# ============================================
+#      CACHE SEMÂNTICO (PERGUNTAS PARECIDAS)
+# ============================================
+
+import re
+import time
+import zlib
+import logging
+import threading
+import importlib.util
+from collections import deque
+
+from normalizacao import normalizar_texto
+
+# numpy é opcional: sem ele o cache fica desligado. Só é importado no primeiro
+# vetor (~80 ms a menos na subida do bot).
+NUMPY_DISPONIVEL = importlib.util.find_spec("numpy") is not None
+np = None
+
+
+def _carregar_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+logger = logging.getLogger(__name__)
+
+# marcadores usados para não guardar dados pessoais dentro das respostas
+_MARCADOR = "\x00{}\x00"
+
+# palavras que não mudam o sentido do pedido
+_PALAVRAS_VAZIAS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "um", "uma", "para", "pra", "por", "favor", "eu", "me", "meu", "minha",
+    "quero", "queria", "preciso", "gostaria", "como", "faco", "poderia", "pode",
+}
+
+# abreviações comuns digitadas pelos alunos
+_SINONIMOS = {"2a": "segunda", "seg": "segunda", "vc": "voce", "msg": "mensagem"}
+
+# ordinais (e dias da semana) e meses: junto com os números, são as marcas de
+# uma pergunta. "prova do 2º semestre" e "do 3º semestre" ficam acima do
+# limiar, mas pedem respostas diferentes, então marcas diferentes nunca dão hit
+_ORDINAIS = {
+    "primeiro": "1", "primeira": "1", "segundo": "2", "segunda": "2", "terceiro": "3", "terceira": "3",
+    "terca": "3", "quarto": "4", "quarta": "4", "quinto": "5", "quinta": "5", "sexto": "6", "sexta": "6",
+    "setimo": "7", "setima": "7", "oitavo": "8", "oitava": "8", "nono": "9", "nona": "9",
+    "decimo": "10", "decima": "10", "ultimo": "ultimo", "ultima": "ultimo",
+}
+_MESES = {
+    "janeiro": "1", "fevereiro": "2", "marco": "3", "abril": "4", "maio": "5", "junho": "6",
+    "julho": "7", "agosto": "8", "setembro": "9", "outubro": "10", "novembro": "11", "dezembro": "12",
+}
+_NUMERO = re.compile(r"\d+")
+
+
+# =======================================================
+#   VETORIZAÇÃO (N-GRAMAS DE CARACTERES COM HASH)
+# =======================================================
+def _palavras(texto: str) -> list:
+    return [_SINONIMOS.get(p, p) for p in normalizar_texto(texto).split()]
+
+
+def _caracteristicas(texto: str):
+    """N-gramas de 3 e 4 caracteres + palavras inteiras, sem palavras vazias."""
+    palavras = _palavras(texto)
+    normalizado = " ".join(p for p in palavras if p not in _PALAVRAS_VAZIAS) or " ".join(palavras)
+    if not normalizado:
+        return []
+    caracteristicas = [f"w:{palavra}" for palavra in normalizado.split()]
+    preenchido = f" {normalizado} "
+    for n in (3, 4):
+        caracteristicas.extend(preenchido[i:i + n] for i in range(len(preenchido) - n + 1))
+    return caracteristicas
+
+
+def marcas(texto: str) -> int:
+    """
+    Números ("2º" -> 2, "14h" -> 14), ordinais e meses da pergunta, num
+    inteiro (crc32; 0 sem nenhum) que é guardado ao lado de cada entrada.
+    """
+    encontradas = set()
+    for palavra in _palavras(texto):
+        numero = _NUMERO.match(palavra)
+        if numero:
+            encontradas.add(f"n:{int(numero.group())}")
+        elif palavra in _ORDINAIS:
+            encontradas.add(f"n:{_ORDINAIS[palavra]}")
+        elif palavra in _MESES:
+            encontradas.add(f"mes:{_MESES[palavra]}")
+    return zlib.crc32(" ".join(sorted(encontradas)).encode("utf-8")) if encontradas else 0
+
+
+def vetorizar(texto: str, dimensao: int):
+    """Vetor L2-normalizado (float32) com as características espalhadas por hash."""
+    _carregar_numpy()
+    vetor = np.zeros(dimensao, dtype=np.float32)
+    for caracteristica in _caracteristicas(texto):
+        # crc32 é estável entre processos (hash() do Python não é)
+        vetor[zlib.crc32(caracteristica.encode("utf-8")) % dimensao] += 1.0
+    norma = np.linalg.norm(vetor)
+    if norma > 0:
+        vetor /= norma
+    return vetor
+
+
+# =======================================================
+#   ÍNDICE DE UM ESCOPO (UMA ETAPA DO MENU)
+# =======================================================
+class _Escopo:
+    """Matriz circular de vetores + marcas + respostas de uma etapa."""
+
+    def __init__(self, capacidade: int, dimensao: int):
+        _carregar_numpy()
+        self.vetores = np.zeros((capacidade, dimensao), dtype=np.float32)
+        self.marcas = np.zeros(capacidade, dtype=np.int64)
+        self.respostas = [None] * capacidade
+        self.expira_em = [0.0] * capacidade
+        self.tamanho = 0
+        self.proximo = 0
+
+    def adicionar(self, vetor, marca: int, resposta: str, expira_em: float):
+        self.vetores[self.proximo] = vetor
+        self.marcas[self.proximo] = marca
+        self.respostas[self.proximo] = resposta
+        self.expira_em[self.proximo] = expira_em
+        self.proximo = (self.proximo + 1) % len(self.respostas)
+        self.tamanho = min(self.tamanho + 1, len(self.respostas))
+
+    def mais_parecido(self, vetor, marca: int):
+        """(similaridade, posição) da entrada mais próxima com as mesmas marcas — cosseno via produto escalar."""
+        similaridades = self.vetores[:self.tamanho] @ vetor
+        similaridades[self.marcas[:self.tamanho] != marca] = -1.0
+        posicao = int(np.argmax(similaridades))
+        return float(similaridades[posicao]), posicao
+
+
+# =======================================================
+#   CACHE SEMÂNTICO
+# =======================================================
+class CacheSemantico:
+    """
+    Responde perguntas livres reescritas ("segunda via do boleto",
+    "preciso da 2a via do boleto") com uma resposta anterior da IA quando
+    a similaridade de cosseno passa do limiar e os números, ordinais e
+    meses são os mesmos ("2º semestre" nunca responde "3º semestre"). Cada
+    etapa do menu tem seu próprio escopo, então respostas do Financeiro
+    nunca aparecem na Secretaria.
+    """
+
+    def __init__(self, limiar=0.85, ttl=3600, capacidade_por_escopo=500, dimensao=1024, ativo=True):
+        self.limiar = limiar
+        self.ttl = ttl
+        self.capacidade_por_escopo = capacidade_por_escopo
+        self.dimensao = dimensao
+        self.ativo = ativo and NUMPY_DISPONIVEL
+        if ativo and not NUMPY_DISPONIVEL:
+            logger.warning("numpy não instalado: cache semântico desativado")
+        self._escopos = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._latencias_ms = deque(maxlen=1000)
+
+    @staticmethod
+    def _anonimizar(texto: str, dados: dict) -> str:
+        for nome, valor in (dados or {}).items():
+            # valores muito curtos ("TI") trocariam pedaços de outras palavras
+            if valor and len(str(valor)) >= 3:
+                texto = texto.replace(str(valor), _MARCADOR.format(nome))
+        return texto
+
+    @staticmethod
+    def _personalizar(texto: str, dados: dict) -> str:
+        for nome, valor in (dados or {}).items():
+            texto = texto.replace(_MARCADOR.format(nome), str(valor or "Não informado"))
+        return texto
+
+    def buscar(self, escopo, pergunta: str, dados: dict = None):
+        """
+        Resposta de uma pergunta parecida já respondida nesse escopo, ou None.
+        'dados' (ex.: {'ra': ..., 'curso': ...}) recoloca os dados do aluno atual.
+        """
+        if not self.ativo:
+            return None
+        inicio = time.perf_counter()
+        try:
+            with self._lock:
+                indice = self._escopos.get(escopo)
+                if indice is None or indice.tamanho == 0:
+                    self.misses += 1
+                    return None
+                similaridade, posicao = indice.mais_parecido(vetorizar(pergunta, self.dimensao), marcas(pergunta))
+                if similaridade < self.limiar or indice.expira_em[posicao] < time.time():
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                resposta = indice.respostas[posicao]
+            logger.info(f"Cache semântico: hit na etapa {escopo} (similaridade {similaridade:.2f})")
+            return self._personalizar(resposta, dados)
+        finally:
+            self._latencias_ms.append((time.perf_counter() - inicio) * 1000)
+
+    def guardar(self, escopo, pergunta: str, resposta: str, dados: dict = None):
+        """Guarda a resposta da IA sem os dados pessoais do aluno."""
+        if not self.ativo or not resposta or not normalizar_texto(pergunta):
+            return
+        vetor, marca = vetorizar(pergunta, self.dimensao), marcas(pergunta)
+        with self._lock:
+            indice = self._escopos.get(escopo)
+            if indice is None:
+                indice = self._escopos[escopo] = _Escopo(self.capacidade_por_escopo, self.dimensao)
+            indice.adicionar(vetor, marca, self._anonimizar(resposta, dados), time.time() + self.ttl)
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.misses
+        latencias = sorted(self._latencias_ms)
+        return {
+            "ativo": self.ativo,
+            "limiar": self.limiar,
+            "entradas": sum(e.tamanho for e in self._escopos.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+            "latencia_p50_ms": round(latencias[len(latencias) // 2], 3) if latencias else 0.0,
+            "latencia_max_ms": round(latencias[-1], 3) if latencias else 0.0,
+        }
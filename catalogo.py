@@ -0,0 +1,798 @@
+# ============================================
+#      CATÁLOGO DE CURSOS - ÍNDICE DE BUSCA
+# ============================================
+
+import os
+import re
+import csv
+import sys
+import time
+import pickle
+import asyncio
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from itertools import chain
+from math import log
+
+from normalizacao import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# CSV oficial dos cursos (por padrão, ao lado deste arquivo)
+ARQUIVO_CURSOS = os.getenv(
+    "CURSOS_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cursos Tech UniFECAF EAD.csv")
+)
+
+# fotografia do catálogo já indexado, gerada pelo supervisor e carregada por
+# cada worker sem reler o CSV (ver supervisor.py); vazio = cada processo lê o CSV
+CATALOGO_FOTOGRAFIA = os.getenv("CATALOGO_FOTOGRAFIA", "")
+
+# linha separadora entre cursos no CSV
+_SEPARADOR = "---"
+
+# palavras que não ajudam a distinguir um curso de outro
+PALAVRAS_IGNORADAS = {"a", "o", "e", "de", "da", "do", "das", "dos", "em", "ead", "curso", "cursos"}
+
+# apelidos digitados pelos alunos -> trecho (normalizado) do nome oficial do curso
+APELIDOS_CURSOS = {
+    "ads": "analise e desenvolvimento de sistemas",
+    "analise de sistemas": "analise e desenvolvimento de sistemas",
+    "desenvolvimento de sistemas": "analise e desenvolvimento de sistemas",
+    "ciencia dados": "ciencia de dados",
+    "data science": "ciencia de dados",
+    "cd": "ciencia de dados",
+    "nuvem": "computacao em nuvem",
+    "cloud": "computacao em nuvem",
+    "cloud computing": "computacao em nuvem",
+    "ciberseguranca": "defesa cibernetica",
+    "seguranca cibernetica": "defesa cibernetica",
+    "cyber security": "defesa cibernetica",
+    "gti": "gestao da tecnologia da informacao",
+    "gestao de ti": "gestao da tecnologia da informacao",
+    "ia": "inteligencia artificial e automacao digital",
+    "inteligencia artificial": "inteligencia artificial e automacao digital",
+}
+
+# "primeiro semestre", "1o semestre", "1 semestre" -> 1
+ORDINAIS = {"primeiro": 1, "segundo": 2, "terceiro": 3, "quarto": 4, "quinto": 5, "sexto": 6,
+            "setimo": 7, "oitavo": 8, "nono": 9, "decimo": 10}
+_NUMERO = re.compile(r"\d+")
+_SEMESTRE_NA_FRASE = re.compile(r"\b(\d+|" + "|".join(ORDINAIS) + r")\s*o?\s+semestre\b|\bsemestre\s+(\d+)\b")
+
+# acerto por prefixo ("desenv" -> "desenvolvimento") vale menos que o exato
+_PESO_PREFIXO = 0.8
+_TAMANHO_MINIMO_PREFIXO = 3
+
+# erros de digitação tolerados por palavra: nenhum até 3 letras, 1 até 7, 2 a
+# partir de 8 ("sistmas" -> "sistemas", "desenvovimento" -> "desenvolvimento").
+# Palavra corrigida vale menos que a digitada certo.
+_TAMANHO_MINIMO_CORRECAO = 4
+_TAMANHO_DUAS_EDICOES = 8
+_PESO_CORRECAO = 0.7
+
+# palavras das perguntas que o bot procura além dos nomes do catálogo
+_PALAVRAS_DO_BOT = ("semestre", "disciplina", "disciplinas")
+
+# correções guardadas por índice (palavras digitadas se repetem muito)
+_MAX_CORRECOES_GUARDADAS = 50_000
+
+
+def _numero_semestre(texto: str):
+    """Extrai o número do semestre de '1º Semestre', '1 semestre' ou 'primeiro'."""
+    normalizado = normalizar_texto(texto)
+    encontrado = _NUMERO.search(normalizado)
+    if encontrado:
+        return int(encontrado.group())
+    for palavra in normalizado.split():
+        if palavra in ORDINAIS:
+            return ORDINAIS[palavra]
+    return None
+
+
+def _tokens_relevantes(texto_normalizado: str) -> list:
+    return [t for t in texto_normalizado.split() if t not in PALAVRAS_IGNORADAS]
+
+
+# =======================================================
+#   AHO-CORASICK: TODOS OS NOMES CITADOS NUMA ÚNICA PASSADA
+# =======================================================
+class AhoCorasick:
+    """
+    Autômato de múltiplos padrões. procurar() percorre o texto uma vez e
+    devolve todos os padrões presentes, independente de quantos existam.
+    """
+
+    def __init__(self, padroes):
+        # padroes: iterável de (texto_do_padrao, valor)
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saidas = [[]]
+
+        for padrao, valor in padroes:
+            estado = 0
+            for caractere in padrao:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][caractere] = proximo
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saidas.append([])
+                estado = proximo
+            self._saidas[estado].append((len(padrao), valor))
+
+        # ligações de falha em largura (BFS)
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] = self._saidas[proximo] + self._saidas[self._falha[proximo]]
+
+    def procurar(self, texto: str) -> list:
+        """Lista de (inicio, tamanho, valor) de cada ocorrência."""
+        encontrados = []
+        estado = 0
+        for posicao, caractere in enumerate(texto):
+            while estado and caractere not in self._transicoes[estado]:
+                estado = self._falha[estado]
+            estado = self._transicoes[estado].get(caractere, 0)
+            for tamanho, valor in self._saidas[estado]:
+                encontrados.append((posicao - tamanho + 1, tamanho, valor))
+        return encontrados
+
+
+# =======================================================
+#   CORREÇÃO DE PALAVRAS (TRIGRAMAS + DISTÂNCIA DE EDIÇÃO)
+# =======================================================
+def _edicoes_toleradas(palavra: str) -> int:
+    if len(palavra) < _TAMANHO_MINIMO_CORRECAO or palavra.isdigit():
+        return 0
+    return 2 if len(palavra) >= _TAMANHO_DUAS_EDICOES else 1
+
+
+def _trigramas(palavra: str) -> set:
+    """Trigramas da palavra com uma borda de cada lado: 'dado' -> $da, dad, ado, do$."""
+    marcada = f"${palavra}$"
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    """
+    Distância de edição entre a e b contando a troca de duas letras vizinhas
+    como um erro só ('sitsemas'). Só calcula a faixa de largura 2 * limite + 1
+    em volta da diagonal e para, devolvendo limite + 1, assim que passa do limite.
+    """
+    tamanho_a, tamanho_b = len(a), len(b)
+    fora = limite + 1
+    if abs(tamanho_a - tamanho_b) > limite:
+        return fora
+    anterior = [j if j <= limite else fora for j in range(tamanho_b + 1)]
+    penultima = anterior
+    for i in range(1, tamanho_a + 1):
+        atual = [fora] * (tamanho_b + 1)
+        if i <= limite:
+            atual[0] = i
+        menor = atual[0]
+        letra = a[i - 1]
+        for j in range(max(1, i - limite), min(tamanho_b, i + limite) + 1):
+            outra = b[j - 1]
+            valor = anterior[j - 1] if letra == outra else anterior[j - 1] + 1
+            if anterior[j] + 1 < valor:
+                valor = anterior[j] + 1
+            if atual[j - 1] + 1 < valor:
+                valor = atual[j - 1] + 1
+            if i > 1 and j > 1 and letra == b[j - 2] and a[i - 2] == outra and penultima[j - 2] + 1 < valor:
+                valor = penultima[j - 2] + 1
+            atual[j] = valor
+            if valor < menor:
+                menor = valor
+        if menor > limite:
+            return fora
+        penultima, anterior = anterior, atual
+    return min(anterior[tamanho_b], fora)
+
+
+def _a_uma_edicao(a: str, b: str) -> bool:
+    """a e b diferentes por uma letra trocada, faltando, sobrando ou duas vizinhas invertidas."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    # mesmo tamanho: uma letra trocada ou duas vizinhas invertidas
+    return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i + 1] + b[i])
+
+
+class IndiceTrigramas:
+    """
+    Vocabulário do catálogo com índice (trigrama, tamanho) -> palavras. Uma
+    palavra desconhecida só é comparada, pela distância de edição, com as de
+    tamanho parecido que têm trigramas em comum com ela; cada palavra
+    digitada é corrigida uma vez e a correção fica guardada.
+    """
+
+    def __init__(self, frequencias: dict):
+        # mais frequentes primeiro: no empate de distância, vence a palavra mais comum
+        self.palavras = sorted(frequencias, key=lambda p: (-frequencias[p], p))
+        self._numero = {palavra: numero for numero, palavra in enumerate(self.palavras)}
+        self._postings = {}
+        for numero, palavra in enumerate(self.palavras):
+            for trigrama in _trigramas(palavra):
+                self._postings.setdefault((trigrama, len(palavra)), []).append(numero)
+        self._correcoes = {}
+
+    def __contains__(self, palavra: str) -> bool:
+        return palavra in self._numero
+
+    def __len__(self) -> int:
+        return len(self.palavras)
+
+    def corrigir(self, palavra: str) -> list:
+        """
+        [(palavra do vocabulário, edições)]: a própria palavra se ela existe, senão
+        as mais próximas dentro do limite (até 3, empatadas na menor distância);
+        [] se nenhuma chega perto.
+        """
+        if palavra in self._numero:
+            return [(palavra, 0)]
+        correcao = self._correcoes.get(palavra)
+        if correcao is None:
+            correcao = self._procurar(palavra)
+            if len(self._correcoes) >= _MAX_CORRECOES_GUARDADAS:
+                self._correcoes.clear()
+            self._correcoes[palavra] = correcao
+        return correcao
+
+    def _candidatas(self, palavra: str, edicoes: int) -> list:
+        """Palavras de tamanho parecido com trigramas suficientes em comum para estar a `edicoes` de distância."""
+        # letra trocada, faltando ou sobrando desfaz no máximo 3 trigramas
+        trigramas = _trigramas(palavra)
+        candidatas = []
+        for tamanho in range(len(palavra) - edicoes, len(palavra) + edicoes + 1):
+            contagem = Counter(chain.from_iterable(self._postings.get((trigrama, tamanho), ()) for trigrama in trigramas))
+            minimo = max(len(palavra), tamanho) - 3 * edicoes
+            candidatas.extend(numero for numero, comuns in contagem.items() if comuns >= minimo)
+        # duas vizinhas invertidas desfazem 4: essas são procuradas direto
+        for i in range(len(palavra) - 1):
+            invertida = palavra[:i] + palavra[i + 1] + palavra[i] + palavra[i + 2:]
+            if invertida in self._numero:
+                candidatas.append(self._numero[invertida])
+        return candidatas
+
+    def _procurar(self, palavra: str) -> list:
+        limite = _edicoes_toleradas(palavra)
+        if not limite:
+            return []
+        # quase todo erro é um só: a procura a duas edições (mais candidatas) só
+        # acontece se nenhuma palavra estiver a uma
+        melhores = sorted({numero for numero in self._candidatas(palavra, 1)
+                           if _a_uma_edicao(palavra, self.palavras[numero])})
+        if melhores:
+            return [(self.palavras[numero], 1) for numero in melhores[:3]]
+        if limite < 2:
+            return []
+        melhores = sorted({numero for numero in self._candidatas(palavra, 2)
+                           if distancia_edicao(palavra, self.palavras[numero], 2) <= 2})
+        return [(self.palavras[numero], 2) for numero in melhores[:3]]
+
+
+# =======================================================
+#   ÍNDICE DO CATÁLOGO
+# =======================================================
+class CatalogIndex:
+    """
+    Índice montado uma única vez sobre o dicionário curso -> semestre -> disciplinas.
+
+    Guarda os nomes já normalizados (minúsculas, sem acento), uma tabela de
+    apelidos ("ads", "ciência dados") e um índice invertido token -> cursos.
+    A busca custa O(tokens da consulta) em vez de percorrer o catálogo, e o
+    empate entre cursos é resolvido pela ordem do CSV (resultado determinístico).
+    Palavras digitadas errado são corrigidas pelo vocabulário do catálogo
+    (IndiceTrigramas) quando a busca exata não encontra nada.
+    """
+
+    def __init__(self, cursos: dict):
+        self.cursos = list(cursos.keys())
+        self._posicao = {curso: posicao for posicao, curso in enumerate(self.cursos)}
+        self._por_nome = {}
+        self._indice_tokens = {}
+        self._semestres = []
+        self._disciplinas = {}
+
+        for posicao, curso in enumerate(self.cursos):
+            normalizado = normalizar_texto(curso)
+            self._por_nome[normalizado] = posicao
+            self._por_nome[" ".join(_tokens_relevantes(normalizado))] = posicao
+            for token in set(_tokens_relevantes(normalizado)):
+                self._indice_tokens.setdefault(token, []).append(posicao)
+
+            por_numero = {}
+            for semestre, disciplinas in cursos[curso].items():
+                numero = _numero_semestre(semestre)
+                if numero is not None:
+                    por_numero.setdefault(numero, semestre)
+                self._disciplinas[(curso, semestre)] = [(normalizar_texto(d), d) for d in disciplinas]
+            self._semestres.append((por_numero, [(normalizar_texto(s), s) for s in cursos[curso]]))
+
+        # vocabulário ordenado para achar prefixos com busca binária
+        self._vocabulario = sorted(self._indice_tokens)
+        total = max(len(self.cursos), 1)
+        self._idf = {t: 1.0 + log(total / len(p)) for t, p in self._indice_tokens.items()}
+
+        # autômato com disciplinas e nomes de cursos, delimitados por espaço
+        # (o texto também é delimitado, então "ia" não casa dentro de "materia")
+        padroes = []
+        for posicao, curso in enumerate(self.cursos):
+            normalizado = normalizar_texto(curso)
+            padroes.append((f" {normalizado} ", ("curso", posicao)))
+            sem_ead = normalizado[:-len(" ead")] if normalizado.endswith(" ead") else None
+            if sem_ead:
+                padroes.append((f" {sem_ead} ", ("curso", posicao)))
+            for semestre, disciplinas in cursos[curso].items():
+                for disciplina in disciplinas:
+                    padroes.append((f" {normalizar_texto(disciplina)} ", ("disciplina", (disciplina, curso, semestre))))
+        self._automato = AhoCorasick(padroes)
+
+        # apelidos: só entram os que apontam para um curso existente
+        self._apelidos = {}
+        for apelido, trecho in APELIDOS_CURSOS.items():
+            for posicao, curso in enumerate(self.cursos):
+                if trecho in normalizar_texto(curso):
+                    self._apelidos[apelido] = posicao
+                    break
+
+        # busca aproximada: cursos e disciplinas pelas palavras do nome, cada
+        # nome guardado só na sua palavra mais rara (um nome só aparece inteiro
+        # na pergunta se a palavra mais rara dele aparecer)
+        self._nomes = []
+        for curso in self.cursos:
+            self._nomes.append(("curso", curso, frozenset(_tokens_relevantes(normalizar_texto(curso)))))
+            for semestre in cursos[curso]:
+                for normalizado, disciplina in self._disciplinas[(curso, semestre)]:
+                    palavras = frozenset(_tokens_relevantes(normalizado))
+                    self._nomes.append(("disciplina", (disciplina, curso, semestre), palavras))
+        frequencias = {}
+        for _, _, palavras in self._nomes:
+            for palavra in palavras:
+                frequencias[palavra] = frequencias.get(palavra, 0) + 1
+        self._por_palavra_rara = {}
+        for numero, (_, _, palavras) in enumerate(self._nomes):
+            if palavras:
+                rara = min(palavras, key=lambda p: (frequencias[p], p))
+                self._por_palavra_rara.setdefault(rara, []).append(numero)
+        for nomes_semestres in cursos.values():
+            for semestre in nomes_semestres:
+                for palavra in normalizar_texto(semestre).split():
+                    frequencias.setdefault(palavra, 0)
+        for palavra in (*ORDINAIS, *APELIDOS_CURSOS, *_PALAVRAS_DO_BOT):
+            frequencias.setdefault(palavra, 0)
+        self.vocabulario = IndiceTrigramas(frequencias)
+
+    # ===================================================
+    #     CURSOS
+    # ===================================================
+    def _postings_prefixo(self, token: str) -> set:
+        """Cursos que têm algum token começando com 'token'."""
+        encontrados = set()
+        inicio = bisect_left(self._vocabulario, token)
+        for palavra in self._vocabulario[inicio:]:
+            if not palavra.startswith(token):
+                break
+            encontrados.update(self._indice_tokens[palavra])
+        return encontrados
+
+    def buscar_cursos(self, consulta: str) -> list:
+        """
+        Lista ranqueada de (curso, pontuação, cobriu_toda_consulta).
+        Nome exato ou apelido vêm primeiro; depois soma de IDF dos tokens.
+        """
+        normalizado = normalizar_texto(consulta)
+        if not normalizado:
+            return []
+
+        exato = self._por_nome.get(normalizado, self._apelidos.get(normalizado))
+        if exato is not None:
+            return [(self.cursos[exato], 100.0, True)]
+
+        tokens = _tokens_relevantes(normalizado) or normalizado.split()
+        pontuacao = {}
+        acertos = {}
+        for token in tokens:
+            candidatos = {}
+            if token in self._apelidos:
+                candidatos[self._apelidos[token]] = 5.0
+            for posicao in self._indice_tokens.get(token, ()):
+                candidatos[posicao] = max(candidatos.get(posicao, 0.0), self._idf[token])
+            if len(token) >= _TAMANHO_MINIMO_PREFIXO:
+                for posicao in self._postings_prefixo(token):
+                    candidatos.setdefault(posicao, self._idf.get(token, 1.0) * _PESO_PREFIXO)
+            if not candidatos:  # erro de digitação: "sistmas" -> "sistemas"
+                for palavra, _ in self.vocabulario.corrigir(token):
+                    for posicao in self._indice_tokens.get(palavra, ()):
+                        candidatos.setdefault(posicao, self._idf[palavra] * _PESO_CORRECAO)
+            for posicao, peso in candidatos.items():
+                pontuacao[posicao] = pontuacao.get(posicao, 0.0) + peso
+                acertos[posicao] = acertos.get(posicao, 0) + 1
+
+        ordenados = sorted(pontuacao, key=lambda p: (-acertos[p], -pontuacao[p], p))
+        return [(self.cursos[p], round(pontuacao[p], 3), acertos[p] == len(tokens)) for p in ordenados]
+
+    def melhor_curso(self, consulta: str):
+        """Curso que casa com todos os tokens da consulta (o mais bem pontuado), ou None."""
+        resultados = self.buscar_cursos(consulta)
+        if resultados and resultados[0][2]:
+            return resultados[0][0]
+        return None
+
+    # ===================================================
+    #     NOMES CITADOS DENTRO DE UMA PERGUNTA
+    # ===================================================
+    def _citacoes(self, pergunta: str) -> list:
+        return self._automato.procurar(f" {normalizar_texto(pergunta)} ")
+
+    def cursos_citados(self, pergunta: str) -> list:
+        """Cursos cujo nome completo aparece na pergunta, na ordem do CSV."""
+        posicoes = {valor for _, _, (tipo, valor) in self._citacoes(pergunta) if tipo == "curso"}
+        return [self.cursos[p] for p in sorted(posicoes)]
+
+    def apelidos_citados(self, pergunta: str) -> list:
+        """Cursos citados por apelido ("ads", "data science") na pergunta, na ordem do CSV."""
+        texto = f" {normalizar_texto(pergunta)} "
+        posicoes = {p for apelido, p in self._apelidos.items() if f" {apelido} " in texto}
+        return [self.cursos[p] for p in sorted(posicoes)]
+
+    def disciplinas_citadas(self, pergunta: str) -> list:
+        """
+        Todas as disciplinas citadas na pergunta, como (disciplina, curso, semestre).
+        Ordem: nomes mais longos (mais específicos) primeiro, depois disciplinas do
+        curso citado na pergunta, depois a posição no texto e a ordem do CSV.
+        """
+        citacoes = self._citacoes(pergunta)
+        cursos = {valor for _, _, (tipo, valor) in citacoes if tipo == "curso"}
+        encontradas = {}
+        for inicio, tamanho, (tipo, valor) in citacoes:
+            if tipo == "disciplina" and valor not in encontradas:
+                encontradas[valor] = (-tamanho, self._posicao[valor[1]] not in cursos, inicio, self._posicao[valor[1]])
+        return sorted(encontradas, key=encontradas.get)
+
+    def semestre_citado(self, curso: str, pergunta: str):
+        """Semestre citado na pergunta ('1º semestre', 'semestre 2', 'terceiro semestre', 'segundo semstre')."""
+        encontrado = _SEMESTRE_NA_FRASE.search(normalizar_texto(pergunta)) or _SEMESTRE_NA_FRASE.search(
+            self.corrigir(pergunta))
+        if not encontrado:
+            return None
+        return self.buscar_semestre(curso, encontrado.group(1) or encontrado.group(2))
+
+    # ===================================================
+    #     BUSCA APROXIMADA (ERROS DE DIGITAÇÃO)
+    # ===================================================
+    def corrigir(self, texto: str) -> str:
+        """Texto normalizado com cada palavra desconhecida trocada pela mais próxima do catálogo."""
+        palavras = []
+        for palavra in normalizar_texto(texto).split():
+            correcoes = self.vocabulario.corrigir(palavra)
+            palavras.append(correcoes[0][0] if correcoes else palavra)
+        return " ".join(palavras)
+
+    def sugestoes(self, consulta: str, limite: int = 5) -> list:
+        """
+        Cursos e disciplinas cujo nome aparece inteiro na consulta, mesmo com
+        erros de digitação, fora de ordem ou sem as preposições ("analise
+        desenvolvimento sistmas", "ciencia de dado"). Lista ranqueada de
+        (tipo, valor, edições), tipo 'curso' (valor = nome) ou 'disciplina'
+        (valor = (disciplina, curso, semestre)): nomes mais longos, depois menos
+        correções, depois a ordem do CSV. Um nome de N palavras aceita até
+        N - 1 palavras corrigidas.
+        """
+        palavras = {}
+        for token in _tokens_relevantes(normalizar_texto(consulta)):
+            for palavra, edicoes in self.vocabulario.corrigir(token):
+                palavras[palavra] = min(edicoes, palavras.get(palavra, edicoes))
+        encontrados = []
+        for palavra in palavras:
+            for numero in self._por_palavra_rara.get(palavra, ()):
+                nome = self._nomes[numero][2]
+                if all(p in palavras for p in nome):
+                    edicoes = sum(1 for p in nome if palavras[p])
+                    if edicoes < len(nome):
+                        encontrados.append((-len(nome), edicoes, numero))
+        encontrados.sort()
+        return [(self._nomes[numero][0], self._nomes[numero][1], edicoes)
+                for _, edicoes, numero in encontrados[:limite]]
+
+    # ===================================================
+    #     SEMESTRES E DISCIPLINAS
+    # ===================================================
+    def buscar_semestre(self, curso: str, consulta: str):
+        """Semestre do curso pelo número ('1', '1º', 'primeiro') ou por trecho do nome."""
+        posicao = self._posicao.get(curso)
+        if posicao is None:
+            return None
+        por_numero, nomes = self._semestres[posicao]
+        numero = _numero_semestre(consulta)
+        if numero is not None and numero in por_numero:
+            return por_numero[numero]
+        normalizado = normalizar_texto(consulta)
+        for nome_normalizado, semestre in nomes:
+            if normalizado and normalizado in nome_normalizado:
+                return semestre
+        corrigido = self.corrigir(consulta)  # "pirmeiro", "segudo semestre"
+        if corrigido != normalizado:
+            return self.buscar_semestre(curso, corrigido)
+        return None
+
+    def buscar_disciplinas(self, curso: str, semestre: str, consulta: str) -> list:
+        """Disciplinas do semestre cujo nome contém a consulta (sem diferenciar acento nem erro de digitação)."""
+        disciplinas = self._disciplinas.get((curso, semestre), ())
+        normalizado = normalizar_texto(consulta)
+        encontradas = [original for nome, original in disciplinas if normalizado in nome]
+        if not encontradas:
+            corrigido = self.corrigir(consulta)
+            if corrigido != normalizado:
+                encontradas = [original for nome, original in disciplinas if corrigido in nome]
+        return encontradas
+
+
+# =======================================================
+#   CARREGAMENTO DO CSV (STREAMING, SEM PANDAS)
+# =======================================================
+def carregar_cursos_csv(caminho: str = None) -> dict:
+    """
+    Lê o CSV linha a linha e devolve {curso: {semestre: (disciplinas...)}}.
+
+    O CSV só repete Curso/Semestre na primeira linha de cada bloco; o
+    preenchimento para baixo é feito na mesma passada. Nomes são internados
+    (sys.intern) e as disciplinas ficam em tuplas para ocupar menos memória.
+    """
+    caminho = caminho or ARQUIVO_CURSOS
+    try:
+        cursos = {}
+        curso_atual = None
+        semestre_atual = None
+        disciplinas = None
+
+        with open(caminho, newline="", encoding="utf-8") as arq:
+            for linha in csv.DictReader(arq):
+                curso = (linha.get("Curso") or "").strip()
+                semestre = (linha.get("Semestre") or "").strip()
+                disciplina = (linha.get("Disciplina") or "").strip()
+
+                # Verificar se é um novo curso
+                if curso and curso != _SEPARADOR:
+                    if disciplinas is not None:
+                        cursos[curso_atual][semestre_atual] = tuple(disciplinas)
+                    curso_atual = sys.intern(curso)
+                    semestre_atual = None
+                    disciplinas = None
+                    cursos[curso_atual] = {}
+
+                # Verificar se é um novo semestre
+                if semestre and semestre != _SEPARADOR and curso_atual:
+                    if disciplinas is not None:
+                        cursos[curso_atual][semestre_atual] = tuple(disciplinas)
+                    semestre_atual = sys.intern(semestre)
+                    disciplinas = []
+                    cursos[curso_atual][semestre_atual] = ()
+
+                # Adicionar disciplina (a linha separadora "---" não é disciplina)
+                if disciplina and disciplina != _SEPARADOR and disciplinas is not None:
+                    disciplinas.append(sys.intern(disciplina))
+
+        if disciplinas is not None:
+            cursos[curso_atual][semestre_atual] = tuple(disciplinas)
+        return cursos
+    except Exception as e:
+        logger.error(f"Erro ao carregar cursos do CSV: {e}")
+        return {}
+
+
+def catalogo_como_dataframe(caminho: str = None):
+    """
+    Catálogo em formato de tabela (Curso, Semestre, Disciplina) para análises.
+    Único ponto que usa pandas — dependência opcional, importada só aqui.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("pandas não está instalado: pip install pandas") from None
+    linhas = [
+        (curso, semestre, disciplina)
+        for curso, semestres in carregar_cursos_csv(caminho).items()
+        for semestre, disciplinas in semestres.items()
+        for disciplina in disciplinas
+    ]
+    return pd.DataFrame(linhas, columns=["Curso", "Semestre", "Disciplina"])
+
+
+# =======================================================
+#   CATÁLOGO CARREGADO SOB DEMANDA
+# =======================================================
+class Catalogo:
+    """
+    Fotografia do catálogo: dados + índice, montados juntos e nunca alterados
+    depois. Uma recarga cria outro Catalogo e troca a referência de uma vez,
+    então quem já pegou a fotografia atual continua com uma visão consistente.
+    """
+
+    __slots__ = ("cursos", "indice", "versao", "hash", "assinatura", "carregado_em", "duracao_ms")
+
+    def __init__(self, cursos: dict, versao: int = 1, hash_arquivo: str = "", assinatura=None):
+        self.cursos = cursos
+        self.indice = CatalogIndex(cursos)
+        self.versao = versao
+        self.hash = hash_arquivo
+        self.assinatura = assinatura
+        self.carregado_em = time.time()
+        self.duracao_ms = 0.0
+
+
+_catalogo = None
+_lock_catalogo = threading.Lock()
+
+
+def _assinatura_arquivo(caminho: str):
+    """(mtime, tamanho) — barato de checar a cada intervalo."""
+    try:
+        info = os.stat(caminho)
+        return info.st_mtime_ns, info.st_size
+    except OSError:
+        return None
+
+
+def _hash_arquivo(caminho: str) -> str:
+    try:
+        with open(caminho, "rb") as arq:
+            return hashlib.sha256(arq.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def _montar_catalogo(versao: int) -> Catalogo:
+    if CATALOGO_FOTOGRAFIA and os.path.exists(CATALOGO_FOTOGRAFIA):
+        return ler_fotografia(CATALOGO_FOTOGRAFIA)
+    inicio = time.perf_counter()
+    assinatura = _assinatura_arquivo(ARQUIVO_CURSOS)
+    hash_arquivo = _hash_arquivo(ARQUIVO_CURSOS)
+    cursos = carregar_cursos_csv()
+    catalogo = Catalogo(cursos, versao, hash_arquivo, assinatura)
+    catalogo.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    logger.info(f"Catálogo v{versao} carregado: {len(cursos)} cursos em {catalogo.duracao_ms} ms")
+    return catalogo
+
+
+def obter_catalogo() -> Catalogo:
+    """Lê o CSV e monta o índice no primeiro acesso; depois só devolve o pronto."""
+    global _catalogo
+    if _catalogo is None:
+        with _lock_catalogo:
+            if _catalogo is None:
+                _catalogo = _montar_catalogo(versao=1)
+    return _catalogo
+
+
+# =======================================================
+#   FOTOGRAFIA EM ARQUIVO (LIDA PELOS WORKERS DO SUPERVISOR)
+# =======================================================
+def salvar_fotografia(caminho: str, catalogo: Catalogo = None) -> int:
+    """
+    Grava o catálogo já indexado (dados, índice e autômato) num arquivo só,
+    trocado de uma vez (os.replace): quem lê nunca pega um arquivo pela metade.
+    Retorna o tamanho em bytes.
+    """
+    catalogo = catalogo or obter_catalogo()
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arq:
+        pickle.dump(catalogo, arq, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+    return os.path.getsize(caminho)
+
+
+def ler_fotografia(caminho: str) -> Catalogo:
+    """
+    Carrega a fotografia: o worker não relê o CSV nem remonta o índice e o
+    autômato. O catálogo continua numa cópia própria na memória de cada
+    worker (o pickle remonta os objetos); o ganho é só o tempo de montagem.
+    O pickle só é gerado por salvar_fotografia, no próprio servidor.
+    """
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as arq:
+        catalogo = pickle.load(arq)
+        assinatura = _assinatura_arquivo(caminho)
+    catalogo.assinatura = ("fotografia",) + (assinatura or ())
+    catalogo.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    logger.info(f"Catálogo v{catalogo.versao} lido da fotografia: {len(catalogo.cursos)} cursos "
+                f"em {catalogo.duracao_ms} ms")
+    return catalogo
+
+
+def _recarregar_da_fotografia(forcar: bool) -> bool:
+    """Nos workers, a recarga segue a fotografia que o supervisor regrava."""
+    global _catalogo
+    atual = obter_catalogo()
+    assinatura = _assinatura_arquivo(CATALOGO_FOTOGRAFIA)
+    if assinatura is None or (("fotografia",) + assinatura == atual.assinatura and not forcar):
+        return False
+    with _lock_catalogo:
+        novo = ler_fotografia(CATALOGO_FOTOGRAFIA)
+        if novo.hash == _catalogo.hash and not forcar:
+            _catalogo.assinatura = novo.assinatura
+            return False
+        _catalogo = novo
+    logger.info(f"Catálogo trocado pela fotografia: v{atual.versao} -> v{novo.versao}")
+    return True
+
+
+# =======================================================
+#   RECARGA A QUENTE DO CSV
+# =======================================================
+def recarregar_catalogo(forcar: bool = False) -> bool:
+    """
+    Recarrega o CSV se ele mudou (mtime/tamanho e, confirmando, o hash).
+    Troca o catálogo de uma vez só; um CSV vazio ou ilegível mantém o atual.
+    Retorna True quando houve troca.
+    """
+    global _catalogo
+    if CATALOGO_FOTOGRAFIA:
+        return _recarregar_da_fotografia(forcar)
+    atual = obter_catalogo()
+    assinatura = _assinatura_arquivo(ARQUIVO_CURSOS)
+    if assinatura is None or (assinatura == atual.assinatura and not forcar):
+        return False
+
+    with _lock_catalogo:
+        atual = _catalogo
+        if not forcar and _hash_arquivo(ARQUIVO_CURSOS) == atual.hash:
+            # só o mtime mudou (ex.: arquivo salvo sem alterações)
+            atual.assinatura = assinatura
+            return False
+
+        novo = _montar_catalogo(versao=atual.versao + 1)
+        if not novo.cursos:
+            logger.error("Recarga do catálogo ignorada: CSV vazio ou ilegível, mantendo a versão atual")
+            atual.assinatura = assinatura
+            return False
+        _catalogo = novo
+
+    logger.info(f"Catálogo trocado: v{atual.versao} -> v{novo.versao} ({novo.duracao_ms} ms)")
+    return True
+
+
+def estado_catalogo() -> dict:
+    """Versão e tempo da última carga, para conferir a troca em produção."""
+    catalogo = obter_catalogo()
+    return {
+        "versao": catalogo.versao,
+        "hash": catalogo.hash[:12],
+        "cursos": len(catalogo.cursos),
+        "carregado_em": catalogo.carregado_em,
+        "duracao_recarga_ms": catalogo.duracao_ms,
+    }
+
+
+async def vigiar_catalogo(intervalo: float = 30.0, ao_trocar=None):
+    """
+    Tarefa de fundo: confere o CSV a cada 'intervalo' segundos. A leitura e a
+    montagem dos índices rodam numa thread, fora do event loop do bot.
+    ao_trocar(catalogo) roda na mesma thread depois de cada troca.
+    """
+    logger.info(f"Recarga automática do catálogo ativa (a cada {intervalo:g}s)")
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            if await asyncio.to_thread(recarregar_catalogo) and ao_trocar:
+                await asyncio.to_thread(ao_trocar, obter_catalogo())
+        except Exception as e:
+            logger.error(f"Erro ao recarregar catálogo: {e}")
@@ -1,5 +1,6 @@
 # chatbot.py
 import os
+import asyncio
 import logging
 import time
 from dotenv import load_dotenv
@@ -12,102 +13,177 @@ from telegram.ext import (
     filters,
 )
 
-from bot_faculdade import Atendimento, consultar_ia, consultar_curso_especifico, consultar_info_curso
+from bot_faculdade import (
+    Atendimento,
+    consultar_curso_especifico_async,
+    consultar_curso_especifico_stream,
+    consultar_info_curso,
+    cache_respostas,
+    cache_semantico,
+    latencias_ia,
+    cliente_ia,
+    coalescencia,
+    rotas_ia,
+    inicializar,
+    aquecer_openai,
+    OPENAI_KEY,
+)
+from catalogo import vigiar_catalogo, estado_catalogo
+from sessoes import criar_store_sessoes, vigiar_sessoes
+from auditoria import criar_auditoria
+from dialogo import MotorDialogo, Turno
+from resposta_progressiva import transmitir as transmitir_mensagem
+from intencoes import criar_roteador_intencoes
+from contexto_ia import tokens_prompt
+from prompts import uso_prompts
+from despacho import DespachoPorUsuario
+from metricas import metricas, iniciar_exportacao, encerrar_exportacao
+from envio import EnvioTelegram, ENVIO_CONEXOES, ENVIO_ESPERA_CONEXAO
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
-logger = logging.getLogger(__name__)
+# polling (padrão), webhook (servidor aiohttp; ver webhook.py para WEBHOOK_*)
+# ou supervisor (vários workers, cada usuário sempre no mesmo; ver supervisor.py)
+BOT_MODO = os.getenv("BOT_MODO", "polling").lower()
 
-# memória de atendimentos ativos
-atendimentos = {}
+# API do Telegram (troque por um Bot API server próprio ou pelo falso dos benchmarks)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
 
-# ---------- teclados reutilizáveis ----------
-KB_INITIAL = ReplyKeyboardMarkup(
-    [[KeyboardButton("Sou aluno"), KeyboardButton("Não sou aluno")]],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# quantos updates o bot processa ao mesmo tempo (1 = um de cada vez). Acima de
+# 1, só pelo despacho por usuário: os de um mesmo usuário sempre rodam em
+# ordem, um por vez (ver despacho.py); nunca concurrent_updates puro
+BOT_UPDATES_CONCORRENTES = int(os.getenv("BOT_UPDATES_CONCORRENTES", "100"))
 
-KB_STUDENT_MENU = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Financeiro"), KeyboardButton("Secretaria")],
-        [KeyboardButton("Documentos"), KeyboardButton("Informações do curso")],
-        [KeyboardButton("Falar com atendente"), KeyboardButton("Cancelar")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# updates aceitos e ainda não terminados (rodando ou esperando a vez)
+BOT_UPDATES_EM_ESPERA = int(os.getenv("BOT_UPDATES_EM_ESPERA", "1000"))
 
-KB_FINANCEIRO = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Ver boletos"), KeyboardButton("Segunda via")],
-        [KeyboardButton("Acordo / Renegociação"), KeyboardButton("Consultar pagamentos")],
-        [KeyboardButton("Voltar"), KeyboardButton("Falar com atendente")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# intervalo (s) para conferir se o CSV de cursos mudou; 0 desativa a recarga
+CATALOGO_RECARGA_INTERVALO = float(os.getenv("CATALOGO_RECARGA_INTERVALO", "30"))
 
-KB_SECRETARIA = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Reposição / Recuperação"), KeyboardButton("Calendário acadêmico")],
-        [KeyboardButton("Horário das aulas"), KeyboardButton("Troca de curso")],
-        [KeyboardButton("Voltar"), KeyboardButton("Falar com atendente")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# respostas da IA aparecem enquanto são geradas (1) ou só prontas (0)
+IA_STREAMING = os.getenv("IA_STREAMING", "1") == "1"
 
-KB_DOCUMENTOS = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Declaração de matrícula"), KeyboardButton("Atestado de frequência")],
-        [KeyboardButton("Histórico parcial"), KeyboardButton("Solicitar diploma")],
-        [KeyboardButton("Voltar"), KeyboardButton("Falar com atendente")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# intervalo mínimo (s) entre edições da mensagem em streaming (limite do Telegram)
+IA_STREAM_INTERVALO = float(os.getenv("IA_STREAM_INTERVALO", "1.0"))
 
-KB_CURSOS = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Listar todos os cursos"), KeyboardButton("Grade curricular")],
-        [KeyboardButton("Disciplinas por semestre"), KeyboardButton("Voltar")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
-)
+# conexões abertas com o Telegram e com a OpenAI antes do primeiro aluno (0 = não aquece)
+AQUECER_CONEXOES = int(os.getenv("AQUECER_CONEXOES", "0"))
 
-KB_VISITOR = ReplyKeyboardMarkup(
-    [
-        [KeyboardButton("Ver cursos"), KeyboardButton("Ver valores")],
-        [KeyboardButton("Documentos para matrícula"), KeyboardButton("Como se inscrever")],
-        [KeyboardButton("Falar com consultor"), KeyboardButton("Cancelar")]
-    ],
-    resize_keyboard=True,
-    one_time_keyboard=False
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO
 )
+logger = logging.getLogger(__name__)
+
+# atendimentos ativos (memória ou SQLite, conforme SESSOES_BACKEND)
+atendimentos = criar_store_sessoes()
+
+# registro dos atendimentos encerrados (gravação em lote, fora do event loop)
+auditoria = criar_auditoria()
+
+# respostas ao usuário: fila por chat, limites do Telegram e agrupamento (ver envio.py)
+envio = EnvioTelegram()
+
+# tarefas de fundo iniciadas junto com o bot
+tarefas_fundo = []
+
+# tempo de cada update por etapa em que o aluno estava (sem efeito com METRICAS_ATIVAS=0)
+tempo_etapa = metricas.histograma(
+    "chatbot_etapa_segundos", "Tempo de processamento de cada update, pela etapa de origem ou comando", ("etapa",))
+metricas.medidor("chatbot_sessoes_ativas", "Atendimentos em andamento", lambda: len(atendimentos))
+metricas.medidor("chatbot_auditoria_fila", "Atendimentos encerrados esperando gravação",
+                 lambda: auditoria.estatisticas()["na_fila"])
+metricas.medidor("chatbot_envio_total", "Respostas pedidas, mensagens enviadas, agrupadas, 429 e reenvios",
+                 lambda: {(nome,): valor for nome, valor in envio.contadores.items()}, ("evento",), tipo="counter")
+metricas.medidor("chatbot_envio_pendentes", "Respostas na fila de envio",
+                 lambda: envio.estatisticas()["pendentes"])
+metricas.medidor("chatbot_catalogo_versao", "Versão do catálogo de cursos carregado",
+                 lambda: estado_catalogo()["versao"])
+
+# ---------- etapas, opções e teclados (menus.json) ----------
+async def responder(turno: Turno, texto: str, teclado: str = None, markdown: bool = False):
+    await envio.enviar(
+        turno.update.message,
+        texto,
+        reply_markup=TECLADOS[teclado] if teclado else None,
+        parse_mode='Markdown' if markdown else None
+    )
+
+async def transmitir(turno: Turno, partes) -> str:
+    return await transmitir_mensagem(envio.origem(turno.update.message), partes, IA_STREAM_INTERVALO)
+
+async def encerrar_turno(turno: Turno):
+    await encerrar_e_limpar_atendimento(turno.update, turno.atendimento, turno.atendimento.user_id)
+
+motor = MotorDialogo(responder, encerrar_turno, transmitir=transmitir if IA_STREAMING else None)
+
+# texto livre reconhecido como opção do menu não passa pela IA (INTENCOES_ATIVO)
+motor.intencoes = criar_roteador_intencoes(motor)
+
+TECLADOS = {
+    nome: ReplyKeyboardMarkup(
+        [[KeyboardButton(texto) for texto in linha] for linha in linhas],
+        resize_keyboard=True,
+        one_time_keyboard=False
+    )
+    for nome, linhas in motor.teclados.items()
+}
 
 # ---------- utilitário de encerramento ----------
 async def encerrar_e_limpar_atendimento(update: Update, atendimento: Atendimento, user_id: int):
     try:
-        caminho = atendimento.gerar_csv()
-        if caminho != "erro_ao_gerar_csv":
-            await update.message.reply_text(f"📁 Atendimento registrado em:\n{caminho}")
-        await update.message.reply_text("✅ Atendimento finalizado. Digite /start para iniciar outro atendimento.")
+        await auditoria.registrar(atendimento)
+        await envio.enviar(update.message, f"📁 Atendimento registrado. Protocolo: {atendimento.id_atendimento}")
+        await envio.enviar(update.message, "✅ Atendimento finalizado. Digite /start para iniciar outro atendimento.")
         atendimento.encerrado = True
         if user_id in atendimentos:
             del atendimentos[user_id]
     except Exception as e:
         logger.error(f"Erro ao encerrar atendimento: {e}")
-        await update.message.reply_text("✅ Atendimento finalizado. Digite /start para iniciar outro atendimento.")
+        await envio.enviar(update.message, "✅ Atendimento finalizado. Digite /start para iniciar outro atendimento.")
+
+# ---------- ações que precisam de código (referenciadas em menus.json) ----------
+@motor.acao("receber_ra")
+async def receber_ra(turno: Turno, opcao: dict):
+    # Validação básica do RA
+    if not turno.texto_raw.isdigit() or len(turno.texto_raw) < 3:
+        return await responder(turno, "Por favor, digite um RA válido (apenas números, pelo menos 3 dígitos):")
+    turno.atendimento.registrar("ra", turno.texto_raw)
+    turno.atendimento.etapa = 13
+    await responder(turno, "Obrigado. Qual é o seu curso? (digite o nome ou abreviação)")
+
+@motor.acao("listar_cursos")
+async def listar_cursos(turno: Turno, opcao: dict):
+    # consulta real do CSV, sem IA
+    resposta = consultar_info_curso()
+    if opcao.get("registro_resposta"):
+        turno.atendimento.registrar(opcao["registro_resposta"], resposta)
+    await responder(turno, resposta)
+
+@motor.acao("consulta_curso_livre")
+async def consulta_curso_livre(turno: Turno, opcao: dict):
+    # Consulta livre sobre cursos - usar a função especializada
+    if IA_STREAMING:
+        # a divisão em mensagens de 4000 caracteres acontece enquanto o texto chega
+        resposta = await transmitir(turno, consultar_curso_especifico_stream(turno.texto_raw))
+    else:
+        resposta = await consultar_curso_especifico_async(turno.texto_raw)
+        # Dividir resposta longa (limite do Telegram)
+        for i in range(0, len(resposta), 4000):
+            await responder(turno, resposta[i:i+4000])
+    turno.atendimento.registrar("consulta_curso_livre", turno.texto_raw)
+    turno.atendimento.registrar("resposta_curso", resposta)
+
+    # Oferecer continuar ou encerrar
+    await responder(turno, "Deseja fazer outra consulta ou voltar ao menu principal?", "pos_consulta")
+    turno.atendimento.etapa = 61  # Aguardando decisão pós-consulta
+
+motor.validar()
 
 # ---------- /start ----------
+@tempo_etapa.cronometrado("/start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.message.from_user.id
@@ -115,47 +191,54 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if user in atendimentos:
             del atendimentos[user]
         
-        atendimentos[user] = Atendimento(user)
+        atendimento = Atendimento(user)
         # etapa 10 = perguntando se é aluno
-        atendimentos[user].etapa = 10
-        await update.message.reply_text(
+        atendimento.etapa = 10
+        atendimentos[user] = atendimento
+        await envio.enviar(
+            update.message,
             "Olá! 👋 Seja bem-vindo ao atendimento virtual da UniFECAF.\n"
             "Antes de começarmos: você é aluno da instituição?",
-            reply_markup=KB_INITIAL
+            reply_markup=TECLADOS["inicial"]
         )
     except Exception as e:
         logger.error(f"Erro no comando start: {e}")
-        await update.message.reply_text("Erro ao iniciar atendimento. Tente novamente.")
+        await envio.enviar(update.message, "Erro ao iniciar atendimento. Tente novamente.")
 
 # ---------- COMANDO /cursos ----------
+@tempo_etapa.cronometrado("/cursos")
 async def cursos_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando específico para consulta de cursos"""
     try:
         user = update.message.from_user.id
         
         # Se não tiver sessão ativa, criar uma temporária
-        if user not in atendimentos:
-            atendimentos[user] = Atendimento(user)
-            atendimentos[user].etapa = 60  # Modo consulta de cursos
+        atendimento = atendimentos.obter(user)
+        if atendimento is None:
+            atendimento = Atendimento(user)
+            atendimento.etapa = 60  # Modo consulta de cursos
+            atendimentos.salvar(atendimento)
         
         if context.args:
             # Se o usuário passou argumentos, fazer busca direta
             busca = " ".join(context.args)
-            resposta = consultar_curso_especifico(busca)
-            await update.message.reply_text(resposta)
+            resposta = await consultar_curso_especifico_async(busca)
+            await envio.enviar(update.message, resposta)
         else:
             # Mostrar menu de opções de cursos
-            atendimentos[user].etapa = 60
-            await update.message.reply_text(
+            atendimento.etapa = 60
+            atendimentos.salvar(atendimento)
+            await envio.enviar(
+                update.message,
                 "🎓 **Consulta de Cursos UniFECAF**\n\n"
                 "Escolha uma opção ou digite o nome de um curso específico:",
-                reply_markup=KB_CURSOS,
+                reply_markup=TECLADOS["cursos"],
                 parse_mode='Markdown'
             )
             
     except Exception as e:
         logger.error(f"Erro no comando /cursos: {e}")
-        await update.message.reply_text("Erro ao consultar cursos. Tente novamente.")
+        await envio.enviar(update.message, "Erro ao consultar cursos. Tente novamente.")
 
 # ---------- mensagem principal ----------
 async def mensagem(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -164,448 +247,165 @@ async def mensagem(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Verificar se a mensagem está vazia
     if not texto_raw:
-        await update.message.reply_text("Por favor, digite uma mensagem válida.")
+        await envio.enviar(update.message, "Por favor, digite uma mensagem válida.")
         return
 
     texto = texto_raw.lower()
 
+    atendimento = atendimentos.obter(user)
+
     # Verificar timeout de sessão (30 minutos)
-    if user in atendimentos:
-        tempo_sessao = time.time() - atendimentos[user].inicio.timestamp()
+    if atendimento is not None:
+        tempo_sessao = time.time() - atendimento.inicio.timestamp()
         if tempo_sessao > 1800:  # 30 minutos
-            await update.message.reply_text("⏰ Sessão expirada. Digite /start para reiniciar.")
+            await envio.enviar(update.message, "⏰ Sessão expirada. Digite /start para reiniciar.")
             del atendimentos[user]
             return
 
     # se não tiver sessão ativa ou já encerrado, força start
-    if user not in atendimentos or atendimentos[user].encerrado:
+    if atendimento is None or atendimento.encerrado:
         if not texto.startswith("/"):
-            await update.message.reply_text("Digite /start para iniciar o atendimento.")
+            await envio.enviar(update.message, "Digite /start para iniciar o atendimento.")
         return await start(update, context)
 
-    atendimento = atendimentos[user]
-
     try:
-        # ---------- ETAPA 10: aluno ou visitante ----------
-        if atendimento.etapa == 10:
-            if texto == "sou aluno":
-                atendimento.registrar("cliente_tipo", "aluno")
-                atendimento.etapa = 12  # pedir RA
-                return await update.message.reply_text("Perfeito — por favor, informe seu RA (apenas números):")
-            elif texto == "não sou aluno" or texto == "nao sou aluno":
-                atendimento.registrar("cliente_tipo", "visitante")
-                atendimento.etapa = 70  # visitante menu
-                return await update.message.reply_text(
-                    "Perfeito — como posso te ajudar hoje?", reply_markup=KB_VISITOR
-                )
-            else:
-                return await update.message.reply_text("Por favor escolha: 'Sou aluno' ou 'Não sou aluno'.")
-
-        # ---------- ETAPA 12: receber RA ----------
-        if atendimento.etapa == 12:
-            # Validação básica do RA
-            if not texto_raw.isdigit() or len(texto_raw) < 3:
-                return await update.message.reply_text("Por favor, digite um RA válido (apenas números, pelo menos 3 dígitos):")
-            
-            atendimento.registrar("ra", texto_raw)
-            atendimento.etapa = 13
-            return await update.message.reply_text("Obrigado. Qual é o seu curso? (digite o nome ou abreviação)")
-
-        # ---------- ETAPA 13: receber curso ----------
-        if atendimento.etapa == 13:
-            atendimento.registrar("curso", texto_raw)
-            atendimento.etapa = 20  # student menu
-            return await update.message.reply_text(
-                "O que deseja fazer hoje? Escolha uma opção:", reply_markup=KB_STUDENT_MENU
-            )
-
-        # ---------- ETAPA 20: menu do aluno ----------
-        if atendimento.etapa == 20:
-            if texto == "financeiro":
-                atendimento.registrar("setor", "financeiro")
-                atendimento.etapa = 30
-                return await update.message.reply_text("Você escolheu Financeiro. O que deseja?", reply_markup=KB_FINANCEIRO)
-            if texto == "secretaria":
-                atendimento.registrar("setor", "secretaria")
-                atendimento.etapa = 40
-                return await update.message.reply_text("Você escolheu Secretaria. O que deseja?", reply_markup=KB_SECRETARIA)
-            if texto == "documentos":
-                atendimento.registrar("setor", "documentos")
-                atendimento.etapa = 50
-                return await update.message.reply_text("Você escolheu Documentos. O que deseja?", reply_markup=KB_DOCUMENTOS)
-            if texto == "informações do curso" or texto == "informacoes do curso":
-                atendimento.registrar("setor", "info_curso")
-                atendimento.etapa = 60
-                return await update.message.reply_text(
-                    "🎓 **Consulta de Informações do Curso**\n\n"
-                    "Você pode:\n"
-                    "- Digitar o nome de um curso específico\n"  
-                    "- Perguntar sobre disciplinas\n"
-                    "- Usar os botões abaixo para navegar",
-                    reply_markup=KB_CURSOS,
-                    parse_mode='Markdown'
-                )
-            if texto == "falar com atendente":
-                # direciona para atendimento humano
-                atendimento.registrar("solicitacao", "falar_com_atendente")
-                await update.message.reply_text(
-                    "👥 **Encaminhando para Atendimento Humano**\n\n"
-                    "📧 **E-mail:** atendimento@unifecaf.edu.br\n"
-                    "📋 **Inclua em seu e-mail:**\n"
-                    "• Seu RA: " + atendimento.registros.get('ra', 'Não informado') + "\n"
-                    "• Seu curso: " + atendimento.registros.get('curso', 'Não informado') + "\n"
-                    "• Descrição detalhada do seu pedido\n\n"
-                    "⏰ **Prazo de retorno:** 24h úteis"
-                )
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "cancelar":
-                await update.message.reply_text("Atendimento cancelado pelo usuário.")
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-            # qualquer outra entrada: considerar texto livre -> usar IA para interpretar
-            contexto = f"Aluno: RA {atendimento.registros.get('ra')}, Curso: {atendimento.registros.get('curso')}"
-            prompt = f"O usuário (aluno) escreveu: '{texto_raw}'. {contexto}. Resuma em uma frase e responda de forma cortês, sugerindo as opções do menu."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_interpretacao_menu", ia_resp)
-            return await update.message.reply_text(f"{ia_resp}\n\nSe preferir, escolha uma opção no menu.", reply_markup=KB_STUDENT_MENU)
-
-        # ---------- CONSULTA DE CURSOS (etapa 60) ----------
-        if atendimento.etapa == 60:
-            if texto == "listar todos os cursos":
-                resposta = consultar_info_curso()
-                await update.message.reply_text(resposta)
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            
-            elif texto == "grade curricular":
-                atendimento.registrar("consulta_curso", "grade_geral")
-                await update.message.reply_text("Digite o nome do curso que deseja ver a grade curricular completa:")
-                return
-            
-            elif texto == "disciplinas por semestre":
-                atendimento.registrar("consulta_curso", "disciplinas_semestre")
-                await update.message.reply_text("Digite o curso e semestre (ex: 'Análise e Desenvolvimento de Sistemas 1º semestre'):")
-                return
-            
-            elif texto == "voltar":
-                atendimento.etapa = 20
-                return await update.message.reply_text("Voltando ao menu principal.", reply_markup=KB_STUDENT_MENU)
-            
-            else:
-                # Consulta livre sobre cursos - usar a função especializada
-                resposta = consultar_curso_especifico(texto_raw)
-                atendimento.registrar("consulta_curso_livre", texto_raw)
-                atendimento.registrar("resposta_curso", resposta)
-                
-                if len(resposta) > 4000:
-                    # Dividir resposta longa
-                    partes = [resposta[i:i+4000] for i in range(0, len(resposta), 4000)]
-                    for parte in partes:
-                        await update.message.reply_text(parte)
-                else:
-                    await update.message.reply_text(resposta)
-                
-                # Oferecer continuar ou encerrar
-                await update.message.reply_text(
-                    "Deseja fazer outra consulta ou voltar ao menu principal?",
-                    reply_markup=ReplyKeyboardMarkup(
-                        [[KeyboardButton("Nova consulta"), KeyboardButton("Voltar ao menu")]],
-                        resize_keyboard=True
-                    )
-                )
-                atendimento.etapa = 61  # Aguardando decisão pós-consulta
-                return
-
-        # ---------- DECISÃO PÓS-CONSULTA (etapa 61) ----------
-        if atendimento.etapa == 61:
-            if texto == "nova consulta" or texto == "outra consulta":
-                atendimento.etapa = 60
-                return await update.message.reply_text(
-                    "🎓 Digite sua próxima consulta sobre cursos:",
-                    reply_markup=KB_CURSOS
-                )
-            elif texto == "voltar ao menu" or texto == "voltar":
-                atendimento.etapa = 20
-                return await update.message.reply_text("Voltando ao menu principal.", reply_markup=KB_STUDENT_MENU)
-            else:
-                # Tratar como nova consulta
-                resposta = consultar_curso_especifico(texto_raw)
-                await update.message.reply_text(resposta)
-                await update.message.reply_text(
-                    "Deseja fazer outra consulta ou voltar ao menu principal?",
-                    reply_markup=ReplyKeyboardMarkup(
-                        [[KeyboardButton("Nova consulta"), KeyboardButton("Voltar ao menu")]],
-                        resize_keyboard=True
-                    )
-                )
-                return
-
-        # ---------- FINANCEIRO (etapa 30 e 31) ----------
-        if atendimento.etapa == 30:
-            if texto in ["ver boletos", "ver boletos"]:
-                atendimento.registrar("financeiro_acao", "ver_boletos")
-                atendimento.etapa = 31
-                return await update.message.reply_text("Deseja alguma observação específica sobre os boletos? Descreva resumidamente (ou digite 'não'):")
-            if texto == "segunda via":
-                atendimento.registrar("financeiro_acao", "segunda_via")
-                atendimento.etapa = 31
-                return await update.message.reply_text("Informe, se quiser, o mês/competência da segunda via (ou digite 'não'):")
-            if texto == "acordo / renegociação" or texto == "acordo / renegociacao" or texto == "acordo":
-                atendimento.registrar("financeiro_acao", "acordo")
-                atendimento.etapa = 31
-                return await update.message.reply_text("Descreva a proposta de acordo (valor/parcelas) ou digite 'não':")
-            if texto == "consultar pagamentos":
-                atendimento.registrar("financeiro_acao", "consultar_pagamentos")
-                atendimento.etapa = 31
-                return await update.message.reply_text("Se quiser, escreva detalhes (período) ou digite 'não':")
-            if texto == "voltar":
-                atendimento.etapa = 20
-                return await update.message.reply_text("Voltando ao menu principal.", reply_markup=KB_STUDENT_MENU)
-            if texto == "falar com atendente":
-                atendimento.registrar("solicitacao", "falar_com_atendente_financeiro")
-                await update.message.reply_text(
-                    "👥 **Encaminhando para Financeiro**\n\n"
-                    "📧 **E-mail:** financeiro@unifecaf.edu.br\n"
-                    "📋 **Inclua em seu e-mail:**\n"
-                    "• Seu RA: " + atendimento.registros.get('ra', 'Não informado') + "\n"
-                    "• Seu curso: " + atendimento.registros.get('curso', 'Não informado') + "\n"
-                    "• Descrição detalhada da solicitação financeira\n\n"
-                    "⏰ **Prazo de retorno:** 24h úteis"
-                )
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-            # entrada livre: IA tenta entender
-            contexto = f"Aluno: RA {atendimento.registros.get('ra')}, Curso: {atendimento.registros.get('curso')}, Setor: Financeiro"
-            prompt = f"Usuário pediu algo no Financeiro: '{texto_raw}'. {contexto}. Resuma a solicitação e explique os próximos passos possíveis em linguagem natural."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_financeiro_interpretacao", ia_resp)
-            return await update.message.reply_text(f"{ia_resp}\n\nSe deseja, escolha uma opção no menu financeiro.", reply_markup=KB_FINANCEIRO)
-
-        # etapa 31: recebendo descrição para ação financeira
-        if atendimento.etapa == 31:
-            detalhe = texto_raw
-            atendimento.registrar("financeiro_detalhe", detalhe)
-            
-            # CONTEXTO COMPLETO PARA IA
-            contexto = f"""
-            DADOS DO ALUNO:
-            • RA: {atendimento.registros.get('ra', 'Não informado')}
-            • Curso: {atendimento.registros.get('curso', 'Não informado')}
-            • Ação Financeira: {atendimento.registros.get('financeiro_acao')}
-            • Detalhes: {detalhe}
-            """
-            
-            prompt = f"Processar solicitação financeira: '{detalhe}'. Forneça confirmação e próximos passos."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_financeiro_resposta", ia_resp)
-            await update.message.reply_text(ia_resp)
-            return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-        # ---------- SECRETARIA (etapa 40 e 41) ----------
-        if atendimento.etapa == 40:
-            if texto in ["reposição / recuperação", "reposição", "recuperação", "recuperacao"]:
-                atendimento.registrar("secretaria_acao", "recuperacao")
-                atendimento.etapa = 41
-                return await update.message.reply_text("Qual a disciplina / período relacionada à recuperação? Descreva:")
-            if texto == "calendário acadêmico" or texto == "calendario acadêmico" or texto == "calendario academico":
-                atendimento.registrar("secretaria_acao", "calendario")
-                await update.message.reply_text("📅 **Calendário Acadêmico**\n\nVocê pode acessar o calendário acadêmico atualizado no portal institucional da UniFECAF.")
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "horário das aulas" or texto == "horario das aulas":
-                atendimento.registrar("secretaria_acao", "horario")
-                atendimento.etapa = 41
-                return await update.message.reply_text("Informe, por favor, qual curso/turno (ex: Tarde, Noite) para buscarmos o horário:")
-            if texto == "troca de curso":
-                atendimento.registrar("secretaria_acao", "troca_curso")
-                atendimento.etapa = 41
-                return await update.message.reply_text("Para qual curso deseja trocar? Informe o nome do curso:")
-            if texto == "voltar":
-                atendimento.etapa = 20
-                return await update.message.reply_text("Voltando ao menu principal.", reply_markup=KB_STUDENT_MENU)
-            if texto == "falar com atendente":
-                atendimento.registrar("solicitacao", "falar_com_atendente_secretaria")
-                await update.message.reply_text(
-                    "👥 **Encaminhando para Secretaria**\n\n"
-                    "📧 **E-mail:** secretaria@unifecaf.edu.br\n"
-                    "📋 **Inclua em seu e-mail:**\n"
-                    "• Seu RA: " + atendimento.registros.get('ra', 'Não informado') + "\n"
-                    "• Seu curso: " + atendimento.registros.get('curso', 'Não informado') + "\n"
-                    "• Descrição detalhada da solicitação\n\n"
-                    "⏰ **Prazo de retorno:** 48h úteis"
-                )
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-            # livre -> IA interpreta
-            contexto = f"Aluno: RA {atendimento.registros.get('ra')}, Curso: {atendimento.registros.get('curso')}, Setor: Secretaria"
-            prompt = f"Solicitação para Secretaria: '{texto_raw}'. {contexto}. Explique em poucas palavras o que pode ser feito pelo bot e sugira opções."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_secretaria_interpretacao", ia_resp)
-            return await update.message.reply_text(f"{ia_resp}\n\nEscolha uma opção no menu da secretaria.", reply_markup=KB_SECRETARIA)
-
-        if atendimento.etapa == 41:
-            detalhe = texto_raw
-            atendimento.registrar("secretaria_detalhe", detalhe)
-            
-            # CONTEXTO COMPLETO PARA IA
-            contexto = f"""
-            DADOS DO ALUNO:
-            • RA: {atendimento.registros.get('ra', 'Não informado')}
-            • Curso: {atendimento.registros.get('curso', 'Não informado')}
-            • Ação Secretaria: {atendimento.registros.get('secretaria_acao')}
-            • Detalhes: {detalhe}
-            """
-            
-            prompt = f"Processar solicitação da secretaria: '{detalhe}'. Forneça confirmação e próximos passos."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_secretaria_resposta", ia_resp)
-            await update.message.reply_text(ia_resp)
-            return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-        # ---------- DOCUMENTOS (etapa 50 e 51) ----------
-        if atendimento.etapa == 50:
-            if texto in ["declaração de matrícula", "declaracao de matrícula", "declaração"]:
-                atendimento.registrar("documento_solicitado", "declaracao_matricula")
-                atendimento.etapa = 51
-                return await update.message.reply_text("Deseja receber por e-mail em PDF ou retirar na secretaria? (digite 'email' ou 'retirar')")
-            if texto in ["atestado de frequência", "atestado"]:
-                atendimento.registrar("documento_solicitado", "atestado_frequencia")
-                atendimento.etapa = 51
-                return await update.message.reply_text("Deseja receber por e-mail em PDF ou retirar na secretaria? (digite 'email' ou 'retirar')")
-            if texto in ["histórico parcial", "historico parcial", "histórico"]:
-                atendimento.registrar("documento_solicitado", "historico_parcial")
-                atendimento.etapa = 51
-                return await update.message.reply_text("Deseja receber por e-mail em PDF ou retirar na secretaria? (digite 'email' ou 'retirar')")
-            if texto == "solicitar diploma" or texto == "solicitar diploma":
-                atendimento.registrar("documento_solicitado", "diploma")
-                atendimento.etapa = 51
-                return await update.message.reply_text("Solicitação de diploma iniciada. Deseja instruções por e-mail? (digite 'sim' ou 'não')")
-            if texto == "voltar":
-                atendimento.etapa = 20
-                return await update.message.reply_text("Voltando ao menu principal.", reply_markup=KB_STUDENT_MENU)
-            if texto == "falar com atendente":
-                atendimento.registrar("solicitacao", "falar_com_atendente_documentos")
-                await update.message.reply_text(
-                    "👥 **Encaminhando para Documentos**\n\n"
-                    "📧 **E-mail:** documentos@unifecaf.edu.br\n"
-                    "📋 **Inclua em seu e-mail:**\n"
-                    "• Seu RA: " + atendimento.registros.get('ra', 'Não informado') + "\n"
-                    "• Seu curso: " + atendimento.registros.get('curso', 'Não informado') + "\n"
-                    "• Documento(s) solicitado(s)\n"
-                    "• Preferência de recebimento\n\n"
-                    "⏰ **Prazo de retorno:** 24h úteis"
-                )
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-            # livre -> IA interpreta
-            contexto = f"Aluno: RA {atendimento.registros.get('ra')}, Curso: {atendimento.registros.get('curso')}, Setor: Documentos"
-            prompt = f"Solicitação de documento: '{texto_raw}'. {contexto}. Resuma e indique opções (email/retirar/voltar)."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_documentos_interpretacao", ia_resp)
-            return await update.message.reply_text(f"{ia_resp}\n\nEscolha uma opção no menu de documentos.", reply_markup=KB_DOCUMENTOS)
-
-        if atendimento.etapa == 51:
-            escolha = texto_raw.lower()
-            atendimento.registrar("documento_preferencia", escolha)
-            
-            # CONTEXTO COMPLETO PARA IA
-            contexto = f"""
-            DADOS DO ALUNO:
-            • RA: {atendimento.registros.get('ra', 'Não informado')}
-            • Curso: {atendimento.registros.get('curso', 'Não informado')}
-            • Documento: {atendimento.registros.get('documento_solicitado')}
-            • Preferência: {escolha}
-            """
-            
-            prompt = f"Confirmar solicitação de documento com preferência: '{escolha}'. Forneça confirmação e próximos passos."
-            ia_resp = consultar_ia(prompt, contexto)
-            atendimento.registrar("ia_documentos_resposta", ia_resp)
-            await update.message.reply_text(ia_resp)
-            return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-        # ---------- VISITANTE (etapa 70) ----------
-        if atendimento.etapa == 70:
-            if texto == "ver cursos":
-                atendimento.registrar("visitante_acao", "ver_cursos")
-                # Agora usa a consulta real do CSV
-                resposta = consultar_info_curso()
-                atendimento.registrar("ia_visitante_cursos", resposta)
-                await update.message.reply_text(resposta)
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "ver valores":
-                atendimento.registrar("visitante_acao", "ver_valores")
-                prompt = "Explique brevemente como consultar valores de mensalidades e opções de bolsas/financiamento na UniFECAF."
-                ia_resp = consultar_ia(prompt)
-                atendimento.registrar("ia_visitante_valores", ia_resp)
-                await update.message.reply_text(ia_resp)
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "documentos para matrícula":
-                atendimento.registrar("visitante_acao", "documentos_matricula")
-                prompt = "Liste os documentos necessários para matrícula de graduação (RG, CPF, comprovante, histórico, etc.)"
-                ia_resp = consultar_ia(prompt)
-                atendimento.registrar("ia_visitante_docs", ia_resp)
-                await update.message.reply_text(ia_resp)
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "como se inscrever":
-                atendimento.registrar("visitante_acao", "como_inscrever")
-                prompt = "Explique o processo de inscrição (link, provas, ENEM, contato) na UniFECAF de forma clara e convidativa."
-                ia_resp = consultar_ia(prompt)
-                atendimento.registrar("ia_visitante_inscricao", ia_resp)
-                await update.message.reply_text(ia_resp)
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "falar com consultor":
-                atendimento.registrar("visitante_acao", "falar_consultor")
-                await update.message.reply_text(
-                    "👥 **Falar com Consultor**\n\n"
-                    "📧 **E-mail:** comercial@unifecaf.edu.br\n"
-                    "📞 **Telefone:** (11) 1234-5678\n"
-                    "🕒 **Horário:** Segunda a sexta, 8h às 18h\n\n"
-                    "Nossa equipe comercial terá prazer em tirar suas dúvidas!"
-                )
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-            if texto == "cancelar":
-                await update.message.reply_text("Atendimento cancelado.")
-                return await encerrar_e_limpar_atendimento(update, atendimento, user)
-
-            # livre -> IA
-            prompt = f"Visitante escreveu: '{texto_raw}'. Resuma a intenção e sugira as opções do menu de visitante."
-            ia_resp = consultar_ia(prompt)
-            atendimento.registrar("ia_visitante_interpretacao", ia_resp)
-            return await update.message.reply_text(f"{ia_resp}\n\nEscolha uma opção ou digite 'Cancelar'.", reply_markup=KB_VISITOR)
-
-        # ---------- CASO NÃO MAPEADO: direciona para e-mail e encerra ----------
-        await update.message.reply_text(
-            "❌ **Não foi possível processar automaticamente**\n\n"
-            "👥 **Atendimento Humano**\n"
-            "📧 **E-mail:** atendimento@unifecaf.edu.br\n"
-            "📋 **Inclua:**\n"
-            "• Seu RA: " + atendimento.registros.get('ra', 'Não informado') + "\n"
-            "• Descrição detalhada do pedido\n\n"
-            "⏰ **Retorno em até 24h úteis**"
-        )
-        return await encerrar_e_limpar_atendimento(update, atendimento, user)
+        # etapa atual + texto normalizado -> opção definida em menus.json
+        with tempo_etapa.cronometrar(atendimento.etapa):
+            await motor.processar(Turno(update, context, atendimento, texto_raw))
 
     except Exception as e:
         logger.error(f"Erro no processamento da mensagem: {e}")
-        await update.message.reply_text(
+        await envio.enviar(
+            update.message,
             "❌ **Erro interno do sistema**\n\n"
             "Desculpe, ocorreu um erro inesperado. "
             "Por favor, tente novamente ou entre em contato:\n"
             "📧 atendimento@unifecaf.edu.br"
         )
+    finally:
+        # grava etapa/registros do turno (no SQLite o objeto é uma cópia)
+        if not atendimento.encerrado:
+            atendimentos.salvar(atendimento)
+
+# ---------- ciclo de vida da aplicação ----------
+async def aquecer_conexoes(app, conexoes: int) -> dict:
+    """Abre conexões com o Telegram (getMe) e com a OpenAI em paralelo, antes do primeiro update."""
+    async def no_telegram():
+        resultados = await asyncio.gather(*(app.bot.get_me() for _ in range(min(conexoes, ENVIO_CONEXOES))),
+                                          return_exceptions=True)
+        return sum(not isinstance(r, Exception) for r in resultados)
+
+    abertas_telegram, abertas_openai = await asyncio.gather(no_telegram(), aquecer_openai(conexoes))
+    return {"telegram": abertas_telegram, "openai": abertas_openai}
+
+async def ao_iniciar(app):
+    """
+    Executado pelo python-telegram-bot antes de começar a receber updates:
+    o import do bot não carrega catálogo, clientes nem modelos, tudo
+    acontece aqui (ou no primeiro uso, fora do bot).
+    """
+    inicio = time.perf_counter()
+    preparo = inicializar()
+    if motor.intencoes:
+        motor.intencoes.preparar()
+    if AQUECER_CONEXOES > 0:
+        preparo["conexoes"] = await aquecer_conexoes(app, AQUECER_CONEXOES)
+    preparo["total_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    logger.info(f"Inicialização (catálogo, OpenAI, intenções, aquecimento): {preparo}")
+    logger.info(f"Catálogo de cursos: {estado_catalogo()}")
+    await auditoria.iniciar()
+    if CATALOGO_RECARGA_INTERVALO > 0:
+        tarefas_fundo.append(asyncio.create_task(vigiar_catalogo(CATALOGO_RECARGA_INTERVALO)))
+    tarefas_fundo.append(asyncio.create_task(vigiar_sessoes(atendimentos)))
+    tarefas_fundo.extend(iniciar_exportacao())
+    if isinstance(app.update_processor, DespachoPorUsuario):
+        despacho = app.update_processor
+        metricas.medidor("chatbot_updates_em_execucao", "Updates com handler rodando", lambda: despacho.em_execucao)
+        metricas.medidor("chatbot_updates_aguardando", "Updates esperando a vez do usuário ou o limite",
+                         lambda: despacho.estatisticas()["aguardando"])
+
+async def ao_parar(app):
+    """Executado pelo python-telegram-bot depois dos handlers, antes de fechar o bot: entrega a fila."""
+    await envio.encerrar()
+    logger.info(f"Envio das respostas (fila/agrupamento/429): {envio.estatisticas()}")
+
+async def ao_encerrar(app):
+    """Executado pelo python-telegram-bot no desligamento."""
+    for tarefa in tarefas_fundo:
+        tarefa.cancel()
+    await auditoria.encerrar()
+    logger.info(f"Cache de respostas IA: {cache_respostas.estatisticas()}")
+    logger.info(f"Cache semântico: {cache_semantico.estatisticas()}")
+    logger.info(f"Latência da IA em streaming (TTFT/total): {latencias_ia.estatisticas()}")
+    logger.info(f"Tokens de entrada da IA por categoria: {tokens_prompt.estatisticas()}")
+    logger.info(f"Uso por modelo de prompt (tokens/cache/latência): {uso_prompts.estatisticas()}")
+    logger.info(f"Cliente da IA (repetições/hedge/disjuntor): {cliente_ia.estatisticas()}")
+    logger.info(f"Consultas iguais compartilhadas (single-flight): {coalescencia.estatisticas()}")
+    logger.info(f"Rotas da IA (modelo/latência/tokens/rebaixamentos): {rotas_ia.estatisticas()}")
+    if motor.intencoes:
+        logger.info(f"Intenções sem IA: {motor.intencoes.estatisticas(latencias_ia.mediana('total'))}")
+    logger.info(f"Sessões: {atendimentos.estatisticas()}")
+    if isinstance(app.update_processor, DespachoPorUsuario):
+        logger.info(f"Despacho por usuário (fila/espera): {app.update_processor.estatisticas()}")
+    cache_respostas.salvar()
+    encerrar_exportacao()
 
 # ---------- MAIN ----------
+def criar_aplicacao():
+    """Application com os handlers do bot (a mesma no polling e no webhook)."""
+    # updates de um mesmo aluno mexem no mesmo atendimento (etapa, registros):
+    # em paralelo, só com a vez de cada usuário garantida pelo despacho
+    concorrencia = (DespachoPorUsuario(BOT_UPDATES_CONCORRENTES, BOT_UPDATES_EM_ESPERA)
+                    if BOT_UPDATES_CONCORRENTES > 1 else False)
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_TOKEN)
+        .base_url(TELEGRAM_API_URL)
+        .concurrent_updates(concorrencia)
+        .connection_pool_size(ENVIO_CONEXOES)
+        .pool_timeout(ENVIO_ESPERA_CONEXAO)
+        .post_init(ao_iniciar)
+        .post_stop(ao_parar)
+        .post_shutdown(ao_encerrar)
+        .build()
+    )
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("cursos", cursos_command))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, mensagem))
+    return app
+
+
 def main():
     if not TELEGRAM_TOKEN:
         logging.error("TELEGRAM_TOKEN não encontrado no .env")
         return
-
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("cursos", cursos_command))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, mensagem))
+    if not OPENAI_KEY:
+        logging.error("OPENAI_API_KEY não encontrada no .env")
+        return
 
     print("🤖 BOT UNIFECAF RODANDO...")
-    logger.info("Bot iniciado com sucesso!")
-    app.run_polling()
+    logger.info(f"Bot iniciado com sucesso! (modo {BOT_MODO})")
+    # cada modo importa só o que usa (aiohttp no webhook e no supervisor)
+    if BOT_MODO == "webhook":
+        from webhook import WEBHOOK_WORKERS, executar_webhook
+        try:
+            if WEBHOOK_WORKERS > 1:
+                # vários workers só pelo supervisor: o mesmo usuário sempre no mesmo processo
+                from supervisor import executar_supervisor
+                executar_supervisor(criar_aplicacao, TELEGRAM_TOKEN, TELEGRAM_API_URL,
+                                    workers=WEBHOOK_WORKERS, entrada="webhook")
+            else:
+                executar_webhook(criar_aplicacao)
+        except (ValueError, RuntimeError) as e:
+            logging.error(f"Modo webhook: {e}")
+    elif BOT_MODO == "supervisor":
+        from supervisor import executar_supervisor
+        try:
+            executar_supervisor(criar_aplicacao, TELEGRAM_TOKEN, TELEGRAM_API_URL)
+        except (ValueError, RuntimeError) as e:
+            logging.error(f"Modo supervisor: {e}")
+    else:
+        criar_aplicacao().run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
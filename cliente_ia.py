@@ -0,0 +1,287 @@
+# ============================================
+#      CLIENTE DA OPENAI COM PRAZO, REPETIÇÃO E DISJUNTOR
+# ============================================
+
+import os
+import time
+import random
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# prazo total (s) de uma consulta, somando tentativas e esperas
+IA_PRAZO = float(os.getenv("IA_PRAZO", "20"))
+
+# prazo (s) de cada tentativa; estourou, tenta de novo se ainda houver prazo
+IA_PRAZO_TENTATIVA = float(os.getenv("IA_PRAZO_TENTATIVA", "10"))
+
+# tentativas por consulta (1 = sem repetição) e espera exponencial entre elas
+IA_TENTATIVAS = int(os.getenv("IA_TENTATIVAS", "3"))
+IA_ESPERA_BASE = float(os.getenv("IA_ESPERA_BASE", "0.5"))
+IA_ESPERA_MAX = float(os.getenv("IA_ESPERA_MAX", "4"))
+
+# requisição de reserva (hedge) se a primeira passar de N s; 0 desativa.
+# Só sem stream e limitada a uma fração das consultas.
+IA_HEDGE_APOS = float(os.getenv("IA_HEDGE_APOS", "0"))
+IA_HEDGE_MAX_FRACAO = float(os.getenv("IA_HEDGE_MAX_FRACAO", "0.1"))
+
+# disjuntor: abre após N falhas seguidas e fica aberto por N s
+IA_DISJUNTOR_FALHAS = int(os.getenv("IA_DISJUNTOR_FALHAS", "5"))
+IA_DISJUNTOR_PAUSA = float(os.getenv("IA_DISJUNTOR_PAUSA", "30"))
+
+
+class IAIndisponivel(Exception):
+    """Disjuntor aberto ou prazo esgotado: quem chamou usa o fallback da categoria."""
+
+
+def erro_transitorio(erro: Exception) -> bool:
+    """Vale tentar de novo? Rede, prazo, 408/409/429 e 5xx; cota esgotada não."""
+    import openai  # já carregado por quem criou o cliente; fora do import do bot (~1 s)
+
+    if isinstance(erro, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(erro, openai.APIStatusError):
+        if getattr(erro, "code", None) == "insufficient_quota":
+            return False
+        return erro.status_code in (408, 409, 429) or erro.status_code >= 500
+    return False
+
+
+def _espera_pedida(erro: Exception) -> float:
+    """Retry-After da resposta (a OpenAI manda retry-after-ms), em segundos."""
+    resposta = getattr(erro, "response", None)
+    if resposta is None:
+        return 0.0
+    try:
+        if "retry-after-ms" in resposta.headers:
+            return float(resposta.headers["retry-after-ms"]) / 1000
+        return float(resposta.headers.get("retry-after", 0))
+    except ValueError:
+        return 0.0
+
+
+# =======================================================
+#   DISJUNTOR (CIRCUIT BREAKER)
+# =======================================================
+class Disjuntor:
+    """
+    fechado: chamadas passam. aberto: recusa tudo até passar a pausa.
+    meio-aberto: deixa uma chamada de sonda passar; se ela der certo o
+    disjuntor fecha, se falhar abre de novo.
+    """
+
+    FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio_aberto"
+
+    def __init__(self, falhas: int = IA_DISJUNTOR_FALHAS, pausa: float = IA_DISJUNTOR_PAUSA, relogio=time.monotonic):
+        self.limite_falhas = falhas
+        self.pausa = pausa
+        self._relogio = relogio
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self._fechar_em = 0.0
+        self._sonda = False
+        self.aberturas = 0
+        self.recusadas = 0
+
+    def permitir(self) -> bool:
+        if self.estado == self.ABERTO and self._relogio() >= self._fechar_em:
+            self.estado, self._sonda = self.MEIO_ABERTO, False
+        if self.estado == self.FECHADO:
+            return True
+        if self.estado == self.MEIO_ABERTO and not self._sonda:
+            self._sonda = True
+            return True
+        self.recusadas += 1
+        return False
+
+    def registrar(self, sucesso):
+        """True = a API respondeu bem; False = falha transitória; None = nada a concluir."""
+        if sucesso is None:
+            self._sonda = False
+        elif sucesso:
+            if self.estado != self.FECHADO:
+                logger.info("Disjuntor da IA fechado: API respondendo de novo")
+            self.estado, self.falhas_seguidas, self._sonda = self.FECHADO, 0, False
+        else:
+            self.falhas_seguidas += 1
+            if self.estado == self.MEIO_ABERTO or self.falhas_seguidas >= self.limite_falhas:
+                self._abrir()
+
+    def _abrir(self):
+        if self.estado != self.ABERTO:
+            self.aberturas += 1
+            logger.warning(f"Disjuntor da IA aberto por {self.pausa:.0f}s após {self.falhas_seguidas} falhas seguidas")
+        self.estado, self._sonda = self.ABERTO, False
+        self._fechar_em = self._relogio() + self.pausa
+
+
+# =======================================================
+#   CLIENTE RESILIENTE
+# =======================================================
+class ClienteIAResiliente:
+    """
+    Envolve chat.completions.create com prazo total, repetição com espera
+    exponencial e jitter (só para erros transitórios), disjuntor e, se
+    configurado, uma requisição de reserva para cortar a cauda de latência.
+
+    O cliente OpenAI é passado a cada chamada (o bot troca o async_client
+    nos testes), e o cliente precisa estar com max_retries=0: as repetições
+    ficam todas aqui.
+    """
+
+    def __init__(self, prazo: float = IA_PRAZO, prazo_tentativa: float = IA_PRAZO_TENTATIVA,
+                 tentativas: int = IA_TENTATIVAS, espera_base: float = IA_ESPERA_BASE,
+                 espera_max: float = IA_ESPERA_MAX, hedge_apos: float = IA_HEDGE_APOS,
+                 hedge_max_fracao: float = IA_HEDGE_MAX_FRACAO, disjuntor: Disjuntor = None,
+                 aleatorio=random.random):
+        self.prazo = prazo
+        self.prazo_tentativa = prazo_tentativa
+        self.tentativas = max(1, tentativas)
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.hedge_apos = hedge_apos
+        self.hedge_max_fracao = hedge_max_fracao
+        self.disjuntor = disjuntor or Disjuntor()
+        self._aleatorio = aleatorio
+        self.contadores = dict.fromkeys(
+            ("chamadas", "requisicoes", "repeticoes", "hedges", "hedges_vencedores", "prazos_estourados", "falhas"), 0
+        )
+
+    def estatisticas(self) -> dict:
+        return {**self.contadores, "disjuntor": self.disjuntor.estado,
+                "aberturas": self.disjuntor.aberturas, "recusadas": self.disjuntor.recusadas}
+
+    def espera(self, tentativa: int, erro: Exception = None) -> float:
+        """Espera antes da próxima tentativa: 'full jitter', ou o Retry-After se for maior."""
+        teto = min(self.espera_max, self.espera_base * 2 ** (tentativa - 1))
+        return max(self._aleatorio() * teto, _espera_pedida(erro) if erro else 0.0)
+
+    async def criar(self, cliente, prazo: float = None, **parametros):
+        """
+        chat.completions.create resiliente. Levanta IAIndisponivel com o
+        disjuntor aberto ou o prazo esgotado, e repassa o último erro quando
+        ele não é transitório ou as tentativas acabaram.
+
+        prazo substitui o prazo total do cliente nesta consulta (rotas da IA).
+        Com stream=True a resposta é um iterador cujo próximo pedaço também
+        respeita o prazo total.
+        """
+        self.contadores["chamadas"] += 1
+        prazo = prazo or self.prazo
+        limite = time.monotonic() + prazo
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                resposta = await self._com_reserva(cliente, parametros, limite)
+                if parametros.get("stream"):
+                    return self._stream_com_prazo(resposta, limite)
+                return resposta
+            except IAIndisponivel:
+                raise
+            except Exception as e:
+                if not erro_transitorio(e) or tentativa == self.tentativas:
+                    self.contadores["falhas"] += 1
+                    raise
+                espera = self.espera(tentativa, e)
+                if time.monotonic() + espera >= limite:
+                    self.contadores["falhas"] += 1
+                    raise IAIndisponivel(f"prazo de {prazo:.0f}s esgotado ({type(e).__name__})") from e
+                self.contadores["repeticoes"] += 1
+                logger.warning(f"IA: tentativa {tentativa} falhou ({type(e).__name__}); nova em {espera:.2f}s")
+                await asyncio.sleep(espera)
+
+    async def _requisicao(self, cliente, parametros: dict, limite: float):
+        """Uma requisição à API, com o prazo da tentativa e o registro no disjuntor."""
+        restante = min(self.prazo_tentativa, limite - time.monotonic())
+        if restante <= 0:
+            raise IAIndisponivel("prazo da consulta esgotado")
+        if not self.disjuntor.permitir():
+            raise IAIndisponivel("disjuntor aberto: API da OpenAI instável")
+        self.contadores["requisicoes"] += 1
+        resultado = None
+        try:
+            resposta = await asyncio.wait_for(cliente.chat.completions.create(**parametros), restante)
+            resultado = True
+            return resposta
+        except asyncio.TimeoutError:
+            self.contadores["prazos_estourados"] += 1
+            resultado = False
+            raise
+        except Exception as e:
+            resultado = False if erro_transitorio(e) else None
+            raise
+        finally:
+            self.disjuntor.registrar(resultado)
+
+    async def _com_reserva(self, cliente, parametros: dict, limite: float):
+        """Dispara a reserva se a primeira demorar; fica com a que responder bem primeiro."""
+        usar_reserva = (
+            self.hedge_apos > 0 and not parametros.get("stream")
+            and self.contadores["hedges"] < self.hedge_max_fracao * self.contadores["chamadas"]
+        )
+        if not usar_reserva:
+            return await self._requisicao(cliente, parametros, limite)
+
+        primeira = asyncio.ensure_future(self._requisicao(cliente, parametros, limite))
+        tarefas = [primeira]
+        try:
+            concluidas, _ = await asyncio.wait(tarefas, timeout=self.hedge_apos)
+            if concluidas:
+                return primeira.result()
+
+            self.contadores["hedges"] += 1
+            tarefas.append(asyncio.ensure_future(self._requisicao(cliente, parametros, limite)))
+            pendentes, erro = set(tarefas), None
+            while pendentes:
+                concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in concluidas:
+                    if tarefa.exception() is None:
+                        if tarefa is not primeira:
+                            self.contadores["hedges_vencedores"] += 1
+                        return tarefa.result()
+                    erro = erro or tarefa.exception()
+            raise erro
+        finally:
+            for tarefa in tarefas:
+                if not tarefa.done():
+                    tarefa.cancel()
+
+    async def _stream_com_prazo(self, stream, limite: float):
+        """Repassa os eventos do stream; se o próximo não chegar no prazo, desiste."""
+        iterador = stream.__aiter__()
+        try:
+            while True:
+                restante = limite - time.monotonic()
+                try:
+                    evento = await asyncio.wait_for(iterador.__anext__(), max(restante, 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.contadores["prazos_estourados"] += 1
+                    raise IAIndisponivel("prazo da consulta esgotado no meio da resposta") from None
+                yield evento
+        finally:
+            fechar = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+            if fechar:
+                await fechar()
+
+    def criar_sincrono(self, cliente, **parametros):
+        """
+        Versão para o cliente síncrono (consultar_ia): só o disjuntor; prazo
+        e repetições ficam com o próprio SDK (timeout/max_retries do cliente).
+        """
+        self.contadores["chamadas"] += 1
+        if not self.disjuntor.permitir():
+            raise IAIndisponivel("disjuntor aberto: API da OpenAI instável")
+        self.contadores["requisicoes"] += 1
+        resultado = None
+        try:
+            resposta = cliente.chat.completions.create(**parametros)
+            resultado = True
+            return resposta
+        except Exception as e:
+            self.contadores["falhas"] += 1
+            resultado = False if erro_transitorio(e) else None
+            raise
+        finally:
+            self.disjuntor.registrar(resultado)
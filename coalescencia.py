@@ -0,0 +1,183 @@
+# ============================================
+#   CONSULTAS IGUAIS EM ANDAMENTO VIRAM UMA SÓ (SINGLE-FLIGHT)
+# ============================================
+# Quando muitos usuários pedem a mesma coisa ao mesmo tempo (um aviso vai
+# para o campus inteiro e todos apertam "Como se inscrever"), o cache ainda
+# está vazio e cada um faria a própria chamada à OpenAI. Aqui a primeira
+# consulta de uma chave vira um "voo": uma tarefa separada que faz a chamada
+# e guarda as partes que vão chegando. Quem pede a mesma chave enquanto o voo
+# está no ar embarca nele: recebe as partes que já vieram e depois as novas,
+# sem outra chamada.
+#
+# A chamada não pertence a nenhum usuário: quem desiste (cancelado, conexão
+# caiu, parou de ler o stream) só desembarca, e o voo segue para os demais.
+# Só quando todos desistem a chamada é cancelada. O prazo é o da própria
+# chamada (IA_PRAZO no cliente_ia, contado a partir do primeiro pedido), então
+# quem embarca depois nunca espera mais do que esperaria sozinho. Erro na
+# chamada chega a todos que estão no voo, e cada um usa o próprio fallback.
+
+import os
+import asyncio
+
+# junta consultas iguais em andamento numa chamada só (0 desativa: cada uma chama a IA)
+IA_COALESCER = os.getenv("IA_COALESCER", "1") == "1"
+
+
+class _Voo:
+    """Uma chamada em andamento: as partes que já chegaram, quem está lendo e a tarefa que busca o resto."""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.partes = []
+        self.leitores = 0
+        self.fim = False
+        self.erro = None
+        self.novidade = asyncio.Event()
+        self.tarefa = None
+
+    async def produzir(self, gerar):
+        try:
+            async for parte in gerar():
+                self.partes.append(parte)
+                self._avisar()
+        except Exception as e:  # entregue a cada leitor em Leitura.__anext__
+            self.erro = e
+        except asyncio.CancelledError:
+            # todos desistiram (ninguém lê mais) ou o loop está encerrando
+            self.erro = RuntimeError("chamada compartilhada cancelada")
+            raise
+        finally:
+            self.fim = True
+            self._avisar()
+
+    def _avisar(self):
+        novidade, self.novidade = self.novidade, asyncio.Event()
+        novidade.set()
+
+
+class Leitura:
+    """
+    Um lugar num voo: `async for parte in leitura`. Embarca na primeira
+    parte pedida; .coalescida diz se pegou carona num voo que já estava no
+    ar. Quem para de ler antes do fim chama fechar() (pode chamar sempre).
+    """
+
+    def __init__(self, coalescedor: "Coalescedor", chave, gerar):
+        self._coalescedor = coalescedor
+        self._chave = chave
+        self._gerar = gerar
+        self._voo = None
+        self._lidas = 0
+        self._fechada = False
+        self.coalescida = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._voo is None:
+            self._voo, self.coalescida = self._coalescedor._embarcar(self._chave, self._gerar)
+        voo = self._voo
+        try:
+            while self._lidas == len(voo.partes) and not voo.fim:
+                await voo.novidade.wait()
+        except asyncio.CancelledError:
+            self.fechar()
+            raise
+        if self._lidas < len(voo.partes):
+            self._lidas += 1
+            return voo.partes[self._lidas - 1]
+        self.fechar()
+        if voo.erro is not None:
+            raise voo.erro
+        raise StopAsyncIteration
+
+    def fechar(self):
+        if self._voo is not None and not self._fechada:
+            self._fechada = True
+            self._coalescedor._desembarcar(self._voo)
+
+
+class Coalescedor:
+    """
+    Single-flight por chave. transmitir() serve para geradores assíncronos
+    (stream: cada parte é repassada a todos os leitores assim que chega);
+    executar(), para uma corrotina com um resultado só.
+    Chave None ou coalescedor desativado: cada pedido tem o próprio voo.
+    """
+
+    def __init__(self, ativo: bool = IA_COALESCER):
+        self.ativo = ativo
+        self._em_voo = {}
+        self.contadores = {
+            "lideres": 0,       # pedidos que fizeram a chamada
+            "coalescidas": 0,   # pedidos que pegaram carona numa chamada em andamento
+            "desistencias": 0,  # leitores que saíram antes do fim
+            "abandonadas": 0,   # chamadas canceladas porque todos desistiram
+            "falhas": 0,        # chamadas que terminaram em erro (entregue a todos os leitores)
+        }
+        self.maior_voo = 0
+
+    def transmitir(self, chave, gerar) -> Leitura:
+        """Partes de gerar() (função que cria o gerador assíncrono), compartilhadas por chave."""
+        return Leitura(self, chave, gerar)
+
+    async def executar(self, chave, funcao):
+        """(resultado de await funcao(), coalescida), compartilhado por chave."""
+        async def gerar():
+            yield await funcao()
+
+        leitura = self.transmitir(chave, gerar)
+        try:
+            resultado = [parte async for parte in leitura]
+        finally:
+            leitura.fechar()
+        return resultado[0], leitura.coalescida
+
+    # ---- VOOS ----
+    def _embarcar(self, chave, gerar):
+        voo = self._em_voo.get(chave) if self.ativo and chave is not None else None
+        coalescida = voo is not None
+        if voo is None:
+            voo = _Voo(chave)
+            voo.tarefa = asyncio.ensure_future(voo.produzir(gerar))
+            voo.tarefa.add_done_callback(lambda _: self._pousar(voo))
+            if self.ativo and chave is not None:
+                self._em_voo[chave] = voo
+            self.contadores["lideres"] += 1
+        else:
+            self.contadores["coalescidas"] += 1
+        voo.leitores += 1
+        self.maior_voo = max(self.maior_voo, voo.leitores)
+        return voo, coalescida
+
+    def _desembarcar(self, voo: _Voo):
+        voo.leitores -= 1
+        if voo.fim:
+            return
+        self.contadores["desistencias"] += 1
+        if voo.leitores == 0:
+            # ninguém mais quer a resposta: libera a chamada (e a vaga no semáforo)
+            self.contadores["abandonadas"] += 1
+            self._tirar_do_ar(voo)
+            voo.tarefa.cancel()
+
+    def _pousar(self, voo: _Voo):
+        self._tirar_do_ar(voo)
+        if voo.erro is not None and not voo.tarefa.cancelled():
+            self.contadores["falhas"] += 1
+
+    def _tirar_do_ar(self, voo: _Voo):
+        # quem chegar depois começa um voo novo (o cache já deve ter a resposta)
+        if self._em_voo.get(voo.chave) is voo:
+            del self._em_voo[voo.chave]
+
+    def estatisticas(self) -> dict:
+        pedidos = self.contadores["lideres"] + self.contadores["coalescidas"]
+        return {
+            "ativo": self.ativo,
+            **self.contadores,
+            "em_andamento": len(self._em_voo),
+            "maior_voo": self.maior_voo,
+            "economia": round(self.contadores["coalescidas"] / pedidos, 3) if pedidos else 0.0,
+        }
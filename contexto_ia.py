@@ -0,0 +1,160 @@
+# ============================================
+#      CONTEXTO DOS CURSOS PARA A IA (COM ORÇAMENTO DE TOKENS)
+# ============================================
+
+import os
+import re
+import logging
+
+from catalogo import obter_catalogo
+
+try:
+    import tiktoken
+except ImportError:  # contagem aproximada sem o tiktoken
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# máximo de tokens do trecho do catálogo anexado ao prompt
+CONTEXTO_MAX_TOKENS = int(os.getenv("IA_CONTEXTO_MAX_TOKENS", "400"))
+
+# codificação do gpt-4o / gpt-4o-mini
+CODIFICACAO_TOKENS = os.getenv("IA_CODIFICACAO_TOKENS", "o200k_base")
+
+# tokens fixos que a API soma por mensagem do chat
+TOKENS_POR_MENSAGEM = 4
+
+_PEDACOS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_codificador = None
+
+
+# =======================================================
+#   CONTAGEM DE TOKENS
+# =======================================================
+def _obter_codificador():
+    global _codificador
+    if _codificador is None and tiktoken is not None:
+        try:
+            _codificador = tiktoken.get_encoding(CODIFICACAO_TOKENS)
+        except Exception as e:  # sem rede para baixar o vocabulário, por exemplo
+            logger.warning(f"tiktoken indisponível ({e}); usando contagem aproximada")
+            _codificador = False
+    return _codificador or None
+
+
+def contar_tokens(texto: str) -> int:
+    """
+    Tokens do texto pelo tokenizador do modelo (tiktoken), ou uma
+    aproximação local: cada pontuação/emoji conta 1 e cada palavra conta
+    um token a cada 4 caracteres.
+    """
+    codificador = _obter_codificador()
+    if codificador:
+        return len(codificador.encode(texto))
+    return sum(1 if not p[0].isalnum() else (len(p) + 3) // 4 for p in _PEDACOS.findall(texto))
+
+
+def contar_tokens_mensagens(mensagens: list) -> int:
+    return sum(contar_tokens(m["content"]) + TOKENS_POR_MENSAGEM for m in mensagens)
+
+
+class TokensPorCategoria:
+    """Tokens de entrada enviados à OpenAI, por categoria de atendimento."""
+
+    def __init__(self):
+        self._tokens = {}
+
+    def registrar(self, categoria: str, tokens: int):
+        self._tokens.setdefault(categoria, []).append(tokens)
+        if len(self._tokens[categoria]) > 1000:
+            del self._tokens[categoria][:500]
+
+    def estatisticas(self) -> dict:
+        resumo = {}
+        for categoria, tokens in sorted(self._tokens.items()):
+            ordenados = sorted(tokens)
+            resumo[categoria] = {
+                "chamadas": len(ordenados),
+                "media": round(sum(ordenados) / len(ordenados), 1),
+                "p95": ordenados[int(len(ordenados) * 0.95)],
+            }
+        return resumo
+
+
+tokens_prompt = TokensPorCategoria()
+
+
+# =======================================================
+#   TRECHO RELEVANTE DO CATÁLOGO
+# =======================================================
+class _Orcamento:
+    """Junta linhas de contexto até o limite de tokens."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self.usados = 0
+        self.linhas = []
+
+    def caber(self, linha: str) -> bool:
+        tokens = contar_tokens(linha) + 1  # + quebra de linha
+        if self.usados + tokens > self.limite:
+            return False
+        self.linhas.append(linha)
+        self.usados += tokens
+        return True
+
+    def caber_lista(self, prefixo: str, itens) -> bool:
+        """Coloca o máximo de itens que couber; '…' indica que a lista foi cortada."""
+        itens = list(itens)
+        fixo = contar_tokens(prefixo) + 1
+        disponivel = self.limite - self.usados - fixo
+        custos = []
+        total = 0
+        for item in itens:
+            custo = contar_tokens(item) + 1  # + separador
+            if total + custo > disponivel:
+                break
+            custos.append(custo)
+            total += custo
+        completa = len(custos) == len(itens)
+        if not completa:
+            while custos and total + 2 > disponivel:  # espaço para "; …"
+                total -= custos.pop()
+            total += 2
+        if not custos:
+            return False
+        self.linhas.append(prefixo + "; ".join(itens[:len(custos)]) + ("" if completa else "; …"))
+        self.usados += fixo + total
+        return completa
+
+
+def montar_contexto_cursos(pergunta: str, orcamento: int = None, catalogo=None) -> str:
+    """
+    Só a parte do catálogo que a pergunta pede, dentro do orçamento:
+    1) semestres das disciplinas citadas; 2) cursos citados (pelo nome ou
+    apelido) — o semestre citado ou, se nenhum, os semestres em ordem;
+    3) os nomes dos cursos oferecidos, com o que sobrar do orçamento.
+    """
+    catalogo = catalogo or obter_catalogo()
+    cursos, indice = catalogo.cursos, catalogo.indice
+    contexto = _Orcamento(orcamento or CONTEXTO_MAX_TOKENS)
+    incluidos = set()
+
+    def semestre(curso, nome_semestre) -> bool:
+        if (curso, nome_semestre) in incluidos:
+            return True
+        incluidos.add((curso, nome_semestre))
+        return contexto.caber_lista(f"{curso} | {nome_semestre}: ", cursos[curso][nome_semestre])
+
+    for _, curso, nome_semestre in indice.disciplinas_citadas(pergunta):
+        semestre(curso, nome_semestre)
+
+    citados = dict.fromkeys(indice.cursos_citados(pergunta) + indice.apelidos_citados(pergunta))
+    for curso in citados:
+        citado = indice.semestre_citado(curso, pergunta)
+        for nome_semestre in ([citado] if citado else cursos[curso]):
+            if not semestre(curso, nome_semestre):
+                break
+
+    contexto.caber_lista("Cursos oferecidos: ", cursos)
+    return "\n".join(contexto.linhas)
@@ -0,0 +1,119 @@
+# ============================================
+#   DESPACHO DOS UPDATES: EM ORDEM POR USUÁRIO, EM PARALELO ENTRE USUÁRIOS
+# ============================================
+# Com updates concorrentes, dois toques seguidos do mesmo aluno rodariam o
+# handler ao mesmo tempo sobre o mesmo atendimento (etapa, registros). Aqui
+# cada usuário tem a sua vez: o segundo update só começa quando o primeiro
+# termina, enquanto usuários diferentes seguem em paralelo até o limite.
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class _FilaUsuario:
+    """Vez de um usuário: o lock (FIFO) e quantos updates dele estão pendentes."""
+
+    __slots__ = ("lock", "pendentes")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pendentes = 0
+
+
+class DespachoPorUsuario(BaseUpdateProcessor):
+    """
+    Update processor do python-telegram-bot (ApplicationBuilder.concurrent_updates).
+
+    limite: handlers rodando ao mesmo tempo (usuários diferentes).
+    em_espera: updates aceitos ainda não terminados (inclui os que esperam a vez);
+    passado esse número o próprio python-telegram-bot segura a fila.
+
+    O limite de execução é pego só depois da vez do usuário: um aluno que
+    manda dez mensagens seguidas não ocupa dez vagas dos outros. A fila de um
+    usuário some do dicionário assim que ele não tem mais nada pendente.
+    """
+
+    def __init__(self, limite: int, em_espera: int = 1000, amostras: int = 1000):
+        super().__init__(max(limite, em_espera))
+        self.limite = limite
+        self._execucao = asyncio.BoundedSemaphore(limite)
+        self._filas = {}
+        self._esperas = deque(maxlen=amostras)
+        self.processados = 0
+        self.serializados = 0          # updates que esperaram outro do mesmo usuário
+        self.profundidade_max = 0      # maior fila de um único usuário
+        self.em_execucao = 0
+        self._aceitos = 0
+
+    @staticmethod
+    def _chave(update: object):
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        chegada = time.perf_counter()
+        chave = self._chave(update)
+        self._aceitos += 1
+        if chave is None:  # sem usuário nem chat: só o limite global
+            try:
+                async with self._execucao:
+                    return await self._executar(coroutine, chegada)
+            finally:
+                self._aceitos -= 1
+
+        fila = self._filas.get(chave)
+        if fila is None:
+            fila = self._filas[chave] = _FilaUsuario()
+        fila.pendentes += 1
+        if fila.pendentes > 1:
+            self.serializados += 1
+            self.profundidade_max = max(self.profundidade_max, fila.pendentes)
+        try:
+            async with fila.lock:
+                async with self._execucao:
+                    await self._executar(coroutine, chegada)
+        finally:
+            self._aceitos -= 1
+            fila.pendentes -= 1
+            if not fila.pendentes:
+                del self._filas[chave]
+
+    async def _executar(self, coroutine, chegada: float):
+        self._esperas.append((time.perf_counter() - chegada) * 1000)
+        self.em_execucao += 1
+        try:
+            await coroutine
+        finally:
+            self.em_execucao -= 1
+            self.processados += 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._filas:
+            logger.warning(f"Despacho encerrado com {len(self._filas)} usuários ainda na fila")
+
+    def estatisticas(self) -> dict:
+        esperas = sorted(self._esperas)
+        return {
+            "processados": self.processados,
+            "em_execucao": self.em_execucao,
+            "usuarios_com_fila": len(self._filas),
+            "aguardando": self._aceitos - self.em_execucao,  # esperando a vez (do usuário ou do limite)
+            "profundidade_max_usuario": self.profundidade_max,
+            "serializados": self.serializados,
+            "espera_p50_ms": round(esperas[len(esperas) // 2], 1) if esperas else None,
+            "espera_p95_ms": round(esperas[int(len(esperas) * 0.95)], 1) if esperas else None,
+        }
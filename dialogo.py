@@ -0,0 +1,209 @@
+# ============================================
+#      MOTOR DE DIÁLOGO (MENUS DEFINIDOS EM DADOS)
+# ============================================
+
+import os
+import json
+import logging
+
+from normalizacao import normalizar_texto
+from bot_faculdade import (
+    consultar_ia_async,
+    consultar_ia_stream,
+    interpretar_texto_livre_async,
+    interpretar_texto_livre_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+# menus, teclados e textos do bot
+ARQUIVO_MENUS = os.getenv(
+    "MENUS_ARQUIVO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "menus.json")
+)
+
+
+class _Campos(dict):
+    """Valores dos templates ({ra}, {curso}, {texto}...); ausentes viram 'Não informado'."""
+
+    def __missing__(self, chave):
+        return "Não informado"
+
+
+class Turno:
+    """Uma mensagem recebida: quem mandou, em que atendimento e o texto."""
+
+    __slots__ = ("update", "context", "atendimento", "texto_raw", "texto")
+
+    def __init__(self, update, context, atendimento, texto_raw: str):
+        self.update = update
+        self.context = context
+        self.atendimento = atendimento
+        self.texto_raw = texto_raw
+        self.texto = normalizar_texto(texto_raw)
+
+
+# =======================================================
+#   MOTOR
+# =======================================================
+class MotorDialogo:
+    """
+    Roteia cada mensagem pela tabela etapa -> (texto normalizado -> opção).
+
+    As etapas, opções, respostas, teclados e prompts da IA vêm do JSON de
+    menus; um novo setor só precisa de uma nova entrada lá. O que exige
+    lógica (validar RA, consultar cursos) fica em ações registradas com
+    @motor.acao("nome"). Quem envia as mensagens e encerra o atendimento
+    é injetado (responder/encerrar), então o motor roda sem o Telegram.
+    Com 'transmitir' (async (turno, partes) -> texto), as respostas da IA
+    são mostradas enquanto são geradas; o sufixo e o teclado da opção vão
+    numa mensagem separada logo depois.
+
+    Com um roteador de 'intencoes' (ver intencoes.py), texto livre que
+    iria para a IA é antes comparado com as opções da própria etapa; se
+    reconhecido, a opção é executada direto. Opções com repassar_texto só
+    mudam de etapa e reprocessam o mesmo texto lá.
+
+    Ordem de execução de uma opção: registrar -> registrar_texto -> etapa ->
+    acao -> ia (ou resposta) -> encerrar.
+    """
+
+    def __init__(self, responder, encerrar, caminho: str = None, transmitir=None):
+        self.responder = responder    # async (turno, texto, teclado=None, markdown=False)
+        self.encerrar = encerrar      # async (turno)
+        self.transmitir = transmitir  # async (turno, partes) -> texto; None = sem streaming
+        self.intencoes = None         # RoteadorIntencoes; None = todo texto livre vai para a IA
+        self.consultar_ia = consultar_ia_async
+        self.interpretar_texto_livre = interpretar_texto_livre_async
+        self.consultar_ia_stream = consultar_ia_stream
+        self.interpretar_texto_livre_stream = interpretar_texto_livre_stream
+        self.acoes = {}
+        self.carregar(caminho or ARQUIVO_MENUS)
+
+    # ===================================================
+    #     CARGA E COMPILAÇÃO DOS MENUS
+    # ===================================================
+    def carregar(self, caminho: str):
+        with open(caminho, encoding="utf-8") as arq:
+            dados = json.load(arq)
+
+        self.teclados = dados["teclados"]
+        self.nao_mapeado = dados["nao_mapeado"]
+        self.etapas = {}
+        for etapa, definicao in dados["etapas"].items():
+            mapa = {}
+            for opcao in definicao.get("opcoes", []):
+                for texto in opcao["textos"]:
+                    mapa[normalizar_texto(texto)] = opcao
+            self.etapas[int(etapa)] = (mapa, definicao.get("entrada_livre"))
+        logger.info(f"Menus carregados: {len(self.etapas)} etapas de {caminho}")
+
+    def acao(self, nome: str):
+        """Decorador para registrar uma ação em código usada pelo JSON."""
+        def registrar(funcao):
+            self.acoes[nome] = funcao
+            return funcao
+        return registrar
+
+    def validar(self):
+        """Confere teclados e ações citados no JSON (chamar depois de registrar as ações)."""
+        opcoes = [self.nao_mapeado]
+        for mapa, livre in self.etapas.values():
+            opcoes.extend(mapa.values())
+            if livre:
+                opcoes.append(livre)
+        for opcao in opcoes:
+            if opcao.get("teclado") and opcao["teclado"] not in self.teclados:
+                raise ValueError(f"Teclado desconhecido no menu: {opcao['teclado']}")
+            if opcao.get("acao") and opcao["acao"] not in self.acoes:
+                raise ValueError(f"Ação sem implementação no menu: {opcao['acao']}")
+            if "etapa" in opcao and opcao["etapa"] not in self.etapas:
+                logger.warning(f"Opção leva para etapa inexistente: {opcao['etapa']}")
+
+    # ===================================================
+    #     ROTEAMENTO E EXECUÇÃO
+    # ===================================================
+    def rota(self, etapa: int, texto: str):
+        """Opção para o texto (já normalizado) na etapa — O(1), sem cadeia de ifs."""
+        rota = self.etapas.get(etapa)
+        if rota is None:
+            return self.nao_mapeado
+        mapa, livre = rota
+        return mapa.get(texto) or livre or self.nao_mapeado
+
+    async def processar(self, turno: Turno, reconhecer_intencao: bool = True):
+        atendimento = turno.atendimento
+        etapa = atendimento.etapa
+        opcao = self.rota(etapa, turno.texto)
+
+        rota = self.etapas.get(etapa)
+        if rota and opcao is rota[1] and "ia" in opcao:
+            # texto livre que iria para a IA
+            atendimento.registrar(f"texto_livre_{etapa}", turno.texto_raw)
+            atalho = self.intencoes.classificar(etapa, turno.texto) if self.intencoes and reconhecer_intencao else None
+            if atalho is not None:
+                atendimento.registrar(f"intencao_{etapa}", normalizar_texto(atalho["textos"][0]))
+                if atalho.get("repassar_texto"):
+                    await self.executar(turno, {k: atalho[k] for k in ("registrar", "etapa") if k in atalho})
+                    return await self.processar(turno, reconhecer_intencao=atendimento.etapa != etapa)
+                opcao = atalho
+
+        await self.executar(turno, opcao)
+
+    async def executar(self, turno: Turno, opcao: dict):
+        atendimento = turno.atendimento
+        etapa_origem = atendimento.etapa
+        texto = turno.texto_raw.lower() if opcao.get("minusculas") else turno.texto_raw
+
+        for chave, valor in opcao.get("registrar", {}).items():
+            atendimento.registrar(chave, valor)
+        if "registrar_texto" in opcao:
+            atendimento.registrar(opcao["registrar_texto"], texto)
+        if "etapa" in opcao:
+            atendimento.etapa = opcao["etapa"]
+
+        campos = _Campos({k: v for k, v in atendimento.registros.items() if v is not None})
+        campos["texto"] = texto
+
+        if "acao" in opcao:
+            await self.acoes[opcao["acao"]](turno, opcao)
+
+        if "ia" in opcao:
+            await self._responder_ia(turno, etapa_origem, opcao, campos)
+        elif "resposta" in opcao:
+            await self.responder(turno, opcao["resposta"].format_map(campos), opcao.get("teclado"),
+                                 opcao.get("markdown", False))
+
+        if opcao.get("encerrar"):
+            await self.encerrar(turno)
+
+    async def _responder_ia(self, turno: Turno, etapa: int, opcao: dict, campos: _Campos):
+        atendimento = turno.atendimento
+        ia = opcao["ia"]
+        contexto = ia.get("contexto", "").format_map(campos)
+        campos["contexto"] = contexto
+        prompt = ia["prompt"].format_map(campos)
+        categoria = ia.get("categoria", "geral")
+
+        dados_aluno = {"ra": atendimento.registros.get("ra"), "curso": atendimento.registros.get("curso")}
+
+        if self.transmitir:
+            if ia.get("semantico"):
+                partes = self.interpretar_texto_livre_stream(
+                    etapa, turno.texto_raw, prompt, contexto, categoria=categoria, dados_aluno=dados_aluno
+                )
+            else:
+                partes = self.consultar_ia_stream(prompt, contexto, categoria=categoria, etapa=etapa)
+            resposta = await self.transmitir(turno, partes)
+            if opcao.get("sufixo"):
+                await self.responder(turno, opcao["sufixo"].strip(), opcao.get("teclado"))
+        else:
+            if ia.get("semantico"):
+                resposta = await self.interpretar_texto_livre(
+                    etapa, turno.texto_raw, prompt, contexto, categoria=categoria, dados_aluno=dados_aluno
+                )
+            else:
+                resposta = await self.consultar_ia(prompt, contexto, categoria=categoria, etapa=etapa)
+            await self.responder(turno, resposta + opcao.get("sufixo", ""), opcao.get("teclado"))
+
+        if ia.get("registro"):
+            atendimento.registrar(ia["registro"], resposta)
@@ -0,0 +1,411 @@
+# ============================================
+#   ENVIO DAS RESPOSTAS: ORDEM POR CHAT E LIMITES DO TELEGRAM
+# ============================================
+# O Telegram limita os envios de um bot (cerca de 30 mensagens/s no total e
+# cerca de uma por segundo em cada chat, tolerando rajadas curtas); passou
+# disso responde 429 com retry_after e o bot fica parado esperando. Aqui cada
+# resposta entra na fila do seu chat e sai:
+#  - na ordem em que foi pedida (FIFO por chat, uma de cada vez);
+#  - quando houver ficha no balde global e no balde do chat;
+#  - junto com as seguintes que já estiverem na fila, se couberem numa
+#    mensagem só (mesmo parse_mode, no máximo um teclado, até 4096 caracteres).
+# O handler não espera a entrega: enfileira e segue. Um 429 mesmo assim pausa
+# todos os envios pelo retry_after pedido e a mensagem é reenviada.
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# fila de envio (1) ou reply_text direto no handler, como antes (0)
+ENVIO_ATIVO = os.getenv("ENVIO_ATIVO", "1") == "1"
+
+# balde global: mensagens por segundo e rajada; 0 = sem limite. Taxa +
+# rajada <= 30: nenhuma janela de 1 s passa do limite do Telegram. O limite é
+# do bot inteiro: com vários processos (supervisor) cada um
+# recebe a sua parte (ver ambiente_dos_workers).
+ENVIO_POR_SEGUNDO = float(os.getenv("ENVIO_POR_SEGUNDO", "25"))
+ENVIO_RAJADA = int(os.getenv("ENVIO_RAJADA", "5"))
+
+# balde de cada chat (uma por segundo, com as rajadas curtas que o Telegram tolera)
+ENVIO_CHAT_POR_SEGUNDO = float(os.getenv("ENVIO_CHAT_POR_SEGUNDO", "1"))
+ENVIO_CHAT_RAJADA = int(os.getenv("ENVIO_CHAT_RAJADA", "3"))
+
+# juntar respostas seguidas do mesmo chat numa mensagem só
+ENVIO_AGRUPAR = os.getenv("ENVIO_AGRUPAR", "1") == "1"
+
+# envios simultâneos para a Bot API (também o tamanho do pool HTTP do bot)
+ENVIO_CONEXOES = int(os.getenv("ENVIO_CONEXOES", "32"))
+
+# respostas pendentes no total; passou disso quem responde espera vaga
+ENVIO_FILA_MAX = int(os.getenv("ENVIO_FILA_MAX", "10000"))
+
+# espera (s) por uma conexão livre do pool antes de desistir da requisição
+ENVIO_ESPERA_CONEXAO = float(os.getenv("ENVIO_ESPERA_CONEXAO", "5"))
+
+# tentativas por mensagem quando o Telegram responde 429
+ENVIO_TENTATIVAS = int(os.getenv("ENVIO_TENTATIVAS", "3"))
+
+LIMITE_TELEGRAM = 4096
+SEPARADOR = "\n\n"
+
+# menor taxa (msg/s) de um worker ao dividir o limite do bot entre processos
+_TAXA_MINIMA_WORKER = 0.5
+
+
+def workers_no_limite(workers: int) -> int:
+    """
+    Quantos dos 'workers' processos cabem no limite de envio do bot: cada um
+    precisa de uma ficha de rajada e de pelo menos _TAXA_MINIMA_WORKER msg/s.
+    """
+    if ENVIO_POR_SEGUNDO <= 0:
+        return workers
+    return max(1, min(workers, int((ENVIO_POR_SEGUNDO + ENVIO_RAJADA) // (1 + _TAXA_MINIMA_WORKER))))
+
+
+def ambiente_dos_workers(workers: int) -> dict:
+    """
+    ENVIO_POR_SEGUNDO e ENVIO_RAJADA de cada um de 'workers' processos: a
+    soma de taxa + rajada de todos fica no que o bot teria num processo só.
+    Cada worker mantém ao menos uma ficha de rajada, tirada da sua taxa;
+    mais workers que workers_no_limite() não cabem.
+    """
+    if workers <= 1 or ENVIO_POR_SEGUNDO <= 0:
+        return {}
+    if workers > workers_no_limite(workers):
+        raise ValueError(f"{workers} workers passam do limite de envio (ENVIO_POR_SEGUNDO + ENVIO_RAJADA = "
+                         f"{ENVIO_POR_SEGUNDO + ENVIO_RAJADA:g}); no máximo {workers_no_limite(workers)}")
+    rajada = max(1, ENVIO_RAJADA // workers)
+    # para baixo, em milésimos: o texto da variável não pode arredondar para cima
+    taxa = math.floor(((ENVIO_POR_SEGUNDO + ENVIO_RAJADA) / workers - rajada) * 1000) / 1000
+    return {"ENVIO_POR_SEGUNDO": f"{taxa:g}", "ENVIO_RAJADA": str(rajada)}
+
+
+def _segundos(retry_after) -> float:
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+class BaldeFichas:
+    """Token bucket: 'taxa' fichas por segundo, acumulando até 'capacidade'."""
+
+    def __init__(self, taxa: float, capacidade: int, relogio=time.monotonic):
+        self.taxa = taxa
+        self.capacidade = max(1, capacidade)
+        self._relogio = relogio
+        self._fichas = float(self.capacidade)
+        self._ultimo = relogio()
+
+    def _repor(self):
+        agora = self._relogio()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def retirar(self) -> float:
+        """Tira uma ficha e devolve 0.0; sem ficha, devolve quantos segundos faltam (sem tirar)."""
+        if self.taxa <= 0:
+            return 0.0
+        self._repor()
+        if self._fichas >= 1:
+            self._fichas -= 1
+            return 0.0
+        return (1 - self._fichas) / self.taxa
+
+    def tempo_para_encher(self) -> float:
+        if self.taxa <= 0:
+            return 0.0
+        self._repor()
+        return (self.capacidade - self._fichas) / self.taxa
+
+
+class _Pedido:
+    __slots__ = ("mensagem", "texto", "opcoes", "agrupar", "futuro", "chegada")
+
+    def __init__(self, mensagem, texto: str, opcoes: dict, agrupar: bool):
+        self.mensagem = mensagem
+        self.texto = texto
+        self.opcoes = opcoes
+        self.agrupar = agrupar
+        self.futuro = asyncio.get_running_loop().create_future()
+        self.chegada = time.perf_counter()
+
+
+class _FilaChat:
+    __slots__ = ("pedidos", "balde", "chegou", "ultimo")
+
+    def __init__(self, balde: BaldeFichas):
+        self.pedidos = deque()
+        self.balde = balde
+        self.chegou = asyncio.Event()
+        self.ultimo = None  # futuro do último pedido (para aguardar o chat esvaziar)
+
+
+def _tem_teclado(pedido: _Pedido) -> bool:
+    return pedido.opcoes.get("reply_markup") is not None
+
+
+def _compativeis(anterior: _Pedido, seguinte: _Pedido, tamanho: int, com_teclado: bool) -> bool:
+    """Cabem numa mensagem só? Mesmas opções, no máximo um teclado no lote, sem passar do limite."""
+    if not (anterior.agrupar and seguinte.agrupar):
+        return False
+    if tamanho + len(SEPARADOR) + len(seguinte.texto) > LIMITE_TELEGRAM:
+        return False
+    if com_teclado and _tem_teclado(seguinte):
+        return False
+    sem_teclado = {k: v for k, v in anterior.opcoes.items() if k != "reply_markup"}
+    return sem_teclado == {k: v for k, v in seguinte.opcoes.items() if k != "reply_markup"}
+
+
+class EnvioTelegram:
+    """
+    Fila de saída das respostas do bot. `await envio.enviar(update.message,
+    texto, reply_markup=..., parse_mode=...)` devolve, assim que a resposta
+    entra na fila, um futuro com a Message enviada (a mesma para respostas
+    agrupadas). Cada chat com respostas pendentes tem uma tarefa que as
+    entrega; ela some alguns segundos depois da fila esvaziar, quando o balde
+    do chat já está cheio de novo.
+    """
+
+    def __init__(self, ativo: bool = ENVIO_ATIVO, por_segundo: float = ENVIO_POR_SEGUNDO,
+                 rajada: int = ENVIO_RAJADA, chat_por_segundo: float = ENVIO_CHAT_POR_SEGUNDO,
+                 chat_rajada: int = ENVIO_CHAT_RAJADA, agrupar: bool = ENVIO_AGRUPAR,
+                 conexoes: int = ENVIO_CONEXOES, fila_max: int = ENVIO_FILA_MAX,
+                 tentativas: int = ENVIO_TENTATIVAS, amostras: int = 1000):
+        self.ativo = ativo
+        self.agrupar = agrupar
+        self.tentativas = max(1, tentativas)
+        self.chat_por_segundo = chat_por_segundo
+        self.chat_rajada = chat_rajada
+        self.balde = BaldeFichas(por_segundo, rajada)
+        self._conexoes_max = conexoes
+        self._fila_max = fila_max
+        self._conexoes = None           # semáforos criados no event loop do bot
+        self._vagas = None
+        self._vez_global = None
+        self._loop = None
+        self._pausa_ate = 0.0
+        self._filas = {}
+        self._tarefas = set()
+        self._esperas = deque(maxlen=amostras)
+        self.contadores = dict.fromkeys(
+            ("pedidos", "mensagens", "agrupadas", "seguradas_pelo_limite", "respostas_429", "reenvios",
+             "falhas", "edicoes"), 0
+        )
+        self.pausa_total = 0.0
+
+    def _iniciar_no_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # outro event loop (ex.: asyncio.run de novo nos testes)
+            self._loop = loop
+            self._filas = {}
+            self._conexoes = asyncio.Semaphore(self._conexoes_max)
+            self._vagas = asyncio.Semaphore(self._fila_max)
+            self._vez_global = asyncio.Lock()
+
+    # ===================================================
+    #     API USADA PELOS HANDLERS
+    # ===================================================
+    async def enviar(self, mensagem, texto: str, agrupar: bool = True, **opcoes) -> asyncio.Future:
+        """
+        Enfileira uma resposta ao chat de 'mensagem' (a do usuário; a entrega
+        usa mensagem.reply_text). agrupar=False: sai numa mensagem só dela
+        (ex.: a que vai ser editada depois).
+        """
+        self.contadores["pedidos"] += 1
+        if not self.ativo:
+            futuro = asyncio.get_running_loop().create_future()
+            futuro.set_result(await mensagem.reply_text(texto, **opcoes))
+            return futuro
+
+        self._iniciar_no_loop()
+        await self._vagas.acquire()
+        pedido = _Pedido(mensagem, texto, opcoes, agrupar and self.agrupar)
+        chave = mensagem.chat_id
+        fila = self._filas.get(chave)
+        if fila is None:
+            fila = self._filas[chave] = _FilaChat(BaldeFichas(self.chat_por_segundo, self.chat_rajada))
+            tarefa = asyncio.create_task(self._despachar(chave, fila))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+        fila.pedidos.append(pedido)
+        fila.ultimo = pedido.futuro
+        fila.chegou.set()
+        return pedido.futuro
+
+    async def editar(self, mensagem_enviada, texto: str, **opcoes):
+        """edit_text passando pelo balde global (um 429 também pausa os envios)."""
+        if self.ativo:
+            self._iniciar_no_loop()
+            await self._ficha_global()
+        self.contadores["edicoes"] += 1
+        try:
+            return await mensagem_enviada.edit_text(texto, **opcoes)
+        except RetryAfter as e:
+            self._pausar(_segundos(e.retry_after))
+            raise
+
+    def origem(self, mensagem) -> "OrigemNaFila":
+        """Adaptador para resposta_progressiva: a primeira mensagem pela fila, as edições pelo balde."""
+        return OrigemNaFila(self, mensagem)
+
+    async def aguardar(self, chat_id):
+        """Espera o chat não ter mais respostas pendentes."""
+        fila = self._filas.get(chat_id)
+        if fila is not None and fila.ultimo is not None:
+            await asyncio.gather(fila.ultimo, return_exceptions=True)
+
+    async def encerrar(self, prazo: float = 10.0):
+        """Entrega o que ainda está na fila (até 'prazo' segundos) e para as tarefas."""
+        pendentes = [fila.ultimo for fila in self._filas.values() if fila.ultimo is not None]
+        if pendentes:
+            await asyncio.wait(pendentes, timeout=prazo)
+        for tarefa in list(self._tarefas):
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+    def estatisticas(self) -> dict:
+        esperas = sorted(self._esperas)
+        return {
+            **self.contadores,
+            "pausa_429_s": round(self.pausa_total, 1),
+            "chats_com_fila": len(self._filas),
+            "pendentes": sum(len(fila.pedidos) for fila in self._filas.values()),
+            "espera_p50_ms": round(esperas[len(esperas) // 2], 1) if esperas else None,
+            "espera_p95_ms": round(esperas[int(len(esperas) * 0.95)], 1) if esperas else None,
+        }
+
+    # ===================================================
+    #     ENTREGA (UMA TAREFA POR CHAT COM PENDÊNCIAS)
+    # ===================================================
+    def _pausar(self, segundos: float):
+        self.contadores["respostas_429"] += 1
+        ate = time.monotonic() + segundos
+        if ate > self._pausa_ate:
+            self.pausa_total += ate - max(self._pausa_ate, time.monotonic())
+            self._pausa_ate = ate
+        logger.warning(f"Telegram pediu {segundos:.1f}s de pausa nos envios (429)")
+
+    async def _ficha_global(self) -> bool:
+        """Espera a pausa de um 429 e uma ficha do balde global; True se precisou esperar."""
+        esperou = False
+        async with self._vez_global:  # as fichas saem na ordem de chegada
+            while True:
+                pausa = self._pausa_ate - time.monotonic()
+                espera = pausa if pausa > 0 else self.balde.retirar()
+                if espera <= 0:
+                    return esperou
+                esperou = True
+                await asyncio.sleep(espera)
+
+    async def _despachar(self, chave, fila: _FilaChat):
+        try:
+            while True:
+                while fila.pedidos:
+                    esperou = False
+                    while (espera := fila.balde.retirar()) > 0:
+                        esperou = True
+                        await asyncio.sleep(espera)
+                    esperou = await self._ficha_global() or esperou
+                    self.contadores["seguradas_pelo_limite"] += esperou
+                    # junta só agora: o que chegou durante a espera vai na mesma mensagem
+                    await self._entregar(self._juntar(fila.pedidos))
+                # ociosa: fica até o balde do chat encher, para uma resposta logo
+                # depois ainda respeitar o limite do chat
+                recarga = fila.balde.tempo_para_encher()
+                if recarga <= 0:
+                    break
+                fila.chegou.clear()
+                try:
+                    await asyncio.wait_for(fila.chegou.wait(), recarga)
+                except asyncio.TimeoutError:
+                    if not fila.pedidos:
+                        break
+        finally:
+            for pedido in fila.pedidos:  # cancelada no encerramento
+                pedido.futuro.cancel()
+                self._vagas.release()
+            if self._filas.get(chave) is fila:
+                del self._filas[chave]
+
+    def _juntar(self, pedidos: deque) -> list:
+        lote = [pedidos.popleft()]
+        tamanho = len(lote[0].texto)
+        com_teclado = _tem_teclado(lote[0])  # de qualquer pedido do lote, não só do último
+        while pedidos and _compativeis(lote[-1], pedidos[0], tamanho, com_teclado):
+            tamanho += len(SEPARADOR) + len(pedidos[0].texto)
+            lote.append(pedidos.popleft())
+            com_teclado = com_teclado or _tem_teclado(lote[-1])
+        return lote
+
+    async def _entregar(self, lote: list):
+        """Envia o lote (ficha global já tirada); 429 pausa todos e tenta de novo."""
+        opcoes = {}
+        for pedido in lote:
+            opcoes.update({k: v for k, v in pedido.opcoes.items() if v is not None})
+        texto = SEPARADOR.join(pedido.texto for pedido in lote)
+        inicio = time.perf_counter()
+        try:
+            for tentativa in range(1, self.tentativas + 1):
+                try:
+                    async with self._conexoes:
+                        enviada = await lote[-1].mensagem.reply_text(texto, **opcoes)
+                    break
+                except RetryAfter as e:
+                    self._pausar(_segundos(e.retry_after))
+                    if tentativa == self.tentativas:
+                        raise
+                    self.contadores["reenvios"] += 1
+                    await self._ficha_global()
+        except asyncio.CancelledError:
+            for pedido in lote:
+                pedido.futuro.cancel()
+            raise
+        except Exception as e:
+            self.contadores["falhas"] += 1
+            logger.error(f"Erro ao enviar resposta ao chat {lote[-1].mensagem.chat_id}: {e}")
+            for pedido in lote:
+                if not pedido.futuro.done():
+                    pedido.futuro.set_exception(e)
+                    pedido.futuro.exception()  # já está no log; quem não aguarda não recebe aviso
+        else:
+            self.contadores["mensagens"] += 1
+            self.contadores["agrupadas"] += len(lote) - 1
+            for pedido in lote:
+                self._esperas.append((inicio - pedido.chegada) * 1000)
+                if not pedido.futuro.done():
+                    pedido.futuro.set_result(enviada)
+        finally:
+            for _ in lote:
+                self._vagas.release()
+
+
+class _EnviadaNaFila:
+    """Mensagem já enviada cujas edições passam pelo balde global."""
+
+    __slots__ = ("envio", "mensagem")
+
+    def __init__(self, envio: EnvioTelegram, mensagem):
+        self.envio = envio
+        self.mensagem = mensagem
+
+    async def edit_text(self, texto: str, **opcoes):
+        return await self.envio.editar(self.mensagem, texto, **opcoes)
+
+
+class OrigemNaFila:
+    """O que resposta_progressiva usa da mensagem do usuário (reply_text), pela fila do chat."""
+
+    __slots__ = ("envio", "mensagem")
+
+    def __init__(self, envio: EnvioTelegram, mensagem):
+        self.envio = envio
+        self.mensagem = mensagem
+
+    async def reply_text(self, texto: str, **opcoes):
+        futuro = await self.envio.enviar(self.mensagem, texto, agrupar=False, **opcoes)
+        return _EnviadaNaFila(self.envio, await futuro)
@@ -0,0 +1,368 @@
+# ============================================
+#      ROTEADOR DE INTENÇÕES (TEXTO LIVRE SEM IA)
+# ============================================
+
+import os
+import json
+import math
+import time
+import zlib
+import random
+import logging
+from collections import deque
+
+from normalizacao import normalizar_texto
+from catalogo import obter_catalogo
+
+logger = logging.getLogger(__name__)
+
+# rótulo de quem escreveu algo que não é nenhuma opção do menu (vai para a IA)
+LIVRE = "_livre"
+
+# frases genéricas que nunca devem pular a IA (exemplos negativos do modelo)
+_EXEMPLOS_LIVRES = [
+    "oi", "ola bom dia", "boa tarde", "boa noite", "tudo bem", "obrigado", "valeu",
+    "tenho uma duvida", "preciso de ajuda", "nao entendi", "pode me ajudar",
+    "quero tirar uma duvida", "como funciona", "nao sei", "sim", "nao",
+]
+
+
+def _radicais(texto_normalizado: str) -> str:
+    """Tira o plural simples ('boletos' -> 'boleto') para as regras e o modelo."""
+    return " ".join(t[:-1] if len(t) > 3 and t.endswith("s") else t for t in texto_normalizado.split())
+
+
+def _caracteristicas(texto_normalizado: str, dimensao: int) -> list:
+    """Índices (com hash) de palavras, pares de palavras e 4-gramas de caracteres."""
+    palavras = _radicais(texto_normalizado).split()
+    termos = [f"p:{p}" for p in palavras]
+    termos += [f"b:{a}_{b}" for a, b in zip(palavras, palavras[1:])]
+    for palavra in palavras:
+        marcada = f"<{palavra}>"
+        termos += [f"c:{marcada[i:i + 4]}" for i in range(max(1, len(marcada) - 3))]
+    return sorted({zlib.crc32(t.encode("utf-8")) % dimensao for t in termos})
+
+
+# =======================================================
+#   REGRESSÃO LOGÍSTICA COM HASH (SEM DEPENDÊNCIAS)
+# =======================================================
+class RegressaoLogistica:
+    """
+    Softmax multiclasse sobre features binárias com hash, treinada por SGD.
+    Pequena o bastante para treinar na subida do bot e rodar em microssegundos.
+    """
+
+    def __init__(self, classes: list, dimensao: int = 4096):
+        self.classes = list(classes)
+        self.dimensao = dimensao
+        self.pesos = {c: {} for c in self.classes}   # esparso: índice -> peso
+        self.vies = {c: 0.0 for c in self.classes}
+
+    def probabilidades(self, texto_normalizado: str) -> dict:
+        indices = _caracteristicas(texto_normalizado, self.dimensao)
+        escala = 1.0 / math.sqrt(len(indices)) if indices else 0.0
+        pontos = {c: self.vies[c] + escala * sum(self.pesos[c].get(i, 0.0) for i in indices) for c in self.classes}
+        maximo = max(pontos.values())
+        exp = {c: math.exp(v - maximo) for c, v in pontos.items()}
+        total = sum(exp.values())
+        return {c: v / total for c, v in exp.items()}
+
+    def treinar(self, exemplos: list, epocas: int = 40, taxa: float = 0.5, l2: float = 1e-4):
+        """exemplos: [(texto_normalizado, classe)]."""
+        exemplos = [(_caracteristicas(t, self.dimensao), c) for t, c in exemplos if c in self.vies]
+        sorteio = random.Random(0)
+        for _ in range(epocas):
+            sorteio.shuffle(exemplos)
+            for indices, correta in exemplos:
+                escala = 1.0 / math.sqrt(len(indices)) if indices else 0.0
+                pontos = {c: self.vies[c] + escala * sum(self.pesos[c].get(i, 0.0) for i in indices)
+                          for c in self.classes}
+                maximo = max(pontos.values())
+                exp = {c: math.exp(v - maximo) for c, v in pontos.items()}
+                total = sum(exp.values())
+                for c in self.classes:
+                    gradiente = exp[c] / total - (1.0 if c == correta else 0.0)
+                    self.vies[c] -= taxa * gradiente
+                    pesos = self.pesos[c]
+                    for i in indices:
+                        pesos[i] = pesos.get(i, 0.0) * (1 - taxa * l2) - taxa * gradiente * escala
+
+    def para_dict(self) -> dict:
+        return {
+            "classes": self.classes,
+            "dimensao": self.dimensao,
+            "vies": self.vies,
+            "pesos": {c: {str(i): round(p, 5) for i, p in pesos.items() if abs(p) > 1e-5}
+                      for c, pesos in self.pesos.items()},
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "RegressaoLogistica":
+        modelo = cls(dados["classes"], dados["dimensao"])
+        modelo.vies = {c: float(v) for c, v in dados["vies"].items()}
+        modelo.pesos = {c: {int(i): p for i, p in pesos.items()} for c, pesos in dados["pesos"].items()}
+        return modelo
+
+
+# =======================================================
+#   ROTEADOR POR ETAPA
+# =======================================================
+class _Etapa:
+    """Regras e modelo de uma etapa do menu que manda texto livre para a IA."""
+
+    def __init__(self, opcoes: list):
+        self.opcoes = {}          # rótulo -> opção do menus.json
+        self.regras = []          # (palavra-chave com radical, rótulo)
+        self.por_registro = {}    # (chave, valor) registrado -> rótulo (para ler a auditoria)
+        self.rotulo_catalogo = None
+        for opcao in opcoes:
+            if not opcao.get("palavras_chave") and not opcao.get("intencao_catalogo"):
+                continue
+            rotulo = normalizar_texto(opcao["textos"][0])
+            self.opcoes[rotulo] = opcao
+            # rótulo de botão com uma palavra só ("acordo") já casa exato no dialogo.py;
+            # como trecho ele pegaria qualquer frase com a palavra
+            rotulos = [t for t in opcao["textos"] if len(t.split()) > 1]
+            for palavra in opcao.get("palavras_chave", []) + rotulos:
+                self.regras.append((f" {_radicais(normalizar_texto(palavra))} ", rotulo))
+            for chave, valor in opcao.get("registrar", {}).items():
+                self.por_registro[(chave, valor)] = rotulo
+            if opcao.get("intencao_catalogo"):
+                self.rotulo_catalogo = rotulo
+        self.modelo = None
+
+    def exemplos_semente(self) -> list:
+        exemplos = [(normalizar_texto(t), LIVRE) for t in _EXEMPLOS_LIVRES]
+        for rotulo, opcao in self.opcoes.items():
+            for texto in opcao["textos"] + opcao.get("palavras_chave", []):
+                exemplos.append((normalizar_texto(texto), rotulo))
+        return exemplos
+
+    def por_regra(self, texto: str):
+        """Rótulo com mais evidência (soma do tamanho das palavras-chave achadas); None se empatar."""
+        alvo = f" {_radicais(texto)} "
+        encontrados = {}
+        for palavra, rotulo in self.regras:
+            if palavra in alvo:
+                encontrados[rotulo] = encontrados.get(rotulo, 0) + len(palavra)
+        if encontrados:
+            maior = max(encontrados.values())
+            melhores = [r for r, tamanho in encontrados.items() if tamanho == maior]
+            if len(melhores) == 1:
+                return melhores[0]
+        if self.rotulo_catalogo and texto:
+            indice = obter_catalogo().indice
+            if indice.cursos_citados(texto) or indice.apelidos_citados(texto) or indice.disciplinas_citadas(texto):
+                return self.rotulo_catalogo
+        return None
+
+
+class RoteadorIntencoes:
+    """
+    Antes de mandar um texto livre para a IA, tenta reconhecer nele uma
+    opção do próprio menu da etapa ("boleto" no financeiro, nome de curso no
+    menu do aluno). Primeiro as palavras-chave do menus.json (e nomes do
+    catálogo), depois uma regressão logística com hash treinada com os
+    exemplos do menu e com a auditoria dos atendimentos. Só desvia da IA
+    quando a confiança passa do limiar.
+    """
+
+    def __init__(self, etapas: dict, limiar: float = 0.8, arquivo_modelo: str = None):
+        self.limiar = limiar
+        self.arquivo_modelo = arquivo_modelo
+        self._treinado = False
+        self.etapas = {}
+        for numero, (mapa, livre) in etapas.items():
+            if not livre or "ia" not in livre:
+                continue
+            opcoes = list({id(o): o for o in mapa.values()}.values())
+            etapa = _Etapa(opcoes)
+            if etapa.opcoes:
+                self.etapas[numero] = etapa
+        self.consultas = 0
+        self.desvios_regra = 0
+        self.desvios_modelo = 0
+        self._tempos_us = deque(maxlen=1000)
+
+    # ===================================================
+    #     CLASSIFICAÇÃO
+    # ===================================================
+    def prever(self, etapa: int, texto: str):
+        """(rótulo, confiança, origem) para o texto normalizado; rótulo LIVRE = deixar para a IA."""
+        if not self._treinado:
+            self.preparar()
+        regras = self.etapas.get(etapa)
+        if regras is None:
+            return LIVRE, 0.0, "sem_regras"
+        rotulo = regras.por_regra(texto)
+        if rotulo:
+            return rotulo, 1.0, "regra"
+        if regras.modelo is None:
+            return LIVRE, 0.0, "sem_modelo"
+        probabilidades = regras.modelo.probabilidades(texto)
+        rotulo = max(probabilidades, key=probabilidades.get)
+        return rotulo, probabilidades[rotulo], "modelo"
+
+    def classificar(self, etapa: int, texto: str):
+        """Opção do menu para o texto, ou None se for caso para a IA."""
+        inicio = time.perf_counter()
+        rotulo, confianca, origem = self.prever(etapa, texto)
+        self._tempos_us.append((time.perf_counter() - inicio) * 1e6)
+        self.consultas += 1
+        if rotulo == LIVRE or confianca < self.limiar:
+            return None
+        if origem == "regra":
+            self.desvios_regra += 1
+        else:
+            self.desvios_modelo += 1
+        return self.etapas[etapa].opcoes[rotulo]
+
+    def estatisticas(self, latencia_ia_ms: float = None) -> dict:
+        desvios = self.desvios_regra + self.desvios_modelo
+        tempos = sorted(self._tempos_us)
+        resumo = {
+            "consultas": self.consultas,
+            "desvios_regra": self.desvios_regra,
+            "desvios_modelo": self.desvios_modelo,
+            "taxa_desvio": round(desvios / self.consultas, 3) if self.consultas else 0.0,
+            "classificacao_p50_us": round(tempos[len(tempos) // 2], 1) if tempos else 0.0,
+        }
+        if latencia_ia_ms is not None:
+            resumo["latencia_ia_evitada_s"] = round(desvios * latencia_ia_ms / 1000, 1)
+        return resumo
+
+    # ===================================================
+    #     TREINO (MENU + AUDITORIA)
+    # ===================================================
+    def exemplos_da_auditoria(self, registros) -> dict:
+        """
+        {etapa: [(texto, rótulo, id_atendimento)]} a partir dos atendimentos
+        gravados: o texto livre da etapa (texto_livre_<etapa>) rotulado com a
+        opção que o usuário escolheu depois, ou LIVRE se não escolheu nenhuma.
+        Atendimentos em que o próprio roteador decidiu ficam de fora.
+        """
+        exemplos = {}
+        for registro in registros:
+            dados = registro["registros"]
+            for numero, etapa in self.etapas.items():
+                texto = dados.get(f"texto_livre_{numero}")
+                if not texto or f"intencao_{numero}" in dados:
+                    continue
+                rotulo = next((r for (k, v), r in etapa.por_registro.items() if dados.get(k) == v), LIVRE)
+                exemplos.setdefault(numero, []).append(
+                    (normalizar_texto(texto), rotulo, registro["id_atendimento"])
+                )
+        return exemplos
+
+    def treinar(self, exemplos_auditoria: dict = None):
+        """Treina um modelo por etapa com os exemplos do menu (+ auditoria, se houver)."""
+        exemplos_auditoria = exemplos_auditoria or {}
+        for numero, etapa in self.etapas.items():
+            exemplos = etapa.exemplos_semente()
+            exemplos += [(texto, rotulo) for texto, rotulo, _ in exemplos_auditoria.get(numero, [])]
+            etapa.modelo = RegressaoLogistica([LIVRE] + list(etapa.opcoes))
+            etapa.modelo.treinar(exemplos)
+        self._treinado = True
+
+    def preparar(self):
+        """
+        Treina com os exemplos do menu e usa os modelos salvos, se houver.
+        Só na primeira chamada (no início do bot ou na primeira classificação),
+        fora do import.
+        """
+        if self._treinado:
+            return
+        self.treinar()
+        if self.arquivo_modelo and self.carregar(self.arquivo_modelo):
+            logger.info(f"Modelo de intenções carregado de {self.arquivo_modelo}")
+
+    def avaliar(self, exemplos: dict) -> dict:
+        """
+        Acurácia, taxa de desvio e acerto dos desvios num conjunto rotulado
+        {etapa: [(texto, rótulo, _)]}; desvios_modelo/_certos são os que as
+        regras não pegaram e o modelo decidiu.
+        """
+        total = acertos = desvios = desvios_certos = desvios_modelo = desvios_modelo_certos = 0
+        for numero, lista in exemplos.items():
+            for texto, esperado, _ in lista:
+                rotulo, confianca, origem = self.prever(numero, texto)
+                if confianca < self.limiar:
+                    rotulo = LIVRE
+                total += 1
+                acertos += rotulo == esperado
+                if rotulo != LIVRE:
+                    desvios += 1
+                    desvios_certos += rotulo == esperado
+                    if origem == "modelo":
+                        desvios_modelo += 1
+                        desvios_modelo_certos += rotulo == esperado
+        return {
+            "exemplos": total,
+            "acuracia": round(acertos / total, 3) if total else 0.0,
+            "taxa_desvio": round(desvios / total, 3) if total else 0.0,
+            "acuracia_desvios": round(desvios_certos / desvios, 3) if desvios else 0.0,
+            "desvios_modelo": desvios_modelo,
+            "desvios_modelo_certos": desvios_modelo_certos,
+        }
+
+    def salvar(self, caminho: str):
+        dados = {str(n): e.modelo.para_dict() for n, e in self.etapas.items() if e.modelo}
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arq:
+            json.dump(dados, arq)
+        os.replace(temporario, caminho)
+
+    def carregar(self, caminho: str) -> bool:
+        """Usa os modelos salvos; etapas cujas opções mudaram ficam com o treino do menu."""
+        try:
+            with open(caminho, encoding="utf-8") as arq:
+                dados = json.load(arq)
+        except FileNotFoundError:
+            return False
+        for numero, modelo in dados.items():
+            etapa = self.etapas.get(int(numero))
+            if etapa and set(modelo["classes"]) == {LIVRE, *etapa.opcoes}:
+                etapa.modelo = RegressaoLogistica.de_dict(modelo)
+        return True
+
+
+def separar_validacao(exemplos: dict, fracao: int = 5, dobra: int = 0):
+    """
+    Separa ~1/fracao dos atendimentos (por id, de forma estável) para
+    validação; dobra = 0..fracao-1 escolhe qual parte (validação cruzada).
+    """
+    treino, validacao = {}, {}
+    for numero, lista in exemplos.items():
+        for exemplo in lista:
+            destino = validacao if zlib.crc32(exemplo[2].encode()) % fracao == dobra else treino
+            destino.setdefault(numero, []).append(exemplo)
+    return treino, validacao
+
+
+def criar_roteador_intencoes(motor):
+    """
+    Configuração via .env: INTENCOES_ATIVO (1), INTENCOES_LIMIAR (0.8) e
+    INTENCOES_MODELO (arquivo gerado por `python intencoes.py`).
+    """
+    if os.getenv("INTENCOES_ATIVO", "1") != "1":
+        return None
+    return RoteadorIntencoes(motor.etapas, limiar=float(os.getenv("INTENCOES_LIMIAR", "0.8")),
+                             arquivo_modelo=os.getenv("INTENCOES_MODELO", "modelo_intencoes.json"))
+
+
+if __name__ == "__main__":
+    # treinar com a auditoria: python intencoes.py
+    from dialogo import MotorDialogo
+    from auditoria import criar_auditoria
+
+    roteador = RoteadorIntencoes(MotorDialogo(responder=None, encerrar=None).etapas,
+                                 limiar=float(os.getenv("INTENCOES_LIMIAR", "0.8")))
+    exemplos = roteador.exemplos_da_auditoria(criar_auditoria().ler_registros())
+    treino, validacao = separar_validacao(exemplos)
+    roteador.treinar(treino)
+    print(f"Exemplos da auditoria: {sum(len(v) for v in exemplos.values())}")
+    print(f"Validação (atendimentos separados): {roteador.avaliar(validacao)}")
+    roteador.treinar(exemplos)
+    caminho = os.getenv("INTENCOES_MODELO", "modelo_intencoes.json")
+    roteador.salvar(caminho)
+    print(f"Modelo salvo em {caminho}")
@@ -0,0 +1,343 @@
+# ============================================
+#   MÉTRICAS NO FORMATO DO PROMETHEUS
+# ============================================
+# Contadores, histogramas e medidores com rótulos, expostos no formato de
+# texto do Prometheus: na rota /metrics (servidor do webhook ou METRICAS_PORTA)
+# ou num arquivo regravado de tempos em tempos (coletor "textfile" do
+# node_exporter). O formato é gerado aqui mesmo, sem o prometheus_client.
+#
+# Desligadas (METRICAS_ATIVAS=0, o padrão) as mesmas chamadas não fazem nada:
+# os instrumentos viram objetos nulos, cronometrar devolve um contexto vazio e
+# as funções decoradas com cronometrado ficam sem invólucro.
+
+import os
+import time
+import bisect
+import asyncio
+import inspect
+import logging
+import functools
+import threading
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# liga a coleta (1) ou deixa todas as chamadas sem efeito (0)
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "0") == "1"
+
+# porta de um servidor só de /metrics; 0 = sem servidor próprio (no modo
+# webhook /metrics também responde no servidor do bot)
+METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "0"))
+METRICAS_HOST = os.getenv("METRICAS_HOST", "0.0.0.0")
+
+# arquivo .prom regravado a cada METRICAS_INTERVALO s; vazio = não grava
+METRICAS_ARQUIVO = os.getenv("METRICAS_ARQUIVO", "")
+METRICAS_INTERVALO = float(os.getenv("METRICAS_INTERVALO", "15"))
+
+# sufixo do arquivo por processo (".w0", ".w1"... nos workers), antes da extensão
+METRICAS_SUFIXO = os.getenv("METRICAS_SUFIXO", "")
+
+# limites (s) dos baldes: de consultas ao catálogo (ms) a respostas da IA (s)
+BALDES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor))
+
+
+def _rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+# =======================================================
+#   INSTRUMENTOS
+# =======================================================
+class Contador:
+    """Só cresce: inc(*valores_dos_rotulos, valor=1)."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *rotulos, valor: float = 1.0):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0.0) + valor
+
+    def linhas(self):
+        with self._lock:
+            valores = sorted(self._valores.items(), key=lambda item: tuple(map(str, item[0])))
+        for rotulos, valor in valores:
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}"
+
+
+class _Cronometro:
+    __slots__ = ("histograma", "rotulos", "inicio")
+
+    def __init__(self, histograma, rotulos: tuple):
+        self.histograma = histograma
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.histograma.observar(time.perf_counter() - self.inicio, *self.rotulos)
+
+
+class Histograma:
+    """
+    Distribuição de durações (s) em baldes fixos, por combinação de rótulos.
+    Cada série guarda a contagem de cada balde (não acumulada), a soma e o
+    total; o acumulado do formato do Prometheus sai na exportação.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), baldes: tuple = BALDES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.baldes = tuple(sorted(baldes))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float, *rotulos):
+        posicao = bisect.bisect_left(self.baldes, segundos)  # "le": limite inclusivo
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [0] * (len(self.baldes) + 1) + [0.0]
+            serie[posicao] += 1
+            serie[-1] += segundos
+
+    def cronometrar(self, *rotulos):
+        """`with histograma.cronometrar("etapa"):` observa a duração do bloco."""
+        return _Cronometro(self, rotulos)
+
+    def cronometrado(self, *rotulos):
+        """Decorador (função comum ou async): observa a duração de cada chamada."""
+        def decorar(funcao):
+            if inspect.iscoroutinefunction(funcao):
+                @functools.wraps(funcao)
+                async def medida_async(*args, **kwargs):
+                    inicio = time.perf_counter()
+                    try:
+                        return await funcao(*args, **kwargs)
+                    finally:
+                        self.observar(time.perf_counter() - inicio, *rotulos)
+                return medida_async
+
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcao(*args, **kwargs)
+                finally:
+                    self.observar(time.perf_counter() - inicio, *rotulos)
+            return medida
+        return decorar
+
+    def linhas(self):
+        with self._lock:
+            series = sorted(((r, list(s)) for r, s in self._series.items()), key=lambda item: tuple(map(str, item[0])))
+        for rotulos, serie in series:
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (float("inf"),), serie):
+                acumulado += contagem
+                le = f'le="{_numero(limite)}"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_numero(serie[-1])}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}"
+
+
+class Medidor:
+    """
+    Valor lido na hora da exportação (tamanho de fila, sessões ativas ou um
+    contador que o módulo já mantém). A função devolve um número ou, com
+    rótulos, um dicionário {tupla_de_valores: número}.
+    """
+
+    def __init__(self, nome: str, ajuda: str, funcao, rotulos: tuple = (), tipo: str = "gauge"):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.rotulos = tuple(rotulos)
+        self.tipo = tipo
+
+    def linhas(self):
+        try:
+            valor = self.funcao()
+        except Exception as e:
+            logger.warning(f"Métrica {self.nome}: leitura falhou ({e})")
+            return
+        itens = valor.items() if isinstance(valor, dict) else [((), valor)]
+        for rotulos, numero in itens:
+            if numero is not None:
+                yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(numero)}"
+
+
+class _InstrumentoNulo:
+    """O que as fábricas devolvem com as métricas desligadas."""
+
+    __slots__ = ()
+    _contexto = nullcontext()
+
+    def inc(self, *rotulos, valor: float = 1.0):
+        pass
+
+    def observar(self, segundos: float, *rotulos):
+        pass
+
+    def cronometrar(self, *rotulos):
+        return self._contexto
+
+    def cronometrado(self, *rotulos):
+        return lambda funcao: funcao
+
+
+_NULO = _InstrumentoNulo()
+
+
+# =======================================================
+#   REGISTRO E EXPORTAÇÃO
+# =======================================================
+class Metricas:
+    """
+    Registro das métricas do processo. Um nome registrado de novo devolve o
+    instrumento existente (o módulo pode ser importado como __main__ e pelo
+    nome); um medidor registrado de novo passa a ler a função mais recente.
+    """
+
+    def __init__(self, ativo: bool = METRICAS_ATIVAS):
+        self.ativo = ativo
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None and not isinstance(metrica, Medidor):
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        return self._registrar(Contador(nome, ajuda, rotulos)) if self.ativo else _NULO
+
+    def histograma(self, nome: str, ajuda: str, rotulos: tuple = (), baldes: tuple = BALDES_PADRAO):
+        return self._registrar(Histograma(nome, ajuda, rotulos, baldes)) if self.ativo else _NULO
+
+    def medidor(self, nome: str, ajuda: str, funcao, rotulos: tuple = (), tipo: str = "gauge"):
+        return self._registrar(Medidor(nome, ajuda, funcao, rotulos, tipo)) if self.ativo else _NULO
+
+    def texto(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (0.0.4)."""
+        with self._lock:
+            metricas = sorted(self._metricas.values(), key=lambda m: m.nome)
+        linhas = []
+        for metrica in metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.linhas())
+        return "\n".join(linhas) + "\n"
+
+    def exportar_arquivo(self, caminho: str):
+        """Grava o texto num arquivo (escrita atômica: o coletor nunca lê pela metade)."""
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arq:
+            arq.write(self.texto())
+        os.replace(temporario, caminho)
+
+
+metricas = Metricas()
+
+
+def arquivo_do_processo(caminho: str = METRICAS_ARQUIVO, sufixo: str = METRICAS_SUFIXO) -> str:
+    """metricas.prom -> metricas.w1.prom no worker 1 (um arquivo por processo)."""
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}{sufixo}{extensao}"
+
+
+def ambiente_do_worker(worker: int) -> dict:
+    """Variáveis de um worker: arquivo próprio e porta base + número do worker."""
+    return {"METRICAS_SUFIXO": f".w{worker}", "METRICAS_PORTA": str(METRICAS_PORTA + worker if METRICAS_PORTA else 0)}
+
+
+def _aiohttp_web():
+    """aiohttp.web só quando há servidor (o import custa ~0,2 s); None se não estiver instalado."""
+    try:
+        from aiohttp import web
+    except ImportError:  # só o servidor próprio (METRICAS_PORTA) precisa do aiohttp
+        return None
+    return web
+
+
+async def responder_metricas(request):
+    """Handler aiohttp de GET /metrics."""
+    web = _aiohttp_web()
+    return web.Response(body=metricas.texto().encode("utf-8"), headers={"Content-Type": TIPO_CONTEUDO})
+
+
+async def servir_metricas(porta: int = METRICAS_PORTA, host: str = METRICAS_HOST):
+    """Servidor só de /metrics; roda até a tarefa ser cancelada."""
+    web = _aiohttp_web()
+    app_web = web.Application()
+    app_web.router.add_get("/metrics", responder_metricas)
+    runner = web.AppRunner(app_web, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, porta).start()
+        logger.info(f"Métricas em http://{host}:{porta}/metrics")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def exportar_periodicamente(caminho: str, intervalo: float = METRICAS_INTERVALO):
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await asyncio.to_thread(metricas.exportar_arquivo, caminho)
+        except OSError as e:
+            logger.error(f"Erro ao gravar métricas em {caminho}: {e}")
+
+
+def iniciar_exportacao() -> list:
+    """Tarefas de exportação conforme METRICAS_PORTA e METRICAS_ARQUIVO (nenhuma com as métricas desligadas)."""
+    if not metricas.ativo:
+        return []
+    tarefas = []
+    if METRICAS_PORTA:
+        if _aiohttp_web() is None:
+            logger.warning("METRICAS_PORTA precisa do aiohttp: pip install aiohttp")
+        else:
+            tarefas.append(asyncio.create_task(servir_metricas()))
+    if METRICAS_ARQUIVO:
+        tarefas.append(asyncio.create_task(exportar_periodicamente(arquivo_do_processo())))
+    return tarefas
+
+
+def encerrar_exportacao():
+    """Última gravação do arquivo, com os números finais do processo."""
+    if metricas.ativo and METRICAS_ARQUIVO:
+        try:
+            metricas.exportar_arquivo(arquivo_do_processo())
+        except OSError as e:
+            logger.error(f"Erro ao gravar métricas em {METRICAS_ARQUIVO}: {e}")
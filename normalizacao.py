@@ -0,0 +1,28 @@
+# ============================================
+#      NORMALIZAÇÃO DE TEXTO
+# ============================================
+
+import re
+import unicodedata
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def remover_acentos(texto: str) -> str:
+    """'Análise' -> 'Analise' (mantém maiúsculas/minúsculas)."""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Forma canônica usada nas comparações do bot:
+    minúsculas, sem acentos, só letras/números separados por um espaço.
+    'Acordo / Renegociação' -> 'acordo renegociacao'
+    """
+    return _NAO_ALFANUMERICO.sub(" ", remover_acentos(texto).lower()).strip()
+
+
+def tokenizar(texto: str) -> list:
+    """Tokens do texto já normalizado."""
+    return normalizar_texto(texto).split()
@@ -0,0 +1,225 @@
+# ============================================
+#      MODELOS DE PROMPT POR CATEGORIA (VERSIONADOS)
+# ============================================
+# Cada mensagem à OpenAI sai de um modelo da categoria do atendimento, na
+# mesma ordem sempre: primeiro o que não muda (prompt de sistema da
+# categoria e, se o modelo usar, o catálogo inteiro), por último o que muda
+# a cada chamada (pedido, trecho do catálogo, dados do aluno). A OpenAI
+# reaproveita prefixos idênticos de 1024 tokens ou mais (cached_tokens):
+# cobra metade e responde mais rápido. Os textos de sistema v1 têm de 100 a
+# 250 tokens, bem abaixo desse mínimo: com as versões padrão não há cache de
+# prefixo. Ele só aparece com um prefixo grande, como o catálogo inteiro de
+# cursos@v2 (~3000 tokens), que só entra fixada em IA_PROMPT_VERSOES.
+
+import os
+import logging
+
+from catalogo import obter_catalogo
+from contexto_ia import contar_tokens, montar_contexto_cursos
+
+logger = logging.getLogger(__name__)
+
+# fixa versões dos modelos, ex.: "cursos=2,financeiro=1" (padrão: _VERSOES_PADRAO
+# e, nas outras categorias, a mais nova)
+IA_PROMPT_VERSOES = os.getenv("IA_PROMPT_VERSOES", "")
+
+# acima disso o catálogo não vai no prefixo; o modelo usa só o trecho
+IA_CATALOGO_PREFIXO_MAX_TOKENS = int(os.getenv("IA_CATALOGO_PREFIXO_MAX_TOKENS", "6000"))
+
+PALAVRAS_CHAVE_CURSOS = ['curso', 'disciplina', 'semestre', 'grade', 'matéria', 'matriz', 'métodos ágeis', 'recuperação', 'reposição']
+
+# =======================================================
+#   PROMPT DE SISTEMA (EM SEÇÕES)
+# =======================================================
+_INTRODUCAO = "Você é um assistente especializado da UniFECAF. Siga estas diretrizes:"
+
+_SECOES = {
+    "recuperacao": """🎯 **PARA RECUPERAÇÃO/REPOSIÇÃO:**
+- Confirme disciplina e semestre
+- Informe prazos (48h úteis)
+- Explique procedimentos
+- Fornece contato da secretaria""",
+    "financeiro": """💰 **PARA FINANCEIRO:**
+- Confirme tipo de solicitação
+- Informe prazos (24h úteis)
+- Oriente sobre documentação
+- Fornece contato do financeiro""",
+    "documentos": """📄 **PARA DOCUMENTOS:**
+- Confirme documento solicitado
+- Explique opções (email/retirar)
+- Informe prazos de emissão
+- Fornece contato de documentos""",
+    "cursos": """🎓 **PARA CURSOS:**
+- Use dados reais do CSV
+- Seja preciso nas informações
+- Sugira contato com coordenação""",
+    "todos": """📋 **PARA TODOS:**
+- Seja educado e profissional
+- Use emojis moderadamente
+- Confirme dados do aluno quando disponíveis
+- Fornece contatos específicos""",
+}
+
+
+def prompt_sistema(*secoes: str) -> str:
+    """Introdução + as seções pedidas, sempre na ordem de _SECOES."""
+    escolhidas = [texto for nome, texto in _SECOES.items() if nome in secoes]
+    return "\n\n".join([_INTRODUCAO] + escolhidas)
+
+
+# o prompt completo, com todas as seções (categorias sem modelo próprio)
+PROMPT_SISTEMA = prompt_sistema(*_SECOES)
+
+
+# =======================================================
+#   CATÁLOGO INTEIRO (PREFIXO FIXO)
+# =======================================================
+_snapshot_catalogo = (None, "")
+
+
+def catalogo_em_texto() -> str:
+    """O catálogo inteiro, uma linha por semestre; refeito só quando o catálogo é trocado."""
+    global _snapshot_catalogo
+    catalogo = obter_catalogo()
+    if _snapshot_catalogo[0] is not catalogo:
+        linhas = [
+            f"{curso} | {semestre}: " + "; ".join(disciplinas)
+            for curso, semestres in catalogo.cursos.items()
+            for semestre, disciplinas in semestres.items()
+        ]
+        _snapshot_catalogo = (catalogo, "Catálogo de cursos (dados reais do CSV):\n" + "\n".join(linhas))
+    return _snapshot_catalogo[1]
+
+
+# =======================================================
+#   MODELOS
+# =======================================================
+class ModeloPrompt:
+    """
+    Modelo de prompt de uma categoria. O texto de sistema é montado uma vez,
+    no registro; montar() só junta a parte variável no fim.
+
+    catalogo: 'prefixo' (catálogo inteiro logo após o sistema, igual em
+    toda chamada), 'trecho' (só o que a pergunta cita, quando ela fala de
+    cursos) ou 'nenhum'.
+    """
+
+    def __init__(self, categoria: str, versao: int, sistema: str, catalogo: str = "trecho"):
+        if catalogo not in ("prefixo", "trecho", "nenhum"):
+            raise ValueError(f"Modelo {categoria}@v{versao}: catalogo inválido '{catalogo}'")
+        self.categoria = categoria
+        self.versao = versao
+        self.id = f"{categoria}@v{versao}"
+        self.sistema = sistema
+        self.catalogo = catalogo
+
+    def montar(self, prompt: str, contexto_adicional: str = "") -> list:
+        mensagens = [{"role": "system", "content": self.sistema}]
+        trecho = self.catalogo == "trecho"
+        if self.catalogo == "prefixo":
+            catalogo = catalogo_em_texto()
+            if contar_tokens(catalogo) <= IA_CATALOGO_PREFIXO_MAX_TOKENS:
+                mensagens.append({"role": "system", "content": catalogo})
+            else:
+                trecho = True
+
+        partes = [prompt.strip()]
+        if trecho and any(palavra in prompt.lower() for palavra in PALAVRAS_CHAVE_CURSOS):
+            info_cursos = montar_contexto_cursos(f"{prompt}\n{contexto_adicional}")
+            partes.append(f"Informações dos cursos (trecho do catálogo):\n{info_cursos}\n\n"
+                          "Baseie sua resposta nessas informações reais dos cursos.")
+        if contexto_adicional.strip():
+            partes.append(contexto_adicional.strip())
+        mensagens.append({"role": "user", "content": "\n\n".join(partes)})
+        return mensagens
+
+
+MODELOS = {}  # categoria -> {versão: ModeloPrompt}
+
+
+def registrar_modelo(modelo: ModeloPrompt):
+    versoes = MODELOS.setdefault(modelo.categoria, {})
+    if modelo.versao in versoes:
+        raise ValueError(f"Modelo {modelo.id} já registrado; mudou o texto? suba a versão")
+    versoes[modelo.versao] = modelo
+
+
+def _versoes_fixadas(texto: str) -> dict:
+    fixadas = {}
+    for item in texto.split(","):
+        categoria, _, versao = item.partition("=")
+        if categoria.strip() and versao.strip().isdigit():
+            fixadas[categoria.strip()] = int(versao)
+        elif item.strip():
+            logger.warning(f"IA_PROMPT_VERSOES: entrada inválida '{item.strip()}'")
+    return fixadas
+
+
+def modelo_prompt(categoria: str) -> ModeloPrompt:
+    """
+    Modelo ativo da categoria ('visitante_livre' cai em 'visitante';
+    categoria sem modelo usa 'geral'). Versão: a fixada em
+    IA_PROMPT_VERSOES, a de _VERSOES_PADRAO ou a mais nova.
+    """
+    for nome in (categoria, categoria.split("_")[0], "geral"):
+        versoes = MODELOS.get(nome)
+        if versoes:
+            versao = _VERSOES_ATIVAS.get(nome, max(versoes))
+            return versoes.get(versao) or versoes[max(versoes)]
+    raise KeyError(categoria)
+
+
+registrar_modelo(ModeloPrompt("geral", 1, PROMPT_SISTEMA))
+registrar_modelo(ModeloPrompt("financeiro", 1, prompt_sistema("financeiro", "todos")))
+registrar_modelo(ModeloPrompt("secretaria", 1, prompt_sistema("recuperacao", "todos")))
+registrar_modelo(ModeloPrompt("documentos", 1, prompt_sistema("documentos", "todos")))
+registrar_modelo(ModeloPrompt("visitante", 1, prompt_sistema("cursos", "todos")))
+registrar_modelo(ModeloPrompt("cursos", 1, prompt_sistema("cursos", "todos")))
+# v2: catálogo inteiro no prefixo; a IA de cursos só é chamada quando a
+# pergunta não cita curso nem disciplina, e aí o trecho seria só a lista de nomes
+registrar_modelo(ModeloPrompt("cursos", 2, prompt_sistema("cursos", "todos"), catalogo="prefixo"))
+
+# versões em uso sem IA_PROMPT_VERSOES. cursos@v2 só entra fixada: em
+# benchmarks/bench_prompts.py ela custa ~7x a v1 por chamada de cursos (o
+# catálogo inteiro vai em toda chamada) com a mesma latência
+_VERSOES_PADRAO = {"cursos": 1}
+
+_VERSOES_ATIVAS = {**_VERSOES_PADRAO, **_versoes_fixadas(IA_PROMPT_VERSOES)}
+
+
+# =======================================================
+#   USO DE TOKENS POR VERSÃO DE MODELO
+# =======================================================
+class UsoPrompts:
+    """
+    Tokens de entrada e cached_tokens informados pela OpenAI (campo usage),
+    e a latência da chamada, por versão de modelo de prompt.
+    """
+
+    def __init__(self):
+        self._uso = {}
+
+    def registrar(self, id_modelo: str, uso, ms: float = None):
+        if uso is None:
+            return
+        detalhes = getattr(uso, "prompt_tokens_details", None)
+        em_cache = (getattr(detalhes, "cached_tokens", 0) or 0) if detalhes else 0
+        total = self._uso.setdefault(id_modelo, {"chamadas": 0, "entrada": 0, "em_cache": 0, "ms": 0.0})
+        total["chamadas"] += 1
+        total["entrada"] += getattr(uso, "prompt_tokens", 0) or 0
+        total["em_cache"] += em_cache
+        total["ms"] += ms or 0.0
+
+    def estatisticas(self) -> dict:
+        return {
+            id_modelo: {
+                "chamadas": t["chamadas"],
+                "tokens_entrada_media": round(t["entrada"] / t["chamadas"], 1),
+                "taxa_cache": round(t["em_cache"] / t["entrada"], 3) if t["entrada"] else 0.0,
+                "latencia_media_ms": round(t["ms"] / t["chamadas"], 1),
+            }
+            for id_modelo, t in sorted(self._uso.items())
+        }
+
+
+uso_prompts = UsoPrompts()
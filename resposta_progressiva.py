@@ -0,0 +1,111 @@
+# ============================================
+#      RESPOSTA PROGRESSIVA NO TELEGRAM
+# ============================================
+
+import time
+import asyncio
+import logging
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# limite seguro por mensagem (o Telegram aceita até 4096 caracteres)
+LIMITE_MENSAGEM = 4000
+
+
+class MensagemProgressiva:
+    """
+    Mostra um texto que chega aos pedaços: a primeira parte sai numa
+    mensagem nova assim que existe, e o resto entra por edições espaçadas
+    de pelo menos 'intervalo' segundos (o Telegram limita edições por chat).
+    Quando o texto passa de LIMITE_MENSAGEM, a mensagem atual é fechada e
+    a continuação segue numa nova.
+    """
+
+    def __init__(self, origem, intervalo: float = 1.0, limite: int = LIMITE_MENSAGEM):
+        self._origem = origem          # mensagem do usuário (usa reply_text)
+        self.intervalo = intervalo
+        self.limite = limite
+        self.texto = ""
+        self._atual = None             # mensagem do bot sendo editada
+        self._inicio = 0               # onde começa, em self.texto, a mensagem atual
+        self._mostrado = ""            # o que o usuário vê na mensagem atual
+        self._proxima_edicao = 0.0
+        self.mensagens = 0
+        self.edicoes = 0
+
+    async def acrescentar(self, parte: str):
+        self.texto += parte
+        while len(self.texto) - self._inicio > self.limite:
+            fim = self._inicio + self.limite
+            await self._mostrar(self.texto[self._inicio:fim], forcar=True)
+            self._inicio, self._atual, self._mostrado = fim, None, ""
+        await self._mostrar(self.texto[self._inicio:])
+
+    async def concluir(self) -> str:
+        """Garante que a última parte foi mostrada inteira; devolve o texto completo."""
+        await self._mostrar(self.texto[self._inicio:], forcar=True)
+        return self.texto
+
+    async def _mostrar(self, trecho: str, forcar: bool = False):
+        if not trecho.strip() or trecho == self._mostrado:
+            return
+        if self._atual is None:
+            await self._nova(trecho)
+        else:
+            espera = self._proxima_edicao - time.monotonic()
+            if espera > 0:
+                if not forcar:
+                    return
+                await asyncio.sleep(espera)
+            if not await self._editar(trecho, forcar):
+                return
+        self._proxima_edicao = time.monotonic() + self.intervalo
+
+    async def _nova(self, trecho: str):
+        self._atual = await self._origem.reply_text(trecho)
+        self._mostrado = trecho
+        self.mensagens += 1
+
+    async def _editar(self, trecho: str, forcar: bool) -> bool:
+        # forçada (fim da resposta ou da mensagem), a edição não pode perder
+        # texto: espera o tempo pedido pelo Telegram quantas vezes for preciso
+        while True:
+            try:
+                await self._atual.edit_text(trecho)
+            except RetryAfter as e:
+                # limite do Telegram atingido: respeita o tempo pedido
+                atraso = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self._proxima_edicao = time.monotonic() + atraso
+                if not forcar:
+                    return False
+                await asyncio.sleep(atraso)
+                continue
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    # mensagem apagada ou que não dá mais para editar: o que o
+                    # usuário ainda não viu segue numa mensagem nova
+                    logger.warning(f"Edição recusada ({e}); o resto segue numa mensagem nova")
+                    await self._continuar(trecho)
+                    return True
+                # "message is not modified": o usuário já vê este texto
+                logger.debug(f"Edição ignorada: {e}")
+            self._mostrado = trecho
+            self.edicoes += 1
+            return True
+
+    async def _continuar(self, trecho: str):
+        resto = trecho[len(self._mostrado):]
+        self._inicio += len(self._mostrado)
+        self._atual, self._mostrado = None, ""
+        if resto.strip():
+            await self._nova(resto)
+
+
+async def transmitir(origem, partes, intervalo: float = 1.0) -> str:
+    """Consome um iterador assíncrono de pedaços de texto, mostrando-os ao usuário."""
+    mensagem = MensagemProgressiva(origem, intervalo)
+    async for parte in partes:
+        await mensagem.acrescentar(parte)
+    return await mensagem.concluir()
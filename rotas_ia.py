@@ -0,0 +1,185 @@
+# ============================================
+#   ROTAS DA IA: MODELO, ORÇAMENTO E SLO POR CATEGORIA E ETAPA
+# ============================================
+# Uma reformulação de uma frase no menu do aluno (etapa 20) e a confirmação
+# de um pedido financeiro (etapa 31) não precisam do mesmo modelo nem do
+# mesmo orçamento. A política (rotas_ia.json, sem mexer no código) dá a cada
+# rota o nível de modelo, max_tokens, temperatura, prazo e um SLO de latência
+# (p95 da duração das chamadas). A rota que estoura o SLO desce para o nível
+# mais rápido seguinte e, passada a pausa, tenta de novo o de cima, como o
+# meio-aberto do disjuntor em cliente_ia.
+
+import os
+import json
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# política de rotas (ver o _descricao do arquivo); sem o arquivo, todas as
+# consultas usam o padrão abaixo (o comportamento de antes das rotas)
+IA_ROTAS_ARQUIVO = os.getenv(
+    "IA_ROTAS_ARQUIVO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rotas_ia.json")
+)
+
+_CAMPOS = ("nivel", "max_tokens", "temperatura", "prazo", "slo_p95_ms")
+
+
+def _percentil(ordenados: list, p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class EscolhaRota:
+    """Parâmetros de uma consulta: o que vai para a OpenAI e o prazo do cliente_ia."""
+
+    __slots__ = ("rota", "nivel", "modelo", "max_tokens", "temperatura", "prazo", "rebaixada")
+
+    def __init__(self, rota: "Rota", nivel: int):
+        self.rota = rota
+        self.nivel = nivel
+        self.modelo = rota.politica.niveis[nivel][1]
+        self.max_tokens = rota.max_tokens
+        self.temperatura = rota.temperatura
+        self.prazo = rota.prazo
+        self.rebaixada = nivel != rota.nivel_base
+
+    def parametros(self) -> dict:
+        return {"model": self.modelo, "max_tokens": self.max_tokens, "temperature": self.temperatura}
+
+
+class Rota:
+    """Uma rota da política: parâmetros já com os herdados, tempos, tokens e o nível atual."""
+
+    def __init__(self, politica: "PoliticaRotas", nome: str, config: dict):
+        self.politica = politica
+        self.nome = nome
+        self.nivel_base = politica.indice_nivel(config["nivel"], nome)
+        self.max_tokens = int(config["max_tokens"])
+        self.temperatura = float(config["temperatura"])
+        self.prazo = float(config["prazo"])
+        self.slo_p95_ms = float(config["slo_p95_ms"])
+        self.nivel = self.nivel_base
+        self._voltar_em = 0.0
+        self._janela = deque(maxlen=politica.janela)  # só chamadas do nível atual (decide o rebaixamento)
+        self._tempos = deque(maxlen=1000)               # todas (relatório)
+        self.contadores = dict.fromkeys(
+            ("chamadas", "falhas", "rebaixadas", "rebaixamentos", "tokens_entrada", "tokens_saida"), 0)
+
+    def escolher(self) -> EscolhaRota:
+        if self.nivel != self.nivel_base and self.politica.relogio() >= self._voltar_em:
+            # passou a pausa: tenta o nível de cima de novo, com a janela zerada
+            self.nivel -= 1
+            self._janela.clear()
+            logger.info(f"Rota IA {self.nome}: voltando para {self.politica.niveis[self.nivel][0]}")
+        return EscolhaRota(self, self.nivel)
+
+    def registrar(self, escolha: EscolhaRota, segundos: float, uso=None, sucesso: bool = True):
+        """Duração da chamada (falhas contam: prazo estourado é latência) e tokens informados pela OpenAI."""
+        ms = segundos * 1000
+        self._tempos.append(ms)
+        self.contadores["chamadas"] += 1
+        self.contadores["rebaixadas"] += escolha.rebaixada
+        if not sucesso:
+            self.contadores["falhas"] += 1
+        if uso is not None:
+            self.contadores["tokens_entrada"] += getattr(uso, "prompt_tokens", 0) or 0
+            self.contadores["tokens_saida"] += getattr(uso, "completion_tokens", 0) or 0
+        if escolha.nivel != self.nivel:
+            return  # chamada de antes da última troca de nível
+        self._janela.append(ms)
+        if len(self._janela) < self.politica.min_amostras or self.nivel == len(self.politica.niveis) - 1:
+            return
+        p95 = _percentil(sorted(self._janela), 0.95)
+        if p95 > self.slo_p95_ms:
+            self.nivel += 1
+            self._voltar_em = self.politica.relogio() + self.politica.pausa
+            self._janela.clear()
+            self.contadores["rebaixamentos"] += 1
+            logger.warning(f"Rota IA {self.nome}: p95 {p95:.0f} ms acima do SLO de {self.slo_p95_ms:.0f} ms; "
+                           f"usando {self.politica.niveis[self.nivel][0]} por {self.politica.pausa:.0f}s")
+
+    def estatisticas(self) -> dict:
+        ordenados = sorted(self._tempos)
+        nome_nivel, modelo = self.politica.niveis[self.nivel]
+        resumo = {
+            "nivel": nome_nivel, "modelo": modelo, "rebaixada": self.nivel != self.nivel_base,
+            "max_tokens": self.max_tokens, "prazo": self.prazo, "slo_p95_ms": self.slo_p95_ms,
+            **self.contadores,
+        }
+        if ordenados:
+            resumo["p50_ms"] = round(_percentil(ordenados, 0.50), 1)
+            resumo["p95_ms"] = round(_percentil(ordenados, 0.95), 1)
+        if self.contadores["chamadas"]:
+            resumo["tokens_saida_media"] = round(self.contadores["tokens_saida"] / self.contadores["chamadas"], 1)
+        return resumo
+
+
+class PoliticaRotas:
+    """
+    Política de rotas lida de um dict no formato do rotas_ia.json.
+    rota(categoria, etapa) procura 'categoria@etapa', depois 'categoria';
+    categorias sem rota ganham uma própria com os valores do padrão, para
+    terem tempos e tokens separados.
+    """
+
+    def __init__(self, config: dict, relogio=time.monotonic):
+        self.relogio = relogio
+        self.niveis = [(nivel["nome"], nivel["modelo"]) for nivel in config["niveis"]]
+        if not self.niveis:
+            raise ValueError("Rotas da IA: nenhum nível de modelo")
+        rebaixamento = config.get("rebaixamento", {})
+        self.janela = int(rebaixamento.get("janela", 100))
+        self.min_amostras = max(1, int(rebaixamento.get("min_amostras", 20)))
+        self.pausa = float(rebaixamento.get("pausa_s", 120))
+        self.padrao = dict(config["padrao"])
+        faltando = [campo for campo in _CAMPOS if campo not in self.padrao]
+        if faltando:
+            raise ValueError(f"Rotas da IA: padrao sem {', '.join(faltando)}")
+        self._config = config.get("rotas", {})
+        self.rotas = {}
+        for nome in self._config:
+            self._criar(nome)  # valida tudo na subida, não na primeira consulta
+
+    def indice_nivel(self, nome: str, rota: str) -> int:
+        for indice, (nivel, _) in enumerate(self.niveis):
+            if nivel == nome:
+                return indice
+        raise ValueError(f"Rota da IA {rota}: nível desconhecido '{nome}'")
+
+    def _criar(self, nome: str) -> Rota:
+        categoria = nome.split("@", 1)[0]
+        config = {**self.padrao, **self._config.get(categoria, {}), **self._config.get(nome, {})}
+        desconhecidos = set(self._config.get(nome, {})) - set(_CAMPOS)
+        if desconhecidos:
+            raise ValueError(f"Rota da IA {nome}: campos desconhecidos {sorted(desconhecidos)}")
+        rota = self.rotas[nome] = Rota(self, nome, config)
+        return rota
+
+    def rota(self, categoria: str, etapa=None) -> Rota:
+        if etapa is not None:
+            rota = self.rotas.get(f"{categoria}@{etapa}")
+            if rota is not None:
+                return rota
+        return self.rotas.get(categoria) or self._criar(categoria)
+
+    def escolher(self, categoria: str, etapa=None) -> EscolhaRota:
+        return self.rota(categoria, etapa).escolher()
+
+    def estatisticas(self) -> dict:
+        return {nome: rota.estatisticas() for nome, rota in sorted(self.rotas.items())}
+
+
+def carregar_politica(caminho: str = IA_ROTAS_ARQUIVO, modelo: str = "gpt-4o-mini", max_tokens: int = 500,
+                      temperatura: float = 0.4, prazo: float = 20.0) -> PoliticaRotas:
+    """Política do arquivo; sem ele, um nível só com os valores passados e SLO que nunca estoura."""
+    if caminho and os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            politica = PoliticaRotas(json.load(arquivo))
+        logger.info(f"Rotas da IA: {len(politica.rotas)} rotas, níveis {[n for n, _ in politica.niveis]} ({caminho})")
+        return politica
+    return PoliticaRotas({
+        "niveis": [{"nome": "padrao", "modelo": modelo}],
+        "padrao": {"nivel": "padrao", "max_tokens": max_tokens, "temperatura": temperatura,
+                   "prazo": prazo, "slo_p95_ms": float("inf")},
+    })
@@ -0,0 +1,205 @@
+# ============================================
+#      ARMAZENAMENTO DAS SESSÕES DE ATENDIMENTO
+# ============================================
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+import sqlite3
+import threading
+
+from bot_faculdade import Atendimento
+
+logger = logging.getLogger(__name__)
+
+
+# =======================================================
+#   INTERFACE COMUM
+# =======================================================
+class SessionStore:
+    """
+    Onde ficam os atendimentos em andamento (user_id -> Atendimento).
+
+    Aceita a mesma sintaxe do dicionário que o chatbot usava
+    (`user in store`, `store[user]`, `del store[user]`), mas quem altera um
+    atendimento deve chamar salvar() no fim do turno: no backend SQLite o
+    objeto devolvido é uma cópia.
+    """
+
+    def __init__(self, ociosidade_max: float = 1800):
+        self.ociosidade_max = ociosidade_max
+        self.evicoes = 0
+
+    def obter(self, user_id):
+        raise NotImplementedError
+
+    def salvar(self, atendimento: Atendimento):
+        raise NotImplementedError
+
+    def remover(self, user_id):
+        raise NotImplementedError
+
+    def limpar_ociosas(self) -> int:
+        """Remove sessões sem atividade há mais de ociosidade_max; retorna quantas."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, user_id):
+        return self.obter(user_id) is not None
+
+    def __getitem__(self, user_id):
+        atendimento = self.obter(user_id)
+        if atendimento is None:
+            raise KeyError(user_id)
+        return atendimento
+
+    def __setitem__(self, user_id, atendimento: Atendimento):
+        self.salvar(atendimento)
+
+    def __delitem__(self, user_id):
+        self.remover(user_id)
+
+    def estatisticas(self) -> dict:
+        return {"sessoes_ativas": len(self), "evicoes": self.evicoes}
+
+
+# =======================================================
+#   BACKEND EM MEMÓRIA (HEAP DE EXPIRAÇÃO)
+# =======================================================
+class SessoesMemoria(SessionStore):
+    """
+    Dicionário em memória + heap (expira_em, user_id) com uma entrada por
+    usuário. Ao vencer, a entrada é conferida com a última atividade real:
+    se o usuário voltou a falar, ela é reagendada em vez de removida.
+    """
+
+    def __init__(self, ociosidade_max: float = 1800):
+        super().__init__(ociosidade_max)
+        self._sessoes = {}
+        self._heap = []
+        self._agendado = set()
+
+    def obter(self, user_id):
+        self.limpar_ociosas()
+        return self._sessoes.get(user_id)
+
+    def salvar(self, atendimento: Atendimento):
+        atendimento.ultima_atividade = time.time()
+        self._sessoes[atendimento.user_id] = atendimento
+        if atendimento.user_id not in self._agendado:
+            self._agendado.add(atendimento.user_id)
+            heapq.heappush(self._heap, (atendimento.ultima_atividade + self.ociosidade_max, atendimento.user_id))
+
+    def remover(self, user_id):
+        self._sessoes.pop(user_id, None)
+
+    def limpar_ociosas(self) -> int:
+        agora = time.time()
+        removidas = 0
+        while self._heap and self._heap[0][0] <= agora:
+            _, user_id = heapq.heappop(self._heap)
+            atendimento = self._sessoes.get(user_id)
+            if atendimento is None:
+                self._agendado.discard(user_id)
+                continue
+            expira_em = atendimento.ultima_atividade + self.ociosidade_max
+            if expira_em > agora:
+                heapq.heappush(self._heap, (expira_em, user_id))
+                continue
+            del self._sessoes[user_id]
+            self._agendado.discard(user_id)
+            removidas += 1
+        self.evicoes += removidas
+        return removidas
+
+    def __len__(self):
+        return len(self._sessoes)
+
+
+# =======================================================
+#   BACKEND SQLITE (SOBREVIVE A REINÍCIOS, VÁRIOS PROCESSOS)
+# =======================================================
+class SessoesSQLite(SessionStore):
+    """
+    Sessões num arquivo SQLite em modo WAL: continuam após reiniciar o bot e
+    podem ser compartilhadas por vários processos na mesma máquina.
+    """
+
+    def __init__(self, caminho: str = "sessoes.db", ociosidade_max: float = 1800):
+        super().__init__(ociosidade_max)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS sessoes ("
+            " user_id INTEGER PRIMARY KEY,"
+            " dados TEXT NOT NULL,"
+            " atualizado_em REAL NOT NULL)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_atualizado ON sessoes (atualizado_em)")
+
+    def obter(self, user_id):
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT dados FROM sessoes WHERE user_id = ? AND atualizado_em > ?",
+                (user_id, time.time() - self.ociosidade_max),
+            ).fetchone()
+        return Atendimento.desserializar(linha[0]) if linha else None
+
+    def salvar(self, atendimento: Atendimento):
+        atendimento.ultima_atividade = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO sessoes (user_id, dados, atualizado_em) VALUES (?, ?, ?)",
+                (atendimento.user_id, atendimento.serializar(), atendimento.ultima_atividade),
+            )
+
+    def remover(self, user_id):
+        with self._lock:
+            self._conexao.execute("DELETE FROM sessoes WHERE user_id = ?", (user_id,))
+
+    def limpar_ociosas(self) -> int:
+        with self._lock:
+            cursor = self._conexao.execute(
+                "DELETE FROM sessoes WHERE atualizado_em <= ?", (time.time() - self.ociosidade_max,)
+            )
+        self.evicoes += cursor.rowcount
+        return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conexao.execute(
+                "SELECT COUNT(*) FROM sessoes WHERE atualizado_em > ?", (time.time() - self.ociosidade_max,)
+            ).fetchone()[0]
+
+
+# =======================================================
+#   CRIAÇÃO A PARTIR DO .env E LIMPEZA PERIÓDICA
+# =======================================================
+def criar_store_sessoes() -> SessionStore:
+    """SESSOES_BACKEND=memoria (padrão) ou sqlite (arquivo em SESSOES_SQLITE_ARQUIVO)."""
+    backend = os.getenv("SESSOES_BACKEND", "memoria").lower()
+    ociosidade = float(os.getenv("SESSAO_OCIOSA_SEGUNDOS", "1800"))
+    if backend == "sqlite":
+        caminho = os.getenv("SESSOES_SQLITE_ARQUIVO", "sessoes.db")
+        logger.info(f"Sessões em SQLite: {caminho}")
+        return SessoesSQLite(caminho, ociosidade)
+    return SessoesMemoria(ociosidade)
+
+
+async def vigiar_sessoes(store: SessionStore, intervalo: float = 60.0):
+    """Tarefa de fundo: remove sessões abandonadas mesmo sem novas mensagens."""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            removidas = store.limpar_ociosas()
+            if removidas:
+                logger.info(f"Sessões ociosas removidas: {removidas} | {store.estatisticas()}")
+        except Exception as e:
+            logger.error(f"Erro ao limpar sessões ociosas: {e}")
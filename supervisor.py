@@ -0,0 +1,320 @@
+# ============================================
+#   SUPERVISOR: VÁRIOS WORKERS COM ROTEAMENTO FIXO POR USUÁRIO
+# ============================================
+# Um processo recebe os updates (getUpdates ou webhook) e repassa cada um ao
+# worker escolhido pelo hash do id do usuário: o mesmo usuário cai sempre no
+# mesmo worker, na ordem em que as mensagens chegaram, e as sessões podem
+# ficar em memória (cada worker só atende os seus usuários).
+#
+# O catálogo é lido e indexado uma vez, aqui, e gravado numa fotografia que
+# cada worker carrega em vez de reler o CSV e remontar o índice
+# (CATALOGO_FOTOGRAFIA). Cada worker ainda tem a própria cópia em memória.
+# A recarga do CSV também só acontece aqui; os workers seguem a fotografia
+# regravada.
+
+import os
+import hmac
+import zlib
+import signal
+import asyncio
+import logging
+import tempfile
+import importlib
+import multiprocessing
+
+import httpx
+from telegram import Update
+
+from catalogo import obter_catalogo, salvar_fotografia, vigiar_catalogo
+from metricas import ambiente_do_worker
+from envio import ambiente_dos_workers, workers_no_limite
+from webhook import (
+    CABECALHO_SEGREDO,
+    WEBHOOK_CAMINHO,
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_CONEXOES,
+    WEBHOOK_PORTA,
+    WEBHOOK_SEGREDO,
+    WEBHOOK_URL,
+    iniciar_processo,
+    validar_segredo,
+    web,
+)
+
+logger = logging.getLogger(__name__)
+
+# quantos workers (processos do bot); padrão: um por núcleo
+SUPERVISOR_WORKERS = int(os.getenv("SUPERVISOR_WORKERS", str(os.cpu_count() or 1)))
+
+# por onde chegam os updates: polling (getUpdates) ou webhook (WEBHOOK_*)
+SUPERVISOR_ENTRADA = os.getenv("SUPERVISOR_ENTRADA", "polling").lower()
+
+# espera (s) do long polling do getUpdates
+SUPERVISOR_POLLING_ESPERA = int(os.getenv("SUPERVISOR_POLLING_ESPERA", "10"))
+
+# tempo máximo (s) para cada worker terminar o que já recebeu no desligamento
+SUPERVISOR_DRENAGEM = float(os.getenv("SUPERVISOR_DRENAGEM", "10"))
+
+# onde fica a fotografia do catálogo (padrão: pasta temporária do sistema)
+SUPERVISOR_FOTOGRAFIA = os.getenv(
+    "SUPERVISOR_FOTOGRAFIA", os.path.join(tempfile.gettempdir(), f"catalogo_unifecaf_{os.getpid()}.pickle")
+)
+
+# intervalo (s) para conferir se o CSV de cursos mudou; 0 desativa a recarga
+CATALOGO_RECARGA_INTERVALO = float(os.getenv("CATALOGO_RECARGA_INTERVALO", "30"))
+
+
+# =======================================================
+#   ROTEAMENTO
+# =======================================================
+def usuario_do_update(update: dict) -> int:
+    """
+    Id de quem gerou o update (message.from, callback_query.from,
+    poll_answer.user...); sem usuário, o id do chat; sem nenhum dos dois, 0.
+    """
+    for valor in update.values():
+        if not isinstance(valor, dict):
+            continue
+        remetente = valor.get("from") or valor.get("user")
+        if remetente:
+            return remetente["id"]
+        chat = valor.get("chat") or valor.get("message", {}).get("chat")
+        if chat:
+            return chat["id"]
+    return 0
+
+
+def worker_do_usuario(user_id: int, workers: int) -> int:
+    """Worker fixo do usuário (crc32: estável entre processos e execuções)."""
+    return zlib.crc32(str(user_id).encode()) % workers
+
+
+# =======================================================
+#   WORKER (PROCESSO DO BOT)
+# =======================================================
+async def _rodar_worker(application, fila, worker: int, drenagem: float):
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    logger.info(f"Worker {worker} pronto (pid {os.getpid()})")
+
+    loop = asyncio.get_running_loop()
+    recebidos = 0
+    while True:
+        lote = await loop.run_in_executor(None, fila.get)
+        if lote is None:  # fim: o supervisor parou de repassar
+            break
+        for dados in lote:
+            await application.update_queue.put(Update.de_json(dados, application.bot))
+        recebidos += len(lote)
+
+    logger.info(f"Worker {worker} drenando: {application.update_queue.qsize()} updates na fila")
+    try:
+        await asyncio.wait_for(application.stop(), drenagem)
+    except asyncio.TimeoutError:
+        logger.warning(f"Worker {worker}: drenagem passou de {drenagem:.0f}s; encerrando com updates em andamento")
+    if application.post_stop:  # respostas ainda na fila de envio
+        await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+    logger.info(f"Worker {worker} encerrado ({recebidos} updates)")
+
+
+def _processo_worker(modulo: str, funcao: str, worker: int, fila, drenagem: float):
+    """Ponto de entrada de cada worker (processo novo, via spawn)."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C chega ao grupo todo; quem encerra é o supervisor
+    criar_aplicacao = getattr(importlib.import_module(modulo), funcao)
+    asyncio.run(_rodar_worker(criar_aplicacao(), fila, worker, drenagem))
+
+
+# =======================================================
+#   SUPERVISOR
+# =======================================================
+class Supervisor:
+    """
+    Sobe os workers, repassa os updates e reinicia quem cair. Cada worker tem
+    a sua fila (multiprocessing.Queue): put() não bloqueia o event loop, e a
+    ordem dos updates de um usuário é a ordem em que entraram na fila.
+    """
+
+    def __init__(self, criar_aplicacao, token: str, url_api: str, workers: int = SUPERVISOR_WORKERS,
+                 fotografia: str = SUPERVISOR_FOTOGRAFIA, drenagem: float = SUPERVISOR_DRENAGEM):
+        self.criar_aplicacao = criar_aplicacao
+        self.url_metodos = f"{url_api}{token}/"
+        self.workers = workers_no_limite(max(1, workers))
+        if self.workers < workers:
+            logger.warning(f"Supervisor: {workers} workers passariam do limite de envio do Telegram; "
+                           f"usando {self.workers}")
+        self.fotografia = fotografia
+        self.drenagem = drenagem
+        self._contexto = multiprocessing.get_context("spawn")
+        self.processos = [None] * self.workers
+        self.filas = [None] * self.workers
+        self.repassados = [0] * self.workers
+        self.reinicios = 0
+        self._parando = False
+
+    # ---------- workers ----------
+    def _iniciar_worker(self, worker: int):
+        fila = self._contexto.Queue()
+        processo = self._contexto.Process(
+            target=_processo_worker,
+            args=(self.criar_aplicacao.__module__, self.criar_aplicacao.__name__, worker, fila, self.drenagem),
+            name=f"bot-worker-{worker}",
+        )
+        iniciar_processo(processo, AUDITORIA_SUFIXO=f".w{worker}", CATALOGO_FOTOGRAFIA=self.fotografia,
+                         **ambiente_do_worker(worker), **ambiente_dos_workers(self.workers))
+        self.filas[worker], self.processos[worker] = fila, processo
+
+    def iniciar_workers(self):
+        tamanho = salvar_fotografia(self.fotografia, obter_catalogo())
+        logger.info(f"Fotografia do catálogo: {self.fotografia} ({tamanho / 1024:.0f} KiB)")
+        for worker in range(self.workers):
+            self._iniciar_worker(worker)
+        logger.info(f"Supervisor: {self.workers} workers, roteamento por usuário")
+
+    async def vigiar_workers(self, intervalo: float = 1.0):
+        """Worker que caiu volta com a mesma posição (os usuários dele não mudam de worker)."""
+        while not self._parando:
+            await asyncio.sleep(intervalo)
+            for worker, processo in enumerate(self.processos):
+                if not self._parando and not processo.is_alive():
+                    logger.error(f"{processo.name} caiu (código {processo.exitcode}); reiniciando")
+                    self.reinicios += 1
+                    self._iniciar_worker(worker)
+
+    def repassar(self, updates: list):
+        """Agrupa por worker e manda um lote para cada (a ordem de cada usuário é mantida)."""
+        lotes = {}
+        for update in updates:
+            worker = worker_do_usuario(usuario_do_update(update), self.workers)
+            lotes.setdefault(worker, []).append(update)
+        for worker, lote in lotes.items():
+            self.filas[worker].put(lote)
+            self.repassados[worker] += len(lote)
+
+    def estatisticas(self) -> dict:
+        return {"workers": self.workers, "repassados": list(self.repassados), "reinicios": self.reinicios}
+
+    async def encerrar(self):
+        """Avisa cada worker (None na fila) e espera a drenagem deles."""
+        self._parando = True
+        for fila in self.filas:
+            fila.put(None)
+        limite = self.drenagem + 30
+        for processo in self.processos:
+            await asyncio.to_thread(processo.join, limite)
+            if processo.is_alive():
+                logger.warning(f"{processo.name} não encerrou a tempo; finalizando")
+                processo.kill()
+        try:
+            os.remove(self.fotografia)
+        except OSError:
+            pass
+        logger.info(f"Supervisor encerrado: {self.estatisticas()}")
+
+    # ---------- entrada: getUpdates ----------
+    async def receber_por_polling(self, parar: asyncio.Event):
+        espera = SUPERVISOR_POLLING_ESPERA
+        offset = None
+        async with httpx.AsyncClient(timeout=espera + 10) as http:
+            await http.post(self.url_metodos + "deleteWebhook")
+            while not parar.is_set():
+                pedido = asyncio.ensure_future(
+                    http.post(self.url_metodos + "getUpdates", data={"offset": offset or "", "timeout": espera})
+                )
+                parado = asyncio.ensure_future(parar.wait())
+                await asyncio.wait({pedido, parado}, return_when=asyncio.FIRST_COMPLETED)
+                if not pedido.done():
+                    pedido.cancel()
+                    break
+                parado.cancel()
+                try:
+                    updates = pedido.result().json()["result"]
+                except Exception as e:
+                    logger.warning(f"getUpdates falhou ({e}); tentando de novo em 1s")
+                    await asyncio.sleep(1)
+                    continue
+                if updates:
+                    offset = updates[-1]["update_id"] + 1
+                    self.repassar(updates)
+            if offset:
+                # confirma ao Telegram o que já foi repassado (o que vier agora fica para a próxima)
+                await http.post(self.url_metodos + "getUpdates", data={"offset": offset, "timeout": 0, "limit": 1})
+
+    # ---------- entrada: webhook ----------
+    def criar_app_web(self):
+        async def receber(request):
+            if not hmac.compare_digest(request.headers.get(CABECALHO_SEGREDO, ""), WEBHOOK_SEGREDO):
+                return web.Response(status=401)
+            try:
+                update = await request.json()
+            except ValueError:
+                return web.Response(status=400)
+            self.repassar([update])
+            return web.Response()
+
+        async def saude(request):
+            return web.json_response(self.estatisticas())
+
+        app_web = web.Application()
+        app_web.router.add_post(WEBHOOK_CAMINHO, receber)
+        app_web.router.add_get("/saude", saude)
+        return app_web
+
+    async def receber_por_webhook(self, parar: asyncio.Event):
+        runner = web.AppRunner(self.criar_app_web(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORTA).start()
+        logger.info(f"Supervisor ouvindo em {WEBHOOK_HOST}:{WEBHOOK_PORTA}{WEBHOOK_CAMINHO}")
+        if WEBHOOK_URL:
+            async with httpx.AsyncClient() as http:
+                await http.post(self.url_metodos + "setWebhook", data={
+                    "url": WEBHOOK_URL.rstrip("/") + WEBHOOK_CAMINHO,
+                    "secret_token": WEBHOOK_SEGREDO,
+                    "max_connections": WEBHOOK_MAX_CONEXOES,
+                })
+        await parar.wait()
+        await runner.cleanup()
+
+
+# =======================================================
+#   EXECUÇÃO
+# =======================================================
+async def _rodar(supervisor: Supervisor, entrada: str):
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinal, parar.set)
+
+    supervisor.iniciar_workers()
+    tarefas = [asyncio.create_task(supervisor.vigiar_workers())]
+    if CATALOGO_RECARGA_INTERVALO > 0:
+        tarefas.append(asyncio.create_task(vigiar_catalogo(
+            CATALOGO_RECARGA_INTERVALO, ao_trocar=lambda catalogo: salvar_fotografia(supervisor.fotografia, catalogo)
+        )))
+    try:
+        if entrada == "webhook":
+            await supervisor.receber_por_webhook(parar)
+        else:
+            await supervisor.receber_por_polling(parar)
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await supervisor.encerrar()
+
+
+def executar_supervisor(criar_aplicacao, token: str, url_api: str, workers: int = SUPERVISOR_WORKERS,
+                        entrada: str = SUPERVISOR_ENTRADA):
+    """
+    Sobe o supervisor e os workers. criar_aplicacao é importada de novo em
+    cada worker, então precisa ser uma função de módulo.
+    """
+    if entrada == "webhook":
+        if web is None:
+            raise RuntimeError("Entrada webhook precisa do aiohttp: pip install aiohttp")
+        validar_segredo(WEBHOOK_SEGREDO)
+    supervisor = Supervisor(criar_aplicacao, token, url_api, workers)
+    asyncio.run(_rodar(supervisor, entrada))
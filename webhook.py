@@ -0,0 +1,199 @@
+# ============================================
+#      MODO WEBHOOK (AIOHTTP) — ALTERNATIVA AO run_polling
+# ============================================
+# O Telegram entrega cada update por POST no endereço público do bot; o
+# servidor confere o segredo (X-Telegram-Bot-Api-Secret-Token) e coloca o
+# update na fila da Application, que chama os mesmos handlers do polling.
+# No desligamento (SIGTERM/SIGINT) para de aceitar conexões e só encerra
+# depois de responder o que já chegou (até WEBHOOK_DRENAGEM segundos).
+#
+# Aqui roda um processo só. Com WEBHOOK_WORKERS > 1 o chatbot sobe o
+# supervisor com entrada webhook (supervisor.py): ele recebe os POSTs e manda
+# cada usuário sempre ao mesmo worker, na ordem em que as mensagens chegaram.
+# Dividir a porta entre processos (SO_REUSEPORT) espalharia as mensagens de um
+# mesmo usuário entre workers, que disputariam a sessão dele.
+
+import os
+import hmac
+import re
+import signal
+import asyncio
+import logging
+
+from telegram import Update
+
+from metricas import metricas, responder_metricas
+
+try:
+    from aiohttp import web
+except ImportError:  # só o modo webhook precisa do aiohttp
+    web = None
+
+logger = logging.getLogger(__name__)
+
+# endereço público (https) que o Telegram chama; vazio = não registra o webhook
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_CAMINHO = os.getenv("WEBHOOK_CAMINHO", "/telegram")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORTA = int(os.getenv("WEBHOOK_PORTA", "8080"))
+
+# segredo que o Telegram manda em todo POST (1-256 caracteres: A-Z a-z 0-9 _ -)
+WEBHOOK_SEGREDO = os.getenv("WEBHOOK_SEGREDO", "")
+
+# entregas simultâneas que o Telegram faz ao webhook (1-100)
+WEBHOOK_MAX_CONEXOES = int(os.getenv("WEBHOOK_MAX_CONEXOES", "40"))
+
+# tempo máximo (s) para terminar os updates em andamento no desligamento
+WEBHOOK_DRENAGEM = float(os.getenv("WEBHOOK_DRENAGEM", "10"))
+
+# processos do bot; acima de 1 o chatbot usa o supervisor (roteamento fixo por usuário)
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+
+CABECALHO_SEGREDO = "X-Telegram-Bot-Api-Secret-Token"
+_SEGREDO_VALIDO = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+def validar_segredo(segredo: str):
+    if not _SEGREDO_VALIDO.match(segredo or ""):
+        raise ValueError("WEBHOOK_SEGREDO obrigatório: 1-256 caracteres entre A-Z, a-z, 0-9, _ e -")
+
+
+def iniciar_processo(processo, **ambiente):
+    """
+    Inicia o processo (spawn) com variáveis de ambiente só dele. O spawn
+    importa o módulo principal antes de chamar o alvo, então o que os módulos
+    leem na importação (AUDITORIA_SUFIXO...) tem de vir no ambiente herdado.
+    """
+    anteriores = {nome: os.environ.get(nome) for nome in ambiente}
+    os.environ.update(ambiente)
+    try:
+        processo.start()
+    finally:
+        for nome, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(nome, None)
+            else:
+                os.environ[nome] = valor
+
+
+class ServidorWebhook:
+    """
+    Servidor aiohttp que alimenta a Application do python-telegram-bot.
+    Cuida do ciclo de vida da Application (initialize/post_init/start e
+    stop/post_stop/shutdown/post_shutdown), como o run_polling faria.
+    """
+
+    def __init__(self, application, segredo: str, caminho: str = WEBHOOK_CAMINHO, host: str = WEBHOOK_HOST,
+                 porta: int = WEBHOOK_PORTA, drenagem: float = WEBHOOK_DRENAGEM):
+        if web is None:
+            raise RuntimeError("Modo webhook precisa do aiohttp: pip install aiohttp")
+        validar_segredo(segredo)
+        self.application = application
+        self.segredo = segredo
+        self.caminho = caminho
+        self.host = host
+        self.porta = porta
+        self.drenagem = drenagem
+        self._runner = None
+        self.recebidos = 0
+        self.recusados = 0
+        self.invalidos = 0
+
+    def criar_app_web(self):
+        app_web = web.Application()
+        app_web.router.add_post(self.caminho, self._receber)
+        app_web.router.add_get("/saude", self._saude)
+        if metricas.ativo:
+            app_web.router.add_get("/metrics", responder_metricas)
+        return app_web
+
+    async def _receber(self, request):
+        if not hmac.compare_digest(request.headers.get(CABECALHO_SEGREDO, ""), self.segredo):
+            self.recusados += 1
+            return web.Response(status=401)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            self.invalidos += 1
+            logger.warning(f"Webhook: update inválido ({e})")
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        self.recebidos += 1
+        return web.Response()
+
+    async def _saude(self, request):
+        return web.json_response(self.estatisticas())
+
+    def estatisticas(self) -> dict:
+        return {"recebidos": self.recebidos, "recusados": self.recusados, "invalidos": self.invalidos,
+                "fila": self.application.update_queue.qsize()}
+
+    async def iniciar(self):
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        await self.application.start()
+
+        self._runner = web.AppRunner(self.criar_app_web(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.porta, ).start()
+        self.porta = self._runner.addresses[0][1]
+        logger.info(f"Webhook ouvindo em {self.host}:{self.porta}{self.caminho}")
+
+    async def registrar_webhook(self, url_publica: str, max_conexoes: int = WEBHOOK_MAX_CONEXOES):
+        """Informa ao Telegram para onde mandar os updates (e com qual segredo)."""
+        await self.application.bot.set_webhook(
+            url=url_publica.rstrip("/") + self.caminho,
+            secret_token=self.segredo,
+            max_connections=max_conexoes,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logger.info(f"Webhook registrado no Telegram: {url_publica.rstrip('/')}{self.caminho}")
+
+    async def encerrar(self):
+        """
+        Drenagem: fecha a porta (o Telegram tenta de novo as entregas que
+        chegarem) e espera a fila e os handlers em andamento.
+        """
+        if self._runner:
+            await self._runner.cleanup()
+        pendentes = self.application.update_queue.qsize()
+        logger.info(f"Webhook drenando: {pendentes} updates na fila")
+        try:
+            await asyncio.wait_for(self.application.stop(), self.drenagem)
+        except asyncio.TimeoutError:
+            logger.warning(f"Drenagem passou de {self.drenagem:.0f}s; encerrando com updates em andamento")
+        if self.application.post_stop:  # respostas ainda na fila de envio
+            await self.application.post_stop(self.application)
+        await self.application.shutdown()
+        if self.application.post_shutdown:
+            await self.application.post_shutdown(self.application)
+        logger.info(f"Webhook encerrado: {self.estatisticas()}")
+
+
+# =======================================================
+#   EXECUÇÃO
+# =======================================================
+async def _rodar(servidor: ServidorWebhook, url_publica: str):
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinal, parar.set)
+    await servidor.iniciar()
+    if url_publica:
+        await servidor.registrar_webhook(url_publica)
+    await parar.wait()
+    await servidor.encerrar()
+
+
+def executar_webhook(criar_aplicacao, workers: int = WEBHOOK_WORKERS):
+    """
+    Sobe o bot em modo webhook num processo só. Vários workers passam pelo
+    supervisor (BOT_MODO=supervisor com SUPERVISOR_ENTRADA=webhook), que
+    mantém cada usuário no mesmo worker.
+    """
+    if workers > 1:
+        raise ValueError("WEBHOOK_WORKERS > 1 precisa do supervisor (roteamento fixo por usuário): "
+                         "use executar_supervisor(..., entrada=\"webhook\")")
+    servidor = ServidorWebhook(criar_aplicacao(), WEBHOOK_SEGREDO)
+    asyncio.run(_rodar(servidor, WEBHOOK_URL))